@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Audit di qualità dei dati in cache da riga di comando
+
+Uso: python audit_cache.py [--symbols AAPL,MSFT] [--data-types daily,dailyAdjusted]
+                           [--workers N] [--output resources/data/audit] [--fail-on-error]
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Aggiungi il percorso root al Python path
+ROOT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.backend.config.settings import AUDIT_MAX_WORKERS, AUDIT_OUTPUT_DIR
+from modules.dataManagement.backend.services.audit import DataAuditService
+
+
+def _list(value):
+    """Lista separata da virgole (None se vuota)"""
+    items = [item.strip() for item in (value or '').split(',') if item.strip()]
+    return items or None
+
+
+def main():
+    """Esegue l'audit, stampa il riepilogo e restituisce il codice di uscita"""
+    parser = argparse.ArgumentParser(description="Audit di qualità dei dati prezzi in cache")
+    parser.add_argument('--symbols', help="Simboli separati da virgola (default: tutti)")
+    parser.add_argument('--data-types', help="Tipi dati separati da virgola (default: tutti)")
+    parser.add_argument('--workers', type=int, default=AUDIT_MAX_WORKERS,
+                        help="Processi del pool")
+    parser.add_argument('--output', default=AUDIT_OUTPUT_DIR,
+                        help="Directory del report ('' per non scriverlo)")
+    parser.add_argument('--fail-on-error', action='store_true',
+                        help="Codice di uscita 1 se ci sono problemi di gravità 'error'")
+    parser.add_argument('--verbose', action='store_true', help="Log dettagliato")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    report = DataAuditService().run(
+        symbols=_list(args.symbols), data_types=_list(args.data_types),
+        max_workers=args.workers, output_dir=args.output or None
+    )
+    print(json.dumps(report['summary'], indent=2))
+
+    if args.fail_on_error and report['summary']['by_severity']['error']:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark del calcolo dei prezzi adjusted su 1M di righe
+Confronta il vecchio percorso pandas (DataFrame dai record, colonne temporanee,
+max/min per riga, to_dict) con il wrapper a record e con il kernel NumPy
+AdjustedDataService.adjust_arrays su array contigui
+
+Uso: python benchmarks/bench_adjusted_prices.py [righe] [ripetizioni]
+"""
+import logging
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.dataManagement.backend.services.adjusted_data import AdjustedDataService
+
+
+def make_records(rows: int) -> list:
+    """Record sintetici come arrivano dal download (con adj_close), timestamp al minuto"""
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    df = pd.DataFrame({
+        'date': pd.date_range('2000-01-03', periods=rows, freq='min').strftime('%Y-%m-%d %H:%M'),
+        'open': close + rng.normal(0, 0.5, rows),
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': rng.integers(1_000, 1_000_000, rows),
+        'adj_close': close * 0.98
+    })
+    return df.to_dict('records')
+
+
+def pandas_baseline(records: list) -> list:
+    """Percorso precedente: DataFrame, fattore come colonna, max/min per riga"""
+    df = pd.DataFrame(records)
+    df['adjustment_factor'] = np.where(df['close'] != 0, df['adj_close'] / df['close'], 1.0)
+    df['adjustment_factor'] = df['adjustment_factor'].fillna(1.0).replace([np.inf, -np.inf], 1.0)
+    for field in ('open', 'high', 'low'):
+        df[f'adj_{field}'] = df[field] * df['adjustment_factor']
+    price_cols = ['adj_open', 'adj_high', 'adj_low', 'adj_close']
+    df['adj_high'] = df[price_cols].max(axis=1)
+    df['adj_low'] = df[price_cols].min(axis=1)
+    return df.drop(columns='adjustment_factor').to_dict('records')
+
+
+def bench(function, repeat: int) -> float:
+    """Millisecondi medi per chiamata"""
+    function()
+    return timeit.timeit(function, number=repeat) / repeat * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logging.disable(logging.INFO)
+
+    service = AdjustedDataService()
+    records = make_records(rows)
+    arrays = {field: np.array([record[field] for record in records], dtype=np.float64)
+              for field in ('open', 'high', 'low', 'close', 'adj_close')}
+
+    def kernel():
+        return service.adjust_arrays(arrays['open'], arrays['high'], arrays['low'],
+                                     arrays['close'], adj_close=arrays['adj_close'])
+
+    print(f"Prezzi adjusted su {rows} righe, media su {repeat} ripetizioni")
+    print(f"  pandas (precedente):   {bench(lambda: pandas_baseline(records), repeat):9.1f} ms")
+    print(f"  wrapper a record:      "
+          f"{bench(lambda: service.calculate_adjusted_prices(records), repeat):9.1f} ms")
+    print(f"  kernel adjust_arrays:  {bench(kernel, repeat):9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
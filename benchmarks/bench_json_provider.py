@@ -0,0 +1,83 @@
+"""
+Benchmark del JSON provider: tempo di jsonify di una risposta prezzi da 10k righe
+Confronta il provider standard di Flask (json) con OrjsonProvider, sia con
+record di float Python sia con colonne passate come array NumPy
+
+Uso: python benchmarks/bench_json_provider.py [righe] [ripetizioni]
+"""
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from flask import Flask, jsonify
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.backend.utils.json_provider import JSON_PROVIDERS, init_json_provider
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    """Serie giornaliera sintetica con prezzi adjusted"""
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, rows))
+    df = pd.DataFrame({
+        'date': pd.bdate_range('1990-01-01', periods=rows),
+        'open': close + rng.normal(0, 0.5, rows),
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': rng.integers(1_000, 1_000_000, rows)
+    })
+    for field in ('open', 'high', 'low', 'close'):
+        df[f'adj_{field}'] = df[field] * 0.98
+    return df
+
+
+def records_payload(df: pd.DataFrame) -> dict:
+    """Risposta 'records' come la costruiscono oggi i servizi (float Python)"""
+    batch = df.copy()
+    batch['date'] = batch['date'].dt.strftime('%Y-%m-%d')
+    records = batch.round(2).to_dict('records')
+    return {'success': True, 'data': {'symbol': 'BENCH', 'records': records,
+                                      'count': len(records)}}
+
+
+def columnar_payload(df: pd.DataFrame) -> dict:
+    """Risposta colonnare con array NumPy non convertiti (solo orjson)"""
+    return {'success': True, 'data': {
+        'symbol': 'BENCH',
+        'timestamps': df['date'].to_numpy().astype('datetime64[s]'),
+        'columns': {column: df[column].to_numpy().round(2) if column != 'volume'
+                    else df[column].to_numpy()
+                    for column in df.columns if column != 'date'}
+    }}
+
+
+def bench(provider: str, payload: dict, repeat: int) -> float:
+    """Millisecondi medi per jsonify (corpo completo della Response)"""
+    app = Flask(__name__)
+    init_json_provider(app, provider)
+    with app.app_context():
+        jsonify(payload).get_data()
+        seconds = timeit.timeit(lambda: jsonify(payload).get_data(), number=repeat)
+    return seconds / repeat * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    df = make_frame(rows)
+    records = records_payload(df)
+    columnar = columnar_payload(df)
+
+    print(f"jsonify di {rows} righe, media su {repeat} ripetizioni")
+    for provider in JSON_PROVIDERS:
+        print(f"  {provider:<8} records:          {bench(provider, records, repeat):8.2f} ms")
+    print(f"  {'orjson':<8} columnar (NumPy): {bench('orjson', columnar, repeat):8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
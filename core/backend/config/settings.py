@@ -32,12 +32,67 @@ LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 YAHOO_API_TIMEOUT = 20
 YAHOO_MAX_RETRIES = 3
 
+# Streaming risposte ed export
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 5000))  # righe per batch
+
+# Cache HTTP (ETag / Last-Modified) e compressione risposte
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", 0))  # secondi, poi rivalidazione
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # byte
+COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", 6))
+
+# Body delle richieste compressi (gzip): limite sulla dimensione decompressa
+REQUEST_MAX_DECOMPRESSED_SIZE = int(os.getenv("REQUEST_MAX_DECOMPRESSED_SIZE", 256 * 1024 * 1024))
+
+# Analisi batch su più simboli (lettura parallela dalla cache)
+BATCH_MAX_SYMBOLS = int(os.getenv("BATCH_MAX_SYMBOLS", 1000))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", 8))
+
+# Screener: tabella ultima barra per simbolo, riallineata ai file ogni N secondi
+SCREENER_RECONCILE_SECONDS = float(os.getenv("SCREENER_RECONCILE_SECONDS", 60))
+SCREENER_MAX_EXPRESSION = int(os.getenv("SCREENER_MAX_EXPRESSION", 1000))  # caratteri
+
+# Indice date-major (tutti i simboli di una data): log mensile fuso nel file base oltre la soglia
+CROSS_SECTION_COMPACT_BYTES = int(os.getenv("CROSS_SECTION_COMPACT_BYTES", 1024 * 1024))
+CROSS_SECTION_MAX_DAYS = int(os.getenv("CROSS_SECTION_MAX_DAYS", 366))
+
+# Sweep di parametri delle strategie (process pool, prezzi condivisi via memmap)
+SWEEP_MAX_WORKERS = int(os.getenv("SWEEP_MAX_WORKERS", os.cpu_count() or 1))
+SWEEP_MAX_COMBINATIONS = int(os.getenv("SWEEP_MAX_COMBINATIONS", 10000))
+SWEEP_START_METHOD = os.getenv("SWEEP_START_METHOD", "forkserver")
+
+# Simulazioni Monte Carlo del rischio (path x orizzonte a blocchi, process pool opzionale)
+MONTE_CARLO_MAX_PATHS = int(os.getenv("MONTE_CARLO_MAX_PATHS", 1_000_000))
+MONTE_CARLO_MAX_WORKERS = int(os.getenv("MONTE_CARLO_MAX_WORKERS", os.cpu_count() or 1))
+MONTE_CARLO_CHUNK_ELEMENTS = int(os.getenv("MONTE_CARLO_CHUNK_ELEMENTS", 2_000_000))  # valori per blocco
+MONTE_CARLO_START_METHOD = os.getenv("MONTE_CARLO_START_METHOD", SWEEP_START_METHOD)
+
+# Audit di qualità dei dati su tutta la cache (process pool, job periodico opzionale)
+AUDIT_MAX_WORKERS = int(os.getenv("AUDIT_MAX_WORKERS", os.cpu_count() or 1))
+AUDIT_START_METHOD = os.getenv("AUDIT_START_METHOD", SWEEP_START_METHOD)
+AUDIT_CHUNK_SIZE = int(os.getenv("AUDIT_CHUNK_SIZE", 64))  # file per task del pool
+AUDIT_MAX_ISSUES_PER_CHECK = int(os.getenv("AUDIT_MAX_ISSUES_PER_CHECK", 100))  # per file
+AUDIT_JUMP_RATIO = float(os.getenv("AUDIT_JUMP_RATIO", 1.8))  # close / close precedente (o inverso)
+AUDIT_INTERVAL_SECONDS = float(os.getenv("AUDIT_INTERVAL_SECONDS", 0))  # 0: job periodico disattivato
+AUDIT_OUTPUT_DIR = os.getenv("AUDIT_OUTPUT_DIR", "resources/data/audit")
+
+# Serializzazione JSON delle risposte ('orjson' o 'default' = json standard)
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+
+# Paginazione a cursore
+PAGE_INDEX_STRIDE = int(os.getenv("PAGE_INDEX_STRIDE", 512))  # righe tra due voci dell'indice
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", 10000))
+
+# Cache delle risposte serializzate (LRU a budget di byte)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
 # Database (future use)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///financial_app.db")
 
 # Module Registry
 ENABLED_MODULES = [
     "dataManagement",
-    "minuteData"
+    "minuteData",
+    "portfolioAnalytics",
+    "backtesting"
     # Aggiungi qui altri moduli quando li crei
 ]
\ No newline at end of file
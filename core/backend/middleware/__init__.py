@@ -0,0 +1 @@
+"""Middleware HTTP dell'applicazione"""
\ No newline at end of file
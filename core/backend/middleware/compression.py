@@ -0,0 +1,109 @@
+"""
+Compressione delle risposte HTTP (gzip / brotli) sopra una soglia di dimensione
+Le risposte in streaming vengono compresse al volo chunk per chunk
+Dipendenza opzionale: brotli (se assente si usa solo gzip)
+"""
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, Response, request
+
+from core.backend.config.settings import COMPRESSION_LEVEL, COMPRESSION_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dipendenza opzionale
+    brotli = None
+
+
+# Formati già compressi: ricomprimerli costa CPU senza ridurre i byte
+SKIP_MIMETYPES = {
+    'application/gzip',
+    'application/zip',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'image/png',
+    'image/jpeg'
+}
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Sceglie la codifica dall'header Accept-Encoding della richiesta corrente"""
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_bytes(data: bytes, encoding: str, level: int = COMPRESSION_LEVEL) -> bytes:
+    """Comprime un corpo completo"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level)
+
+
+def compress_stream(chunks: Iterable, encoding: str,
+                    level: int = COMPRESSION_LEVEL) -> Iterator[bytes]:
+    """
+    Comprime un corpo in streaming; ogni chunk viene svuotato subito
+    (sync flush) così il client riceve i batch senza attendere la fine
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    # wbits=31: stream zlib con header/trailer gzip
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response: Response, min_size: int = COMPRESSION_MIN_SIZE,
+                      level: int = COMPRESSION_LEVEL) -> Response:
+    """Comprime la risposta se il client lo accetta e ne vale la pena"""
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return response
+    if response.mimetype in SKIP_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress_bytes(data, encoding, level))
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app: Flask, min_size: int = COMPRESSION_MIN_SIZE,
+                     level: int = COMPRESSION_LEVEL) -> None:
+    """Registra la compressione come after_request dell'applicazione"""
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, min_size, level)
@@ -0,0 +1,146 @@
+"""
+Cache HTTP condizionale (ETag / Last-Modified / Cache-Control) per gli endpoint dati
+L'ETag forte deriva dalla versione della cache su disco e dai parametri della
+richiesta: con If-None-Match corrispondente la risposta è 304 senza leggere i dati
+"""
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+from flask import Response, make_response, request
+
+from core.backend.config.settings import HTTP_CACHE_MAX_AGE
+from core.backend.middleware.compression import negotiate_encoding
+
+
+# (versione, timestamp ultima modifica) della risorsa
+DataVersion = Tuple[str, float]
+
+CONDITIONAL_METHODS = ('GET', 'HEAD')
+
+logger = logging.getLogger(__name__)
+
+
+def request_params() -> Dict[str, Any]:
+    """
+    Parametri della richiesta: body JSON (POST) o query string (GET)
+    Nella query string 'true'/'false' diventano booleani e 'symbols' una lista
+    """
+    if request.method not in CONDITIONAL_METHODS:
+        return request.get_json(silent=True) or {}
+
+    params: Dict[str, Any] = {}
+    for key, value in request.args.items():
+        lowered = value.strip().lower()
+        if lowered in ('true', 'false'):
+            params[key] = lowered == 'true'
+        elif key == 'symbols':
+            params[key] = [symbol.strip() for symbol in value.split(',') if symbol.strip()]
+        else:
+            params[key] = value
+    return params
+
+
+def with_freshness(version: Optional[DataVersion], end_date: Optional[str] = None,
+                   bucket_seconds: int = 86400) -> Optional[DataVersion]:
+    """
+    Aggiunge alla versione un token temporale per i periodi aperti (end_date >= oggi):
+    i nuovi dati arrivano solo quando la view aggiorna la cache, quindi l'ETag
+    deve scadere a ogni bucket anche se il file non è cambiato
+    """
+    if version is None:
+        return None
+
+    if end_date and pd.to_datetime(end_date) < pd.Timestamp.now().normalize():
+        return version
+
+    bucket = int(time.time() // bucket_seconds)
+    return f"{version[0]}-{bucket}", max(version[1], bucket * bucket_seconds)
+
+
+def make_etag(version: str, params: Dict[str, Any]) -> str:
+    """ETag forte (senza virgolette) per versione, endpoint e rappresentazione"""
+    key = json.dumps({
+        'path': request.path,
+        'params': params,
+        'version': version,
+        'accept': request.headers.get('Accept', ''),
+        'encoding': negotiate_encoding()
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def conditional(version_getter: Callable[[Dict[str, Any]], Optional[DataVersion]],
+                max_age: int = HTTP_CACHE_MAX_AGE) -> Callable:
+    """
+    Decoratore per view GET: risponde 304 se If-None-Match / If-Modified-Since
+    corrispondono alla versione corrente, altrimenti aggiunge ETag,
+    Last-Modified e Cache-Control alla risposta 200
+
+    Args:
+        version_getter: Riceve i parametri della richiesta e restituisce la
+            DataVersion dei dati (None: risposta non cacheabile)
+        max_age: Secondi di validità prima della rivalidazione
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in CONDITIONAL_METHODS:
+                return view(*args, **kwargs)
+
+            params = request_params()
+            version = _get_version(version_getter, params)
+
+            if version is not None:
+                etag = make_etag(version[0], params)
+                if _is_not_modified(etag, version[1]):
+                    response = Response(status=304)
+                    _set_cache_headers(response, etag, version[1], max_age)
+                    return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+            # La view può aver aggiornato la cache: versione ricalcolata
+            version = _get_version(version_getter, params)
+            if version is not None:
+                _set_cache_headers(response, make_etag(version[0], params), version[1], max_age)
+            return response
+
+        return wrapper
+    return decorator
+
+
+def _get_version(version_getter: Callable, params: Dict[str, Any]) -> Optional[DataVersion]:
+    """Versione dei dati; in caso di errore la risposta non viene cachata"""
+    try:
+        return version_getter(params)
+    except Exception as e:
+        logger.warning(f"Versione dati non disponibile: {str(e)}")
+        return None
+
+
+def _is_not_modified(etag: str, last_modified: float) -> bool:
+    """Valuta If-None-Match (prioritario) e If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def _set_cache_headers(response: Response, etag: str, last_modified: float,
+                       max_age: int) -> None:
+    """Header di validazione e caching"""
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.must_revalidate = True
+    response.vary.update(['Accept', 'Accept-Encoding'])
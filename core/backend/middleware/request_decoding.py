@@ -0,0 +1,115 @@
+"""
+Decodifica dei body delle richieste: JSON, MessagePack o Arrow IPC, anche
+compressi con Content-Encoding gzip/deflate. I dati tabellari binari arrivano
+ai servizi come DataFrame colonnare in 'records', senza passare da liste di dict
+MAX_CONTENT_LENGTH limita i byte ricevuti; REQUEST_MAX_DECOMPRESSED_SIZE quelli
+ottenuti dalla decompressione (protezione da body "zip bomb")
+"""
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from flask import current_app, g, request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+from core.backend.config.settings import REQUEST_MAX_DECOMPRESSED_SIZE
+from core.backend.utils.binary import (
+    BINARY_MIMETYPES, arrow_to_frame, binary_format_available, msgpack_to_payload
+)
+
+
+# wbits zlib per formato: 16+ = header gzip, positivo = header zlib (deflate)
+CONTENT_ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+
+def decompress_body(data: bytes, encoding: Optional[str],
+                    max_size: int = REQUEST_MAX_DECOMPRESSED_SIZE) -> bytes:
+    """
+    Decomprime il body secondo Content-Encoding fermandosi a max_size byte
+    (la decompressione non alloca mai più del limite)
+    """
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding == 'identity':
+        return data
+    if encoding not in CONTENT_ENCODINGS:
+        raise UnsupportedMediaType(f"Content-Encoding non supportato: {encoding}")
+
+    decompressor = zlib.decompressobj(CONTENT_ENCODINGS[encoding])
+    try:
+        body = decompressor.decompress(data, max_size + 1)
+    except zlib.error as e:
+        raise BadRequest(f"Body {encoding} non valido: {str(e)}")
+
+    if len(body) > max_size or decompressor.unconsumed_tail:
+        raise RequestEntityTooLarge(
+            f"Body decompresso oltre il limite di {max_size} byte"
+        )
+    if not decompressor.eof:
+        raise BadRequest(f"Body {encoding} troncato")
+    return body
+
+
+def request_payload() -> Dict[str, Any]:
+    """
+    Body della richiesta corrente decodificato (calcolato una volta per richiesta)
+    - application/json: dizionario JSON
+    - application/msgpack: mappa; 'columns' (formato frame_to_msgpack) -> DataFrame
+    - application/vnd.apache.arrow.stream: tabella -> DataFrame in 'records',
+      metadata dello schema come parametri
+    Per i body binari i parametri in query string completano quelli del body
+    """
+    if 'request_payload' not in g:
+        g.request_payload = _decode_request()
+    return g.request_payload
+
+
+def data_reference(payload: Dict[str, Any]) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Riferimento ai dati in cache al posto dei record inline:
+    {symbol, start, end} (accetta anche start_date / end_date)
+    """
+    if payload.get('records') is not None or not payload.get('symbol'):
+        return None
+
+    symbol = str(payload['symbol']).strip().upper()
+    start = payload.get('start', payload.get('start_date'))
+    end = payload.get('end', payload.get('end_date'))
+    return symbol, start, end
+
+
+def _decode_request() -> Dict[str, Any]:
+    """Decodifica Content-Encoding e Content-Type del body"""
+    body = decompress_body(request.get_data(cache=False),
+                           request.headers.get('Content-Encoding'))
+    mimetype = request.mimetype.lower()
+
+    if mimetype in ('', 'application/json') or mimetype.endswith('+json'):
+        if not body:
+            return {}
+        try:
+            payload = current_app.json.loads(body)
+        except ValueError as e:
+            raise BadRequest(f"JSON non valido: {str(e)}")
+        if not isinstance(payload, dict):
+            raise BadRequest("Il body JSON deve essere un oggetto")
+        return payload
+
+    binary_format = BINARY_MIMETYPES.get(mimetype)
+    if binary_format is None:
+        raise UnsupportedMediaType(f"Content-Type non supportato: {mimetype}")
+    if not binary_format_available(binary_format):
+        raise UnsupportedMediaType(f"Formato {binary_format} non disponibile sul server")
+
+    try:
+        if binary_format == 'arrow':
+            frame, metadata = arrow_to_frame(body)
+            payload = {**metadata, 'records': frame}
+        else:
+            payload = msgpack_to_payload(body)
+    except Exception as e:
+        raise BadRequest(f"Body {binary_format} non valido: {str(e)}")
+
+    return {**request.args.to_dict(), **payload}
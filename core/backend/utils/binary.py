@@ -0,0 +1,158 @@
+"""
+Formati di risposta binari (Arrow IPC stream / MessagePack) per client programmatici
+Costruiti dalle colonne del DataFrame in cache, senza passare da record/dict Python
+Dipendenze opzionali: pyarrow e msgpack (se assenti il formato non è negoziabile)
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import Response
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - dipendenza opzionale
+    pa = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dipendenza opzionale
+    msgpack = None
+
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+BINARY_MIMETYPES = {
+    ARROW_MIMETYPE: 'arrow',
+    MSGPACK_MIMETYPE: 'msgpack',
+    'application/x-msgpack': 'msgpack'
+}
+
+# Unità dei timestamp nei payload binari
+TIMESTAMP_UNIT = 'ms'
+
+
+def negotiate_binary_format(accept: Iterable[Tuple[str, float]]) -> Optional[str]:
+    """
+    Sceglie il formato binario dall'header Accept (request.accept_mimetypes)
+    Solo i mimetype indicati esplicitamente contano: '*/*' resta JSON
+    """
+    best_format = None
+    best_quality = 0
+    for mimetype, quality in accept:
+        binary_format = BINARY_MIMETYPES.get(mimetype.lower())
+        if binary_format and quality > best_quality:
+            best_format, best_quality = binary_format, quality
+    return best_format
+
+
+def binary_format_available(binary_format: str) -> bool:
+    """Indica se la libreria del formato è installata sul server"""
+    if binary_format == 'arrow':
+        return pa is not None
+    if binary_format == 'msgpack':
+        return msgpack is not None
+    return False
+
+
+def frame_to_arrow(df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Serializza il DataFrame come Arrow IPC stream (un record batch per colonna-chunk)
+    Le colonne numeriche vengono trasferite senza copia in Python; i metadata
+    (simbolo, tipo dati) finiscono nello schema come stringhe
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow non installato")
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata.update({str(k): str(v) for k, v in metadata.items()})
+        table = table.replace_schema_metadata(schema_metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_to_msgpack(df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Serializza il DataFrame in MessagePack come mappa di colonne
+    Ogni colonna numerica/temporale è {'dtype', 'data'} con i byte grezzi
+    dell'array (np.frombuffer(data, dtype) lato client); le colonne testuali
+    sono liste di stringhe
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack non installato")
+
+    payload = dict(metadata or {})
+    payload['count'] = len(df)
+    payload['columns'] = {
+        str(column): _column_payload(df[column]) for column in df.columns
+    }
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def arrow_to_frame(data: bytes) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """Decodifica un Arrow IPC stream in (DataFrame, metadata dello schema)"""
+    if pa is None:
+        raise RuntimeError("pyarrow non installato")
+
+    table = pa.ipc.open_stream(data).read_all()
+    metadata = {
+        key.decode('utf-8'): value.decode('utf-8')
+        for key, value in (table.schema.metadata or {}).items()
+        if key != b'pandas'
+    }
+    return table.to_pandas(), metadata
+
+
+def msgpack_to_payload(data: bytes) -> Dict[str, Any]:
+    """
+    Decodifica un body MessagePack; una mappa 'columns' nel formato di
+    frame_to_msgpack diventa un DataFrame in 'records' (array senza copia)
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack non installato")
+
+    payload = msgpack.unpackb(data, raw=False)
+    if not isinstance(payload, dict):
+        raise ValueError("Il body MessagePack deve essere una mappa")
+
+    columns = payload.pop('columns', None)
+    if isinstance(columns, dict):
+        payload.pop('count', None)
+        payload['records'] = pd.DataFrame({
+            name: _column_values(values) for name, values in columns.items()
+        })
+    return payload
+
+
+def binary_response(df: pd.DataFrame, binary_format: str,
+                    metadata: Optional[Dict[str, Any]] = None) -> Response:
+    """Crea la Response Flask nel formato binario negoziato"""
+    if binary_format == 'arrow':
+        return Response(frame_to_arrow(df, metadata), mimetype=ARROW_MIMETYPE)
+    return Response(frame_to_msgpack(df, metadata), mimetype=MSGPACK_MIMETYPE)
+
+
+def _column_payload(series: pd.Series) -> Any:
+    """Colonna come byte grezzi little-endian, o lista per le colonne testuali"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy().astype(f'datetime64[{TIMESTAMP_UNIT}]')
+    elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy()
+    else:
+        return [None if pd.isna(value) else str(value) for value in series.tolist()]
+
+    values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+    return {'dtype': values.dtype.str, 'data': values.tobytes()}
+
+
+def _column_values(column: Any) -> Any:
+    """Inverso di _column_payload: byte grezzi + dtype -> array NumPy"""
+    if isinstance(column, dict) and 'dtype' in column and 'data' in column:
+        return np.frombuffer(column['data'], dtype=np.dtype(column['dtype']))
+    return column
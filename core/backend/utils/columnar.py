@@ -0,0 +1,132 @@
+"""
+Serializzazione colonnare ("struct of arrays") dei dati prezzo
+Un array per campo e un array di timestamp condiviso, al posto di una lista di record
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+OUTPUT_FORMATS = ('records', 'columnar')
+
+# Ordine stabile dei campi nelle risposte colonnari
+PRICE_FIELDS = [
+    'open', 'high', 'low', 'close', 'volume',
+    'adj_open', 'adj_high', 'adj_low', 'adj_close'
+]
+
+DAILY_TIME_FORMAT = '%Y-%m-%d'
+MINUTE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_output_format(value: Optional[str]) -> str:
+    """Normalizza e valida il parametro 'format' delle richieste"""
+    output_format = str(value or 'records').strip().lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Formato risposta non supportato: {output_format}. "
+            f"Usa uno tra {', '.join(OUTPUT_FORMATS)}"
+        )
+    return output_format
+
+
+def frame_to_columnar(df: pd.DataFrame, time_column: str = 'date',
+                      time_format: str = DAILY_TIME_FORMAT,
+                      fields: Optional[Sequence[str]] = None,
+                      delta_timestamps: bool = False,
+                      decimals: int = 2) -> Dict[str, Any]:
+    """
+    Costruisce il payload colonnare direttamente dalle colonne del DataFrame
+
+    Args:
+        df: DataFrame ordinato per tempo
+        time_column: Colonna usata come asse temporale condiviso
+        time_format: Formato stringa dei timestamp (se non delta)
+        fields: Campi da includere (default: campi prezzo presenti)
+        delta_timestamps: Se True, timestamp interi in secondi epoch
+            codificati a delta (primo valore assoluto, poi differenze)
+        decimals: Decimali per i campi float
+    """
+    if fields is None:
+        fields = [field for field in PRICE_FIELDS if field in df.columns]
+
+    times = df[time_column]
+    if not pd.api.types.is_datetime64_any_dtype(times):
+        times = pd.to_datetime(times)
+
+    payload = _timestamps(times, time_format, delta_timestamps)
+
+    payload['columns'] = {
+        field: _column_values(df[field], decimals) for field in fields
+    }
+    return payload
+
+
+def panel_to_columnar(panels: Dict[str, pd.DataFrame], time_format: str = DAILY_TIME_FORMAT,
+                      delta_timestamps: bool = False, decimals: int = 2) -> Dict[str, Any]:
+    """
+    Payload di un pannello allineato: un asse di date condiviso e, per campo,
+    una matrice data x simbolo (una riga per data, una colonna per simbolo)
+
+    Args:
+        panels: {campo: DataFrame indicizzato per data, stesse righe e colonne}
+    """
+    first = next(iter(panels.values()))
+    times = first.index.to_series()
+
+    payload = _timestamps(times, time_format, delta_timestamps)
+    payload['symbols'] = [str(symbol) for symbol in first.columns]
+    payload['values'] = {
+        field: _matrix_values(panel.to_numpy(dtype=np.float64), decimals)
+        for field, panel in panels.items()
+    }
+    return payload
+
+
+def records_to_columnar(records: List[Dict], **kwargs) -> Dict[str, Any]:
+    """Converte una lista di record (es. appena scaricati) in formato colonnare"""
+    if not records:
+        return {
+            'timestamps': [],
+            'timestamp_encoding': 'delta' if kwargs.get('delta_timestamps') else 'iso',
+            'columns': {}
+        }
+    return frame_to_columnar(pd.DataFrame(records), **kwargs)
+
+
+def _timestamps(times: pd.Series, time_format: str, delta_timestamps: bool) -> Dict[str, Any]:
+    """Asse temporale condiviso: stringhe ISO o secondi epoch codificati a delta"""
+    if delta_timestamps:
+        epoch = times.values.astype('datetime64[s]').astype(np.int64)
+        return {
+            'timestamps': np.diff(epoch, prepend=0).tolist() if len(epoch) else [],
+            'timestamp_encoding': 'delta',
+            'timestamp_unit': 's'
+        }
+    return {'timestamps': times.dt.strftime(time_format).tolist(), 'timestamp_encoding': 'iso'}
+
+
+def _column_values(series: pd.Series, decimals: int) -> List[Any]:
+    """Estrae i valori di una colonna come lista JSON-compatibile"""
+    values = series.to_numpy()
+
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(np.int64).tolist()
+
+    values = np.round(values.astype(np.float64), decimals)
+    if np.isnan(values).any():
+        # NaN non è JSON valido: usa null
+        return [None if np.isnan(v) else v for v in values.tolist()]
+    return values.tolist()
+
+
+def _matrix_values(values: np.ndarray, decimals: int) -> List[List[Any]]:
+    """Matrice come liste annidate JSON-compatibili (NaN -> null)"""
+    values = np.round(values, decimals)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    matrix = values.astype(object)
+    matrix[missing] = None
+    return matrix.tolist()
@@ -0,0 +1,112 @@
+"""
+JSON provider dell'app Flask ad alte prestazioni (orjson)
+Serializza nativamente array/scalari NumPy e datetime (ISO 8601): i servizi
+possono restituire array senza convertirli prima in float Python
+Dipendenza opzionale: orjson (se assente resta il provider standard di Flask)
+"""
+import logging
+from typing import Any, Dict, Type
+
+import numpy as np
+import pandas as pd
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+from core.backend.config.settings import JSON_PROVIDER
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dipendenza opzionale
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Tipi non gestiti da orjson: pandas, array NumPy di oggetti, tipi Flask"""
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    # Decimal, UUID, dataclass, __html__
+    return DefaultJSONProvider.default(obj)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Provider basato su orjson con le stesse opzioni del provider standard
+    (sort_keys, compact/debug). NaN e infiniti diventano null; per gli oggetti
+    che orjson non sa serializzare (es. interi oltre 64 bit) si ripiega su json
+    """
+
+    def _options(self, indent: bool = False) -> int:
+        """Flag orjson corrispondenti alla configurazione del provider"""
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """Serializza direttamente in byte UTF-8 (senza passare da str)"""
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=self._options(indent))
+        except TypeError:
+            kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+            return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serializza in stringa; argomenti specifici di json.dumps usano json"""
+        if set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserializza testo o byte UTF-8"""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        """Come jsonify standard, ma il corpo viene prodotto già in byte"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype
+        )
+
+
+JSON_PROVIDERS: Dict[str, Type[JSONProvider]] = {
+    'default': DefaultJSONProvider,
+    'orjson': OrjsonProvider
+}
+
+
+def init_json_provider(app: Flask, name: str = JSON_PROVIDER) -> str:
+    """
+    Installa il provider JSON configurato sull'app
+    
+    Returns:
+        Nome del provider effettivamente in uso
+    """
+    if name not in JSON_PROVIDERS:
+        raise ValueError(
+            f"JSON provider non supportato: {name}. "
+            f"Usa uno tra {', '.join(JSON_PROVIDERS)}"
+        )
+    
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson non installato: uso il provider JSON standard")
+        name = 'default'
+    
+    app.json_provider_class = JSON_PROVIDERS[name]
+    app.json = app.json_provider_class(app)
+    return name
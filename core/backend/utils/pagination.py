@@ -0,0 +1,48 @@
+"""
+Paginazione a cursore opaco per le serie temporali
+Il cursore codifica l'ultimo timestamp restituito: la pagina successiva riparte
+da lì con una ricerca nell'indice, indipendentemente dalla posizione nello storico
+"""
+import base64
+import json
+from typing import Any, Dict, Optional
+
+from core.backend.config.settings import PAGE_MAX_LIMIT
+
+
+def parse_limit(value: Any) -> Optional[int]:
+    """Normalizza il parametro 'limit' (None: nessuna paginazione)"""
+    if value is None or value is False or value == '':
+        return None
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"limit non valido: {value}")
+    if limit < 1 or limit > PAGE_MAX_LIMIT:
+        raise ValueError(f"limit deve essere compreso tra 1 e {PAGE_MAX_LIMIT}")
+    return limit
+
+
+def encode_cursor(symbol: str, data_type: str, after: int) -> str:
+    """Cursore opaco (base64 URL-safe) per la pagina che segue il timestamp 'after' (ns)"""
+    payload = json.dumps({'s': symbol, 't': data_type, 'a': int(after)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], symbol: str, data_type: str) -> Optional[int]:
+    """
+    Restituisce il timestamp (ns) dopo cui riprendere, None per la prima pagina
+    Il cursore deve appartenere allo stesso simbolo e tipo dati
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        after = int(payload['a'])
+    except Exception:
+        raise ValueError("Cursore non valido")
+
+    if payload.get('s') != symbol or payload.get('t') != data_type:
+        raise ValueError("Cursore non valido per questa richiesta")
+    return after
@@ -0,0 +1,163 @@
+"""
+Cache delle risposte già serializzate (byte finali) con eviction LRU a budget di byte
+Chiave: (endpoint, parametri normalizzati, versione dei dati); le richieste
+ripetute vengono servite copiando i byte senza ricaricare né riserializzare
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from flask import Response, jsonify
+
+from core.backend.config.settings import RESPONSE_CACHE_MAX_BYTES
+
+
+# Parametri che non cambiano il contenuto della risposta
+IGNORED_PARAMS = ('use_cache',)
+
+
+class ResponseCache:
+    """LRU thread-safe di corpi di risposta, invalidabile per simbolo"""
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[bytes, str, Tuple[str, ...]]]' = OrderedDict()
+        self._by_symbol: Dict[str, set] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(endpoint: str, params: Dict[str, Any], version: str) -> str:
+        """Chiave normalizzata: ordine dei parametri e maiuscole dei simboli irrilevanti"""
+        normalized = {}
+        for key, value in params.items():
+            if key in IGNORED_PARAMS:
+                continue
+            if key in ('symbol', 'symbols'):
+                value = (
+                    [str(v).strip().upper() for v in value]
+                    if isinstance(value, list) else str(value).strip().upper()
+                )
+            normalized[key] = value
+        return json.dumps([endpoint, normalized, version], sort_keys=True, default=str)
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Restituisce (body, mimetype) e segna la voce come usata di recente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: str, body: bytes, mimetype: str,
+            symbols: Iterable[str] = ()) -> bool:
+        """Salva un corpo di risposta; le voci meno recenti escono oltre il budget"""
+        size = len(body)
+        if size > self.max_bytes:
+            return False
+
+        symbols = tuple(str(symbol).strip().upper() for symbol in symbols)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (body, mimetype, symbols)
+            self._size += size
+            for symbol in symbols:
+                self._by_symbol.setdefault(symbol, set()).add(key)
+
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+        return True
+
+    def invalidate(self, symbol: str, *args: Any) -> int:
+        """
+        Rimuove tutte le risposte che contengono il simbolo
+        Firma compatibile con i listener di scrittura di FileManagerService
+        """
+        with self._lock:
+            keys = self._by_symbol.pop(str(symbol).strip().upper(), set())
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        """Svuota la cache"""
+        with self._lock:
+            self._entries.clear()
+            self._by_symbol.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiche di utilizzo"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _remove(self, key: str) -> None:
+        """Rimuove una voce (chiamare con il lock acquisito)"""
+        body, _, symbols = self._entries.pop(key)
+        self._size -= len(body)
+        for symbol in symbols:
+            keys = self._by_symbol.get(symbol)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_symbol[symbol]
+
+
+# Istanza condivisa tra i moduli (un solo budget di memoria per processo)
+response_cache = ResponseCache()
+
+
+def cached_json_response(endpoint: str, params: Dict[str, Any],
+                         version_getter: Callable[[Dict[str, Any]], Optional[Tuple[str, float]]],
+                         compute: Callable[[], Dict[str, Any]],
+                         symbols: Iterable[str], error_status: int = 200,
+                         cache: Optional[ResponseCache] = None) -> Any:
+    """
+    Risposta JSON servita dai byte in cache se la versione dei dati non è cambiata
+
+    Args:
+        endpoint: Nome logico dell'endpoint (parte della chiave)
+        params: Parametri della richiesta
+        version_getter: Versione dei dati per i parametri (None: non cacheabile)
+        compute: Calcola il risultato {'success', ...} in caso di miss
+        symbols: Simboli contenuti nella risposta (per l'invalidazione)
+        error_status: Status HTTP dei risultati con success False (mai cachati)
+    """
+    cache = cache or response_cache
+    if params.get('use_cache', True) is False:
+        result = compute()
+        return jsonify(result), (200 if result.get('success') else error_status)
+
+    version = version_getter(params)
+    if version is not None:
+        cached = cache.get(cache.make_key(endpoint, params, version[0]))
+        if cached is not None:
+            return Response(cached[0], mimetype=cached[1])
+
+    result = compute()
+    response = jsonify(result)
+    if not result.get('success'):
+        return response, error_status
+
+    # Il calcolo può aver aggiornato i file: chiave con la versione corrente
+    version = version_getter(params)
+    if version is not None:
+        cache.put(cache.make_key(endpoint, params, version[0]),
+                  response.get_data(), response.mimetype, symbols)
+    return response
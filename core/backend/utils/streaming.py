@@ -0,0 +1,183 @@
+"""
+Risposte in streaming (NDJSON / JSON a chunk / CSV) costruite da batch di DataFrame
+Il server serializza un batch alla volta: memoria costante e primo byte anticipato
+"""
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from flask import Response, stream_with_context
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+JSON_MIMETYPE = 'application/json'
+CSV_MIMETYPE = 'text/csv'
+GZIP_MIMETYPE = 'application/gzip'
+
+STREAM_MODES = ('ndjson', 'json')
+COMPRESSIONS = ('gzip',)
+
+
+def parse_stream_mode(value: Any) -> Optional[str]:
+    """
+    Normalizza il parametro 'stream' delle richieste
+    True/'ndjson' -> NDJSON, 'json' -> JSON a chunk, False/None -> nessuno streaming
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return 'ndjson'
+
+    stream_mode = str(value).strip().lower()
+    if stream_mode in ('', 'false', '0', 'none'):
+        return None
+    if stream_mode in ('true', '1'):
+        return 'ndjson'
+    if stream_mode not in STREAM_MODES:
+        raise ValueError(
+            f"Modalità streaming non supportata: {stream_mode}. "
+            f"Usa uno tra {', '.join(STREAM_MODES)}"
+        )
+    return stream_mode
+
+
+def parse_compression(value: Any) -> Optional[str]:
+    """Normalizza il parametro 'compression' degli export (None o 'gzip')"""
+    if value is None or value is False:
+        return None
+    if value is True:
+        return 'gzip'
+
+    compression = str(value).strip().lower()
+    if compression in ('', 'none', 'false'):
+        return None
+    if compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Compressione non supportata: {compression}. "
+            f"Usa uno tra {', '.join(COMPRESSIONS)}"
+        )
+    return compression
+
+
+def format_batch(df: pd.DataFrame, date_columns: Optional[Dict[str, str]] = None,
+                 decimals: int = 2) -> pd.DataFrame:
+    """
+    Prepara un batch per la serializzazione come i record delle risposte JSON:
+    date come stringhe e float arrotondati (operazioni vettoriali sul batch)
+    """
+    batch = df.copy()
+
+    for column, time_format in (date_columns or {'date': '%Y-%m-%d'}).items():
+        if column in batch.columns and pd.api.types.is_datetime64_any_dtype(batch[column]):
+            batch[column] = batch[column].dt.strftime(time_format)
+
+    float_columns = batch.select_dtypes(include=[np.floating]).columns
+    if len(float_columns):
+        batch[float_columns] = batch[float_columns].round(decimals)
+
+    return batch
+
+
+def _batch_lines(batch: pd.DataFrame) -> str:
+    """Serializza un batch come righe JSON separate da newline"""
+    return batch.to_json(orient='records', lines=True).rstrip('\n')
+
+
+def ndjson_stream(batches: Iterable[pd.DataFrame]) -> Iterator[str]:
+    """Genera una risposta NDJSON: un record JSON per riga, un chunk per batch"""
+    for batch in batches:
+        if not batch.empty:
+            yield _batch_lines(batch) + '\n'
+
+
+def json_stream(batches: Iterable[pd.DataFrame], envelope: Dict[str, Any]) -> Iterator[str]:
+    """
+    Genera una risposta JSON standard ({'success', 'data': {..., 'records': [...]}})
+    serializzando i record un batch alla volta; 'count' viene emesso in coda
+    """
+    header = json.dumps({'success': True, 'data': envelope})
+    # Apre l'array records dentro l'oggetto data
+    yield header[:-2] + (', ' if envelope else '') + '"records": ['
+
+    count = 0
+    for batch in batches:
+        if batch.empty:
+            continue
+        lines = _batch_lines(batch).replace('\n', ',')
+        yield (',' if count else '') + lines
+        count += len(batch)
+
+    yield f'], "count": {count}}}}}'
+
+
+def ndjson_records(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """NDJSON da oggetti già pronti (es. risultati prodotti man mano): una riga per oggetto"""
+    for record in records:
+        yield json.dumps(record, default=str) + '\n'
+
+
+def record_stream_response(records: Iterable[Dict[str, Any]]) -> Response:
+    """Response NDJSON in streaming: ogni oggetto viene inviato appena prodotto"""
+    response = Response(stream_with_context(ndjson_records(records)),
+                        mimetype=NDJSON_MIMETYPE)
+    # Nessun buffering dei proxy: le righe devono arrivare appena pronte
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def stream_response(batches: Iterable[pd.DataFrame], stream_mode: str,
+                    envelope: Optional[Dict[str, Any]] = None) -> Response:
+    """Crea la Response Flask in streaming per la modalità richiesta"""
+    if stream_mode == 'ndjson':
+        return Response(stream_with_context(ndjson_stream(batches)),
+                        mimetype=NDJSON_MIMETYPE)
+    return Response(stream_with_context(json_stream(batches, envelope or {})),
+                    mimetype=JSON_MIMETYPE)
+
+
+def csv_stream(batches: Iterable[pd.DataFrame],
+               compression: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Genera un file CSV un batch alla volta (header solo sul primo batch)
+    Con compression='gzip' comprime al volo con zlib senza bufferizzare il file
+    Le colonne sono fissate dal primo batch: i batch successivi vengono riallineati
+    """
+    # wbits=31: stream zlib con header/trailer gzip
+    compressor = zlib.compressobj(wbits=31) if compression == 'gzip' else None
+    columns = None
+
+    for batch in batches:
+        if batch.empty:
+            continue
+
+        if columns is None:
+            columns = list(batch.columns)
+            chunk = batch.to_csv(index=False)
+        else:
+            chunk = batch.reindex(columns=columns).to_csv(index=False, header=False)
+
+        data = chunk.encode('utf-8')
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def csv_response(batches: Iterable[pd.DataFrame], filename: str,
+                 compression: Optional[str] = None) -> Response:
+    """Crea la Response Flask di download CSV in streaming"""
+    if compression == 'gzip':
+        filename = f"{filename}.gz"
+        mimetype = GZIP_MIMETYPE
+    else:
+        mimetype = CSV_MIMETYPE
+
+    response = Response(stream_with_context(csv_stream(batches, compression)),
+                        mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
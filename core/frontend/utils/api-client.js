@@ -102,6 +102,37 @@ class ApiClient {
             return { success: false, error: error.message };
         }
     }
+    
+    /**
+     * Converte una risposta colonnare (format=columnar) in lista di record
+     * Supporta timestamp ISO e timestamp interi codificati a delta
+     */
+    static columnarToRecords(data, timeKey = 'date') {
+        const columns = data.columns || {};
+        const fields = Object.keys(columns);
+        let timestamps = data.timestamps || [];
+        
+        if (data.timestamp_encoding === 'delta') {
+            let current = 0;
+            timestamps = timestamps.map(delta => {
+                current += delta;
+                const iso = new Date(current * 1000).toISOString();
+                return timeKey === 'date' ? iso.slice(0, 10) : `${iso.slice(0, 10)} ${iso.slice(11, 19)}`;
+            });
+        }
+        
+        return timestamps.map((timestamp, i) => {
+            const record = { [timeKey]: timestamp };
+            if (timeKey === 'datetime') {
+                record.date = timestamp.slice(0, 10);
+                record.time = timestamp.slice(11, 19);
+            }
+            for (const field of fields) {
+                record[field] = columns[field][i];
+            }
+            return record;
+        });
+    }
 }
 
 // Crea istanza globale
@@ -0,0 +1 @@
+"""Backtesting Module"""
\ No newline at end of file
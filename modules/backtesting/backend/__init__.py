@@ -0,0 +1 @@
+"""Backend del modulo Backtesting"""
\ No newline at end of file
@@ -0,0 +1 @@
+"""API routes del modulo"""
\ No newline at end of file
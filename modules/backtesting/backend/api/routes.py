@@ -0,0 +1,145 @@
+"""
+API Routes per il modulo Backtesting
+"""
+from flask import Blueprint, jsonify, request
+
+from ..services.backtest_service import BacktestService
+from ..services.sweep_service import SweepService
+from core.backend.utils.streaming import parse_stream_mode, record_stream_response
+
+# Crea blueprint per il modulo
+backtesting_bp = Blueprint('backtesting', __name__)
+
+# Inizializza servizi
+backtest_service = BacktestService()
+sweep_service = SweepService()
+
+
+def _symbols(data):
+    """Lista simboli del body ('symbols' o 'symbol')"""
+    return data.get('symbols') or ([data['symbol']] if data.get('symbol') else [])
+
+
+def _number(data, key, default):
+    """Parametro numerico opzionale del body"""
+    value = data.get(key, default)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} non valido: {value}")
+
+
+@backtesting_bp.route('/strategies', methods=['GET'])
+def list_strategies():
+    """Endpoint per l'elenco delle strategie con i parametri di default"""
+    return jsonify({
+        'success': True,
+        'data': backtest_service.list_strategies()
+    })
+
+
+@backtesting_bp.route('/run', methods=['POST'])
+def run_backtest():
+    """
+    Endpoint per eseguire un backtest sui dati giornalieri in cache
+    Body: symbols, strategy, params, start_date, end_date, adjusted,
+    direction, commission, slippage, initial_capital
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        symbols = _symbols(data)
+        if not data.get('strategy'):
+            raise ValueError("Campo richiesto mancante: strategy")
+        if data.get('params') is not None and not isinstance(data['params'], dict):
+            raise ValueError("params deve essere un oggetto")
+        
+        result = backtest_service.run(
+            symbols,
+            str(data['strategy']).strip().lower(),
+            params=data.get('params'),
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date'),
+            data_type='dailyAdjusted' if data.get('adjusted', True) else 'daily',
+            direction=str(data.get('direction', 'long')).strip().lower(),
+            commission=_number(data, 'commission', 0.0),
+            slippage=_number(data, 'slippage', 0.0),
+            initial_capital=_number(data, 'initial_capital', 10000.0)
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
+
+
+@backtesting_bp.route('/sweep', methods=['POST'])
+def run_sweep():
+    """
+    Endpoint per la sweep dei parametri di una strategia su un process pool
+    Body come /run con 'grid' ({parametro: [valori]}) al posto di 'params'.
+    Con stream (default) risponde NDJSON: header, un risultato per combinazione
+    appena completato, end. Con stream false restituisce i risultati ordinati
+    per rank_by (campo numerico di summary, default sharpe)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        if not data.get('strategy'):
+            raise ValueError("Campo richiesto mancante: strategy")
+        stream_mode = parse_stream_mode(data.get('stream', True))
+        rank_by = sweep_service.validate_rank_by(str(data.get('rank_by', 'sharpe')))
+        
+        plan = sweep_service.prepare(
+            _symbols(data),
+            str(data['strategy']).strip().lower(),
+            data.get('grid'),
+            start_date=data.get('start_date'),
+            end_date=data.get('end_date'),
+            data_type='dailyAdjusted' if data.get('adjusted', True) else 'daily',
+            direction=str(data.get('direction', 'long')).strip().lower(),
+            commission=_number(data, 'commission', 0.0),
+            slippage=_number(data, 'slippage', 0.0),
+            initial_capital=_number(data, 'initial_capital', 10000.0)
+        )
+        
+        if stream_mode:
+            return record_stream_response(sweep_service.iter_results(plan))
+        
+        rows = list(sweep_service.iter_results(plan))
+        results = [row for row in rows if row['type'] == 'result']
+        results.sort(key=lambda row: (row['summary'].get(rank_by) is None,
+                                      -(row['summary'].get(rank_by) or 0.0)))
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                **{key: value for key, value in rows[0].items() if key != 'type'},
+                **{key: value for key, value in rows[-1].items() if key != 'type'},
+                'rank_by': rank_by,
+                'errors': [row for row in rows if row['type'] == 'error'],
+                'results': results
+            }
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
@@ -0,0 +1,7 @@
+# modules/backtesting/backend/services/__init__.py
+"""Servizi del modulo"""
+from .strategies import STRATEGIES, strategy_params
+from .backtest_service import BacktestService
+from .sweep_service import SweepService
+
+__all__ = ['STRATEGIES', 'strategy_params', 'BacktestService', 'SweepService']
@@ -0,0 +1,323 @@
+"""
+Motore di backtest vettoriale sui dati giornalieri in cache
+Principio SOLID: Single Responsibility - simula strategie a segnali, non scarica dati
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import BATCH_MAX_SYMBOLS
+from core.backend.utils.columnar import frame_to_columnar
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from .strategies import STRATEGIES, strategy_params, strategy_signal
+
+
+class BacktestService(BaseService):
+    """
+    Backtest di una strategia su molti simboli con operazioni su matrici data x simbolo
+    - i segnali sono calcolati per simbolo con i kernel NumPy degli indicatori
+    - posizioni, rendimenti, costi ed equity sono operazioni 2D in blocco
+    - il segnale calcolato sul close di t viene eseguito allo stesso close:
+      la posizione matura il rendimento da close t a close t + 1
+    - ogni simbolo ha la stessa quota di capitale iniziale (sleeve), senza ribilanciamento
+    """
+
+    DIRECTIONS = ('long', 'long_short')
+    TRADING_DAYS = 252
+    PRICE_FIELD = 'close'
+    STAT_COLUMNS = (
+        'symbol', 'total_return', 'max_drawdown', 'trades', 'win_rate', 'exposure'
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida simboli, direzione, costi e capitale"""
+        symbols = data.get('symbols')
+        if not isinstance(symbols, list) or not symbols:
+            raise ValueError("Campo richiesto mancante: symbols")
+        if len(symbols) > BATCH_MAX_SYMBOLS:
+            raise ValueError(f"Massimo {BATCH_MAX_SYMBOLS} simboli per richiesta")
+
+        if data.get('direction', 'long') not in self.DIRECTIONS:
+            raise ValueError(
+                f"Direzione non supportata: {data.get('direction')}. "
+                f"Usa una tra {', '.join(self.DIRECTIONS)}"
+            )
+        for key in ('commission', 'slippage'):
+            value = data.get(key, 0.0)
+            if not isinstance(value, (int, float)) or isinstance(value, bool) \
+                    or not 0 <= value < 1:
+                raise ValueError(f"{key} deve essere una frazione tra 0 e 1")
+        capital = data.get('initial_capital', 1.0)
+        if not isinstance(capital, (int, float)) or isinstance(capital, bool) or capital <= 0:
+            raise ValueError("initial_capital deve essere positivo")
+        return True
+
+    @staticmethod
+    def normalize_symbols(symbols: Any) -> List[str]:
+        """Simboli in maiuscolo senza duplicati; una stringa non viene spezzata in caratteri"""
+        if not isinstance(symbols, list) or not symbols:
+            raise ValueError("symbols deve essere una lista non vuota")
+        return list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols))
+
+    def list_strategies(self) -> List[Dict[str, Any]]:
+        """Strategie disponibili con i parametri di default"""
+        return [
+            {'name': name, 'description': spec['description'], 'params': dict(spec['params'])}
+            for name, spec in STRATEGIES.items()
+        ]
+
+    def run(self, symbols: List[str], strategy: str, params: Optional[Dict[str, Any]] = None,
+            start_date: Optional[str] = None, end_date: Optional[str] = None,
+            data_type: str = 'dailyAdjusted', direction: str = 'long',
+            commission: float = 0.0, slippage: float = 0.0,
+            initial_capital: float = 10000.0) -> Dict[str, Any]:
+        """
+        Esegue il backtest sui close in cache dei simboli richiesti
+
+        Args:
+            commission: Commissione per unità di controvalore scambiato (0.001 = 10 bps)
+            slippage: Slippage per unità di controvalore scambiato
+
+        Returns:
+            {'strategy', 'params', 'summary', 'trades', 'symbols' (tabella compatta),
+             'equity' (colonnare: equity e drawdown), 'missing'}
+        """
+        symbols = self.normalize_symbols(symbols)
+        params = strategy_params(strategy, params)
+        self.validate_input({
+            'symbols': symbols, 'direction': direction, 'commission': commission,
+            'slippage': slippage, 'initial_capital': initial_capital
+        })
+
+        panels, missing = self.file_manager.load_panel(
+            symbols, data_type, start_date, end_date, fields=(self.PRICE_FIELD,)
+        )
+        close = panels[self.PRICE_FIELD]
+        if close.empty:
+            raise ValueError("Nessun dato trovato in cache per i simboli richiesti")
+
+        result = self.simulate(
+            close, strategy, params, direction, commission + slippage, initial_capital
+        )
+        result.update({
+            'strategy': strategy,
+            'params': params,
+            'direction': direction,
+            'commission': commission,
+            'slippage': slippage,
+            'missing': missing
+        })
+        return result
+
+    def simulate(self, close: pd.DataFrame, strategy: str, params: Dict[str, Any],
+                 direction: str = 'long', cost: float = 0.0,
+                 initial_capital: float = 10000.0) -> Dict[str, Any]:
+        """
+        Simulazione su una matrice di close (date x simboli, NaN = non quotato)
+        cost: costo totale (commissione + slippage) per unità di turnover
+        """
+        filled, listed = self.fill_prices(close.to_numpy(dtype=np.float64))
+        held, net, sleeves, equity = self.equity(
+            filled, listed, strategy, params, direction, cost, initial_capital
+        )
+        drawdown = equity / np.maximum.accumulate(equity) - 1.0
+
+        trade_returns, trade_symbols, holding = self.trades(held, net)
+        symbol_stats = self._symbol_stats(close.columns, sleeves, held, listed,
+                                          trade_returns, trade_symbols)
+
+        curve = pd.DataFrame({'date': close.index, 'equity': equity, 'drawdown': drawdown})
+        return {
+            'summary': self._summary(close.index, equity, drawdown, held, listed),
+            'trades': self._trade_summary(trade_returns, holding),
+            'symbols': symbol_stats,
+            'equity': frame_to_columnar(curve, fields=['equity', 'drawdown'], decimals=6)
+        }
+
+    def evaluate(self, filled: np.ndarray, listed: np.ndarray, dates: pd.DatetimeIndex,
+                 strategy: str, params: Dict[str, Any], direction: str = 'long',
+                 cost: float = 0.0, initial_capital: float = 10000.0) -> Dict[str, Any]:
+        """
+        Solo statistiche di portafoglio e dei trade su close già allineati
+        (senza equity curve né tabella per simbolo): unità di lavoro delle sweep
+        """
+        held, net, _, equity = self.equity(
+            filled, listed, strategy, params, direction, cost, initial_capital
+        )
+        drawdown = equity / np.maximum.accumulate(equity) - 1.0
+        trade_returns, _, holding = self.trades(held, net)
+        return {
+            'summary': self._summary(dates, equity, drawdown, held, listed),
+            'trades': self._trade_summary(trade_returns, holding)
+        }
+
+    def equity(self, filled: np.ndarray, listed: np.ndarray, strategy: str,
+               params: Dict[str, Any], direction: str = 'long', cost: float = 0.0,
+               initial_capital: float = 10000.0) -> Tuple[np.ndarray, ...]:
+        """
+        Posizioni, rendimenti netti, equity per simbolo (base 1) e di portafoglio
+
+        Returns:
+            (posizioni detenute, rendimenti netti, sleeve, equity di portafoglio)
+        """
+        signals = self.signals(filled, listed, strategy, params)
+        if direction == 'long':
+            signals = np.maximum(signals, 0.0)
+
+        held, net = self.returns(filled, signals, cost)
+        sleeves = np.cumprod(1.0 + net, axis=0)
+        return held, net, sleeves, initial_capital * sleeves.mean(axis=1)
+
+    @staticmethod
+    def fill_prices(prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Close propagati sui buchi di ogni colonna e maschera del periodo quotato
+        (dalla prima all'ultima data valida del simbolo)
+        """
+        valid = np.isfinite(prices)
+        rows = np.arange(len(prices))[:, None]
+        index = np.where(valid, rows, 0)
+        np.maximum.accumulate(index, axis=0, out=index)
+        filled = np.take_along_axis(prices, index, axis=0)
+
+        started = np.maximum.accumulate(valid, axis=0)
+        ended = np.maximum.accumulate(valid[::-1], axis=0)[::-1]
+        return filled, started & ended
+
+    @staticmethod
+    def signals(filled: np.ndarray, listed: np.ndarray, strategy: str,
+                params: Dict[str, Any]) -> np.ndarray:
+        """Posizioni desiderate per simbolo, calcolate sul solo periodo quotato"""
+        signal = strategy_signal(strategy)
+        result = np.zeros(filled.shape)
+        for j in range(filled.shape[1]):
+            rows = np.flatnonzero(listed[:, j])
+            if len(rows):
+                first, last = rows[0], rows[-1] + 1
+                result[first:last, j] = signal(filled[first:last, j], **params)
+        return result
+
+    @staticmethod
+    def returns(filled: np.ndarray, signals: np.ndarray,
+                cost: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Posizioni detenute e rendimenti netti per simbolo
+        La posizione di t è il segnale di t - 1 (entrata al close del giorno del
+        segnale) e matura il rendimento close t - 1 -> close t; i costi si pagano
+        sul turnover nel primo giorno detenuto
+
+        Returns:
+            (posizioni detenute, rendimenti netti) date x simboli
+        """
+        held = np.zeros(signals.shape)
+        held[1:] = signals[:-1]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            price_returns = filled[1:] / filled[:-1] - 1.0
+        asset = np.zeros(filled.shape)
+        asset[1:] = np.nan_to_num(price_returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+        turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+        # Una sleeve non può perdere più del proprio capitale
+        net = np.maximum(held * asset - turnover * cost, -1.0)
+        return held, net
+
+    @staticmethod
+    def trades(held: np.ndarray, net: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Rendimento, simbolo e durata (giorni in posizione) di ogni trade
+        Un trade inizia quando la posizione cambia verso un valore non nullo e
+        include il giorno di uscita (costi di chiusura); raggruppamento con
+        bincount sulle colonne concatenate
+        """
+        rows = held.shape[0]
+        position = held.T.ravel()
+        previous = np.zeros(held.shape)
+        previous[1:] = held[:-1]
+        previous = previous.T.ravel()
+
+        starts = (position != 0) & (position != previous)
+        if not starts.any():
+            empty = np.empty(0)
+            return empty, np.empty(0, dtype=np.int64), empty
+
+        ids = np.cumsum(starts)
+        member = (position != 0) | (previous != 0)
+        with np.errstate(divide='ignore'):
+            log_returns = np.log1p(net.T.ravel())
+
+        count = int(ids[-1]) + 1
+        trade_returns = np.expm1(np.bincount(ids[member], weights=log_returns[member],
+                                             minlength=count))[1:]
+        holding = np.bincount(ids[position != 0], minlength=count)[1:]
+        trade_symbols = np.flatnonzero(starts) // rows
+        return trade_returns, trade_symbols, holding
+
+    def _summary(self, dates: pd.DatetimeIndex, equity: np.ndarray, drawdown: np.ndarray,
+                 held: np.ndarray, listed: np.ndarray) -> Dict[str, Any]:
+        """Statistiche di portafoglio"""
+        daily = equity[1:] / equity[:-1] - 1.0
+        years = max((dates[-1] - dates[0]).days / 365.25, 1e-9)
+        total = equity[-1] / equity[0] - 1.0
+        volatility = float(np.std(daily, ddof=1)) if len(daily) > 1 else 0.0
+
+        return {
+            'start': dates[0].strftime('%Y-%m-%d'),
+            'end': dates[-1].strftime('%Y-%m-%d'),
+            'days': len(dates),
+            'symbols': int(held.shape[1]),
+            'final_equity': float(equity[-1]),
+            'total_return': float(total * 100),
+            'cagr': float(((1.0 + total) ** (1.0 / years) - 1.0) * 100) if total > -1 else -100.0,
+            'volatility_annualized': volatility * np.sqrt(self.TRADING_DAYS) * 100,
+            'sharpe': float(np.mean(daily) / volatility * np.sqrt(self.TRADING_DAYS))
+            if volatility > 0 else None,
+            'max_drawdown': float(drawdown.min() * 100),
+            'exposure': float((held != 0).sum() / max(listed.sum(), 1) * 100)
+        }
+
+    @staticmethod
+    def _trade_summary(trade_returns: np.ndarray, holding: np.ndarray) -> Dict[str, Any]:
+        """Statistiche aggregate dei trade"""
+        if not len(trade_returns):
+            return {'count': 0}
+
+        wins = trade_returns[trade_returns > 0]
+        losses = trade_returns[trade_returns < 0]
+        return {
+            'count': int(len(trade_returns)),
+            'win_rate': float(len(wins) / len(trade_returns) * 100),
+            'avg_return': float(trade_returns.mean() * 100),
+            'best': float(trade_returns.max() * 100),
+            'worst': float(trade_returns.min() * 100),
+            'avg_holding_days': float(holding.mean()),
+            'profit_factor': float(wins.sum() / -losses.sum()) if len(losses) else None
+        }
+
+    def _symbol_stats(self, symbols: pd.Index, sleeves: np.ndarray, held: np.ndarray,
+                      listed: np.ndarray, trade_returns: np.ndarray,
+                      trade_symbols: np.ndarray) -> Dict[str, Any]:
+        """Tabella compatta per simbolo (columns + una riga per simbolo)"""
+        n = sleeves.shape[1]
+        drawdown = (sleeves / np.maximum.accumulate(sleeves, axis=0) - 1.0).min(axis=0)
+        trades = np.bincount(trade_symbols, minlength=n)
+        wins = np.bincount(trade_symbols, weights=trade_returns > 0, minlength=n)
+        exposure = (held != 0).sum(axis=0) / np.maximum(listed.sum(axis=0), 1)
+
+        rows = []
+        for j, symbol in enumerate(symbols):
+            rows.append([
+                str(symbol),
+                float((sleeves[-1, j] - 1.0) * 100),
+                float(drawdown[j] * 100),
+                int(trades[j]),
+                float(wins[j] / trades[j] * 100) if trades[j] else None,
+                float(exposure[j] * 100)
+            ])
+        return {'columns': list(self.STAT_COLUMNS), 'rows': rows}
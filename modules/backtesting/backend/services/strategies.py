@@ -0,0 +1,121 @@
+"""
+Strategie a segnali per il motore di backtest
+Ogni strategia riceve i close di un simbolo (senza buchi) e restituisce la
+posizione desiderata a fine giornata: 1 long, -1 short, 0 flat
+"""
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from modules.dataManagement.backend.services.indicators import IndicatorService
+
+
+# Kernel RSI (metodo di istanza): una sola istanza per il modulo
+_indicators = IndicatorService()
+
+
+def _ffill_events(events: np.ndarray) -> np.ndarray:
+    """Propaga l'ultimo evento (entrata/uscita) sulle righe senza evento (NaN)"""
+    index = np.where(np.isnan(events), 0, np.arange(len(events)))
+    np.maximum.accumulate(index, out=index)
+    return np.nan_to_num(events[index], nan=0.0)
+
+
+def sma_cross(close: np.ndarray, fast: int, slow: int) -> np.ndarray:
+    """Long con media veloce sopra la lenta, short sotto"""
+    fast_ma = IndicatorService.rolling_mean(close, fast)
+    slow_ma = IndicatorService.rolling_mean(close, slow)
+    with np.errstate(invalid='ignore'):
+        signal = np.sign(fast_ma - slow_ma)
+    return np.nan_to_num(signal, nan=0.0)
+
+
+def ema_cross(close: np.ndarray, fast: int, slow: int) -> np.ndarray:
+    """Come sma_cross con medie esponenziali (valide dopo slow righe)"""
+    fast_ma = IndicatorService.ema(close, 2.0 / (fast + 1))
+    slow_ma = IndicatorService.ema(close, 2.0 / (slow + 1))
+    signal = np.sign(fast_ma - slow_ma)
+    signal[:slow - 1] = 0.0
+    return signal
+
+
+def rsi_threshold(close: np.ndarray, period: int, lower: float, upper: float) -> np.ndarray:
+    """Long sotto la soglia di ipervenduto, short sopra l'ipercomprato; posizione mantenuta tra le soglie"""
+    rsi, _, _ = _indicators.rsi(close, period)
+    with np.errstate(invalid='ignore'):
+        events = np.where(rsi < lower, 1.0, np.where(rsi > upper, -1.0, np.nan))
+    return _ffill_events(events)
+
+
+def momentum(close: np.ndarray, lookback: int, threshold: float) -> np.ndarray:
+    """Long se il rendimento degli ultimi lookback giorni supera la soglia, short sotto -soglia"""
+    signal = np.zeros(len(close))
+    if len(close) > lookback:
+        change = close[lookback:] / close[:-lookback] - 1.0
+        signal[lookback:] = np.where(change > threshold, 1.0,
+                                     np.where(change < -threshold, -1.0, 0.0))
+    return signal
+
+
+# Registro: funzione segnale, parametri di default e vincoli tra parametri
+STRATEGIES: Dict[str, Dict[str, Any]] = {
+    'sma_cross': {
+        'signal': sma_cross,
+        'params': {'fast': 20, 'slow': 50},
+        'description': 'Incrocio di medie mobili semplici'
+    },
+    'ema_cross': {
+        'signal': ema_cross,
+        'params': {'fast': 12, 'slow': 26},
+        'description': 'Incrocio di medie mobili esponenziali'
+    },
+    'rsi_threshold': {
+        'signal': rsi_threshold,
+        'params': {'period': 14, 'lower': 30.0, 'upper': 70.0},
+        'description': 'Soglie RSI di ipervenduto / ipercomprato'
+    },
+    'momentum': {
+        'signal': momentum,
+        'params': {'lookback': 126, 'threshold': 0.0},
+        'description': 'Rendimento degli ultimi lookback giorni oltre la soglia'
+    }
+}
+
+
+def strategy_params(name: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Parametri completi e validati di una strategia (default + override)
+    I tipi seguono i default: interi per periodi, float per soglie
+    """
+    if name not in STRATEGIES:
+        raise ValueError(
+            f"Strategia non supportata: {name}. Usa una tra {', '.join(STRATEGIES)}"
+        )
+
+    defaults = STRATEGIES[name]['params']
+    unknown = [key for key in (params or {}) if key not in defaults]
+    if unknown:
+        raise ValueError(f"Parametri non supportati per {name}: {', '.join(unknown)}")
+
+    resolved = {}
+    for key, default in defaults.items():
+        value = (params or {}).get(key, default)
+        try:
+            resolved[key] = type(default)(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Parametro {key} non valido: {value}")
+        if isinstance(default, int) and (resolved[key] != float(value) or resolved[key] < 1):
+            raise ValueError(f"Parametro {key} deve essere un intero >= 1")
+
+    if 'fast' in resolved and resolved['fast'] >= resolved['slow']:
+        raise ValueError("Il periodo fast deve essere minore di slow")
+    if 'lower' in resolved and not 0 <= resolved['lower'] < resolved['upper'] <= 100:
+        raise ValueError("Soglie RSI non valide: serve 0 <= lower < upper <= 100")
+    if 'threshold' in resolved and resolved['threshold'] < 0:
+        raise ValueError("threshold deve essere >= 0")
+    return resolved
+
+
+def strategy_signal(name: str) -> Callable[..., np.ndarray]:
+    """Funzione segnale di una strategia registrata"""
+    return STRATEGIES[name]['signal']
@@ -0,0 +1,231 @@
+"""
+Sweep dei parametri di una strategia su un process pool
+Principio SOLID: Single Responsibility - distribuisce le valutazioni, non le calcola
+"""
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import (
+    SWEEP_MAX_COMBINATIONS, SWEEP_MAX_WORKERS, SWEEP_START_METHOD
+)
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from .backtest_service import BacktestService
+from .strategies import STRATEGIES, strategy_params
+
+
+# Array del processo worker: memmap aperti una volta dall'initializer del pool
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(directory: str) -> None:
+    """Apre in sola lettura i prezzi condivisi (le pagine restano nella page cache del SO)"""
+    _worker['filled'] = np.load(os.path.join(directory, 'filled.npy'), mmap_mode='r')
+    _worker['listed'] = np.load(os.path.join(directory, 'listed.npy'), mmap_mode='r')
+    _worker['dates'] = pd.DatetimeIndex(np.load(os.path.join(directory, 'dates.npy')))
+    _worker['engine'] = BacktestService()
+
+
+def _evaluate(index: int, strategy: str, params: Dict[str, Any], direction: str,
+              cost: float, initial_capital: float) -> Dict[str, Any]:
+    """Valuta una combinazione nel worker: al task viaggiano solo i parametri"""
+    result = _worker['engine'].evaluate(
+        _worker['filled'], _worker['listed'], _worker['dates'],
+        strategy, params, direction, cost, initial_capital
+    )
+    result.update({'index': index, 'params': params})
+    return result
+
+
+class SweepService(BaseService):
+    """
+    Valuta una strategia su ogni combinazione di una griglia di parametri
+    - i close vengono letti e allineati una volta, poi scritti in file .npy
+      che i worker aprono come memmap: nessun array viene serializzato per task
+    - i file .npy esistono solo mentre il generatore dei risultati è attivo
+    - le valutazioni (CPU-bound) girano in un ProcessPoolExecutor, fuori dal GIL
+    - i risultati vengono restituiti man mano che terminano
+    """
+
+    # Campi numerici di summary utilizzabili per ordinare i risultati
+    RANK_FIELDS = (
+        'final_equity', 'total_return', 'cagr', 'volatility_annualized',
+        'sharpe', 'max_drawdown', 'exposure'
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+        self.engine = BacktestService()
+
+    def validate_rank_by(self, rank_by: str) -> str:
+        """Valida il campo di ordinamento dei risultati"""
+        if rank_by not in self.RANK_FIELDS:
+            raise ValueError(
+                f"rank_by non supportato: {rank_by}. Usa uno tra {', '.join(self.RANK_FIELDS)}"
+            )
+        return rank_by
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida la griglia: parametri della strategia con liste di valori non vuote"""
+        strategy, grid = data.get('strategy'), data.get('grid')
+        if strategy not in STRATEGIES:
+            raise ValueError(
+                f"Strategia non supportata: {strategy}. Usa una tra {', '.join(STRATEGIES)}"
+            )
+        if not isinstance(grid, dict) or not grid:
+            raise ValueError("grid deve essere un oggetto {parametro: [valori]}")
+
+        for key, values in grid.items():
+            if key not in STRATEGIES[strategy]['params']:
+                raise ValueError(f"Parametro non supportato per {strategy}: {key}")
+            if not isinstance(values, list) or not values:
+                raise ValueError(f"grid.{key} deve essere una lista non vuota")
+
+        size = int(np.prod([len(values) for values in grid.values()]))
+        if size > SWEEP_MAX_COMBINATIONS:
+            raise ValueError(
+                f"Griglia di {size} combinazioni: massimo {SWEEP_MAX_COMBINATIONS}"
+            )
+        return True
+
+    def expand_grid(self, strategy: str, grid: Dict[str, List[Any]]) -> Dict[str, Any]:
+        """
+        Combinazioni valide della griglia (prodotto cartesiano)
+        Le combinazioni che violano i vincoli (es. fast >= slow) vengono scartate
+
+        Returns:
+            {'combinations': [parametri completi], 'skipped': numero scartate}
+        """
+        self.validate_input({'strategy': strategy, 'grid': grid})
+
+        keys = list(grid)
+        combinations, skipped = [], 0
+        for values in itertools.product(*(grid[key] for key in keys)):
+            try:
+                combinations.append(strategy_params(strategy, dict(zip(keys, values))))
+            except ValueError:
+                skipped += 1
+
+        if not combinations:
+            raise ValueError("Nessuna combinazione valida nella griglia")
+        return {'combinations': combinations, 'skipped': skipped}
+
+    def prepare(self, symbols: List[str], strategy: str, grid: Dict[str, List[Any]],
+                start_date: Optional[str] = None, end_date: Optional[str] = None,
+                data_type: str = 'dailyAdjusted', direction: str = 'long',
+                commission: float = 0.0, slippage: float = 0.0,
+                initial_capital: float = 10000.0) -> Dict[str, Any]:
+        """
+        Valida la richiesta e allinea i prezzi condivisi
+        Gli errori emergono qui, prima che inizi lo streaming dei risultati;
+        i file per i worker vengono scritti solo da iter_results
+
+        Returns:
+            Piano della sweep da passare a iter_results
+        """
+        symbols = self.engine.normalize_symbols(symbols)
+        self.engine.validate_input({
+            'symbols': symbols, 'direction': direction, 'commission': commission,
+            'slippage': slippage, 'initial_capital': initial_capital
+        })
+        expanded = self.expand_grid(strategy, grid)
+
+        panels, missing = self.file_manager.load_panel(
+            symbols, data_type, start_date, end_date, fields=(self.engine.PRICE_FIELD,)
+        )
+        close = panels[self.engine.PRICE_FIELD]
+        if close.empty:
+            raise ValueError("Nessun dato trovato in cache per i simboli richiesti")
+
+        filled, listed = self.engine.fill_prices(close.to_numpy(dtype=np.float64))
+
+        return {
+            'arrays': {'filled': filled, 'listed': listed, 'dates': close.index.to_numpy()},
+            'strategy': strategy,
+            'direction': direction,
+            'cost': commission + slippage,
+            'initial_capital': initial_capital,
+            'combinations': expanded['combinations'],
+            'header': {
+                'strategy': strategy,
+                'direction': direction,
+                'commission': commission,
+                'slippage': slippage,
+                'symbols': [str(symbol) for symbol in close.columns],
+                'missing': missing,
+                'start': close.index[0].strftime('%Y-%m-%d'),
+                'end': close.index[-1].strftime('%Y-%m-%d'),
+                'combinations': len(expanded['combinations']),
+                'skipped': expanded['skipped']
+            }
+        }
+
+    def iter_results(self, plan: Dict[str, Any],
+                     max_workers: int = SWEEP_MAX_WORKERS) -> Iterator[Dict[str, Any]]:
+        """
+        Esegue la sweep e restituisce i risultati nell'ordine di completamento
+        Prima riga: intestazione ('type': 'header'); poi una riga 'result' per
+        combinazione; in coda 'end' con conteggio e durata. Se il consumatore
+        smette di leggere, le valutazioni in coda vengono annullate.
+        La directory dei file condivisi viene creata qui (plan['directory']) e
+        rimossa nel finally: un generatore mai avviato non lascia file su disco
+        """
+        started = time.perf_counter()
+        combinations = plan['combinations']
+        workers = max(1, min(max_workers, len(combinations)))
+        directory = plan['directory'] = tempfile.mkdtemp(prefix='sweep_')
+        executor = None
+        completed, failed = 0, 0
+        try:
+            for name, values in plan['arrays'].items():
+                np.save(os.path.join(directory, f'{name}.npy'), values)
+            yield {'type': 'header', **plan['header']}
+
+            context = multiprocessing.get_context(SWEEP_START_METHOD)
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=context,
+                initializer=_init_worker, initargs=(directory,)
+            )
+            pending = {
+                executor.submit(
+                    _evaluate, index, plan['strategy'], params, plan['direction'],
+                    plan['cost'], plan['initial_capital']
+                ): index
+                for index, params in enumerate(combinations)
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        failed += 1
+                        self.log_error(f"Sweep: valutazione {index} fallita", e)
+                        yield {'type': 'error', 'index': index,
+                               'params': combinations[index], 'error': str(e)}
+                        continue
+                    completed += 1
+                    yield {'type': 'result', **result}
+
+            yield {
+                'type': 'end',
+                'completed': completed,
+                'failed': failed,
+                'workers': workers,
+                'elapsed_seconds': round(time.perf_counter() - started, 3)
+            }
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,115 @@
+"""
+Test per il motore di backtest vettoriale
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.backtesting.backend.services.backtest_service import BacktestService
+from modules.backtesting.backend.services.strategies import strategy_params
+
+
+class TestBacktestService:
+    """Test suite per BacktestService"""
+
+    @pytest.fixture
+    def service(self):
+        """Istanza del servizio"""
+        return BacktestService()
+
+    @pytest.fixture
+    def close(self):
+        """Due simboli, il secondo quotato da metà periodo e con un buco"""
+        rng = np.random.default_rng(5)
+        dates = pd.bdate_range('2020-01-01', periods=600)
+        close = pd.DataFrame({
+            'AAA': 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, 600))),
+            'BBB': 20 * np.exp(np.cumsum(rng.normal(0.0, 0.02, 600)))
+        }, index=dates)
+        close.iloc[:300, 1] = np.nan
+        close.iloc[400, 1] = np.nan
+        return close
+
+    @staticmethod
+    def reference_equity(prices, fast, slow, cost):
+        """Backtest a ciclo esplicito di un incrocio SMA long-only"""
+        series = pd.Series(prices)
+        signal = (series.rolling(fast).mean() > series.rolling(slow).mean()).astype(float)
+        equity, position = 1.0, 0.0
+        for t in range(1, len(prices)):
+            new_position = signal.iloc[t - 1]
+            equity *= 1 + new_position * (prices[t] / prices[t - 1] - 1) \
+                - abs(new_position - position) * cost
+            position = new_position
+        return equity
+
+    def test_matches_loop_reference(self, service, close):
+        """Test equity per simbolo uguale al backtest a ciclo"""
+        result = service.simulate(close, 'sma_cross', {'fast': 10, 'slow': 30}, cost=0.002)
+        rows = {row[0]: row for row in result['symbols']['rows']}
+
+        expected = self.reference_equity(close['AAA'].to_numpy(), 10, 30, 0.002)
+        assert rows['AAA'][1] == pytest.approx((expected - 1) * 100)
+
+        # Prima della quotazione nessuna posizione; il buco usa l'ultimo close
+        prices = close['BBB'].iloc[300:].ffill().to_numpy()
+        expected = self.reference_equity(prices, 10, 30, 0.002)
+        assert rows['BBB'][1] == pytest.approx((expected - 1) * 100)
+
+        equity = result['equity']['columns']['equity']
+        assert len(equity) == len(close)
+        assert result['summary']['final_equity'] == pytest.approx(equity[-1], abs=1e-6)
+
+    def test_trades_and_costs(self, service, close):
+        """Test conteggio trade e impatto dei costi"""
+        free = service.simulate(close, 'ema_cross', {'fast': 5, 'slow': 20}, 'long_short')
+        costly = service.simulate(close, 'ema_cross', {'fast': 5, 'slow': 20}, 'long_short',
+                                  cost=0.01)
+
+        trades = free['trades']['count']
+        assert trades == sum(row[3] for row in free['symbols']['rows'])
+        assert trades > 0
+        assert costly['summary']['final_equity'] < free['summary']['final_equity']
+
+    def test_execution_at_signal_close(self, service):
+        """Test segnale del giorno 0: entrata al close 0, rendimento 100 -> 110"""
+        filled = np.array([[100.0], [110.0], [121.0]])
+        signals = np.array([[1.0], [0.0], [0.0]])
+
+        held, net = service.returns(filled, signals, cost=0.0)
+        assert list(held[:, 0]) == [0.0, 1.0, 0.0]
+        np.testing.assert_allclose(net[:, 0], [0.0, 0.1, 0.0])
+
+        # Costi di entrata nel primo giorno detenuto, di uscita nel giorno successivo
+        _, net = service.returns(filled, signals, cost=0.01)
+        np.testing.assert_allclose(net[:, 0], [0.0, 0.09, -0.01])
+
+    def test_trade_returns_compound_to_equity(self, service):
+        """Test prodotto dei rendimenti dei trade uguale all'equity del simbolo"""
+        held = np.array([[0.0], [1.0], [1.0], [0.0], [-1.0], [-1.0], [1.0]])
+        net = np.array([[0.0], [0.01], [0.02], [-0.001], [0.03], [-0.01], [0.005]])
+
+        trade_returns, symbols, holding = service.trades(held, net)
+        assert len(trade_returns) == 3
+        assert list(holding) == [2, 2, 1]
+        assert np.prod(1 + trade_returns) == pytest.approx(np.prod(1 + net))
+
+    def test_symbols_must_be_a_list(self, service):
+        """Test symbols stringa: errore esplicito invece di un simbolo per carattere"""
+        with pytest.raises(ValueError, match='symbols'):
+            service.run('AAPL', 'sma_cross')
+        assert service.normalize_symbols([' aapl', 'AAPL', 'msft']) == ['AAPL', 'MSFT']
+
+    def test_strategy_params_validation(self):
+        """Test default, conversione e vincoli dei parametri"""
+        assert strategy_params('sma_cross', {'fast': '5'}) == {'fast': 5, 'slow': 50}
+        with pytest.raises(ValueError):
+            strategy_params('sma_cross', {'fast': 60})
+        with pytest.raises(ValueError):
+            strategy_params('rsi_threshold', {'window': 3})
+        with pytest.raises(ValueError):
+            strategy_params('unknown')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
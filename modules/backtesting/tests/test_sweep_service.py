@@ -0,0 +1,113 @@
+"""
+Test per la sweep dei parametri su process pool
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask
+
+from modules.backtesting.backend.api.routes import backtesting_bp
+from modules.backtesting.backend.services.backtest_service import BacktestService
+from modules.backtesting.backend.services.sweep_service import SweepService
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+
+
+class TestSweepService:
+    """Test suite per SweepService"""
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch):
+        """Servizio con cache su directory temporanea e due simboli salvati"""
+        monkeypatch.chdir(tmp_path)
+        rng = np.random.default_rng(11)
+        manager = FileManagerService()
+        for symbol, start in (('AAA', '2020-01-01'), ('BBB', '2020-06-01')):
+            close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, 500)))
+            manager.save_data(symbol, 'dailyAdjusted', pd.DataFrame({
+                'date': pd.bdate_range(start, periods=500),
+                'open': close, 'high': close, 'low': close, 'close': close,
+                'volume': 1000
+            }))
+        return SweepService()
+
+    def test_expand_grid_skips_invalid(self, service):
+        """Test prodotto cartesiano senza le combinazioni con fast >= slow"""
+        expanded = service.expand_grid('sma_cross', {'fast': [5, 20, 50], 'slow': [20, 50]})
+
+        assert expanded['skipped'] == 3
+        assert expanded['combinations'] == [
+            {'fast': 5, 'slow': 20}, {'fast': 5, 'slow': 50}, {'fast': 20, 'slow': 50}
+        ]
+
+        with pytest.raises(ValueError):
+            service.expand_grid('sma_cross', {'window': [5]})
+        with pytest.raises(ValueError):
+            service.expand_grid('sma_cross', {'fast': []})
+        with pytest.raises(ValueError):
+            service.expand_grid('sma_cross', {'fast': [50], 'slow': [10]})
+
+    def test_results_match_backtest(self, service):
+        """Test risultati dei worker uguali alla valutazione nel processo"""
+        plan = service.prepare(['AAA', 'BBB', 'ZZZ'], 'ema_cross',
+                               {'fast': [5, 10], 'slow': [30, 60]},
+                               direction='long_short', commission=0.001)
+        rows = list(service.iter_results(plan, max_workers=2))
+
+        assert rows[0]['type'] == 'header'
+        assert rows[0]['missing'] == ['ZZZ']
+        assert rows[0]['combinations'] == 4
+        assert rows[-1]['type'] == 'end'
+        assert rows[-1]['completed'] == 4 and rows[-1]['failed'] == 0
+        assert not os.path.exists(plan['directory'])
+
+        results = rows[1:-1]
+        assert sorted(row['index'] for row in results) == [0, 1, 2, 3]
+
+        close = FileManagerService().load_panel(['AAA', 'BBB'], 'dailyAdjusted')[0]['close']
+        engine = BacktestService()
+        filled, listed = engine.fill_prices(close.to_numpy(dtype=np.float64))
+        for row in results:
+            expected = engine.evaluate(filled, listed, close.index, 'ema_cross',
+                                       row['params'], 'long_short', 0.001)
+            assert row['summary'] == pytest.approx(expected['summary'])
+            assert row['trades'] == pytest.approx(expected['trades'])
+
+    def test_abandoned_stream_cleans_up(self, service):
+        """Test interruzione del consumatore: file condivisi rimossi"""
+        plan = service.prepare(['AAA'], 'momentum', {'lookback': [20, 60, 120]})
+        stream = service.iter_results(plan, max_workers=1)
+
+        assert next(stream)['type'] == 'header'
+        assert next(stream)['type'] == 'result'
+        stream.close()
+        assert not os.path.exists(plan['directory'])
+
+    def test_unstarted_stream_writes_nothing(self, service):
+        """Test risposta mai inviata: nessuna directory temporanea creata"""
+        plan = service.prepare(['AAA'], 'momentum', {'lookback': [20]})
+        stream = service.iter_results(plan, max_workers=1)
+        stream.close()
+        assert 'directory' not in plan
+
+    def test_rank_by_validation(self, service):
+        """Test rank_by limitato ai campi numerici di summary (400 sugli altri)"""
+        assert service.validate_rank_by('cagr') == 'cagr'
+        with pytest.raises(ValueError):
+            service.validate_rank_by('start')
+        with pytest.raises(ValueError, match='symbols'):
+            service.prepare('AAA', 'momentum', {'lookback': [20]})
+
+        app = Flask(__name__)
+        app.register_blueprint(backtesting_bp, url_prefix='/backtesting')
+        response = app.test_client().post('/backtesting/sweep', json={
+            'symbols': ['AAA'], 'strategy': 'momentum', 'grid': {'lookback': [20]},
+            'stream': False, 'rank_by': 'start'
+        })
+        assert response.status_code == 400
+        assert 'rank_by' in response.get_json()['error']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -1,14 +1,38 @@
 """
 API Routes per il modulo Data Management - Enhanced Version
 """
+import hashlib
+
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import HTTPException
 import pandas as pd
-from io import BytesIO
-import json
 
 from ..services.yahoo_service import YahooFinanceService
 from ..services.data_processor import DataProcessor
 from ..services.file_manager import FileManagerService
+from ..services.excel_exporter import ExcelExportService
+from ..services.downsampling import DownsamplingService
+from ..services.indicators import IndicatorService
+from ..services.snapshot import SnapshotService
+from ..services.screener import ScreenerService
+from ..services.cross_section import CrossSectionService
+from ..services.audit import CHECKS, DataAuditService
+from core.backend.config.settings import BATCH_MAX_SYMBOLS
+from core.backend.middleware.http_cache import (
+    conditional, request_params, with_freshness
+)
+from core.backend.middleware.request_decoding import data_reference, request_payload
+from core.backend.utils.binary import (
+    binary_format_available, binary_response, negotiate_binary_format
+)
+from core.backend.utils.columnar import (
+    DAILY_TIME_FORMAT, MINUTE_TIME_FORMAT, frame_to_columnar, parse_output_format
+)
+from core.backend.utils.pagination import parse_limit
+from core.backend.utils.response_cache import cached_json_response, response_cache
+from core.backend.utils.streaming import (
+    csv_response, format_batch, parse_compression, parse_stream_mode, stream_response
+)
 
 # Crea blueprint per il modulo - NOME CORRETTO per module_loader
 dataManagement_bp = Blueprint('dataManagement', __name__)
@@ -17,26 +41,320 @@ dataManagement_bp = Blueprint('dataManagement', __name__)
 yahoo_service = YahooFinanceService()
 data_processor = DataProcessor()
 file_manager = FileManagerService()
+excel_exporter = ExcelExportService()
+downsampler = DownsamplingService()
+indicator_service = IndicatorService()
+snapshot_service = SnapshotService()
+screener_service = ScreenerService(snapshot_service)
+cross_section_service = CrossSectionService()
+audit_service = DataAuditService()
+
+# Le risposte in cache vengono invalidate a ogni scrittura dei dati del simbolo
+FileManagerService.add_write_listener(response_cache.invalidate)
+# Lo snapshot dello screener ricalcola l'ultima barra del simbolo scritto
+FileManagerService.add_write_listener(snapshot_service.on_write)
+# L'indice date-major accoda le righe nuove del simbolo scritto
+FileManagerService.add_write_listener(cross_section_service.on_write)
+# Le barre settimanali / mensili / trimestrali seguono le scritture giornaliere
+FileManagerService.add_write_listener(yahoo_service.timeframes.on_write)
+# Audit di qualità periodico della cache (solo se AUDIT_INTERVAL_SECONDS > 0)
+audit_service.start_schedule()
+
+
+def _stock_data_version(params):
+    """Versione della cache prezzi per ETag/Last-Modified (None: non cacheabile)"""
+    if not params.get('symbol'):
+        return None
+    
+    symbol = str(params['symbol']).strip().upper()
+    data_type = yahoo_service.get_data_type(
+        params.get('interval', '1d'), params.get('adjusted', True)
+    )
+    return with_freshness(
+        file_manager.get_data_version(symbol, data_type), params.get('end_date')
+    )
+
+
+def _stream_stock_data(symbol, start_date, end_date, stream_mode,
+                       interval='1d', adjusted=True, full_history=False):
+    """
+    Risposta in streaming letta direttamente dalla cache a batch
+    La cache viene prima aggiornata senza materializzare i record
+    """
+    status = yahoo_service.ensure_cached(
+        symbol, start_date, end_date,
+        interval=interval, adjusted=adjusted, full_history=full_history
+    )
+    if not status['success']:
+        return jsonify(status)
+    
+    symbol = status['data']['symbol']
+    data_type = status['data']['data_type']
+    
+    batches = (
+        format_batch(batch)
+        for batch in file_manager.iter_batches(symbol, data_type, start_date, end_date)
+    )
+    return stream_response(batches, stream_mode, envelope={
+        'symbol': symbol,
+        'data_type': data_type,
+        'from_cache': True
+    })
+
+
+def _binary_stock_data(symbol, start_date, end_date, binary_format,
+                       interval='1d', adjusted=True, full_history=False,
+                       max_points=None, downsample_method='minmax'):
+    """
+    Risposta binaria (Arrow / MessagePack) costruita dalle colonne in cache
+    Negoziata tramite header Accept; 406 se la libreria non è installata
+    """
+    if not binary_format_available(binary_format):
+        return jsonify({
+            'success': False,
+            'error': f"Formato {binary_format} non disponibile sul server"
+        }), 406
+    
+    status = yahoo_service.ensure_cached(
+        symbol, start_date, end_date,
+        interval=interval, adjusted=adjusted, full_history=full_history
+    )
+    if not status['success']:
+        return jsonify(status)
+    
+    symbol = status['data']['symbol']
+    data_type = status['data']['data_type']
+    df = file_manager.load_range(symbol, data_type, start_date, end_date)
+    if max_points:
+        df = downsampler.downsample(df, max_points, downsample_method)
+    
+    return binary_response(df, binary_format, metadata={
+        'symbol': symbol,
+        'data_type': data_type
+    })
+
+
+def _paged_stock_data(data, start_date, end_date, limit, output_format='records',
+                      interval='1d', adjusted=True, full_history=False):
+    """Pagina a cursore letta con seek sull'indice della cache (risposta JSON)"""
+    return cached_json_response(
+        'stock_data_page', data, _stock_data_version,
+        lambda: yahoo_service.get_stock_page(
+            data['symbol'], start_date, end_date, limit,
+            cursor=data.get('cursor'),
+            interval=interval,
+            adjusted=adjusted,
+            output_format=output_format,
+            delta_timestamps=bool(data.get('delta_timestamps', False)),
+            full_history=full_history
+        ),
+        symbols=[data['symbol']], error_status=400
+    )
+
+
+def _export_symbols(data):
+    """Restituisce la lista simboli di un export ('symbol' o 'symbols')"""
+    symbols = data.get('symbols') or ([data['symbol']] if data.get('symbol') else [])
+    if not isinstance(symbols, list) or not symbols:
+        raise ValueError("Campo richiesto mancante: symbol")
+    return [str(symbol).strip().upper() for symbol in symbols]
+
+
+def _export_name(symbols):
+    """Prefisso del nome file di un export"""
+    return symbols[0] if len(symbols) == 1 else f"{len(symbols)}_symbols"
+
+
+def _cache_symbols(symbols, start_date, end_date, adjusted=True):
+    """Aggiorna la cache per ogni simbolo di un export: (pronti, errori)"""
+    ready = []
+    errors = []
+    for symbol in symbols:
+        status = yahoo_service.ensure_cached(symbol, start_date, end_date, adjusted=adjusted)
+        if status['success']:
+            ready.append(status['data'])
+        else:
+            errors.append({'symbol': symbol, 'error': status.get('error')})
+    return ready, errors
+
+
+def _export_error(errors):
+    """Risposta di errore quando nessun simbolo è esportabile"""
+    return jsonify({
+        'success': False,
+        'error': errors[0]['error'] if len(errors) == 1 else 'Nessun dato disponibile',
+        'errors': errors
+    }), 400
 
 
-@dataManagement_bp.route('/stock/data', methods=['POST'])
+def _price_batches(item, start_date, end_date, include_symbol=False, extra_columns=None):
+    """Batch formattati dei prezzi di un simbolo letti dalla cache"""
+    for batch in file_manager.iter_batches(
+        item['symbol'], item['data_type'], start_date, end_date
+    ):
+        batch = format_batch(batch)
+        if include_symbol:
+            batch['symbol'] = item['symbol']
+        for column, value in (extra_columns or {}).items():
+            batch[column] = value
+        yield batch
+
+
+def _export_csv(symbols, start_date, end_date, filename, adjusted=True,
+                compression=None, include_symbol=False, extra_columns=None):
+    """
+    Export CSV in streaming letto dalla cache a batch, anche multi-simbolo
+    Il file non viene mai tenuto interamente in memoria
+    """
+    ready, errors = _cache_symbols(symbols, start_date, end_date, adjusted)
+    if not ready:
+        return _export_error(errors)
+    
+    def batches():
+        for item in ready:
+            yield from _price_batches(
+                item, start_date, end_date,
+                include_symbol=include_symbol or len(ready) > 1,
+                extra_columns=extra_columns
+            )
+    
+    response = csv_response(batches(), filename, compression)
+    if errors:
+        response.headers['X-Skipped-Symbols'] = ','.join(e['symbol'] for e in errors)
+    return response
+
+
+def _analysis_rows(item, start_date, end_date):
+    """Righe (Category, Metric, Value) dell'analisi base di un simbolo in cache"""
+    df = file_manager.load_range(item['symbol'], item['data_type'], start_date, end_date,
+                                 columns=['close', 'volume'])
+    if df is None or df.empty:
+        return []
+    
+    analysis = data_processor.analyze_frame(item['symbol'], df)
+    
+    rows = []
+    for category, values in analysis.items():
+        if isinstance(values, dict):
+            for key, value in values.items():
+                rows.append((category, key, value))
+    return rows
+
+
+def _export_excel(symbols, start_date, end_date, filename, adjusted=True,
+                  price_sheet='Price Data', include_symbol=False, extra_columns=None,
+                  include_info=False, include_analysis=False):
+    """
+    Export Excel con worksheet write-only: i prezzi sono scritti riga per riga
+    dalla cache a batch. Con più simboli crea un foglio prezzi per simbolo.
+    """
+    ready, errors = _cache_symbols(symbols, start_date, end_date, adjusted)
+    if not ready:
+        return _export_error(errors)
+    
+    multi = len(ready) > 1
+    stats = {}
+    
+    def tracked_batches(item):
+        # Raccoglie conteggio e date mentre i batch vengono scritti
+        info = stats.setdefault(item['symbol'], {'count': 0, 'first': None, 'last': None})
+        for batch in _price_batches(item, start_date, end_date,
+                                    include_symbol, extra_columns):
+            info['count'] += len(batch)
+            info['first'] = info['first'] or batch['date'].iloc[0]
+            info['last'] = batch['date'].iloc[-1]
+            yield batch
+    
+    def info_batches():
+        # Valutato dopo i fogli prezzi, quando le statistiche sono complete
+        data_type = 'Adjusted' if adjusted else 'Regular'
+        if not multi:
+            symbol = ready[0]['symbol']
+            info = stats.get(symbol, {'count': 0, 'first': None, 'last': None})
+            yield from ExcelExportService.key_value_sheet([
+                ('Symbol', symbol),
+                ('Records', info['count']),
+                ('Start Date', info['first']),
+                ('End Date', info['last']),
+                ('Data Type', data_type),
+                ('From Cache', True)
+            ])
+            return
+        yield pd.DataFrame([
+            {
+                'Symbol': item['symbol'],
+                'Records': stats.get(item['symbol'], {}).get('count', 0),
+                'Start Date': stats.get(item['symbol'], {}).get('first'),
+                'End Date': stats.get(item['symbol'], {}).get('last'),
+                'Data Type': data_type
+            }
+            for item in ready
+        ])
+    
+    def analysis_batches():
+        for item in ready:
+            rows = _analysis_rows(item, start_date, end_date)
+            if not rows:
+                continue
+            frame = pd.DataFrame(rows, columns=['Category', 'Metric', 'Value'])
+            if multi:
+                frame.insert(0, 'Symbol', item['symbol'])
+            yield frame
+    
+    sheets = [
+        (item['symbol'] if multi else price_sheet, tracked_batches(item))
+        for item in ready
+    ]
+    if include_info:
+        sheets.append(('Info', info_batches()))
+    if include_analysis:
+        sheets.append(('Analysis', analysis_batches()))
+    
+    response = excel_exporter.send_workbook(sheets, filename)
+    if errors:
+        response.headers['X-Skipped-Symbols'] = ','.join(e['symbol'] for e in errors)
+    return response
+
+
+@dataManagement_bp.route('/stock/data', methods=['GET', 'POST'])
+@conditional(_stock_data_version)
 def get_stock_data():
     """Endpoint per recuperare dati di un singolo titolo (legacy)"""
     try:
-        data = request.get_json()
+        data = request_params()
         
         # Valida input
         yahoo_service.validate_input(data)
+        max_points, downsample_method = downsampler.parse_params(data)
         
-        # Recupera dati
-        result = yahoo_service.get_stock_data(
-            symbol=data['symbol'],
-            start_date=data['start_date'],
-            end_date=data['end_date'],
-            interval=data.get('interval', '1d')
-        )
+        binary_format = negotiate_binary_format(request.accept_mimetypes)
+        if binary_format:
+            return _binary_stock_data(
+                data['symbol'], data['start_date'], data['end_date'], binary_format,
+                interval=data.get('interval', '1d'),
+                max_points=max_points, downsample_method=downsample_method
+            )
         
-        return jsonify(result)
+        stream_mode = parse_stream_mode(data.get('stream'))
+        if stream_mode:
+            return _stream_stock_data(
+                data['symbol'], data['start_date'], data['end_date'], stream_mode,
+                interval=data.get('interval', '1d')
+            )
+        
+        # Recupera dati (byte serializzati in cache finché i dati non cambiano)
+        return cached_json_response(
+            'stock_data', data, _stock_data_version,
+            lambda: yahoo_service.get_stock_data(
+                symbol=data['symbol'],
+                start_date=data['start_date'],
+                end_date=data['end_date'],
+                interval=data.get('interval', '1d'),
+                max_points=max_points,
+                downsample_method=downsample_method
+            ),
+            symbols=[data['symbol']]
+        )
         
     except ValueError as e:
         return jsonify({
@@ -50,34 +368,65 @@ def get_stock_data():
         }), 500
 
 
-@dataManagement_bp.route('/stock/data/v2', methods=['POST'])
+@dataManagement_bp.route('/stock/data/v2', methods=['GET', 'POST'])
+@conditional(_stock_data_version)
 def get_stock_data_v2():
     """
     Endpoint enhanced per recuperare dati con supporto cache e adjusted
     """
     try:
-        data = request.get_json()
+        data = request_params()
         
         # Parametri enhanced
         use_cache = data.get('use_cache', True)
         adjusted = data.get('adjusted', True)
         interval = data.get('interval', '1d')
+        output_format = parse_output_format(data.get('format'))
         
         # Valida input base
         yahoo_service.validate_input(data)
+        max_points, downsample_method = downsampler.parse_params(data)
+        
+        binary_format = negotiate_binary_format(request.accept_mimetypes)
+        if binary_format:
+            return _binary_stock_data(
+                data['symbol'], data['start_date'], data['end_date'], binary_format,
+                interval=interval, adjusted=adjusted,
+                max_points=max_points, downsample_method=downsample_method
+            )
+        
+        stream_mode = parse_stream_mode(data.get('stream'))
+        if stream_mode:
+            return _stream_stock_data(
+                data['symbol'], data['start_date'], data['end_date'], stream_mode,
+                interval=interval, adjusted=adjusted
+            )
+        
+        limit = parse_limit(data.get('limit'))
+        if limit:
+            return _paged_stock_data(
+                data, data['start_date'], data['end_date'], limit, output_format,
+                interval=interval, adjusted=adjusted
+            )
         
         # Recupera dati con nuove opzioni
-        result = yahoo_service.get_stock_data(
-            symbol=data['symbol'],
-            start_date=data['start_date'],
-            end_date=data['end_date'],
-            interval=interval,
-            use_cache=use_cache,
-            adjusted=adjusted
+        return cached_json_response(
+            'stock_data_v2', data, _stock_data_version,
+            lambda: yahoo_service.get_stock_data(
+                symbol=data['symbol'],
+                start_date=data['start_date'],
+                end_date=data['end_date'],
+                interval=interval,
+                use_cache=use_cache,
+                adjusted=adjusted,
+                output_format=output_format,
+                delta_timestamps=bool(data.get('delta_timestamps', False)),
+                max_points=max_points,
+                downsample_method=downsample_method
+            ),
+            symbols=[data['symbol']]
         )
         
-        return jsonify(result)
-        
     except ValueError as e:
         return jsonify({
             'success': False,
@@ -90,22 +439,52 @@ def get_stock_data_v2():
         }), 500
 
 
-@dataManagement_bp.route('/stock/history/full', methods=['POST'])
+@dataManagement_bp.route('/stock/history/full', methods=['GET', 'POST'])
+@conditional(_stock_data_version)
 def get_full_history():
     """
     Endpoint per scaricare lo storico completo di un titolo
     """
     try:
-        data = request.get_json()
+        data = request_params()
         
         if 'symbol' not in data:
             raise ValueError("Simbolo richiesto")
         
         adjusted = data.get('adjusted', True)
+        max_points, downsample_method = downsampler.parse_params(data)
+        
+        binary_format = negotiate_binary_format(request.accept_mimetypes)
+        if binary_format:
+            start_date, end_date = yahoo_service.get_full_history_range()
+            return _binary_stock_data(
+                data['symbol'], start_date, end_date, binary_format,
+                adjusted=adjusted, full_history=True,
+                max_points=max_points, downsample_method=downsample_method
+            )
+        
+        stream_mode = parse_stream_mode(data.get('stream'))
+        if stream_mode:
+            start_date, end_date = yahoo_service.get_full_history_range()
+            return _stream_stock_data(
+                data['symbol'], start_date, end_date, stream_mode,
+                adjusted=adjusted, full_history=True
+            )
+        
+        limit = parse_limit(data.get('limit'))
+        if limit:
+            start_date, end_date = yahoo_service.get_full_history_range()
+            return _paged_stock_data(
+                data, start_date, end_date, limit,
+                parse_output_format(data.get('format')),
+                adjusted=adjusted, full_history=True
+            )
         
         result = yahoo_service.get_full_history(
             symbol=data['symbol'],
-            adjusted=adjusted
+            adjusted=adjusted,
+            max_points=max_points,
+            downsample_method=downsample_method
         )
         
         return jsonify(result)
@@ -124,17 +503,47 @@ def get_full_history():
 
 @dataManagement_bp.route('/stock/multiple', methods=['POST'])
 def get_multiple_stocks():
-    """Endpoint per recuperare dati di multipli titoli"""
+    """
+    Endpoint per recuperare dati di multipli titoli
+    layout 'records' (default): dati indipendenti per simbolo
+    layout 'panel': asse di date condiviso e matrici data x simbolo per campo
+    (fields, join 'outer'/'inner', fill 'ffill', fill_limit)
+    """
     try:
         data = request.get_json()
         
         if 'symbols' not in data or not isinstance(data['symbols'], list):
             raise ValueError("Lista simboli richiesta")
         
+        layout = str(data.get('layout') or 'records').strip().lower()
+        if layout == 'panel':
+            # Date condivise e una matrice data x simbolo per campo, allineate sul server
+            if len(data['symbols']) > BATCH_MAX_SYMBOLS:
+                raise ValueError(f"Massimo {BATCH_MAX_SYMBOLS} simboli per richiesta")
+            fill_limit = data.get('fill_limit')
+            result = yahoo_service.get_multiple_panel(
+                symbols=data['symbols'],
+                start_date=data['start_date'],
+                end_date=data['end_date'],
+                adjusted=bool(data.get('adjusted', True)),
+                fields=_field_list(data.get('fields')),
+                join=str(data.get('join') or 'outer').strip().lower(),
+                fill=str(data['fill']).strip().lower() if data.get('fill') else None,
+                fill_limit=int(fill_limit) if fill_limit is not None else None,
+                delta_timestamps=bool(data.get('delta_timestamps', False))
+            )
+            return jsonify(result)
+        if layout != 'records':
+            raise ValueError(f"Layout non supportato: {layout}. Usa 'records' o 'panel'")
+        
+        output_format = parse_output_format(data.get('format'))
+        
         result = yahoo_service.get_multiple_stocks(
             symbols=data['symbols'],
             start_date=data['start_date'],
-            end_date=data['end_date']
+            end_date=data['end_date'],
+            output_format=output_format,
+            delta_timestamps=bool(data.get('delta_timestamps', False))
         )
         
         return jsonify(result)
@@ -172,7 +581,7 @@ def download_stock_data():
         data = request.get_json()
         
         # Validazione parametri
-        required_fields = ['symbol', 'start_date', 'end_date', 'format']
+        required_fields = ['start_date', 'end_date', 'format']
         for field in required_fields:
             if field not in data or not data[field]:
                 return jsonify({
@@ -180,6 +589,15 @@ def download_stock_data():
                     'error': f"Campo richiesto mancante: {field}"
                 }), 400
         
+        try:
+            symbols = _export_symbols(data)
+            compression = parse_compression(data.get('compression'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
         format_type = data.get('format', 'csv').lower()
         if format_type not in ['csv', 'excel']:
             return jsonify({
@@ -187,55 +605,20 @@ def download_stock_data():
                 'error': "Formato non supportato. Usa 'csv' o 'excel'"
             }), 400
         
-        # Recupera dati
-        stock_result = yahoo_service.get_stock_data(
-            symbol=data['symbol'],
-            start_date=data['start_date'],
-            end_date=data['end_date']
-        )
-        
-        if not stock_result['success']:
-            return jsonify(stock_result), 400
-        
-        # Processa per download
-        from flask import make_response
-        import io
-        
         if format_type == 'csv':
-            # Genera CSV
-            records = stock_result['data']['records']
-            df = pd.DataFrame(records)
-            
-            # Crea CSV in memoria
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            csv_data = output.getvalue()
-            
-            # Crea risposta
-            response = make_response(csv_data)
-            response.headers['Content-Type'] = 'text/csv'
-            response.headers['Content-Disposition'] = f'attachment; filename="{data["symbol"]}_data.csv"'
-            
-            return response
-            
-        elif format_type == 'excel':
-            # Genera Excel
-            records = stock_result['data']['records']
-            df = pd.DataFrame(records)
-            
-            # Crea Excel in memoria
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Stock Data', index=False)
-            
-            excel_data = output.getvalue()
-            
-            # Crea risposta
-            response = make_response(excel_data)
-            response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            response.headers['Content-Disposition'] = f'attachment; filename="{data["symbol"]}_data.xlsx"'
-            
-            return response
+            # CSV in streaming dalla cache
+            return _export_csv(
+                symbols, data['start_date'], data['end_date'],
+                filename=f"{_export_name(symbols)}_data.csv",
+                compression=compression
+            )
+        
+        # Excel write-only dalla cache (un foglio per simbolo)
+        return _export_excel(
+            symbols, data['start_date'], data['end_date'],
+            filename=f"{_export_name(symbols)}_data.xlsx",
+            price_sheet='Stock Data'
+        )
         
     except Exception as e:
         return jsonify({
@@ -253,7 +636,7 @@ def download_stock_data_v2():
         data = request.get_json()
         
         # Validazione parametri
-        required_fields = ['symbol', 'start_date', 'end_date', 'format']
+        required_fields = ['start_date', 'end_date', 'format']
         for field in required_fields:
             if field not in data:
                 return jsonify({
@@ -261,104 +644,44 @@ def download_stock_data_v2():
                     'error': f"Campo richiesto mancante: {field}"
                 }), 400
         
+        try:
+            symbols = _export_symbols(data)
+            compression = parse_compression(data.get('compression'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
         format_type = data.get('format', 'csv').lower()
         adjusted = data.get('adjusted', True)
-        use_cache = data.get('use_cache', True)
-        
-        # Recupera dati
-        stock_result = yahoo_service.get_stock_data(
-            symbol=data['symbol'],
-            start_date=data['start_date'],
-            end_date=data['end_date'],
-            use_cache=use_cache,
-            adjusted=adjusted
-        )
-        
-        if not stock_result['success']:
-            return jsonify(stock_result), 400
         
-        # Prepara per download
-        from flask import make_response
-        import io
-        
-        records = stock_result['data']['records']
-        df = pd.DataFrame(records)
-        
-        # Aggiungi metadati
-        df['symbol'] = stock_result['data']['symbol']
-        df['data_source'] = 'yahoo_finance'
-        df['adjusted'] = adjusted
+        # I dati vengono letti dalla cache a batch (use_cache non applicabile:
+        # vengono scaricati solo i periodi mancanti)
+        extra_columns = {'data_source': 'yahoo_finance', 'adjusted': adjusted}
+        file_prefix = f"{_export_name(symbols)}_{'adjusted' if adjusted else 'regular'}_data"
         
         if format_type == 'csv':
-            # CSV
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            csv_data = output.getvalue()
-            
-            response = make_response(csv_data)
-            response.headers['Content-Type'] = 'text/csv'
-            response.headers['Content-Disposition'] = (
-                f'attachment; filename="{data["symbol"]}_'
-                f'{"adjusted" if adjusted else "regular"}_data.csv"'
+            return _export_csv(
+                symbols, data['start_date'], data['end_date'],
+                filename=f"{file_prefix}.csv",
+                adjusted=adjusted,
+                compression=compression,
+                include_symbol=True,
+                extra_columns=extra_columns
             )
             
-            return response
-            
         elif format_type == 'excel':
-            # Excel con più fogli
-            output = io.BytesIO()
-            
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Dati principali
-                df.to_excel(writer, sheet_name='Price Data', index=False)
-                
-                # Statistiche
-                stats_data = {
-                    'Metric': ['Symbol', 'Records', 'Start Date', 'End Date',
-                               'Data Type', 'From Cache'],
-                    'Value': [
-                        stock_result['data']['symbol'],
-                        stock_result['data']['count'],
-                        stock_result['data']['first_date'],
-                        stock_result['data']['last_date'],
-                        'Adjusted' if adjusted else 'Regular',
-                        stock_result['data'].get('from_cache', False)
-                    ]
-                }
-                stats_df = pd.DataFrame(stats_data)
-                stats_df.to_excel(writer, sheet_name='Info', index=False)
-                
-                # Analisi se richiesta
-                if data.get('include_analysis', False):
-                    analysis = data_processor.basic_analysis(stock_result['data'])
-                    
-                    # Converti analisi in DataFrame
-                    analysis_rows = []
-                    for category, values in analysis.items():
-                        if isinstance(values, dict):
-                            for key, value in values.items():
-                                analysis_rows.append({
-                                    'Category': category,
-                                    'Metric': key,
-                                    'Value': value
-                                })
-                    
-                    if analysis_rows:
-                        analysis_df = pd.DataFrame(analysis_rows)
-                        analysis_df.to_excel(writer, sheet_name='Analysis', index=False)
-            
-            excel_data = output.getvalue()
-            
-            response = make_response(excel_data)
-            response.headers['Content-Type'] = (
-                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            # Excel con più fogli: Price Data (o uno per simbolo), Info, Analysis
+            return _export_excel(
+                symbols, data['start_date'], data['end_date'],
+                filename=f"{file_prefix}.xlsx",
+                adjusted=adjusted,
+                include_symbol=True,
+                extra_columns=extra_columns,
+                include_info=True,
+                include_analysis=data.get('include_analysis', False)
             )
-            response.headers['Content-Disposition'] = (
-                f'attachment; filename="{data["symbol"]}_'
-                f'{"adjusted" if adjusted else "regular"}_data.xlsx"'
-            )
-            
-            return response
             
         else:
             return jsonify({
@@ -373,34 +696,420 @@ def download_stock_data_v2():
         }), 500
 
 
+def _indicator_payload(series, output_format):
+    """Serie indicatori come record o colonne (NaN del riscaldamento -> null)"""
+    time_column = series.columns[0]
+    time_format = MINUTE_TIME_FORMAT if time_column == 'datetime' else DAILY_TIME_FORMAT
+    fields = list(series.columns[1:])
+    
+    if output_format == 'columnar':
+        return {
+            'format': 'columnar',
+            **frame_to_columnar(series, time_column=time_column, time_format=time_format,
+                                fields=fields, decimals=4)
+        }
+    
+    batch = format_batch(series, date_columns={time_column: time_format}, decimals=4)
+    return {'records': batch.astype(object).where(batch.notna(), None).to_dict('records')}
+
+
+@dataManagement_bp.route('/stock/indicators', methods=['GET', 'POST'])
+@conditional(_stock_data_version)
+def get_stock_indicators():
+    """
+    Endpoint per le serie degli indicatori tecnici (SMA, EMA, RSI, MACD,
+    Bollinger, ATR, OBV) calcolate sulla cache prezzi
+    """
+    try:
+        data = request_params()
+        
+        yahoo_service.validate_input(data)
+        indicators = indicator_service.parse_indicators(data.get('indicators'))
+        output_format = parse_output_format(data.get('format'))
+        adjusted = data.get('adjusted', True)
+        interval = data.get('interval', '1d')
+        
+        def compute():
+            status = yahoo_service.ensure_cached(
+                data['symbol'], data['start_date'], data['end_date'],
+                interval=interval, adjusted=adjusted
+            )
+            if not status['success']:
+                return status
+            
+            symbol = status['data']['symbol']
+            data_type = status['data']['data_type']
+            series = indicator_service.get_indicators(
+                symbol, data_type, data['start_date'], data['end_date'], indicators
+            )
+            
+            return {
+                'success': True,
+                'data': {
+                    'symbol': symbol,
+                    'data_type': data_type,
+                    'indicators': indicators,
+                    'count': len(series),
+                    **_indicator_payload(series, output_format)
+                }
+            }
+        
+        return cached_json_response(
+            'stock_indicators', data, _stock_data_version, compute,
+            symbols=[data['symbol']], error_status=400
+        )
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
+
+
 @dataManagement_bp.route('/stock/analysis', methods=['POST'])
 def analyze_stock_data():
     """Endpoint per analisi base dei dati"""
     try:
         data = request.get_json()
         
-        # Recupera dati
-        stock_result = yahoo_service.get_stock_data(
-            symbol=data['symbol'],
-            start_date=data['start_date'],
-            end_date=data['end_date']
+        def compute():
+            # Aggiorna la cache senza costruire i record
+            status = yahoo_service.ensure_cached(
+                data['symbol'], data['start_date'], data['end_date']
+            )
+            if not status['success']:
+                return status
+            
+            # Analisi sulle sole colonne necessarie lette dalla cache
+            symbol = status['data']['symbol']
+            df = file_manager.load_range(
+                symbol, status['data']['data_type'],
+                data['start_date'], data['end_date'],
+                columns=['close', 'volume']
+            )
+            if df is None or df.empty:
+                return {
+                    'success': False,
+                    'error': f"Nessun dato trovato per {symbol}"
+                }
+            
+            analysis = data_processor.analyze_frame(symbol, df)
+            
+            return {
+                'success': True,
+                'data': analysis
+            }
+        
+        return cached_json_response(
+            'stock_analysis', data, _stock_data_version, compute,
+            symbols=[data['symbol']], error_status=400
         )
         
-        if not stock_result['success']:
-            return jsonify(stock_result), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _batch_data_version(params):
+    """Versione combinata dei file in cache dei simboli di un'analisi batch"""
+    data_type = 'dailyAdjusted' if params.get('adjusted', True) else 'daily'
+    versions = [
+        file_manager.get_data_version(symbol, data_type)
+        for symbol in _export_symbols(params)
+    ]
+    digest = hashlib.sha1('|'.join(
+        version[0] if version else '-' for version in versions
+    ).encode('ascii')).hexdigest()
+    return digest, max((version[1] for version in versions if version), default=0.0)
+
+
+@dataManagement_bp.route('/stock/analysis/batch', methods=['GET', 'POST'])
+@conditional(_batch_data_version)
+def analyze_stock_batch():
+    """
+    Endpoint per l'analisi base di molti simboli in una sola richiesta
+    Legge solo la cache: i simboli vengono caricati in parallelo, allineati in
+    una matrice data x simbolo e analizzati in blocco; risposta a tabella
+    compatta (columns + una riga per simbolo). I simboli senza dati in cache
+    sono elencati in 'missing'
+    """
+    try:
+        data = dict(request_params())
+        symbols = list(dict.fromkeys(_export_symbols(data)))
+        if len(symbols) > BATCH_MAX_SYMBOLS:
+            raise ValueError(f"Massimo {BATCH_MAX_SYMBOLS} simboli per richiesta")
+        data['symbols'] = symbols
+        data.pop('symbol', None)
         
-        # Esegui analisi
-        analysis = data_processor.basic_analysis(stock_result['data'])
+        def compute():
+            data_type = 'dailyAdjusted' if data.get('adjusted', True) else 'daily'
+            panels, missing = file_manager.load_panel(
+                symbols, data_type, data.get('start_date'), data.get('end_date'),
+                fields=('close', 'volume')
+            )
+            table = data_processor.analyze_panel(panels['close'], panels['volume'])
+            table.update({'data_type': data_type, 'missing': missing})
+            return {
+                'success': True,
+                'data': table
+            }
+        
+        return cached_json_response(
+            'stock_analysis_batch', data, _batch_data_version, compute,
+            symbols=symbols, error_status=400
+        )
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
+
+
+def _screen_data_type(params):
+    """Tipo dati dello screener: barre giornaliere adjusted (default) o raw"""
+    return 'dailyAdjusted' if params.get('adjusted', True) else 'daily'
+
+
+def _screen_version(params):
+    """Versione della tabella snapshot: cambia a ogni scrittura in cache"""
+    return snapshot_service.get_version(_screen_data_type(params))
+
+
+def _field_list(value):
+    """Lista di campi: lista o stringa separata da virgole (GET)"""
+    if value in (None, '', []):
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(field).strip().lower() for field in value if str(field).strip()]
+
+
+@dataManagement_bp.route('/stock/screen', methods=['GET', 'POST'])
+@conditional(_screen_version)
+def screen_stocks():
+    """
+    Endpoint screener sull'universo in cache
+    'filter' è un'espressione sull'ultima barra e sugli indicatori, es.
+    "close > sma_50 and volume > 2 * avg_volume_20"; viene valutata sullo
+    snapshot mantenuto a ogni scrittura, senza leggere gli storici.
+    Risposta a tabella compatta (columns + una riga per simbolo)
+    """
+    try:
+        data = request_params()
+        sort = data.get('sort')
+        result = screener_service.screen(
+            data.get('filter'),
+            data_type=_screen_data_type(data),
+            fields=_field_list(data.get('fields')),
+            sort=str(sort).strip().lower() if sort else None,
+            limit=parse_limit(data.get('limit'))
+        )
         
         return jsonify({
             'success': True,
-            'data': analysis
+            'data': result
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
+
+
+def _cross_section_range(params):
+    """Intervallo di una query cross-section: 'date' oppure start_date / end_date"""
+    try:
+        if params.get('date'):
+            start = end = pd.Timestamp(params['date'])
+        else:
+            start = pd.Timestamp(params['start_date']) if params.get('start_date') else None
+            end = pd.Timestamp(params['end_date']) if params.get('end_date') else start
+    except (TypeError, ValueError):
+        raise ValueError("Data non valida: usa il formato YYYY-MM-DD")
+    return start, end
+
+
+def _cross_section_version(params):
+    """Versione delle partizioni mensili interessate dalla query"""
+    try:
+        start, end = _cross_section_range(params)
+    except ValueError:
+        return None
+    if start is None or end is None or end < start:
+        return None
+    return cross_section_service.get_version(_screen_data_type(params), start, end)
+
+
+@dataManagement_bp.route('/cross-section', methods=['GET', 'POST'])
+@conditional(_cross_section_version)
+def get_cross_section():
+    """
+    Endpoint cross-section: close, volume e variazione % di tutti i simboli
+    in cache in una data ('date') o in un intervallo (start_date, end_date).
+    Legge l'indice date-major (partizioni mensili), non i file dei simboli.
+    'sort' ('-change_pct' per i migliori) e 'limit' per le classifiche
+    """
+    try:
+        data = request_params()
+        data_type = _screen_data_type(data)
+        start, end = _cross_section_range(data)
+        fields = _field_list(data.get('fields')) or list(CrossSectionService.FIELDS)
+        cross_section_service.validate_input({
+            'data_type': data_type, 'fields': fields, 'start': start, 'end': end
+        })
+        symbols = data.get('symbols')
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+        symbols = [str(symbol).strip().upper() for symbol in symbols or [] if str(symbol).strip()]
+        
+        frame = cross_section_service.query(data_type, start, end, symbols or None)
+        
+        sort = str(data.get('sort') or '').strip().lower()
+        if sort:
+            field = sort.lstrip('-')
+            if field not in CrossSectionService.FIELDS + ('symbol',):
+                raise ValueError(f"Campo di ordinamento sconosciuto: {field}")
+            frame = frame.sort_values(field, ascending=not sort.startswith('-'),
+                                      kind='stable', na_position='last')
+        matched = len(frame)
+        limit = parse_limit(data.get('limit'))
+        if limit is not None:
+            frame = frame.head(limit)
+        
+        single_date = start == end
+        columns = ([] if single_date else ['date']) + ['symbol'] + fields
+        values = frame[columns].copy()
+        if not single_date:
+            values['date'] = values['date'].dt.strftime(DAILY_TIME_FORMAT)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'data_type': data_type,
+                'start': start.strftime(DAILY_TIME_FORMAT),
+                'end': end.strftime(DAILY_TIME_FORMAT),
+                'dates': int(frame['date'].nunique()),
+                'matched': matched,
+                'count': len(values),
+                'columns': columns,
+                'rows': values.round(4).astype(object).where(values.notna(), None).values.tolist()
+            }
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
+
+
+@dataManagement_bp.route('/audit', methods=['GET'])
+def get_audit():
+    """
+    Endpoint stato dell'audit di qualità della cache e riepilogo dell'ultimo report
+    Con 'issues=true' restituisce anche le occorrenze, filtrabili per
+    'check', 'severity', 'symbol' e 'data_type' ('limit' per troncare)
+    """
+    try:
+        data = request_params()
+        result = audit_service.status()
+        
+        if str(data.get('issues', '')).lower() in ('1', 'true'):
+            check = data.get('check')
+            if check and check not in CHECKS:
+                raise ValueError(f"Controllo sconosciuto: {check}. Usa uno tra {', '.join(CHECKS)}")
+            filters = {field: str(data[field]).strip() for field in
+                       ('check', 'severity', 'data_type') if data.get(field)}
+            if data.get('symbol'):
+                filters['symbol'] = str(data['symbol']).strip().upper()
+            
+            report = audit_service.last_report or {'issues': []}
+            issues = [issue for issue in report['issues']
+                      if all(issue[field] == value for field, value in filters.items())]
+            limit = parse_limit(data.get('limit'))
+            result['matched'] = len(issues)
+            result['issues'] = issues[:limit] if limit is not None else issues
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+        
+    except ValueError as e:
         return jsonify({
             'success': False,
             'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
+
+
+@dataManagement_bp.route('/audit', methods=['POST'])
+def run_audit():
+    """
+    Endpoint per avviare l'audit di qualità della cache
+    {symbols?, data_types?} limitano i file controllati; di default l'audit
+    gira in background (202, stato in GET /audit); con "wait": true la
+    risposta contiene il riepilogo (per audit su pochi simboli)
+    """
+    try:
+        data = request_payload()
+        options = {field: data[field] for field in ('symbols', 'data_types')
+                   if data.get(field) is not None}
+        audit_service.validate_input(options)
+        
+        if data.get('wait'):
+            report = audit_service.run_once(**options)
+            if report is None:
+                raise ValueError("Audit già in corso")
+            return jsonify({
+                'success': True,
+                'data': report['summary']
+            })
+        
+        if not audit_service.trigger(**options):
+            raise ValueError("Audit già in corso")
+        return jsonify({
+            'success': True,
+            'data': audit_service.status()
+        }), 202
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
         }), 500
 
 
@@ -453,6 +1162,15 @@ def get_cache_stats(symbol):
         }), 500
 
 
+@dataManagement_bp.route('/cache/responses', methods=['GET'])
+def get_response_cache_stats():
+    """Endpoint per le statistiche della cache delle risposte serializzate"""
+    return jsonify({
+        'success': True,
+        'data': response_cache.stats()
+    })
+
+
 @dataManagement_bp.route('/cache/clear/<symbol>', methods=['DELETE'])
 def clear_symbol_cache(symbol):
     """
@@ -476,22 +1194,25 @@ def clear_symbol_cache(symbol):
 def validate_adjusted_data():
     """
     Endpoint per validare la qualità dei dati adjusted
+    Record inline (JSON, MessagePack o Arrow, anche gzip) oppure riferimento
+    {symbol, start, end, data_type} ai dati in cache
     """
     try:
-        data = request.get_json()
+        data = request_payload()
         
-        if 'records' not in data:
-            # Se non ci sono records, prova a caricare da un simbolo
-            if 'symbol' in data and 'data_type' in data:
-                df = file_manager.load_data(data['symbol'], data['data_type'])
-                if df is not None:
-                    records = df.to_dict('records')
-                else:
-                    raise ValueError("Nessun dato trovato")
-            else:
-                raise ValueError("Records o simbolo richiesti")
-        else:
+        reference = data_reference(data)
+        if reference is not None:
+            # Nessun record inline: legge il periodo dalla cache
+            symbol, start_date, end_date = reference
+            records = file_manager.load_range(
+                symbol, data.get('data_type', 'dailyAdjusted'), start_date, end_date
+            )
+            if records is None:
+                raise ValueError("Nessun dato trovato")
+        elif data.get('records') is not None:
             records = data['records']
+        else:
+            raise ValueError("Records o simbolo richiesti")
         
         from ..services.adjusted_data import AdjustedDataService
         adj_service = AdjustedDataService()
@@ -503,6 +1224,11 @@ def validate_adjusted_data():
             'data': validation
         })
         
+    except HTTPException as e:
+        return jsonify({
+            'success': False,
+            'error': e.description
+        }), e.code
     except ValueError as e:
         return jsonify({
             'success': False,
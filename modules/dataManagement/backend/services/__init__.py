@@ -4,5 +4,16 @@ from .yahoo_service import YahooFinanceService
 from .data_processor import DataProcessor
 from .adjusted_data import AdjustedDataService
 from .file_manager import FileManagerService
+from .excel_exporter import ExcelExportService
+from .downsampling import DownsamplingService
+from .indicators import IndicatorService
+from .snapshot import SnapshotService
+from .screener import ScreenerService
+from .cross_section import CrossSectionService
+from .timeframes import TimeframeService
+from .audit import DataAuditService
 
-__all__ = ['YahooFinanceService', 'DataProcessor', 'AdjustedDataService', 'FileManagerService']
\ No newline at end of file
+__all__ = ['YahooFinanceService', 'DataProcessor', 'AdjustedDataService', 'FileManagerService',
+           'ExcelExportService', 'DownsamplingService', 'IndicatorService',
+           'SnapshotService', 'ScreenerService', 'CrossSectionService',
+           'TimeframeService', 'DataAuditService']
\ No newline at end of file
@@ -4,7 +4,7 @@ Principio SOLID: Single Responsibility - gestisce solo calcoli adjusted
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 from datetime import datetime
 
 from core.backend.base.base_service import BaseService
@@ -13,6 +13,11 @@ from core.backend.base.base_service import BaseService
 class AdjustedDataService(BaseService):
     """Gestisce il calcolo dei prezzi adjusted per coerenza OHLC"""
     
+    PRICE_FIELDS = ('open', 'high', 'low', 'close')
+    # Variazione relativa minima del fattore tra due sedute per registrare un evento
+    # (sotto soglia: rumore di arrotondamento di Yahoo Finance)
+    FACTOR_TOLERANCE = 1e-6
+    
     def validate_input(self, data: Dict[str, Any]) -> bool:
         """Valida i parametri di input"""
         required_fields = ['records', 'has_adjusted']
@@ -27,27 +32,30 @@ class AdjustedDataService(BaseService):
         Calcola i prezzi adjusted per tutti i campi OHLC
         Se has_adjusted è True, usa l'Adj Close esistente
         Se è False, copia Close in Adj Close
+        Wrapper a record di adjust_arrays: estrae le colonne una volta e
+        aggiunge adj_open / adj_high / adj_low (e adj_close) a ogni record
         """
         try:
             if not records:
                 return records
             
-            # Converti in DataFrame per calcoli più efficienti
-            df = pd.DataFrame(records)
-            
             # Se non ci sono dati adjusted, usa Close come Adj Close
-            if not has_adjusted or 'adj_close' not in df.columns:
-                df['adj_close'] = df['close']
+            use_adjusted = has_adjusted and any('adj_close' in record for record in records)
+            if not use_adjusted:
                 self.log_info("Nessun dato adjusted disponibile, uso Close come Adj Close")
             
-            # Calcola il fattore di aggiustamento
-            df = self._calculate_adjustment_factor(df)
-            
-            # Applica l'aggiustamento a tutti i prezzi
-            df = self._apply_adjustment(df)
+            adjusted = self.adjust_arrays(
+                *(self._column(records, field) for field in self.PRICE_FIELDS),
+                adj_close=self._column(records, 'adj_close') if use_adjusted else None
+            )
             
-            # Converti back in lista di dizionari
-            adjusted_records = df.to_dict('records')
+            adjusted_records = [
+                {**record, 'adj_close': adj_close, 'adj_open': adj_open,
+                 'adj_high': adj_high, 'adj_low': adj_low}
+                for record, adj_open, adj_high, adj_low, adj_close in zip(
+                    records, *(adjusted[f'adj_{field}'].tolist() for field in self.PRICE_FIELDS)
+                )
+            ]
             
             self.log_info(f"Calcolati prezzi adjusted per {len(adjusted_records)} record")
             return adjusted_records
@@ -56,82 +64,146 @@ class AdjustedDataService(BaseService):
             self.log_error("Errore nel calcolo prezzi adjusted", e)
             raise
     
-    def _calculate_adjustment_factor(self, df: pd.DataFrame) -> pd.DataFrame:
+    def adjust_arrays(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                      close: np.ndarray, adj_close: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
         """
-        Calcola il fattore di aggiustamento per ogni giorno
-        Fattore = Adj Close / Close
+        Kernel NumPy dei prezzi adjusted su array float64 contigui
+        - fattore = adj_close / close (1 se close è 0 o il rapporto non è finito)
+        - adj_open / adj_high / adj_low = prezzo * fattore
+        - coerenza: adj_high diventa il massimo dei quattro prezzi adjusted, poi
+          adj_low il minimo di open, low, close e high corretto (NaN ignorati),
+          con riduzioni np.fmax / np.fmin in place
+        Nessun DataFrame intermedio: gli array in ingresso non vengono modificati
+        
+        Returns:
+            {'adj_open', 'adj_high', 'adj_low', 'adj_close'}: array float64
         """
-        try:
-            # Evita divisione per zero
-            df['adjustment_factor'] = np.where(
-                df['close'] != 0,
-                df['adj_close'] / df['close'],
-                1.0
-            )
-            
-            # Gestisci valori NaN o infiniti
-            df['adjustment_factor'].fillna(1.0, inplace=True)
-            df['adjustment_factor'] = df['adjustment_factor'].replace([np.inf, -np.inf], 1.0)
-            
-            return df
-            
-        except Exception as e:
-            self.log_error("Errore calcolo fattore aggiustamento", e)
-            raise
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        adj_close = close.copy() if adj_close is None else np.array(adj_close, dtype=np.float64)
+        
+        factor = np.empty_like(close)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(adj_close, close, out=factor)
+        factor[~np.isfinite(factor)] = 1.0
+        
+        adj_open = np.multiply(np.asarray(open_, dtype=np.float64), factor)
+        adj_high = np.multiply(np.asarray(high, dtype=np.float64), factor)
+        adj_low = np.multiply(np.asarray(low, dtype=np.float64), factor)
+        
+        # Prima il massimo (high corretto), poi il minimo includendo l'high corretto
+        peak = np.fmax(adj_open, adj_low)
+        np.fmax(peak, adj_close, out=peak)
+        corrections = peak > adj_high
+        np.fmax(adj_high, peak, out=adj_high)
+        
+        trough = np.fmin(adj_open, adj_close, out=peak)
+        np.fmin(trough, adj_high, out=trough)
+        corrections |= trough < adj_low
+        np.fmin(adj_low, trough, out=adj_low)
+        corrections = int(np.count_nonzero(corrections))
+        
+        if corrections > 0:
+            self.log_info(f"Applicate {corrections} correzioni per coerenza prezzi")
+        
+        return {
+            'adj_open': adj_open,
+            'adj_high': adj_high,
+            'adj_low': adj_low,
+            'adj_close': adj_close
+        }
     
-    def _apply_adjustment(self, df: pd.DataFrame) -> pd.DataFrame:
+    def split_factors(self, records: List[Dict]) -> Tuple[List[Dict], pd.DataFrame]:
         """
-        Applica il fattore di aggiustamento a Open, High, Low
-        per mantenere la coerenza con Adj Close
+        Separa un download giornaliero in barre grezze ed eventi di rettifica
+        Il fattore di ogni seduta è adj_factor (Adj Close / Close non arrotondato)
+        o, in mancanza, adj_close / close
+        
+        Returns:
+            (record senza adj_close / adj_factor, eventi come da factor_events)
         """
-        try:
-            # Applica aggiustamento
-            df['adj_open'] = df['open'] * df['adjustment_factor']
-            df['adj_high'] = df['high'] * df['adjustment_factor']
-            df['adj_low'] = df['low'] * df['adjustment_factor']
-            
-            # Verifica coerenza: high >= low, high >= open, high >= close
-            df = self._ensure_price_consistency(df)
-            
-            # Rimuovi colonna temporanea
-            df.drop('adjustment_factor', axis=1, inplace=True)
-            
-            return df
-            
-        except Exception as e:
-            self.log_error("Errore applicazione aggiustamento", e)
-            raise
+        bars = [{key: value for key, value in record.items()
+                 if key not in ('adj_close', 'adj_factor')} for record in records]
+        if not records:
+            return bars, self.factor_events([], [])
+        
+        factors = self._column(records, 'adj_factor')
+        missing = np.isnan(factors)
+        if missing.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                factors[missing] = (self._column(records, 'adj_close')[missing]
+                                    / self._column(records, 'close')[missing])
+        return bars, self.factor_events([record['date'] for record in records], factors)
     
-    def _ensure_price_consistency(self, df: pd.DataFrame) -> pd.DataFrame:
+    def factor_events(self, dates, factors) -> pd.DataFrame:
         """
-        Assicura che i prezzi adjusted siano coerenti:
-        - High deve essere il massimo tra Open, High, Low, Close
-        - Low deve essere il minimo tra Open, High, Low, Close
+        Comprime la serie dei fattori di rettifica negli eventi in cui cambia
+        (dividendi, split non già riflessi nel Close): una riga (date, multiplier)
+        con multiplier = fattore della seduta precedente / fattore della seduta.
+        Sedute con fattore non valido (non finito o <= 0) vengono ignorate
+        
+        Returns:
+            DataFrame ['date', 'multiplier'] ordinato per data
         """
-        try:
-            # Calcola min e max per ogni riga
-            price_cols = ['adj_open', 'adj_high', 'adj_low', 'adj_close']
-            
-            # Correggi high e low se necessario
-            df['adj_high'] = df[price_cols].max(axis=1)
-            df['adj_low'] = df[price_cols].min(axis=1)
-            
-            # Log eventuali correzioni significative
-            corrections = ((df['adj_high'] != df['high'] * df['adjustment_factor']) | 
-                         (df['adj_low'] != df['low'] * df['adjustment_factor'])).sum()
-            
-            if corrections > 0:
-                self.log_info(f"Applicate {corrections} correzioni per coerenza prezzi")
-            
+        dates = pd.DatetimeIndex(dates).to_numpy()
+        factors = np.asarray(factors, dtype=np.float64)
+        
+        valid = np.isfinite(factors) & (factors > 0)
+        dates, factors = dates[valid], factors[valid]
+        
+        steps = factors[:-1] / factors[1:]
+        changed = np.flatnonzero(np.abs(steps - 1.0) > self.FACTOR_TOLERANCE)
+        return pd.DataFrame({
+            'date': dates[changed + 1],
+            'multiplier': steps[changed]
+        })
+    
+    @staticmethod
+    def factor_series(dates, events: pd.DataFrame) -> np.ndarray:
+        """
+        Fattore di rettifica di ogni data: prodotto dei multiplier degli eventi
+        successivi (1 dall'ultimo evento in poi). Prodotti cumulati dal fondo e
+        una ricerca binaria per data, senza cicli Python
+        """
+        keys = pd.DatetimeIndex(dates).asi8
+        if events is None or events.empty:
+            return np.ones(len(keys))
+        
+        event_keys = pd.DatetimeIndex(events['date']).asi8
+        suffix = np.append(np.cumprod(events['multiplier'].to_numpy(dtype=np.float64)[::-1])[::-1], 1.0)
+        return suffix[np.searchsorted(event_keys, keys, side='right')]
+    
+    def apply_factors(self, df: pd.DataFrame, events: pd.DataFrame) -> pd.DataFrame:
+        """
+        Barre adjusted da barre grezze, con la stessa semantica di un download
+        auto_adjust: open / high / low / close moltiplicati per il fattore della
+        seduta (close = Adj Close) e, con tutte le colonne OHLC, adj_close /
+        adj_open / adj_high / adj_low dal kernel adjust_arrays (OHLC coerente).
+        Le barre grezze restano leggibili dal tipo sorgente ('daily')
+        """
+        fields = [field for field in self.PRICE_FIELDS if field in df.columns]
+        if not fields:
             return df
-            
-        except Exception as e:
-            self.log_error("Errore verifica coerenza prezzi", e)
-            raise
+        
+        factor = self.factor_series(df['date'], events)
+        raw = {field: df[field].to_numpy(dtype=np.float64) for field in fields}
+        columns = {field: values * factor for field, values in raw.items()}
+        
+        if len(fields) == len(self.PRICE_FIELDS):
+            adjusted = self.adjust_arrays(
+                *(raw[field] for field in self.PRICE_FIELDS), adj_close=columns['close']
+            )
+            columns.update({f'adj_{field}': adjusted[f'adj_{field}']
+                            for field in ('close', 'open', 'high', 'low')})
+        return df.assign(**columns)
+    
+    @staticmethod
+    def _column(records: List[Dict], field: str) -> np.ndarray:
+        """Colonna float64 dai record (campo assente o None -> NaN)"""
+        return np.array([record.get(field) for record in records], dtype=np.float64)
     
-    def validate_adjusted_data(self, records: List[Dict]) -> Dict[str, Any]:
+    def validate_adjusted_data(self, records: Union[List[Dict], pd.DataFrame]) -> Dict[str, Any]:
         """
-        Valida la qualità dei dati adjusted
+        Valida la qualità dei dati adjusted (record o DataFrame colonnare)
         """
         try:
             df = pd.DataFrame(records)
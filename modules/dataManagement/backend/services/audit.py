@@ -0,0 +1,495 @@
+"""
+Audit di qualità dei dati su tutta la cache prezzi
+Principio SOLID: Single Responsibility - controlla i file, non li corregge
+"""
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    MO, AbstractHolidayCalendar, DateOffset, GoodFriday, Holiday, USLaborDay,
+    USMemorialDay, USPresidentsDay, USThanksgivingDay, nearest_workday, sunday_to_monday
+)
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import (
+    AUDIT_CHUNK_SIZE, AUDIT_INTERVAL_SECONDS, AUDIT_JUMP_RATIO, AUDIT_MAX_ISSUES_PER_CHECK,
+    AUDIT_MAX_WORKERS, AUDIT_OUTPUT_DIR, AUDIT_START_METHOD
+)
+from .file_manager import FileManagerService
+
+
+# Controllo -> gravità
+CHECKS = {
+    'duplicate_timestamp': 'error',
+    'unsorted_timestamp': 'error',
+    'missing_value': 'error',
+    'non_positive_price': 'error',
+    'negative_volume': 'error',
+    'ohlc_inconsistent': 'error',
+    'calendar_gap': 'warning',
+    'off_calendar': 'warning',
+    'split_like_jump': 'warning'
+}
+# Tipi con una barra per seduta: confrontati con il calendario di borsa
+SESSION_TYPES = ('daily', 'dailyAdjusted')
+# Split e raggruppamenti riconosciuti nei salti di prezzo (nuove azioni, vecchie)
+SPLIT_RATIOS = ((2, 1), (3, 1), (4, 1), (5, 1), (8, 1), (10, 1), (20, 1), (3, 2))
+# Chiusure straordinarie di borsa (giornate intere): elezioni presidenziali fino
+# al 1980, funerali di stato, blackout e uragani, 11 settembre
+SPECIAL_CLOSURES = (
+    '1972-11-07', '1972-12-28', '1973-01-25', '1976-11-02', '1977-07-14',
+    '1980-11-04', '1985-09-27', '1994-04-27', '2001-09-11', '2001-09-12',
+    '2001-09-13', '2001-09-14', '2004-06-11', '2007-01-02', '2012-10-29',
+    '2012-10-30', '2018-12-05', '2025-01-09'
+)
+# Prima data coperta dal calendario (festività del lunedì in vigore dal 1971):
+# le barre precedenti non vengono confrontate con il calendario
+CALENDAR_START = '1971-01-01'
+
+
+class ExchangeCalendar(AbstractHolidayCalendar):
+    """Festività della borsa USA (NYSE) e chiusure straordinarie note"""
+    rules = [
+        Holiday('NewYearsDay', month=1, day=1, observance=sunday_to_monday),
+        # Festività federale dal 1986, chiusura della borsa solo dal 1998
+        Holiday('MartinLutherKingJr', month=1, day=1, start_date='1998-01-01',
+                offset=DateOffset(weekday=MO(3))),
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday('Juneteenth', month=6, day=19, start_date='2022-01-01',
+                observance=nearest_workday),
+        Holiday('IndependenceDay', month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday('Christmas', month=12, day=25, observance=nearest_workday)
+    ] + [
+        Holiday(f'Closure {day}', year=int(day[:4]), month=int(day[5:7]), day=int(day[8:]))
+        for day in SPECIAL_CLOSURES
+    ]
+
+
+# Servizio del processo worker: creato una volta dall'initializer del pool
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(base_path: str) -> None:
+    """Servizio di audit del worker sulla stessa cache del processo principale"""
+    auditor = DataAuditService()
+    auditor.file_manager.base_path = Path(base_path)
+    _worker['auditor'] = auditor
+
+
+def _audit_chunk(files: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Controlla un blocco di file nel worker: al task viaggiano solo i nomi"""
+    return _worker['auditor'].audit_files(files)
+
+
+class DataAuditService(BaseService):
+    """
+    Controlla tutti i file prezzi in cache (simbolo x tipo dati):
+    - timestamp duplicati o non ordinati, valori mancanti
+    - prezzi nulli o negativi, volume negativo
+    - coerenza OHLC (anche sulle colonne adjusted)
+    - sedute mancanti o fuori calendario rispetto al calendario di borsa
+      (solo barre giornaliere)
+    - salti di prezzo da split non rettificato (close / close precedente oltre
+      AUDIT_JUMP_RATIO, con il rapporto di split più vicino)
+    Ogni file viene letto una volta e controllato con operazioni vettoriali;
+    i file sono distribuiti a blocchi su un ProcessPoolExecutor.
+    L'audit può girare anche periodicamente in un thread in background
+    (start_schedule) o su richiesta (trigger); l'ultimo report resta in memoria
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+        self._sessions: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._scheduler: Optional[threading.Thread] = None
+        self._state: Dict[str, Any] = {
+            'running': False, 'interval_seconds': 0, 'last_started': None,
+            'last_finished': None, 'next_run': None, 'last_error': None
+        }
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida simboli e tipi dati opzionali (liste di stringhe)"""
+        for field in ('symbols', 'data_types'):
+            value = data.get(field)
+            if value is not None and (not isinstance(value, list)
+                                      or not all(isinstance(item, str) for item in value)):
+                raise ValueError(f"{field} deve essere una lista di stringhe")
+        return True
+
+    # ---- calendario ----
+
+    def sessions(self) -> np.ndarray:
+        """Sedute di borsa (giorni dall'epoch, int64) da CALENDAR_START a un anno da oggi"""
+        if self._sessions is None:
+            end = pd.Timestamp.today().normalize() + pd.Timedelta(days=366)
+            holidays = ExchangeCalendar().holidays(CALENDAR_START, end)
+            days = pd.bdate_range(CALENDAR_START, end, freq='C', holidays=holidays)
+            self._sessions = days.to_numpy().astype('datetime64[D]').astype(np.int64)
+        return self._sessions
+
+    # ---- controlli per file ----
+
+    def list_files(self, symbols: Optional[Sequence[str]] = None,
+                   data_types: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+        """Coppie (simbolo, tipo dati) con un file prezzi in cache, in ordine"""
+        base_path = self.file_manager.base_path
+        if not base_path.exists():
+            return []
+        wanted = {str(symbol).strip().upper() for symbol in symbols} if symbols else None
+
+        files = []
+        for symbol_dir in sorted(base_path.iterdir()):
+            if not symbol_dir.is_dir() or (wanted is not None and symbol_dir.name not in wanted):
+                continue
+            symbol = symbol_dir.name
+            types = {path.name for path in symbol_dir.iterdir() if path.is_dir()}
+            types |= {derived for derived in self.file_manager.ADJUSTED_SOURCES
+                      if self.file_manager.is_derived(symbol, derived)}
+            for data_type in sorted(types):
+                if data_types and data_type not in data_types:
+                    continue
+                if self.file_manager.get_data_file(symbol, data_type).exists():
+                    files.append((symbol, data_type))
+        return files
+
+    def audit_files(self, files: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Controlla una lista di file (nel processo corrente)"""
+        return [self.audit_file(symbol, data_type) for symbol, data_type in files]
+
+    def audit_file(self, symbol: str, data_type: str,
+                   max_issues: int = AUDIT_MAX_ISSUES_PER_CHECK) -> Dict[str, Any]:
+        """
+        Legge un file e ne esegue tutti i controlli
+
+        Returns:
+            {'symbol', 'data_type', 'rows', 'first_date', 'last_date',
+             'counts': {controllo: occorrenze}, 'issues': [...], 'error'}
+            con al più max_issues occorrenze elencate per controllo
+        """
+        result = {'symbol': symbol, 'data_type': data_type, 'rows': 0,
+                  'first_date': None, 'last_date': None, 'counts': {},
+                  'issues': [], 'error': None}
+        try:
+            df = self.file_manager.load_data(symbol, data_type)
+            if df is None:
+                raise ValueError("File non leggibile")
+            found = self.audit_frame(df, data_type, max_issues)
+        except Exception as e:
+            result['error'] = str(e)
+            return result
+
+        result.update(found)
+        result['issues'] = [{'symbol': symbol, 'data_type': data_type, **issue}
+                            for issue in found['issues']]
+        return result
+
+    def audit_frame(self, df: pd.DataFrame, data_type: str,
+                    max_issues: int = AUDIT_MAX_ISSUES_PER_CHECK) -> Dict[str, Any]:
+        """Controlli vettoriali su un DataFrame prezzi (una colonna per campo)"""
+        key_column = self.file_manager.get_key_column(data_type)
+        if key_column not in df.columns:
+            key_column = 'date'
+        keys = pd.DatetimeIndex(df[key_column])
+        counts: Dict[str, int] = {}
+        issues: List[Dict[str, Any]] = []
+
+        def report(check: str, positions: np.ndarray, detail=None) -> None:
+            """Conta le occorrenze e ne elenca al più max_issues"""
+            if not len(positions):
+                return
+            counts[check] = counts.get(check, 0) + len(positions)
+            for n, position in enumerate(positions[:max_issues]):
+                issues.append({
+                    'check': check,
+                    'severity': CHECKS[check],
+                    'date': keys[position].isoformat() if position < len(keys) else None,
+                    'detail': detail(n, position) if detail else None
+                })
+
+        ns = keys.asi8
+        report('duplicate_timestamp', np.flatnonzero(keys.duplicated()))
+        report('unsorted_timestamp', np.flatnonzero(np.diff(ns) < 0) + 1)
+
+        price_sets = [fields for fields in (('open', 'high', 'low', 'close'),
+                                            ('adj_open', 'adj_high', 'adj_low', 'adj_close'))
+                      if all(field in df.columns for field in fields)]
+        priced = [field for fields in price_sets for field in fields]
+        prices = df[priced].to_numpy(dtype=np.float64) if priced else np.empty((len(df), 0))
+
+        missing = ~np.isfinite(prices)
+        if 'volume' in df.columns:
+            volume = df['volume'].to_numpy(dtype=np.float64)
+            missing = np.column_stack([missing, np.isnan(volume)])
+            report('negative_volume', np.flatnonzero(volume < 0),
+                   lambda n, row: {'volume': float(volume[row])})
+        columns = priced + (['volume'] if 'volume' in df.columns else [])
+        report('missing_value', np.flatnonzero(missing.any(axis=1)),
+               lambda n, row: {'fields': [columns[i] for i in np.flatnonzero(missing[row])]})
+
+        with np.errstate(invalid='ignore'):
+            non_positive = prices <= 0
+        report('non_positive_price', np.flatnonzero(non_positive.any(axis=1)),
+               lambda n, row: {field: float(prices[row, i])
+                               for i, field in enumerate(priced) if non_positive[row, i]})
+
+        for offset, fields in enumerate(price_sets):
+            open_, high, low, close = (prices[:, offset * 4 + i] for i in range(4))
+            tolerance = 1e-6 * np.fmax(np.abs(high), 1.0)
+            with np.errstate(invalid='ignore'):
+                bad = (high + tolerance < np.fmax(np.fmax(open_, close), low)) \
+                    | (low - tolerance > np.fmin(np.fmin(open_, close), high))
+            report('ohlc_inconsistent', np.flatnonzero(bad),
+                   lambda n, row, fields=fields, offset=offset: {
+                       field: float(prices[row, offset * 4 + i]) for i, field in enumerate(fields)
+                   })
+
+        if data_type in SESSION_TYPES:
+            self._check_calendar(ns, report)
+        if price_sets:
+            self._check_jumps(df, ns, price_sets[-1][3], report)
+
+        return {
+            'rows': len(df),
+            'first_date': keys.min().isoformat() if len(keys) else None,
+            'last_date': keys.max().isoformat() if len(keys) else None,
+            'counts': counts,
+            'issues': issues
+        }
+
+    def _check_calendar(self, ns: np.ndarray, report) -> None:
+        """Barre fuori dalle sedute di borsa e sedute mancanti tra due barre"""
+        sessions = self.sessions()
+        days = ns // (86_400 * 10**9)
+        inside = np.flatnonzero((days >= sessions[0]) & (days <= sessions[-1]))
+        if not len(inside):
+            return
+
+        positions = np.searchsorted(sessions, days[inside])
+        on_calendar = sessions[positions] == days[inside]
+        report('off_calendar', inside[~on_calendar])
+
+        rows = inside[on_calendar]
+        order = np.argsort(days[rows], kind='stable')
+        rows, positions = rows[order], positions[on_calendar][order]
+        missing = np.diff(positions) - 1
+        gaps = np.flatnonzero(missing > 0)
+        report('calendar_gap', rows[gaps + 1], lambda n, row: {
+            'missing_sessions': int(missing[gaps[n]]),
+            'previous': pd.Timestamp(int(ns[rows[gaps[n]]])).strftime('%Y-%m-%d')
+        })
+
+    def _check_jumps(self, df: pd.DataFrame, ns: np.ndarray, column: str, report) -> None:
+        """Variazioni close / close precedente da split (prezzi validi, in ordine di tempo)"""
+        close = df[column].to_numpy(dtype=np.float64)
+        order = np.argsort(ns, kind='stable')
+        valid = order[np.isfinite(close[order]) & (close[order] > 0)]
+        if len(valid) < 2:
+            return
+
+        ratio = close[valid[1:]] / close[valid[:-1]]
+        jumps = np.flatnonzero((ratio >= AUDIT_JUMP_RATIO) | (ratio <= 1.0 / AUDIT_JUMP_RATIO))
+        report('split_like_jump', valid[jumps + 1], lambda n, row: {
+            'column': column,
+            'ratio': round(float(ratio[jumps[n]]), 6),
+            'previous_close': float(close[valid[jumps[n]]]),
+            'close': float(close[row]),
+            'split': self.split_label(float(ratio[jumps[n]]))
+        })
+
+    @staticmethod
+    def split_label(ratio: float, tolerance: float = 0.05) -> Optional[str]:
+        """Split compatibile con il rapporto tra due close ('2:1', reverse '1:10'), se c'è"""
+        for new, old in SPLIT_RATIOS:
+            if abs(ratio * new / old - 1.0) <= tolerance:
+                return f"{new}:{old}"
+            if abs(ratio * old / new - 1.0) <= tolerance:
+                return f"{old}:{new}"
+        return None
+
+    # ---- audit completo ----
+
+    def run(self, symbols: Optional[List[str]] = None, data_types: Optional[List[str]] = None,
+            max_workers: int = AUDIT_MAX_WORKERS,
+            output_dir: Optional[str] = AUDIT_OUTPUT_DIR) -> Dict[str, Any]:
+        """
+        Audit di tutti i file (o dei simboli / tipi indicati)
+        I file vengono distribuiti a blocchi di AUDIT_CHUNK_SIZE sui processi;
+        con un solo processo l'audit gira nel processo corrente
+
+        Returns:
+            {'summary': riepilogo, 'files': file con problemi o errori,
+             'issues': elenco piatto delle occorrenze}; con output_dir il report
+            viene scritto anche su disco (JSON + issues in JSON Lines)
+        """
+        self.validate_input({'symbols': symbols, 'data_types': data_types})
+        started = time.perf_counter()
+        started_at = datetime.now()
+
+        files = self.list_files(symbols, data_types)
+        chunks = [files[i:i + AUDIT_CHUNK_SIZE] for i in range(0, len(files), AUDIT_CHUNK_SIZE)]
+        workers = max(1, min(max_workers, len(chunks)))
+
+        if workers == 1:
+            results = [result for chunk in chunks for result in self.audit_files(chunk)]
+        else:
+            context = multiprocessing.get_context(AUDIT_START_METHOD)
+            base_path = str(self.file_manager.base_path.resolve())
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(base_path,)) as executor:
+                results = [result for part in executor.map(_audit_chunk, chunks)
+                           for result in part]
+
+        report = self.summarize(results)
+        report['summary'].update({
+            'started': started_at.isoformat(timespec='seconds'),
+            'workers': workers,
+            'elapsed_seconds': round(time.perf_counter() - started, 3)
+        })
+        if output_dir:
+            report['summary']['paths'] = self.write_report(report, output_dir, started_at)
+
+        summary = report['summary']
+        self.log_info(
+            f"Audit dati: {summary['files']} file, {summary['files_with_issues']} con problemi, "
+            f"{summary['files_failed']} non leggibili in {summary['elapsed_seconds']} s "
+            f"su {workers} processi"
+        )
+        self.last_report = report
+        return report
+
+    @staticmethod
+    def summarize(results: List[Dict[str, Any]], top: int = 20) -> Dict[str, Any]:
+        """Riepilogo per controllo e gravità, file peggiori ed elenco piatto delle occorrenze"""
+        by_check = {check: 0 for check in CHECKS}
+        with_issues = []
+        for result in results:
+            for check, count in result['counts'].items():
+                by_check[check] += count
+            if result['counts'] or result['error']:
+                with_issues.append(result)
+
+        by_severity = {'error': 0, 'warning': 0}
+        for check, count in by_check.items():
+            by_severity[CHECKS[check]] += count
+
+        issues = [issue for result in with_issues for issue in result['issues']]
+        worst = sorted((result for result in with_issues if result['counts']),
+                       key=lambda result: -sum(result['counts'].values()))[:top]
+        return {
+            'summary': {
+                'files': len(results),
+                'symbols': len({result['symbol'] for result in results}),
+                'rows': sum(result['rows'] for result in results),
+                'files_with_issues': sum(1 for result in with_issues if result['counts']),
+                'files_failed': sum(1 for result in with_issues if result['error']),
+                'by_check': by_check,
+                'by_severity': by_severity,
+                'issues_listed': len(issues),
+                'top_files': [{'symbol': result['symbol'], 'data_type': result['data_type'],
+                               'issues': sum(result['counts'].values())} for result in worst]
+            },
+            'files': [{key: value for key, value in result.items() if key != 'issues'}
+                      for result in with_issues],
+            'issues': issues
+        }
+
+    def write_report(self, report: Dict[str, Any], output_dir: str,
+                     started_at: datetime) -> Dict[str, str]:
+        """Scrive riepilogo + file (JSON) e occorrenze (una per riga, JSON Lines)"""
+        directory = Path(output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"audit_{started_at.strftime('%Y%m%d_%H%M%S')}"
+        summary_path = directory / f"{stem}.json"
+        issues_path = directory / f"{stem}.issues.jsonl"
+
+        with open(issues_path, 'w') as f:
+            for issue in report['issues']:
+                f.write(json.dumps(issue) + '\n')
+        paths = {'summary': str(summary_path), 'issues': str(issues_path)}
+        with open(summary_path, 'w') as f:
+            json.dump({'summary': {**report['summary'], 'paths': paths},
+                       'files': report['files']}, f, indent=2)
+        return paths
+
+    # ---- esecuzione in background ----
+
+    def start_schedule(self, interval_seconds: float = AUDIT_INTERVAL_SECONDS) -> bool:
+        """Avvia l'audit periodico in un thread daemon (0 o negativo: nessun job)"""
+        with self._lock:
+            if interval_seconds <= 0 or (self._scheduler and self._scheduler.is_alive()):
+                return False
+            self._stop.clear()
+            self._state['interval_seconds'] = interval_seconds
+            self._scheduler = threading.Thread(
+                target=self._schedule_loop, args=(interval_seconds,),
+                name='data-audit', daemon=True
+            )
+            self._scheduler.start()
+        self.log_info(f"Audit dati pianificato ogni {interval_seconds:g} s")
+        return True
+
+    def stop_schedule(self) -> None:
+        """Ferma l'audit periodico (un audit in corso viene completato)"""
+        self._stop.set()
+        with self._lock:
+            self._state['next_run'] = None
+
+    def _schedule_loop(self, interval_seconds: float) -> None:
+        """Primo audit dopo un intervallo (non all'avvio dell'applicazione), poi a cadenza fissa"""
+        while True:
+            self._state['next_run'] = datetime.fromtimestamp(
+                time.time() + interval_seconds).isoformat(timespec='seconds')
+            if self._stop.wait(interval_seconds):
+                return
+            self.run_once()
+
+    def trigger(self, **kwargs) -> bool:
+        """Avvia subito un audit in background; False se uno è già in corso"""
+        with self._lock:
+            if self._state['running']:
+                return False
+            self._state['running'] = True
+        threading.Thread(target=self.run_once, kwargs={**kwargs, '_claimed': True},
+                         name='data-audit-run', daemon=True).start()
+        return True
+
+    def run_once(self, _claimed: bool = False, **kwargs) -> Optional[Dict[str, Any]]:
+        """Esegue un audit registrandone lo stato; None se uno è già in corso"""
+        if not _claimed:
+            with self._lock:
+                if self._state['running']:
+                    return None
+                self._state['running'] = True
+        self._state['last_started'] = datetime.now().isoformat(timespec='seconds')
+        try:
+            report = self.run(**kwargs)
+            self._state['last_error'] = None
+            return report
+        except Exception as e:
+            self._state['last_error'] = str(e)
+            self.log_error("Errore audit dati", e)
+            return None
+        finally:
+            self._state['last_finished'] = datetime.now().isoformat(timespec='seconds')
+            with self._lock:
+                self._state['running'] = False
+
+    def status(self) -> Dict[str, Any]:
+        """Stato del job e riepilogo dell'ultimo audit completato"""
+        return {**self._state,
+                'summary': self.last_report['summary'] if self.last_report else None}
@@ -0,0 +1,389 @@
+"""
+Indice date-major dei dati in cache: tutti i simboli di una data
+Principio SOLID: Single Responsibility - mantiene e interroga l'indice per data
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import CROSS_SECTION_COMPACT_BYTES, CROSS_SECTION_MAX_DAYS
+from .file_manager import FileManagerService
+
+
+# Record dell'indice: una riga per (data, simbolo); op 1 = tombstone del simbolo nel mese
+RECORD = np.dtype([
+    ('date', 'datetime64[D]'), ('symbol', 'S20'), ('op', 'u1'),
+    ('close', 'f8'), ('volume', 'f8'), ('change_pct', 'f8')
+])
+UPSERT, TOMBSTONE = 0, 1
+
+
+class CrossSectionService(BaseService):
+    """
+    Copia date-major di close, volume e variazione % dei file in cache
+    - partizioni mensili: un file base ordinato per (data, simbolo), aperto
+      come memmap e tagliato con ricerca binaria sulla data, più un log
+      binario append-only delle scritture successive
+    - ogni scrittura in cache (listener del FileManagerService) accoda solo le
+      righe nuove del simbolo; se lo storico è stato riscritto o cancellato
+      accoda un tombstone per ogni mese coinvolto e le righe correnti
+    - quando il log di un mese supera la soglia viene fuso nel file base
+    Una query su una data legge solo le righe di quella data (più il log del mese)
+    """
+
+    DATA_TYPES = ('daily', 'dailyAdjusted')
+    FIELDS = ('close', 'volume', 'change_pct')
+    STATE_VERSION = 1
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+        self.base_path = Path("resources/data/cross_section")
+        self._lock = threading.RLock()
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida tipo dati, campi e intervallo di date"""
+        if data.get('data_type') not in self.DATA_TYPES:
+            raise ValueError(
+                f"Tipo dati non supportato: {data.get('data_type')}. "
+                f"Usa uno tra {', '.join(self.DATA_TYPES)}"
+            )
+        unknown = [field for field in data.get('fields', []) if field not in self.FIELDS]
+        if unknown:
+            raise ValueError(
+                f"Campi non supportati: {', '.join(unknown)}. Usa uno tra {', '.join(self.FIELDS)}"
+            )
+
+        start, end = data.get('start'), data.get('end')
+        if start is None or end is None:
+            raise ValueError("Serve una data (date) o un intervallo (start_date, end_date)")
+        if end < start:
+            raise ValueError("end_date precede start_date")
+        if (end - start).days >= CROSS_SECTION_MAX_DAYS:
+            raise ValueError(f"Intervallo massimo: {CROSS_SECTION_MAX_DAYS} giorni")
+        return True
+
+    def on_write(self, symbol: str, data_type: Optional[str],
+                 frame: Optional[pd.DataFrame]) -> None:
+        """Listener di scrittura: accoda all'indice le righe cambiate del simbolo"""
+        for current in ([data_type] if data_type else list(self.DATA_TYPES)):
+            if current in self.DATA_TYPES:
+                self.index_symbol(symbol, current, frame)
+
+    def index_symbol(self, symbol: str, data_type: str, frame: Optional[pd.DataFrame],
+                     compact: bool = True) -> int:
+        """
+        Allinea l'indice allo storico del simbolo (frame None: simbolo cancellato)
+        Se lo storico prosegue quello indicizzato (stessa prima data, stessa
+        ultima riga nota) vengono accodate solo le date successive
+
+        Returns:
+            Righe accodate al log
+        """
+        with self._lock:
+            state = self._load_state(symbol, data_type)
+            records = self._records(symbol, frame) if frame is not None and not frame.empty \
+                else np.empty(0, dtype=RECORD)
+            factors = self.file_manager.get_factors_version(symbol, data_type)
+
+            if state is not None and len(records) and self._continues(records, state, factors):
+                records = records[records['date'] > np.datetime64(state['last'], 'D')]
+                tombstones = []
+            else:
+                # Storico riscritto o cancellato: azzera il simbolo nei mesi vecchi e nuovi
+                months = set(self._months(records['date'])) if len(records) else set()
+                if state is not None:
+                    months |= set(pd.period_range(state['first'], state['last'], freq='M').astype(str))
+                tombstones = sorted(months)
+
+            written = self._append(data_type, symbol, records, tombstones)
+            if len(records) or tombstones:
+                self._save_state(symbol, data_type, frame, factors)
+            if compact:
+                for month in set(self._months(records['date'])) | set(tombstones):
+                    self._maybe_compact(data_type, month)
+            return written
+
+    def rebuild(self, data_type: str) -> Dict[str, int]:
+        """
+        Ricostruisce l'indice di un tipo dati da tutti i file in cache
+        (una volta sola per i dati salvati prima dell'indice)
+
+        Returns:
+            {'symbols': simboli indicizzati, 'rows': righe, 'months': partizioni}
+        """
+        symbols = [path.name for path in self.file_manager.base_path.iterdir() if path.is_dir()] \
+            if self.file_manager.base_path.exists() else []
+        rows = indexed = 0
+        with self._lock:
+            for symbol in symbols:
+                frame = self.file_manager.load_data(symbol, data_type)
+                if frame is None or frame.empty:
+                    continue
+                rows += self.index_symbol(symbol, data_type, frame, compact=False)
+                indexed += 1
+
+            months = sorted(path.stem for path in self._store_path(data_type).glob('*.log'))
+            for month in months:
+                self.compact(data_type, month)
+            self._store_path(data_type).mkdir(parents=True, exist_ok=True)
+            self._marker(data_type).write_text(json.dumps({'version': self.STATE_VERSION}))
+
+        self.log_info(f"Indice date-major {data_type}: {indexed} simboli, {rows} righe")
+        return {'symbols': indexed, 'rows': rows, 'months': len(months)}
+
+    def query(self, data_type: str, start: pd.Timestamp, end: pd.Timestamp,
+              symbols: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Righe (date, symbol, close, volume, change_pct) delle date richieste
+        ordinate per data e simbolo; legge solo le partizioni dei mesi coinvolti
+        """
+        self._ensure_built(data_type)
+        first, last = np.datetime64(start.date(), 'D'), np.datetime64(end.date(), 'D')
+
+        parts = []
+        for month in pd.period_range(start, end, freq='M').astype(str):
+            with self._lock:
+                rows = self._month_rows(data_type, month, first, last)
+            if len(rows):
+                parts.append(rows)
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD)
+
+        if symbols:
+            rows = rows[np.isin(rows['symbol'], np.array(symbols, dtype='S20'))]
+        return pd.DataFrame({
+            'date': rows['date'].astype('datetime64[ns]'),
+            'symbol': rows['symbol'].astype(str),
+            **{field: rows[field] for field in self.FIELDS}
+        })
+
+    def get_version(self, data_type: str, start: pd.Timestamp,
+                    end: pd.Timestamp) -> Optional[Tuple[str, float]]:
+        """Versione delle partizioni di un intervallo (dimensione e mtime dei file)"""
+        parts, latest = [], 0.0
+        for month in pd.period_range(start, end, freq='M').astype(str):
+            for path in self._month_files(data_type, month):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                parts.append(f"{path.name}:{stat.st_mtime_ns:x}-{stat.st_size:x}")
+                latest = max(latest, stat.st_mtime)
+        return '|'.join(parts) or '-', latest
+
+    def compact(self, data_type: str, month: str) -> int:
+        """
+        Fonde il log del mese nel file base (scrittura atomica)
+        Il log viene prima rinominato: le scritture concorrenti finiscono in un log nuovo
+
+        Returns:
+            Righe del file base risultante
+        """
+        with self._lock:
+            base, log, pending = self._month_files(data_type, month)
+            if log.exists() and not pending.exists():
+                os.replace(log, pending)
+            if not pending.exists():
+                return 0
+
+            rows = self._merge([self._read_base(base), self._read_log(pending)])
+            temporary = base.with_suffix(f'.{os.getpid()}.tmp')
+            with open(temporary, 'wb') as f:
+                np.save(f, rows)
+            os.replace(temporary, base)
+            pending.unlink()
+            return len(rows)
+
+    def _month_rows(self, data_type: str, month: str, first: np.datetime64,
+                    last: np.datetime64) -> np.ndarray:
+        """Righe del mese nell'intervallo: fetta del base (memmap) + log applicato"""
+        base, log, pending = self._month_files(data_type, month)
+        rows = np.empty(0, dtype=RECORD)
+        if base.exists():
+            stored = np.load(base, mmap_mode='r')
+            lo = int(np.searchsorted(stored['date'], first, side='left'))
+            hi = int(np.searchsorted(stored['date'], last, side='right'))
+            rows = np.array(stored[lo:hi])
+
+        logs = [self._read_log(path) for path in (pending, log)]
+        if not any(len(entries) for entries in logs):
+            return rows
+        merged = self._merge([rows] + logs)
+        return merged[(merged['date'] >= first) & (merged['date'] <= last)]
+
+    @staticmethod
+    def _merge(parts: List[np.ndarray]) -> np.ndarray:
+        """
+        Applica i record in ordine: un tombstone elimina le righe precedenti del
+        simbolo nel mese, a parità di (data, simbolo) vince la riga più recente
+
+        Returns:
+            Righe risultanti ordinate per (data, simbolo)
+        """
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=RECORD)
+        if not len(rows):
+            return rows
+        sequence = np.arange(len(rows))
+
+        tombstone = rows['op'] == TOMBSTONE
+        keep = ~tombstone
+        if tombstone.any():
+            cleared = pd.Series(sequence[tombstone]).groupby(rows['symbol'][tombstone]).max()
+            limit = pd.Series(rows['symbol']).map(cleared).to_numpy(dtype=np.float64)
+            keep &= ~(sequence < np.nan_to_num(limit, nan=-1.0))
+
+        rows, sequence = rows[keep], sequence[keep]
+        order = np.lexsort((sequence, rows['symbol'], rows['date']))
+        rows = rows[order]
+        last = np.ones(len(rows), dtype=bool)
+        last[:-1] = (rows['date'][1:] != rows['date'][:-1]) | (rows['symbol'][1:] != rows['symbol'][:-1])
+        return rows[last]
+
+    def _records(self, symbol: str, frame: pd.DataFrame) -> np.ndarray:
+        """Record dell'indice dallo storico del simbolo (variazione sul close precedente)"""
+        prefix = 'adj_' if 'adj_close' in frame.columns else ''
+        close = frame[f'{prefix}close'].to_numpy(dtype=np.float64)
+        previous = pd.Series(close).ffill().shift(1).to_numpy()
+
+        records = np.zeros(len(frame), dtype=RECORD)
+        records['date'] = pd.to_datetime(frame['date']).to_numpy().astype('datetime64[D]')
+        records['symbol'] = symbol
+        records['close'] = close
+        records['volume'] = frame['volume'].to_numpy(dtype=np.float64) \
+            if 'volume' in frame.columns else np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            records['change_pct'] = (close / previous - 1.0) * 100
+        records['change_pct'][~np.isfinite(records['change_pct'])] = np.nan
+        return records
+
+    @staticmethod
+    def _continues(records: np.ndarray, state: Dict[str, Any], factors: Optional[str]) -> bool:
+        """
+        Lo storico prosegue quello indicizzato (stesse prime righe, stessa ultima
+        riga nota, stessi fattori di rettifica)?
+        """
+        last = np.datetime64(state['last'], 'D')
+        known = records[records['date'] <= last]
+        if state.get('version') != CrossSectionService.STATE_VERSION:
+            return False
+        if state.get('factors') != factors:
+            return False
+        if len(known) != state['rows'] or not len(known):
+            return False
+        if str(known['date'][0]) != state['first'] or known['date'][-1] != last:
+            return False
+        close = known['close'][-1]
+        return bool(close == state['last_close'] or (np.isnan(close) and state['last_close'] is None))
+
+    def _append(self, data_type: str, symbol: str, records: np.ndarray,
+                tombstones: List[str]) -> int:
+        """Accoda tombstone e righe ai log dei rispettivi mesi (una scrittura per mese)"""
+        by_month: Dict[str, List[np.ndarray]] = {}
+        for month in tombstones:
+            marker = np.zeros(1, dtype=RECORD)
+            marker['date'] = np.datetime64(month, 'D')
+            marker['symbol'] = symbol
+            marker['op'] = TOMBSTONE
+            by_month.setdefault(month, []).append(marker)
+
+        months = self._months(records['date'])
+        for month in dict.fromkeys(months):
+            by_month.setdefault(month, []).append(records[months == month])
+
+        store = self._store_path(data_type)
+        store.mkdir(parents=True, exist_ok=True)
+        for month, chunks in by_month.items():
+            with open(store / f"{month}.log", 'ab') as f:
+                f.write(np.concatenate(chunks).tobytes())
+        return int(len(records))
+
+    def _maybe_compact(self, data_type: str, month: str) -> None:
+        """Compatta il mese se il log supera la soglia (o un quarto del file base)"""
+        base, log, _ = self._month_files(data_type, month)
+        try:
+            size = log.stat().st_size
+        except FileNotFoundError:
+            return
+        base_size = base.stat().st_size if base.exists() else 0
+        if size >= max(CROSS_SECTION_COMPACT_BYTES, base_size // 4):
+            self.compact(data_type, month)
+
+    def _ensure_built(self, data_type: str) -> None:
+        """Alla prima query indicizza i dati salvati prima dell'indice"""
+        if not self._marker(data_type).exists():
+            with self._lock:
+                if not self._marker(data_type).exists():
+                    self.rebuild(data_type)
+
+    @staticmethod
+    def _months(dates: np.ndarray) -> np.ndarray:
+        """Mese 'YYYY-MM' di ogni data"""
+        return dates.astype('datetime64[M]').astype(str)
+
+    @staticmethod
+    def _read_base(path: Path) -> np.ndarray:
+        """File base completo (vuoto se assente)"""
+        return np.load(path) if path.exists() else np.empty(0, dtype=RECORD)
+
+    @staticmethod
+    def _read_log(path: Path) -> np.ndarray:
+        """Record del log (un eventuale record parziale in coda viene ignorato)"""
+        try:
+            raw = path.read_bytes()
+        except FileNotFoundError:
+            return np.empty(0, dtype=RECORD)
+        usable = len(raw) - len(raw) % RECORD.itemsize
+        return np.frombuffer(raw[:usable], dtype=RECORD)
+
+    def _store_path(self, data_type: str) -> Path:
+        """Directory delle partizioni di un tipo dati"""
+        return self.base_path / data_type
+
+    def _month_files(self, data_type: str, month: str) -> Tuple[Path, Path, Path]:
+        """(file base, log, log in compattazione) di un mese"""
+        store = self._store_path(data_type)
+        return store / f"{month}.npy", store / f"{month}.log", store / f"{month}.log.compacting"
+
+    def _marker(self, data_type: str) -> Path:
+        """File che segnala l'indice costruito sui dati preesistenti"""
+        return self._store_path(data_type) / "built.json"
+
+    def _state_file(self, symbol: str, data_type: str) -> Path:
+        """Stato indicizzato di un simbolo (prima / ultima data, righe, ultimo close)"""
+        return self._store_path(data_type) / "symbols" / f"{symbol}.json"
+
+    def _load_state(self, symbol: str, data_type: str) -> Optional[Dict[str, Any]]:
+        """Stato del simbolo (None se mai indicizzato o cancellato)"""
+        try:
+            with open(self._state_file(symbol, data_type), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self, symbol: str, data_type: str, frame: Optional[pd.DataFrame],
+                    factors: Optional[str] = None) -> None:
+        """Aggiorna (o rimuove) lo stato del simbolo dopo la scrittura nel log"""
+        path = self._state_file(symbol, data_type)
+        if frame is None or frame.empty:
+            path.unlink(missing_ok=True)
+            return
+
+        dates = pd.to_datetime(frame['date'])
+        prefix = 'adj_' if 'adj_close' in frame.columns else ''
+        last_close = float(frame[f'{prefix}close'].iloc[-1])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({
+                'version': self.STATE_VERSION,
+                'first': dates.iloc[0].strftime('%Y-%m-%d'),
+                'last': dates.iloc[-1].strftime('%Y-%m-%d'),
+                'rows': int(len(frame)),
+                'last_close': last_close if np.isfinite(last_close) else None,
+                'factors': factors
+            }, f)
@@ -2,19 +2,33 @@
 Servizio per processare e analizzare i dati
 Principio SOLID: Single Responsibility - gestisce solo elaborazione dati
 """
+import warnings
 import pandas as pd
 import numpy as np
 from flask import send_file
 from io import BytesIO
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from core.backend.base.base_service import BaseService
+from .excel_exporter import ExcelExportService
 
 
 class DataProcessor(BaseService):
     """Processa e analizza i dati finanziari"""
     
+    # Finestre delle medie mobili per il trend (breve e medio termine)
+    TREND_WINDOWS = {'short_term': 20, 'medium_term': 50}
+    TRADING_DAYS = 252
+    
+    # Colonne della tabella compatta dell'analisi batch (una riga per simbolo)
+    PANEL_COLUMNS = (
+        'symbol', 'start', 'end', 'days', 'min', 'max', 'mean', 'std', 'current',
+        'volume_total', 'volume_avg', 'return_avg', 'return_total', 'best_day',
+        'worst_day', 'volatility_daily', 'volatility_annualized',
+        'trend_short_term', 'trend_medium_term'
+    )
+    
     def validate_input(self, data: Dict[str, Any]) -> bool:
         """Valida i dati di input per il processing"""
         if 'records' not in data or not data['records']:
@@ -22,45 +36,85 @@ class DataProcessor(BaseService):
         return True
     
     def basic_analysis(self, stock_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Esegue analisi statistiche di base sui dati"""
+        """Esegue analisi statistiche di base sui dati (lista di record)"""
         try:
             records = stock_data['records']
-            df = pd.DataFrame(records)
-            
-            # Converte date
-            df['date'] = pd.to_datetime(df['date'])
-            df.set_index('date', inplace=True)
-            
-            # Calcola statistiche
-            stats = {
-                'symbol': stock_data['symbol'],
-                'period': {
-                    'start': stock_data['first_date'],
-                    'end': stock_data['last_date'],
-                    'days': len(records)
-                },
-                'price_stats': {
-                    'min': float(df['close'].min()),
-                    'max': float(df['close'].max()),
-                    'mean': float(df['close'].mean()),
-                    'std': float(df['close'].std()),
-                    'current': float(df['close'].iloc[-1])
-                },
-                'volume_stats': {
-                    'total': int(df['volume'].sum()),
-                    'daily_avg': int(df['volume'].mean())
-                },
-                'returns': self._calculate_returns(df),
-                'volatility': self._calculate_volatility(df),
-                'trends': self._identify_trends(df)
-            }
+            close = np.array([record['close'] for record in records], dtype=np.float64)
+            volume = np.array([record['volume'] for record in records], dtype=np.float64)
             
-            return stats
+            return self.analyze_arrays(
+                stock_data['symbol'], stock_data['first_date'],
+                stock_data['last_date'], close, volume
+            )
             
         except Exception as e:
             self.log_error("Errore nell'analisi", e)
             raise
     
+    def analyze_frame(self, symbol: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """Analisi di base direttamente dalle colonne date/close/volume della cache"""
+        if df.empty:
+            raise ValueError(f"Nessun dato da analizzare per {symbol}")
+        
+        return self.analyze_arrays(
+            symbol,
+            df['date'].iloc[0].strftime('%Y-%m-%d'),
+            df['date'].iloc[-1].strftime('%Y-%m-%d'),
+            df['close'].to_numpy(dtype=np.float64),
+            df['volume'].to_numpy(dtype=np.float64)
+        )
+    
+    def analyze_arrays(self, symbol: str, first_date: str, last_date: str,
+                       close: np.ndarray, volume: np.ndarray) -> Dict[str, Any]:
+        """
+        Kernel NumPy dell'analisi di base su array float64 contigui
+        Rendimenti calcolati una sola volta e riusati per statistiche e volatilità;
+        le medie mobili servono solo nell'ultimo punto, quindi bastano le code
+        dell'array. Valori mancanti (NaN) ignorati come in pandas
+        """
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        volume = np.ascontiguousarray(volume, dtype=np.float64)
+        n = len(close)
+        if n == 0:
+            raise ValueError("Nessun dato da processare")
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = self._finite(close[1:] / close[:-1] - 1.0)
+        prices = self._finite(close)
+        volumes = self._finite(volume)
+        daily_std = self._std(returns)
+        
+        return {
+            'symbol': symbol,
+            'period': {
+                'start': first_date,
+                'end': last_date,
+                'days': n
+            },
+            'price_stats': {
+                'min': self._stat(prices.min, prices),
+                'max': self._stat(prices.max, prices),
+                'mean': self._stat(prices.mean, prices),
+                'std': self._std(prices),
+                'current': float(close[-1])
+            },
+            'volume_stats': {
+                'total': int(volumes.sum()),
+                'daily_avg': int(volumes.mean()) if len(volumes) else 0
+            },
+            'returns': {
+                'daily_avg': self._stat(returns.mean, returns) * 100,
+                'total': float((close[-1] / close[0] - 1.0) * 100),
+                'best_day': self._stat(returns.max, returns) * 100,
+                'worst_day': self._stat(returns.min, returns) * 100
+            },
+            'volatility': {
+                'daily': daily_std * 100,
+                'annualized': daily_std * np.sqrt(self.TRADING_DAYS) * 100
+            },
+            'trends': self._trend_from_tail(close)
+        }
+    
     def prepare_download(self, stock_data: Dict[str, Any], 
                         format_type: str = 'csv') -> Any:
         """Prepara i dati per il download"""
@@ -82,52 +136,129 @@ class DataProcessor(BaseService):
             self.log_error("Errore nella preparazione download", e)
             raise
     
-    def _calculate_returns(self, df: pd.DataFrame) -> Dict[str, float]:
-        """Calcola i rendimenti"""
-        df['daily_return'] = df['close'].pct_change()
+    def analyze_panel(self, close: pd.DataFrame,
+                      volume: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """
+        Analisi di base di tutti i simboli di una matrice data x simbolo
+        Stesse metriche di analyze_arrays calcolate in blocco lungo l'asse delle
+        date. I buchi dovuti all'allineamento (simbolo senza quotazione in una
+        data) vengono compattati in testa alla colonna: in fondo resta la serie
+        del simbolo nell'ordine originale, come se fosse analizzata da sola
         
-        return {
-            'daily_avg': float(df['daily_return'].mean() * 100),
-            'total': float(((df['close'].iloc[-1] / df['close'].iloc[0]) - 1) * 100),
-            'best_day': float(df['daily_return'].max() * 100),
-            'worst_day': float(df['daily_return'].min() * 100)
-        }
-    
-    def _calculate_volatility(self, df: pd.DataFrame) -> Dict[str, float]:
-        """Calcola la volatilità"""
-        daily_returns = df['close'].pct_change()
+        Returns:
+            {'columns': PANEL_COLUMNS, 'rows': [[...] per simbolo], 'count'}
+        """
+        symbols = [str(symbol) for symbol in close.columns]
+        values = close.to_numpy(dtype=np.float64)
+        n, m = values.shape
         
-        return {
-            'daily': float(daily_returns.std() * 100),
-            'annualized': float(daily_returns.std() * np.sqrt(252) * 100)
-        }
-    
-    def _identify_trends(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Identifica trend di base"""
-        # Media mobile semplice
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        df['sma_50'] = df['close'].rolling(window=50).mean()
+        if not m:
+            # Nessun simbolo in cache: le riduzioni su matrice vuota non sono definite
+            return {'columns': list(self.PANEL_COLUMNS), 'rows': [], 'count': 0}
         
-        current_price = df['close'].iloc[-1]
+        valid = np.isfinite(values)
+        counts = valid.sum(axis=0)
+        order = np.argsort(valid, axis=0, kind='stable')
+        packed = np.take_along_axis(values, order, axis=0)
+        packed_dates = close.index.to_numpy()[order]
+        columns = np.arange(m)
+        first_row = np.minimum(n - counts, n - 1)
         
-        trend = {
-            'short_term': 'N/A',
-            'medium_term': 'N/A'
-        }
+        if volume is not None:
+            volumes = volume.reindex(index=close.index, columns=close.columns).to_numpy(dtype=np.float64)
+        else:
+            volumes = np.full((n, m), np.nan)
         
-        # Trend breve termine
-        if len(df) >= 20 and not pd.isna(df['sma_20'].iloc[-1]):
-            if current_price > df['sma_20'].iloc[-1]:
-                trend['short_term'] = 'Rialzista'
-            else:
-                trend['short_term'] = 'Ribassista'
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            # Colonne con uno o zero valori: statistiche NaN senza avvisi
+            warnings.simplefilter('ignore', RuntimeWarning)
+            
+            returns = packed[1:] / packed[:-1] - 1.0
+            returns[~np.isfinite(returns)] = np.nan
+            daily_std = np.nanstd(returns, axis=0, ddof=1)
+            current = packed[-1] if n else np.full(m, np.nan)
+            
+            metrics = {
+                'start': packed_dates[first_row, columns] if n else [None] * m,
+                'end': packed_dates[-1] if n else [None] * m,
+                'days': counts,
+                'min': np.nanmin(values, axis=0),
+                'max': np.nanmax(values, axis=0),
+                'mean': np.nanmean(values, axis=0),
+                'std': np.nanstd(values, axis=0, ddof=1),
+                'current': current,
+                'volume_total': np.nansum(volumes, axis=0),
+                'volume_avg': np.nanmean(volumes, axis=0),
+                'return_avg': np.nanmean(returns, axis=0) * 100,
+                'return_total': (current / packed[first_row, columns] - 1.0) * 100,
+                'best_day': np.nanmax(returns, axis=0) * 100,
+                'worst_day': np.nanmin(returns, axis=0) * 100,
+                'volatility_daily': daily_std * 100,
+                'volatility_annualized': daily_std * np.sqrt(self.TRADING_DAYS) * 100
+            }
+            
+            for name, window in self.TREND_WINDOWS.items():
+                sma = packed[-window:].mean(axis=0) if n >= window else np.full(m, np.nan)
+                metrics[f'trend_{name}'] = np.where(
+                    counts < window, 'N/A',
+                    np.where(current > sma, 'Rialzista', 'Ribassista')
+                )
+        
+        rows = []
+        for j, symbol in enumerate(symbols):
+            row = [symbol]
+            for column in self.PANEL_COLUMNS[1:]:
+                row.append(self._panel_value(column, metrics[column][j]))
+            rows.append(row)
+        
+        return {
+            'columns': list(self.PANEL_COLUMNS),
+            'rows': rows,
+            'count': len(rows)
+        }
+    
+    @staticmethod
+    def _panel_value(column: str, value: Any) -> Any:
+        """Valore JSON-compatibile di una cella della tabella batch"""
+        if column in ('start', 'end'):
+            return pd.Timestamp(value).strftime('%Y-%m-%d') if not pd.isna(value) else None
+        if column.startswith('trend_'):
+            return str(value)
+        if column in ('days', 'volume_total', 'volume_avg'):
+            return int(value) if np.isfinite(value) else None
+        value = float(value)
+        return value if np.isfinite(value) else None
+    
+    @staticmethod
+    def _finite(values: np.ndarray) -> np.ndarray:
+        """Valori finiti dell'array (senza copia se non ci sono NaN)"""
+        mask = np.isfinite(values)
+        return values if mask.all() else values[mask]
+    
+    @staticmethod
+    def _stat(func, values: np.ndarray) -> float:
+        """Riduzione su valori finiti; NaN se l'array è vuoto"""
+        return float(func()) if len(values) else float('nan')
+    
+    @staticmethod
+    def _std(values: np.ndarray) -> float:
+        """Deviazione standard campionaria (ddof=1) come pandas"""
+        return float(values.std(ddof=1)) if len(values) > 1 else float('nan')
+    
+    def _trend_from_tail(self, close: np.ndarray) -> Dict[str, str]:
+        """Trend confrontando l'ultimo prezzo con le medie mobili finali"""
+        trend = {}
+        current_price = close[-1]
         
-        # Trend medio termine
-        if len(df) >= 50 and not pd.isna(df['sma_50'].iloc[-1]):
-            if current_price > df['sma_50'].iloc[-1]:
-                trend['medium_term'] = 'Rialzista'
+        for name, window in self.TREND_WINDOWS.items():
+            # Media mobile solo sull'ultima finestra (NaN nella finestra -> N/A)
+            sma = close[-window:].mean() if len(close) >= window else np.nan
+            if not np.isfinite(sma):
+                trend[name] = 'N/A'
+            elif current_price > sma:
+                trend[name] = 'Rialzista'
             else:
-                trend['medium_term'] = 'Ribassista'
+                trend[name] = 'Ribassista'
         
         return trend
     
@@ -147,32 +278,23 @@ class DataProcessor(BaseService):
         )
     
     def _prepare_excel(self, df: pd.DataFrame, symbol: str) -> Any:
-        """Prepara file Excel per download"""
-        output = BytesIO()
+        """Prepara file Excel per download (worksheet write-only)"""
+        exporter = ExcelExportService()
         
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Dati principali
-            df.to_excel(writer, sheet_name='Dati', index=False)
-            
-            # Aggiungi foglio con statistiche
-            stats_df = pd.DataFrame([
-                ['Simbolo', symbol],
-                ['Record totali', len(df)],
-                ['Data inizio', df['date'].min()],
-                ['Data fine', df['date'].max()],
-                ['Prezzo minimo', df['close'].min()],
-                ['Prezzo massimo', df['close'].max()],
-                ['Prezzo medio', df['close'].mean()]
-            ], columns=['Metrica', 'Valore'])
-            
-            stats_df.to_excel(writer, sheet_name='Statistiche', index=False)
+        # Foglio con statistiche
+        stats_rows = [
+            ('Simbolo', symbol),
+            ('Record totali', len(df)),
+            ('Data inizio', df['date'].min()),
+            ('Data fine', df['date'].max()),
+            ('Prezzo minimo', df['close'].min()),
+            ('Prezzo massimo', df['close'].max()),
+            ('Prezzo medio', df['close'].mean())
+        ]
         
-        output.seek(0)
         filename = f"{symbol}_data_{datetime.now().strftime('%Y%m%d')}.xlsx"
         
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
\ No newline at end of file
+        return exporter.send_workbook([
+            ('Dati', [df]),
+            ('Statistiche', exporter.key_value_sheet(stats_rows, ('Metrica', 'Valore')))
+        ], filename)
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Servizio per il downsampling delle serie prezzo destinate ai grafici
+Principio SOLID: Single Responsibility - riduce il numero di punti, non li formatta
+"""
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+
+
+class DownsamplingService(BaseService):
+    """
+    Riduce una serie a max_points punti con operazioni vettoriali NumPy:
+    - 'minmax': barre OHLC per bucket (open primo, high max, low min, close ultimo)
+    - 'lttb': Largest-Triangle-Three-Buckets, mantiene le barre originali più significative
+    """
+
+    METHODS = ('minmax', 'lttb')
+    MIN_POINTS = 3
+
+    # Regola di aggregazione per bucket delle colonne OHLCV
+    FIRST_FIELDS = ('open', 'adj_open')
+    MAX_FIELDS = ('high', 'adj_high')
+    MIN_FIELDS = ('low', 'adj_low')
+    LAST_FIELDS = ('close', 'adj_close')
+    SUM_FIELDS = ('volume',)
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida max_points e metodo"""
+        max_points = data.get('max_points')
+        if not isinstance(max_points, int) or isinstance(max_points, bool) \
+                or max_points < self.MIN_POINTS:
+            raise ValueError(f"max_points deve essere un intero >= {self.MIN_POINTS}")
+
+        if data.get('method', 'minmax') not in self.METHODS:
+            raise ValueError(
+                f"Metodo downsampling non supportato: {data.get('method')}. "
+                f"Usa uno tra {', '.join(self.METHODS)}"
+            )
+        return True
+
+    def parse_params(self, data: Dict[str, Any]) -> Tuple[Optional[int], str]:
+        """Estrae (max_points, metodo) dai parametri di una richiesta"""
+        method = str(data.get('downsample') or 'minmax').strip().lower()
+        if data.get('max_points') in (None, ''):
+            return None, method
+
+        try:
+            max_points = int(data['max_points'])
+        except (TypeError, ValueError):
+            raise ValueError(f"max_points non valido: {data['max_points']}")
+
+        self.validate_input({'max_points': max_points, 'method': method})
+        return max_points, method
+
+    def downsample(self, df: pd.DataFrame, max_points: int, method: str = 'minmax',
+                   time_column: str = 'date', value_column: str = 'close') -> pd.DataFrame:
+        """
+        Riduce il DataFrame (ordinato per tempo) ad al massimo max_points righe
+        Se le righe sono già entro il limite il DataFrame viene restituito invariato
+        """
+        self.validate_input({'max_points': max_points, 'method': method})
+
+        if len(df) <= max_points:
+            return df
+
+        if method == 'lttb':
+            return self.lttb(df, max_points, time_column, value_column)
+        return self.minmax_ohlc(df, max_points)
+
+    def minmax_ohlc(self, df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+        """Aggrega righe consecutive in max_points barre OHLC (reduceat per colonna)"""
+        n = len(df)
+        starts = np.unique(np.linspace(0, n, max_points, endpoint=False).astype(np.int64))
+        return self.aggregate(df, starts)
+
+    def aggregate(self, df: pd.DataFrame, starts: np.ndarray) -> pd.DataFrame:
+        """
+        Una barra OHLCV per gruppo di righe consecutive (starts: prima riga di
+        ogni gruppo, crescente e con starts[0] == 0)
+        """
+        ends = np.append(starts[1:], len(df)) - 1
+
+        columns = {}
+        for column in df.columns:
+            values = df[column].to_numpy()
+
+            if column in self.MAX_FIELDS:
+                columns[column] = np.fmax.reduceat(values.astype(np.float64), starts)
+            elif column in self.MIN_FIELDS:
+                columns[column] = np.fmin.reduceat(values.astype(np.float64), starts)
+            elif column in self.SUM_FIELDS:
+                columns[column] = np.add.reduceat(values, starts)
+            elif column in self.LAST_FIELDS:
+                columns[column] = values[ends]
+            else:
+                # Apertura, timestamp e colonne descrittive: primo valore del bucket
+                columns[column] = values[starts]
+
+        return pd.DataFrame(columns, columns=df.columns)
+
+    def lttb(self, df: pd.DataFrame, max_points: int,
+             time_column: str = 'date', value_column: str = 'close') -> pd.DataFrame:
+        """Seleziona max_points righe originali con Largest-Triangle-Three-Buckets"""
+        y = df[value_column].to_numpy(dtype=np.float64)
+
+        if time_column in df.columns:
+            times = pd.to_datetime(df[time_column]).to_numpy().astype(np.int64)
+            x = (times - times[0]).astype(np.float64)
+        else:
+            x = np.arange(len(df), dtype=np.float64)
+
+        indices = self.lttb_indices(x, y, max_points)
+        return df.iloc[indices].reset_index(drop=True)
+
+    @staticmethod
+    def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+        """
+        Indici dei punti scelti da LTTB (primo e ultimo sempre inclusi)
+        Medie dei bucket calcolate in blocco con cumsum; resta sequenziale solo la
+        scelta del punto per bucket, che dipende dal punto scelto nel precedente
+        """
+        n = len(y)
+        if max_points >= n or max_points < 3:
+            return np.arange(n)
+
+        y = np.nan_to_num(y, nan=np.nanmean(y) if np.isfinite(y).any() else 0.0)
+
+        # Bucket dei punti interni: [bounds[i], bounds[i + 1])
+        bounds = (np.arange(max_points - 1) * (n - 2) / (max_points - 2)).astype(np.int64) + 1
+        bounds[-1] = n - 1
+
+        # Media del bucket successivo per ogni bucket (l'ultimo usa il punto finale)
+        cum_x = np.concatenate(([0.0], np.cumsum(x)))
+        cum_y = np.concatenate(([0.0], np.cumsum(y)))
+        next_start = np.append(bounds[1:-1], n - 1)
+        next_end = np.append(bounds[2:], n)
+        counts = next_end - next_start
+        avg_x = (cum_x[next_end] - cum_x[next_start]) / counts
+        avg_y = (cum_y[next_end] - cum_y[next_start]) / counts
+
+        selected = np.empty(max_points, dtype=np.int64)
+        selected[0] = 0
+        selected[-1] = n - 1
+
+        a = 0
+        for i in range(max_points - 2):
+            start, end = bounds[i], bounds[i + 1]
+            xs = x[start:end]
+            ys = y[start:end]
+            area = np.abs(
+                (x[a] - avg_x[i]) * (ys - y[a]) - (x[a] - xs) * (avg_y[i] - y[a])
+            )
+            a = start + int(np.argmax(area))
+            selected[i + 1] = a
+
+        return selected
@@ -0,0 +1,143 @@
+"""
+Servizio per l'export Excel in streaming (worksheet write-only di openpyxl)
+Principio SOLID: Single Responsibility - gestisce solo la scrittura dei workbook
+"""
+import re
+import tempfile
+from typing import Any, Dict, IO, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from flask import send_file
+from openpyxl import Workbook
+
+from core.backend.base.base_service import BaseService
+
+
+# Un foglio: (nome, batch di righe come DataFrame)
+SheetSpec = Tuple[str, Iterable[pd.DataFrame]]
+
+
+class ExcelExportService(BaseService):
+    """
+    Scrive workbook Excel riga per riga senza costruire il grafo di oggetti in RAM
+    I worksheet write-only vengono serializzati su file temporanei man mano
+    """
+
+    MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    MAX_SHEET_ROWS = 1048576  # Limite righe di un foglio Excel
+    MAX_SHEET_NAME = 31
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida i parametri di input"""
+        if 'sheets' not in data or not data['sheets']:
+            raise ValueError("Nessun foglio da esportare")
+        return True
+
+    def build_workbook(self, sheets: List[SheetSpec]) -> IO[bytes]:
+        """
+        Crea il workbook in modalità write-only
+
+        Args:
+            sheets: Lista di (nome foglio, iterabile di DataFrame); i batch vengono
+                consumati in ordine e non sono mai tenuti tutti in memoria
+
+        Returns:
+            File temporaneo (rimosso alla chiusura) posizionato all'inizio
+        """
+        try:
+            self.validate_input({'sheets': sheets})
+
+            workbook = Workbook(write_only=True)
+            used_names = set()
+
+            for name, batches in sheets:
+                rows = self._write_sheet(workbook, name, batches, used_names)
+                self.log_info(f"Foglio '{name}': {rows} righe")
+
+            output = tempfile.TemporaryFile()
+            workbook.save(output)
+            output.seek(0)
+            return output
+
+        except Exception as e:
+            self.log_error("Errore creazione workbook Excel", e)
+            raise
+
+    def send_workbook(self, sheets: List[SheetSpec], filename: str) -> Any:
+        """Crea il workbook e restituisce la risposta Flask di download"""
+        output = self.build_workbook(sheets)
+        return send_file(
+            output,
+            mimetype=self.MIMETYPE,
+            as_attachment=True,
+            download_name=filename
+        )
+
+    @staticmethod
+    def key_value_sheet(rows: List[Tuple[str, Any]],
+                        columns: Tuple[str, str] = ('Metric', 'Value')) -> List[pd.DataFrame]:
+        """Foglio a due colonne (es. Info / Statistiche)"""
+        return [pd.DataFrame(rows, columns=list(columns))]
+
+    def _write_sheet(self, workbook: Workbook, name: str,
+                     batches: Iterable[pd.DataFrame], used_names: set) -> int:
+        """Scrive i batch in un foglio, continuando su nuovi fogli oltre il limite righe"""
+        worksheet = None
+        columns: Optional[List[str]] = None
+        sheet_rows = 0
+        total_rows = 0
+        part = 1
+
+        for batch in batches:
+            if batch.empty:
+                continue
+
+            if columns is None:
+                columns = list(batch.columns)
+            else:
+                batch = batch.reindex(columns=columns)
+
+            for row in self._iter_rows(batch):
+                if worksheet is None or sheet_rows >= self.MAX_SHEET_ROWS:
+                    title = name if part == 1 else f"{name} ({part})"
+                    worksheet = workbook.create_sheet(self._sheet_title(title, used_names))
+                    worksheet.append(columns)
+                    sheet_rows = 1
+                    part += 1
+
+                worksheet.append(row)
+                sheet_rows += 1
+                total_rows += 1
+
+        if worksheet is None:
+            # Foglio vuoto: mantieni comunque il foglio nel workbook
+            workbook.create_sheet(self._sheet_title(name, used_names))
+
+        return total_rows
+
+    @staticmethod
+    def _iter_rows(batch: pd.DataFrame) -> Iterable[tuple]:
+        """Righe del batch con valori scrivibili da openpyxl (NaN -> cella vuota)"""
+        if batch.isna().values.any():
+            batch = batch.astype(object).where(batch.notna(), None)
+
+        for row in batch.itertuples(index=False, name=None):
+            yield tuple(
+                value.item() if isinstance(value, np.generic) else value
+                for value in row
+            )
+
+    def _sheet_title(self, name: str, used_names: set) -> str:
+        """Nome foglio valido per Excel e univoco nel workbook"""
+        title = re.sub(r'[\[\]\:\*\?\/\\]', '_', str(name))[:self.MAX_SHEET_NAME] or 'Sheet'
+
+        candidate = title
+        counter = 2
+        while candidate.lower() in used_names:
+            suffix = f" ({counter})"
+            candidate = title[:self.MAX_SHEET_NAME - len(suffix)] + suffix
+            counter += 1
+
+        used_names.add(candidate.lower())
+        return candidate
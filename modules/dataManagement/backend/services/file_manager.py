@@ -4,21 +4,39 @@ Principio SOLID: Single Responsibility - gestisce solo file system
 """
 import os
 import csv
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Any, Tuple
 from datetime import datetime
 import json
 
 from core.backend.base.base_service import BaseService
+from core.backend.config.settings import (
+    BATCH_MAX_WORKERS, PAGE_INDEX_STRIDE, STREAM_BATCH_SIZE
+)
+from .adjusted_data import AdjustedDataService
 
 
 class FileManagerService(BaseService):
     """Gestisce il salvataggio e recupero dei dati dal file system"""
     
+    # Listener di scrittura condivisi tra tutte le istanze:
+    # callback(symbol, data_type, frame) con frame None in caso di cancellazione
+    _write_listeners: List[Callable[[str, Optional[str], Optional[pd.DataFrame]], None]] = []
+    
+    # Tipi adjusted derivati in lettura: barre grezze del tipo sorgente moltiplicate
+    # per la serie dei fattori di rettifica (nessuna copia del file prezzi)
+    ADJUSTED_SOURCES = {'dailyAdjusted': 'daily'}
+    
+    # Tipi scaricati; i tipi di periodo (weekly, monthly, ...) si aggiungono da TIMEFRAMES
+    BASE_DATA_TYPES = ('daily', 'dailyAdjusted', 'minute')
+    
     def __init__(self):
         super().__init__()
         self.base_path = Path("resources/data/price")
+        self.adjuster = AdjustedDataService()
         self._ensure_directories()
     
     def validate_input(self, data: Dict[str, Any]) -> bool:
@@ -28,11 +46,42 @@ class FileManagerService(BaseService):
             if field not in data:
                 raise ValueError(f"Campo richiesto mancante: {field}")
         
-        if data['data_type'] not in ['daily', 'dailyAdjusted', 'minute']:
+        if data['data_type'] not in self.data_types():
             raise ValueError(f"Tipo dati non valido: {data['data_type']}")
         
         return True
     
+    @classmethod
+    def data_types(cls) -> List[str]:
+        """Tutti i tipi dati della cache: scaricati e barre di periodo derivate"""
+        # Import locale: timeframes dipende da questo modulo
+        from .timeframes import SOURCE_TYPES, TIMEFRAMES, TimeframeService
+        return list(cls.BASE_DATA_TYPES) + [
+            TimeframeService.get_data_type(interval, source_type)
+            for interval in TIMEFRAMES for source_type in SOURCE_TYPES
+        ]
+    
+    @classmethod
+    def add_write_listener(cls, callback: Callable[[str, Optional[str], Optional[pd.DataFrame]], None]) -> None:
+        """Registra una callback invocata dopo ogni scrittura o cancellazione dei dati"""
+        if callback not in cls._write_listeners:
+            cls._write_listeners.append(callback)
+    
+    @classmethod
+    def remove_write_listener(cls, callback: Callable) -> None:
+        """Rimuove una callback registrata"""
+        if callback in cls._write_listeners:
+            cls._write_listeners.remove(callback)
+    
+    def _notify_write(self, symbol: str, data_type: Optional[str],
+                      frame: Optional[pd.DataFrame]) -> None:
+        """Notifica i listener; un errore in un listener non blocca la scrittura"""
+        for callback in list(self._write_listeners):
+            try:
+                callback(symbol, data_type, frame)
+            except Exception as e:
+                self.log_error(f"Errore listener scrittura {symbol}/{data_type}", e)
+    
     def _ensure_directories(self):
         """Crea le directory necessarie se non esistono"""
         self.base_path.mkdir(parents=True, exist_ok=True)
@@ -42,15 +91,50 @@ class FileManagerService(BaseService):
         return self.base_path / symbol / data_type
     
     def get_data_file(self, symbol: str, data_type: str) -> Path:
-        """Restituisce il path del file CSV"""
+        """Restituisce il path del file CSV (per un tipo derivato, quello delle barre grezze)"""
+        data_type = self._storage_type(symbol, data_type)
         data_path = self.get_data_path(symbol, data_type)
         return data_path / f"{symbol}_{data_type}.csv"
     
+    def get_factor_file(self, symbol: str, data_type: str = 'dailyAdjusted') -> Path:
+        """Restituisce il path degli eventi di rettifica, accanto alle barre grezze"""
+        source_type = self.ADJUSTED_SOURCES[data_type]
+        return self.get_data_path(symbol, source_type) / f"{symbol}_{source_type}.factors.csv"
+    
+    def is_derived(self, symbol: str, data_type: str) -> bool:
+        """True se il tipo dati è calcolato in lettura da barre grezze + fattori"""
+        return data_type in self.ADJUSTED_SOURCES and self.get_factor_file(symbol, data_type).exists()
+    
+    def _storage_type(self, symbol: str, data_type: str) -> str:
+        """Tipo dati del file fisico che contiene le barre"""
+        return self.ADJUSTED_SOURCES[data_type] if self.is_derived(symbol, data_type) else data_type
+    
     def get_metadata_file(self, symbol: str, data_type: str) -> Path:
         """Restituisce il path del file metadata"""
         data_path = self.get_data_path(symbol, data_type)
         return data_path / "metadata.json"
     
+    def get_index_file(self, symbol: str, data_type: str) -> Path:
+        """Restituisce il path dell'indice sparso (timestamp -> offset in byte)"""
+        data_type = self._storage_type(symbol, data_type)
+        data_path = self.get_data_path(symbol, data_type)
+        return data_path / f"{symbol}_{data_type}.index.npz"
+    
+    def get_indicator_file(self, symbol: str, data_type: str) -> Path:
+        """Restituisce il path delle serie indicatori calcolate sul file prezzi"""
+        data_path = self.get_data_path(symbol, data_type)
+        return data_path / f"{symbol}_{data_type}.indicators.npz"
+    
+    def get_snapshot_file(self, symbol: str, data_type: str) -> Path:
+        """Restituisce il path dell'ultima barra con gli indicatori (snapshot per lo screener)"""
+        data_path = self.get_data_path(symbol, data_type)
+        return data_path / f"{symbol}_{data_type}.snapshot.json"
+    
+    @staticmethod
+    def get_key_column(data_type: str) -> str:
+        """Colonna timestamp univoca e ordinata del file"""
+        return 'datetime' if data_type == 'minute' else 'date'
+    
     def save_data(self, symbol: str, data_type: str, 
                   records: List[Dict], metadata: Optional[Dict] = None) -> bool:
         """Salva i dati su file CSV"""
@@ -59,16 +143,22 @@ class FileManagerService(BaseService):
             data_path = self.get_data_path(symbol, data_type)
             data_path.mkdir(parents=True, exist_ok=True)
             
+            # Un file adjusted scritto esplicitamente sostituisce la versione derivata
+            if self.is_derived(symbol, data_type):
+                self.get_factor_file(symbol, data_type).unlink()
+            
             # Path del file
             file_path = self.get_data_file(symbol, data_type)
             
             # Converti in DataFrame per gestione più semplice
             df = pd.DataFrame(records)
             df['date'] = pd.to_datetime(df['date'])
-            df.sort_values('date', inplace=True)
+            # Ordinamento stabile sulla colonna timestamp: l'indice sparso lo presuppone
+            df.sort_values(self._sort_column(df, data_type), inplace=True, kind='stable')
             
             # Salva CSV
             df.to_csv(file_path, index=False, date_format='%Y-%m-%d')
+            self.build_index(symbol, data_type)
             
             # Salva metadata
             if metadata:
@@ -80,14 +170,17 @@ class FileManagerService(BaseService):
                     json.dump(metadata, f, indent=2)
             
             self.log_info(f"Salvati {len(records)} record per {symbol}/{data_type}")
+            self._notify_write(symbol, data_type, df)
+            self._notify_derived(symbol, data_type, df)
             return True
             
         except Exception as e:
             self.log_error(f"Errore salvataggio dati {symbol}/{data_type}", e)
             raise
     
-    def load_data(self, symbol: str, data_type: str) -> Optional[pd.DataFrame]:
-        """Carica i dati da file CSV"""
+    def load_data(self, symbol: str, data_type: str,
+                  columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Carica i dati da file CSV (opzionalmente solo alcune colonne)"""
         try:
             file_path = self.get_data_file(symbol, data_type)
             
@@ -96,9 +189,15 @@ class FileManagerService(BaseService):
                 return None
             
             # Carica CSV
-            df = pd.read_csv(file_path)
+            derived = self.is_derived(symbol, data_type)
+            df = pd.read_csv(file_path, usecols=self._source_columns(columns) if derived else columns)
             df['date'] = pd.to_datetime(df['date'])
             
+            if derived:
+                df = self.adjuster.apply_factors(df, self.load_factors(symbol, data_type))
+                if columns is not None:
+                    df = df[[column for column in df.columns if column in columns]]
+            
             self.log_info(f"Caricati {len(df)} record da {file_path}")
             return df
             
@@ -106,6 +205,278 @@ class FileManagerService(BaseService):
             self.log_error(f"Errore caricamento dati {symbol}/{data_type}", e)
             return None
     
+    def load_range(self, symbol: str, data_type: str,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None,
+                   columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Carica i dati filtrati per periodo (estremi inclusi) con indice riallineato"""
+        if columns is not None and 'date' not in columns:
+            columns = ['date'] + list(columns)
+
+        df = self.load_data(symbol, data_type, columns=columns)
+        if df is None:
+            return None
+
+        mask = pd.Series(True, index=df.index)
+        if start_date:
+            mask &= df['date'] >= pd.to_datetime(start_date)
+        if end_date:
+            mask &= df['date'] <= pd.to_datetime(end_date)
+        return df[mask].reset_index(drop=True)
+
+    def load_panel(self, symbols: List[str], data_type: str,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None,
+                   fields: Tuple[str, ...] = ('close',),
+                   max_workers: int = BATCH_MAX_WORKERS) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+        """
+        Carica più simboli in parallelo e li allinea in matrici data x simbolo
+        Il parsing CSV di pandas rilascia il GIL: i thread si sovrappongono sull'I/O
+        
+        Returns:
+            ({campo: DataFrame indicizzato per data con una colonna per simbolo},
+             simboli senza dati in cache)
+        """
+        def load(symbol):
+            df = self.load_range(symbol, data_type, start_date, end_date, columns=list(fields))
+            return symbol, df
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols) or 1))) as pool:
+            loaded = list(pool.map(load, symbols))
+        
+        frames = {symbol: df.set_index('date') for symbol, df in loaded
+                  if df is not None and not df.empty}
+        missing = [symbol for symbol, _ in loaded if symbol not in frames]
+        
+        panels = {}
+        for field in fields:
+            if frames:
+                panel = pd.concat(
+                    [df[field].rename(symbol) for symbol, df in frames.items()], axis=1
+                ).sort_index()
+            else:
+                panel = pd.DataFrame(index=pd.DatetimeIndex([], name='date'))
+            panels[field] = panel
+        return panels, missing
+    
+    def iter_batches(self, symbol: str, data_type: str,
+                     start_date: Optional[str] = None, end_date: Optional[str] = None,
+                     batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Legge i dati dal file CSV in batch di al massimo batch_size righe
+        Memoria costante indipendentemente dalla dimensione del file;
+        la lettura si interrompe appena si supera end_date (file ordinato per data)
+        """
+        file_path = self.get_data_file(symbol, data_type)
+        
+        if not file_path.exists():
+            self.log_info(f"File non trovato: {file_path}")
+            return
+        
+        start = pd.to_datetime(start_date) if start_date else None
+        end = pd.to_datetime(end_date) if end_date else None
+        events = self.load_factors(symbol, data_type) if self.is_derived(symbol, data_type) else None
+        
+        with pd.read_csv(file_path, chunksize=batch_size) as reader:
+            for chunk in reader:
+                chunk['date'] = pd.to_datetime(chunk['date'])
+                
+                mask = pd.Series(True, index=chunk.index)
+                if start is not None:
+                    mask &= chunk['date'] >= start
+                if end is not None:
+                    mask &= chunk['date'] <= end
+                
+                if mask.any():
+                    yield chunk[mask] if events is None else \
+                        self.adjuster.apply_factors(chunk[mask], events)
+                
+                if end is not None and chunk['date'].iloc[-1] > end:
+                    break
+    
+    def _sort_column(self, df: pd.DataFrame, data_type: str) -> str:
+        """Colonna timestamp presente nel DataFrame (i minuti ripiegano su 'date')"""
+        key_column = self.get_key_column(data_type)
+        return key_column if key_column in df.columns else 'date'
+    
+    def build_index(self, symbol: str, data_type: str,
+                    stride: int = PAGE_INDEX_STRIDE) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Crea l'indice sparso del file: timestamp e offset in byte di una riga ogni
+        stride. Permette di posizionarsi nel CSV senza leggerlo dall'inizio
+        """
+        file_path = self.get_data_file(symbol, data_type)
+        if not file_path.exists():
+            return None
+        
+        stat = file_path.stat()
+        raw = np.frombuffer(file_path.read_bytes(), dtype=np.uint8)
+        newlines = np.flatnonzero(raw == ord('\n'))
+        # Inizio di ogni riga dati: dopo l'header e dopo ogni newline tranne l'ultimo
+        row_starts = newlines + 1
+        if len(raw) and raw[-1] == ord('\n'):
+            row_starts = row_starts[:-1]
+        
+        key_column = self.get_key_column(data_type)
+        keys = pd.to_datetime(
+            pd.read_csv(file_path, usecols=[key_column])[key_column]
+        ).to_numpy().astype('datetime64[ns]').astype(np.int64)
+        
+        index = {
+            'keys': keys[::stride],
+            'offsets': row_starts[:len(keys)][::stride].astype(np.int64),
+            'stride': np.int64(stride),
+            'file_size': np.int64(stat.st_size),
+            'file_mtime': np.int64(stat.st_mtime_ns)
+        }
+        with open(self.get_index_file(symbol, data_type), 'wb') as f:
+            np.savez(f, **index)
+        return index
+    
+    def load_index(self, symbol: str, data_type: str) -> Optional[Dict[str, np.ndarray]]:
+        """Carica l'indice sparso, ricostruendolo se assente o non allineato al file"""
+        file_path = self.get_data_file(symbol, data_type)
+        index_path = self.get_index_file(symbol, data_type)
+        if not file_path.exists():
+            return None
+        
+        if index_path.exists():
+            stat = file_path.stat()
+            with np.load(index_path) as stored:
+                index = {key: stored[key] for key in stored.files}
+            if (int(index['file_size']) == stat.st_size
+                    and int(index['file_mtime']) == stat.st_mtime_ns):
+                return index
+        
+        self.log_info(f"Ricostruzione indice {symbol}/{data_type}")
+        return self.build_index(symbol, data_type)
+    
+    def read_page(self, symbol: str, data_type: str,
+                  start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  after: Optional[int] = None, limit: Optional[int] = 1000) -> Tuple[Optional[pd.DataFrame], bool]:
+        """
+        Legge una pagina di al massimo limit righe successive al timestamp 'after' (ns)
+        Posizionamento con ricerca binaria nell'indice e seek nel file:
+        costo O(stride + limit) indipendentemente dalla posizione nello storico
+        Con limit None legge tutte le righe fino alla fine (coda del file)
+        
+        Returns:
+            (pagina, ci sono altre righe nel periodo); (None, False) se non ci sono dati
+        """
+        index = self.load_index(symbol, data_type)
+        if index is None or not len(index['offsets']):
+            return None, False
+        
+        key_column = self.get_key_column(data_type)
+        start = pd.to_datetime(start_date) if start_date else None
+        end = pd.to_datetime(end_date) if end_date else None
+        
+        # Primo timestamp utile: dopo il cursore e non prima dell'inizio periodo
+        seek_key = after + 1 if after is not None else None
+        if start is not None:
+            start_ns = start.value
+            seek_key = start_ns if seek_key is None else max(seek_key, start_ns)
+        
+        block = 0
+        if seek_key is not None:
+            block = max(int(np.searchsorted(index['keys'], seek_key, side='right')) - 1, 0)
+        
+        file_path = self.get_data_file(symbol, data_type)
+        
+        # Il blocco contiene al più stride righe precedenti a seek_key
+        with open(file_path, 'rb') as f:
+            columns = f.readline().decode('utf-8').strip().split(',')
+            f.seek(int(index['offsets'][block]))
+            chunk = pd.read_csv(f, header=None, names=columns,
+                                nrows=int(index['stride']) + limit + 1 if limit else None)
+        
+        chunk['date'] = pd.to_datetime(chunk['date'])
+        keys = pd.to_datetime(chunk[key_column]).to_numpy().astype('datetime64[ns]').astype(np.int64)
+        
+        mask = np.ones(len(chunk), dtype=bool)
+        if seek_key is not None:
+            mask &= keys >= seek_key
+        if end is not None:
+            mask &= (chunk['date'] <= end).to_numpy()
+        
+        selected = self._derive(symbol, data_type, chunk[mask])
+        if limit is None:
+            return selected.reset_index(drop=True), False
+        page = selected.head(limit).reset_index(drop=True)
+        return page, len(selected) > limit
+    
+    def read_tail(self, symbol: str, data_type: str, rows: int) -> Optional[pd.DataFrame]:
+        """
+        Ultime 'rows' righe del file con un seek sull'indice sparso
+        (legge al più rows + stride righe, non l'intero storico)
+        """
+        index = self.load_index(symbol, data_type)
+        if index is None or not len(index['offsets']):
+            return None
+        
+        # Ultimo blocco dell'indice che lascia almeno 'rows' righe fino alla fine
+        blocks_back = -(-rows // int(index['stride']))
+        block = max(len(index['offsets']) - 1 - blocks_back, 0)
+        
+        with open(self.get_data_file(symbol, data_type), 'rb') as f:
+            columns = f.readline().decode('utf-8').strip().split(',')
+            f.seek(int(index['offsets'][block]))
+            tail = pd.read_csv(f, header=None, names=columns)
+        
+        tail['date'] = pd.to_datetime(tail['date'])
+        return self._derive(symbol, data_type, tail.tail(rows).reset_index(drop=True))
+    
+    def get_date_range(self, symbol: str, data_type: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Restituisce (prima data, ultima data) dei dati salvati
+        File giornalieri: prima chiave dell'indice sparso e ultima riga del file,
+        senza leggere lo storico; altrimenti legge solo la colonna date
+        """
+        if data_type != 'minute':
+            index = self.load_index(symbol, data_type)
+            if index is not None and len(index['keys']):
+                last = self._read_last_key(symbol, data_type)
+                if last is not None:
+                    return pd.Timestamp(int(index['keys'][0])), last
+
+        df = self.load_data(symbol, data_type, columns=['date'])
+        if df is None or df.empty:
+            return None
+        return df['date'].min(), df['date'].max()
+    
+    def _read_last_key(self, symbol: str, data_type: str,
+                       block: int = 4096) -> Optional[pd.Timestamp]:
+        """Timestamp dell'ultima riga leggendo solo gli ultimi byte del file"""
+        file_path = self.get_data_file(symbol, data_type)
+        with open(file_path, 'rb') as f:
+            header = f.readline().decode('utf-8').strip().split(',')
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - block, 0))
+            lines = f.read().splitlines()
+
+        key_column = self.get_key_column(data_type)
+        if key_column not in header or len(lines) < 2 or not lines[-1].strip():
+            return None
+        try:
+            return pd.Timestamp(lines[-1].decode('utf-8').split(',')[header.index(key_column)])
+        except ValueError:
+            return None
+
+    def get_data_version(self, symbol: str, data_type: str) -> Optional[Tuple[str, float]]:
+        """
+        Versione dei dati salvati (mtime/dimensione del file) senza leggerli
+        Restituisce (versione, timestamp ultima modifica) o None se assenti
+        """
+        file_path = self.get_data_file(symbol, data_type)
+        try:
+            stat = file_path.stat()
+            if not self.is_derived(symbol, data_type):
+                return f"{stat.st_mtime_ns:x}-{stat.st_size:x}", stat.st_mtime
+            # Tipo derivato: cambia con le barre grezze o con i fattori
+            factors = self.get_factor_file(symbol, data_type).stat()
+        except FileNotFoundError:
+            return None
+        return (f"{stat.st_mtime_ns:x}-{stat.st_size:x}-{factors.st_mtime_ns:x}-{factors.st_size:x}",
+                max(stat.st_mtime, factors.st_mtime))
+    
     def load_metadata(self, symbol: str, data_type: str) -> Optional[Dict]:
         """Carica metadata del file"""
         try:
@@ -149,8 +520,9 @@ class FileManagerService(BaseService):
             if existing_df is not None:
                 # Combina con esistenti, rimuovendo duplicati
                 combined_df = pd.concat([existing_df, new_df])
-                combined_df.drop_duplicates(subset=['date'], keep='last', inplace=True)
-                combined_df.sort_values('date', inplace=True)
+                key_column = self._sort_column(combined_df, data_type)
+                combined_df.drop_duplicates(subset=[key_column], keep='last', inplace=True)
+                combined_df.sort_values(key_column, inplace=True, kind='stable')
                 
                 new_count = len(combined_df) - len(existing_df)
             else:
@@ -171,15 +543,15 @@ class FileManagerService(BaseService):
     def clear_data(self, symbol: str, data_type: Optional[str] = None) -> bool:
         """Cancella i dati salvati per un simbolo"""
         try:
+            cleared = [data_type]
             if data_type:
-                # Cancella solo un tipo specifico
-                file_path = self.get_data_file(symbol, data_type)
-                metadata_path = self.get_metadata_file(symbol, data_type)
-                
-                if file_path.exists():
-                    file_path.unlink()
-                if metadata_path.exists():
-                    metadata_path.unlink()
+                # Cancella solo un tipo specifico (e i tipi derivati dalle sue barre)
+                cleared = [derived for derived, source in self.ADJUSTED_SOURCES.items()
+                           if source == data_type and self.is_derived(symbol, derived)] + cleared
+                for cleared_type in cleared:
+                    for path in self._data_files(symbol, cleared_type):
+                        if path.exists():
+                            path.unlink()
             else:
                 # Cancella tutti i dati del simbolo
                 symbol_path = self.base_path / symbol
@@ -188,12 +560,131 @@ class FileManagerService(BaseService):
                     shutil.rmtree(symbol_path)
             
             self.log_info(f"Dati cancellati per {symbol}/{data_type or 'all'}")
+            for cleared_type in cleared:
+                self._notify_write(symbol, cleared_type, None)
             return True
             
         except Exception as e:
             self.log_error(f"Errore cancellazione dati {symbol}", e)
             return False
     
+    def _data_files(self, symbol: str, data_type: str) -> List[Path]:
+        """File propri di un tipo dati (un tipo derivato non possiede le barre né l'indice)"""
+        files = [self.get_metadata_file(symbol, data_type),
+                 self.get_indicator_file(symbol, data_type),
+                 self.get_snapshot_file(symbol, data_type)]
+        if self.is_derived(symbol, data_type):
+            return [self.get_factor_file(symbol, data_type)] + files
+        files += [self.get_data_file(symbol, data_type), self.get_index_file(symbol, data_type)]
+        if data_type in self.ADJUSTED_SOURCES.values():
+            files += [self.get_data_path(symbol, data_type) / f"{symbol}_{data_type}.factors.csv"]
+        return files
+    
+    def load_factors(self, symbol: str, data_type: str = 'dailyAdjusted') -> Optional[pd.DataFrame]:
+        """Eventi di rettifica ['date', 'multiplier'] o None se il tipo non è derivato"""
+        factor_path = self.get_factor_file(symbol, data_type)
+        if not factor_path.exists():
+            return None
+        # File con la sola intestazione (nessun evento): multiplier resta float64
+        events = pd.read_csv(factor_path, dtype={'multiplier': np.float64})
+        events['date'] = pd.to_datetime(events['date'])
+        return events
+    
+    def get_factors_version(self, symbol: str, data_type: str) -> Optional[str]:
+        """Versione (mtime/dimensione) del file dei fattori; None se il tipo non è derivato"""
+        if not self.is_derived(symbol, data_type):
+            return None
+        try:
+            stat = self.get_factor_file(symbol, data_type).stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    
+    def save_factors(self, symbol: str, events: pd.DataFrame,
+                     span: Optional[Tuple[Any, Any]] = None,
+                     data_type: str = 'dailyAdjusted', notify: bool = True) -> bool:
+        """
+        Salva gli eventi di rettifica calcolati su un download
+        
+        Args:
+            events: DataFrame ['date', 'multiplier'] (vedi AdjustedDataService.factor_events)
+            span: (prima, ultima data) del download: sostituisce solo gli eventi
+                successivi alla prima data e fino all'ultima (None: tutta la serie)
+            notify: False se le barre grezze vengono scritte subito dopo (una sola
+                notifica, con i fattori già aggiornati)
+        
+        Returns:
+            True se la serie è cambiata (i listener del tipo derivato ricevono le barre adjusted)
+        """
+        existing = self.load_factors(symbol, data_type)
+        merged = events[['date', 'multiplier']].astype({'multiplier': np.float64})
+        merged['date'] = pd.to_datetime(merged['date'])
+        
+        if existing is not None and span is not None:
+            first, last = pd.to_datetime(span[0]), pd.to_datetime(span[1])
+            kept = existing[(existing['date'] <= first) | (existing['date'] > last)]
+            if len(kept) and len(merged):
+                merged = pd.concat([kept, merged]).sort_values('date', kind='stable')
+                merged = merged.drop_duplicates('date', keep='last').reset_index(drop=True)
+            elif len(kept):
+                merged = kept.reset_index(drop=True)
+        
+        if existing is not None and existing.empty and merged.empty:
+            return False
+        if existing is not None and len(existing) == len(merged) \
+                and (existing['date'].to_numpy() == merged['date'].to_numpy()).all() \
+                and np.allclose(existing['multiplier'], merged['multiplier'],
+                                rtol=self.adjuster.FACTOR_TOLERANCE, atol=0):
+            return False
+        
+        factor_path = self.get_factor_file(symbol, data_type)
+        factor_path.parent.mkdir(parents=True, exist_ok=True)
+        merged.to_csv(factor_path, index=False, date_format='%Y-%m-%d')
+        self.log_info(f"Salvati {len(merged)} eventi di rettifica per {symbol}/{data_type}")
+        
+        # Migrazione: la copia completa adjusted non serve più; la directory del
+        # tipo derivato resta per i file propri (metadata, indicatori, snapshot)
+        legacy_path = self.get_data_path(symbol, data_type)
+        legacy_path.mkdir(parents=True, exist_ok=True)
+        for path in (legacy_path / f"{symbol}_{data_type}.csv",
+                     legacy_path / f"{symbol}_{data_type}.index.npz",
+                     self.get_metadata_file(symbol, data_type)):
+            if path.exists():
+                path.unlink()
+        
+        if notify:
+            self._notify_derived(symbol, self.ADJUSTED_SOURCES[data_type])
+        return True
+    
+    def _derive(self, symbol: str, data_type: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Barre lette dal file grezzo con le colonne adjusted se il tipo è derivato"""
+        if not self.is_derived(symbol, data_type):
+            return df
+        return self.adjuster.apply_factors(df, self.load_factors(symbol, data_type))
+    
+    @staticmethod
+    def _source_columns(columns: Optional[List[str]]) -> Optional[List[str]]:
+        """Colonne grezze necessarie per restituire le colonne richieste di un tipo derivato"""
+        if columns is None:
+            return None
+        needed = ['date'] + [column for column in columns if not column.startswith('adj_')]
+        if any(column.startswith('adj_') for column in columns):
+            needed += list(AdjustedDataService.PRICE_FIELDS)
+        return list(dict.fromkeys(needed))
+    
+    def _notify_derived(self, symbol: str, source_type: str,
+                        frame: Optional[pd.DataFrame] = None) -> None:
+        """Dopo una scrittura delle barre grezze notifica i tipi adjusted derivati"""
+        for data_type, source in self.ADJUSTED_SOURCES.items():
+            if source != source_type or not self.is_derived(symbol, data_type):
+                continue
+            if frame is None:
+                derived = self.load_data(symbol, data_type)
+            else:
+                derived = self.adjuster.apply_factors(frame, self.load_factors(symbol, data_type))
+            if derived is not None:
+                self._notify_write(symbol, data_type, derived)
+    
     def list_available_symbols(self) -> List[Dict[str, Any]]:
         """Elenca tutti i simboli con dati salvati"""
         try:
@@ -210,10 +701,13 @@ class FileManagerService(BaseService):
                     }
                     
                     # Controlla quali tipi di dati sono disponibili
-                    for data_type in ['daily', 'dailyAdjusted', 'minute']:
+                    for data_type in self.data_types():
                         file_path = self.get_data_file(symbol_dir.name, data_type)
                         if file_path.exists():
-                            metadata = self.load_metadata(symbol_dir.name, data_type)
+                            # Tipo derivato: metadata delle barre grezze da cui è calcolato
+                            metadata = self.load_metadata(
+                                symbol_dir.name, self._storage_type(symbol_dir.name, data_type)
+                            )
                             symbol_info['data_types'].append({
                                 'type': data_type,
                                 'last_update': metadata.get('last_update') if metadata else None,
@@ -0,0 +1,420 @@
+"""
+Motore degli indicatori tecnici (SMA, EMA, RSI, MACD, Bollinger, ATR, OBV)
+Principio SOLID: Single Responsibility - calcola e mantiene le serie indicatori
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from .file_manager import FileManagerService
+
+
+# Crescita massima di d^-j in un blocco della EMA in forma chiusa
+EMA_BLOCK_GROWTH = 1e50
+
+
+class IndicatorService(BaseService):
+    """
+    Serie complete degli indicatori con kernel NumPy O(n)
+    Le serie vengono salvate accanto al file prezzi con lo stato finale del
+    calcolo (ultimi valori EMA/Wilder, finestra dei close, OBV): dopo un
+    append viene ricalcolata solo la coda nuova
+    """
+
+    # Serie prodotte per indicatore (parametri standard)
+    SERIES = {
+        'sma': ('sma_20', 'sma_50'),
+        'ema': ('ema_12', 'ema_26'),
+        'rsi': ('rsi_14',),
+        'macd': ('macd', 'macd_signal', 'macd_hist'),
+        'bollinger': ('bb_middle', 'bb_upper', 'bb_lower'),
+        'atr': ('atr_14',),
+        'obv': ('obv',)
+    }
+    INDICATORS = tuple(SERIES)
+
+    SMA_PERIODS = (20, 50)
+    EMA_PERIODS = (12, 26)
+    RSI_PERIOD = 14
+    MACD_PERIODS = (12, 26, 9)
+    BOLLINGER_PERIOD = 20
+    BOLLINGER_WIDTH = 2.0
+    ATR_PERIOD = 14
+
+    # Close precedenti da conservare per le finestre mobili
+    WINDOW = max(SMA_PERIODS + (BOLLINGER_PERIOD,)) - 1
+    STATE_VERSION = 1
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida l'elenco degli indicatori richiesti"""
+        unknown = [name for name in data.get('indicators', []) if name not in self.SERIES]
+        if unknown:
+            raise ValueError(
+                f"Indicatori non supportati: {', '.join(unknown)}. "
+                f"Usa uno tra {', '.join(self.INDICATORS)}"
+            )
+        return True
+
+    def parse_indicators(self, value: Any) -> List[str]:
+        """Normalizza il parametro 'indicators' (lista o stringa separata da virgole)"""
+        if value in (None, '', []):
+            return list(self.INDICATORS)
+        if isinstance(value, str):
+            value = value.split(',')
+        indicators = [str(name).strip().lower() for name in value if str(name).strip()]
+        self.validate_input({'indicators': indicators})
+        return indicators
+
+    def get_indicators(self, symbol: str, data_type: str,
+                       start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       indicators: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Serie degli indicatori richiesti nel periodo (colonna timestamp + serie)
+        Aggiorna prima le serie salvate con le eventuali nuove righe di prezzo
+        """
+        names = self.parse_indicators(indicators)
+        series = self.update(symbol, data_type)
+        if series is None:
+            raise ValueError(f"Nessun dato trovato per {symbol}")
+
+        time_column = series.columns[0]
+        times = series[time_column]
+        mask = pd.Series(True, index=series.index)
+        if start_date:
+            mask &= times >= pd.to_datetime(start_date)
+        if end_date:
+            # Il giorno finale è incluso anche per i dati intraday
+            mask &= times < pd.to_datetime(end_date) + pd.Timedelta(days=1)
+
+        columns = [time_column] + [column for name in names for column in self.SERIES[name]]
+        return series.loc[mask, columns].reset_index(drop=True)
+
+    def update(self, symbol: str, data_type: str) -> Optional[pd.DataFrame]:
+        """
+        Allinea le serie salvate al file prezzi e le restituisce complete
+        Se il file è solo cresciuto si calcola la coda partendo dallo stato
+        salvato; altrimenti (dati riscritti, formato cambiato) ricalcolo completo
+        """
+        key_column = self.file_manager.get_key_column(data_type)
+        stored = self._load(symbol, data_type)
+
+        if stored is not None:
+            times, series, state = stored
+            last_time = int(times[-1])
+            tail, _ = self.file_manager.read_page(
+                symbol, data_type, after=last_time - 1, limit=None
+            )
+
+            factors = self.file_manager.get_factors_version(symbol, data_type)
+            if self._continues(tail, key_column, last_time, state) \
+                    and state.get('factors') == factors:
+                new_rows = tail.iloc[1:]
+                if new_rows.empty:
+                    return self._to_frame(key_column, times, series)
+
+                self.log_info(f"Indicatori {symbol}/{data_type}: "
+                              f"calcolo di {len(new_rows)} nuove righe")
+                new_series, state = self.compute(new_rows, state)
+                times = np.concatenate([times, self._times(new_rows, key_column)])
+                series = {
+                    column: np.concatenate([values, new_series[column]])
+                    for column, values in series.items()
+                }
+                self._save(symbol, data_type, times, series, state)
+                return self._to_frame(key_column, times, series)
+
+        prices = self.file_manager.load_data(symbol, data_type)
+        if prices is None or prices.empty:
+            return None
+
+        self.log_info(f"Indicatori {symbol}/{data_type}: calcolo completo ({len(prices)} righe)")
+        series, state = self.compute(prices)
+        times = self._times(prices, key_column)
+        self._save(symbol, data_type, times, series, state)
+        return self._to_frame(key_column, times, series)
+
+    def compute(self, prices: pd.DataFrame,
+                state: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """
+        Calcola tutte le serie per le righe di prices
+        Con state (restituito dal calcolo precedente) le righe proseguono la
+        serie già calcolata: il risultato coincide con un ricalcolo completo
+
+        Returns:
+            (serie per colonna, nuovo stato)
+        """
+        state = state or {}
+        count = int(state.get('count', 0))
+        prev_close = state.get('last_close')
+        close, high, low, volume = self._price_arrays(prices, prev_close)
+
+        window = np.asarray(state.get('close_window', []), dtype=np.float64)
+        extended = np.concatenate([window, close])
+        offset = len(window)
+
+        series: Dict[str, np.ndarray] = {}
+        for period in self.SMA_PERIODS:
+            series[f'sma_{period}'] = self.rolling_mean(extended, period)[offset:]
+
+        ema_state = state.get('ema', {})
+        emas = {
+            period: self.ema(close, 2.0 / (period + 1), ema_state.get(str(period)))
+            for period in sorted(set(self.EMA_PERIODS + self.MACD_PERIODS[:2]))
+        }
+        for period in self.EMA_PERIODS:
+            series[f'ema_{period}'] = emas[period]
+
+        fast, slow, signal_period = self.MACD_PERIODS
+        macd = emas[fast] - emas[slow]
+        signal = self.ema(macd, 2.0 / (signal_period + 1), state.get('macd_signal'))
+        series['macd'] = macd
+        series['macd_signal'] = signal
+        series['macd_hist'] = macd - signal
+
+        series[f'rsi_{self.RSI_PERIOD}'], avg_gain, avg_loss = self.rsi(
+            close, self.RSI_PERIOD, prev_close,
+            state.get('rsi_gain'), state.get('rsi_loss'), count
+        )
+
+        middle = self.rolling_mean(extended, self.BOLLINGER_PERIOD)[offset:]
+        width = self.BOLLINGER_WIDTH * self.rolling_std(extended, self.BOLLINGER_PERIOD)[offset:]
+        series['bb_middle'] = middle
+        series['bb_upper'] = middle + width
+        series['bb_lower'] = middle - width
+
+        atr, last_atr = self.atr(high, low, close, self.ATR_PERIOD,
+                                 prev_close, state.get('atr'), count)
+        series[f'atr_{self.ATR_PERIOD}'] = atr
+        series['obv'] = self.obv(close, volume, prev_close, state.get('obv'))
+
+        new_state = {
+            'version': self.STATE_VERSION,
+            'price_field': self._price_field(prices),
+            'count': count + len(close),
+            'last_close': self._scalar(close[-1]) if len(close) else prev_close,
+            'close_window': extended[-self.WINDOW:].tolist(),
+            'ema': {
+                str(period): self._scalar(values[-1]) if len(values) else ema_state.get(str(period))
+                for period, values in emas.items()
+            },
+            'macd_signal': self._scalar(signal[-1]) if len(signal) else state.get('macd_signal'),
+            'rsi_gain': avg_gain,
+            'rsi_loss': avg_loss,
+            'atr': last_atr,
+            'obv': self._scalar(series['obv'][-1]) if len(close) else state.get('obv')
+        }
+        return series, new_state
+
+    @staticmethod
+    def rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+        """Media mobile con somme cumulative (NaN finché la finestra non è piena)"""
+        result = np.full(len(values), np.nan)
+        if len(values) >= period:
+            # Traslazione sul primo valore: somme cumulative più piccole, meno errore
+            shift = values[0]
+            sums = np.concatenate(([0.0], np.cumsum(values - shift)))
+            result[period - 1:] = (sums[period:] - sums[:-period]) / period + shift
+        return result
+
+    @staticmethod
+    def rolling_std(values: np.ndarray, period: int) -> np.ndarray:
+        """Deviazione standard mobile di popolazione (ddof=0, come le Bollinger)"""
+        result = np.full(len(values), np.nan)
+        if len(values) >= period:
+            shifted = values - values[0]
+            sums = np.concatenate(([0.0], np.cumsum(shifted)))
+            squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+            mean = (sums[period:] - sums[:-period]) / period
+            variance = (squares[period:] - squares[:-period]) / period - mean * mean
+            result[period - 1:] = np.sqrt(np.maximum(variance, 0.0))
+        return result
+
+    @staticmethod
+    def ema(values: np.ndarray, alpha: float, previous: Optional[float] = None) -> np.ndarray:
+        """
+        Media mobile esponenziale e[t] = alpha * x[t] + (1 - alpha) * e[t - 1]
+        (come pandas ewm(adjust=False)); senza previous parte da x[0]
+
+        La ricorrenza è risolta a blocchi in forma chiusa:
+        e[j] = d^j * (e[0] + alpha * cumsum(x[i] / d^i)), con d = 1 - alpha;
+        l'errore resta dell'ordine di eps * x / alpha, la lunghezza del blocco
+        serve solo a tenere d^-j lontano dall'overflow
+        """
+        n = len(values)
+        result = np.empty(n)
+        if n == 0:
+            return result
+
+        start = 0
+        if previous is None:
+            result[0] = previous = values[0]
+            start = 1
+
+        decay = 1.0 - alpha
+        if decay <= 0.0:
+            result[start:] = values[start:]
+            return result
+
+        block = max(1, int(np.log(EMA_BLOCK_GROWTH) / -np.log(decay)))
+        powers = decay ** np.arange(1, min(block, n) + 1)
+        for begin in range(start, n, block):
+            segment = values[begin:begin + block]
+            scale = powers[:len(segment)]
+            result[begin:begin + len(segment)] = scale * (
+                previous + alpha * np.cumsum(segment / scale)
+            )
+            previous = result[begin + len(segment) - 1]
+        return result
+
+    def rsi(self, close: np.ndarray, period: int, prev_close: Optional[float] = None,
+            avg_gain: Optional[float] = None, avg_loss: Optional[float] = None,
+            start: int = 0) -> Tuple[np.ndarray, Optional[float], Optional[float]]:
+        """
+        RSI con medie di Wilder (alpha = 1/period) di guadagni e perdite
+        Valido dalla riga 'period' in poi (prima servono period variazioni)
+
+        Returns:
+            (serie RSI, ultima media guadagni, ultima media perdite)
+        """
+        result = np.full(len(close), np.nan)
+        if prev_close is None:
+            changes, offset = np.diff(close), 1
+        else:
+            changes, offset = np.diff(close, prepend=prev_close), 0
+
+        if len(changes) == 0:
+            return result, avg_gain, avg_loss
+
+        gains = self.ema(np.maximum(changes, 0.0), 1.0 / period, avg_gain)
+        losses = self.ema(np.maximum(-changes, 0.0), 1.0 / period, avg_loss)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = 100.0 - 100.0 / (1.0 + gains / losses)
+        # Nessuna perdita: 100, nessun movimento: 50
+        values = np.where(losses == 0, np.where(gains == 0, 50.0, 100.0), values)
+
+        result[offset:] = values
+        result[:max(0, period - start)] = np.nan
+        return result, self._scalar(gains[-1]), self._scalar(losses[-1])
+
+    def atr(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int,
+            prev_close: Optional[float] = None, prev_atr: Optional[float] = None,
+            start: int = 0) -> Tuple[np.ndarray, Optional[float]]:
+        """Average True Range con media di Wilder; valido dalla riga period - 1"""
+        if len(close) == 0:
+            return np.empty(0), prev_atr
+
+        previous = np.concatenate(([np.nan if prev_close is None else prev_close], close[:-1]))
+        # fmax ignora il NaN della prima riga: true range = high - low
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+
+        result = self.ema(true_range, 1.0 / period, prev_atr)
+        last = self._scalar(result[-1])
+        result[:max(0, period - 1 - start)] = np.nan
+        return result, last
+
+    @staticmethod
+    def obv(close: np.ndarray, volume: np.ndarray, prev_close: Optional[float] = None,
+            prev_obv: Optional[float] = None) -> np.ndarray:
+        """On-Balance Volume: somma cumulativa del volume con il segno della variazione"""
+        if len(close) == 0:
+            return np.empty(0)
+        first = close[0] if prev_close is None else prev_close
+        direction = np.sign(np.diff(close, prepend=first))
+        return (prev_obv or 0.0) + np.cumsum(direction * volume)
+
+    def _price_arrays(self, prices: pd.DataFrame,
+                      prev_close: Optional[float]) -> Tuple[np.ndarray, ...]:
+        """Array float64 di close/high/low/volume (adjusted se disponibili)"""
+        prefix = 'adj_' if self._price_field(prices) == 'adj_close' else ''
+        close = self._ffill(prices[f'{prefix}close'].to_numpy(dtype=np.float64), prev_close)
+        high = prices[f'{prefix}high'].to_numpy(dtype=np.float64) \
+            if f'{prefix}high' in prices.columns else close
+        low = prices[f'{prefix}low'].to_numpy(dtype=np.float64) \
+            if f'{prefix}low' in prices.columns else close
+        volume = prices['volume'].to_numpy(dtype=np.float64) \
+            if 'volume' in prices.columns else np.zeros(len(close))
+        return close, high, low, np.nan_to_num(volume)
+
+    @staticmethod
+    def _price_field(prices: pd.DataFrame) -> str:
+        """Colonna prezzo usata: adj_close per i dati adjusted"""
+        return 'adj_close' if 'adj_close' in prices.columns else 'close'
+
+    @staticmethod
+    def _ffill(values: np.ndarray, previous: Optional[float] = None) -> np.ndarray:
+        """Propaga l'ultimo prezzo valido sui NaN (le somme cumulative non li tollerano)"""
+        missing = np.isnan(values)
+        if not missing.any():
+            return values
+        index = np.where(missing, 0, np.arange(len(values)))
+        np.maximum.accumulate(index, out=index)
+        filled = values[index]
+        # NaN iniziali: ultimo close del calcolo precedente, se disponibile
+        leading = np.isnan(filled)
+        if previous is not None:
+            filled[leading] = previous
+        return filled
+
+    @staticmethod
+    def _scalar(value: Any) -> Optional[float]:
+        """Valore di stato serializzabile (NaN -> None)"""
+        value = float(value)
+        return value if np.isfinite(value) else None
+
+    @staticmethod
+    def _times(prices: pd.DataFrame, key_column: str) -> np.ndarray:
+        """Timestamp in ns della colonna chiave"""
+        return pd.to_datetime(prices[key_column]).to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+    def _continues(self, tail: Optional[pd.DataFrame], key_column: str,
+                   last_time: int, state: Dict[str, Any]) -> bool:
+        """Il file prezzi prosegue le serie salvate (stessa ultima riga e stesso formato)?"""
+        if tail is None or tail.empty or state.get('version') != self.STATE_VERSION:
+            return False
+        if int(self._times(tail.iloc[:1], key_column)[0]) != last_time:
+            return False
+        if self._price_field(tail) != state.get('price_field'):
+            return False
+        last_close = tail[state['price_field']].iloc[0]
+        return state.get('last_close') is not None and bool(
+            np.isclose(last_close, state['last_close'], rtol=1e-12, atol=0.0)
+        )
+
+    def _load(self, symbol: str, data_type: str) -> Optional[Tuple[np.ndarray, Dict[str, np.ndarray], Dict]]:
+        """Serie e stato salvati (None se assenti o illeggibili)"""
+        path = self.file_manager.get_indicator_file(symbol, data_type)
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as stored:
+                times = stored['time']
+                state = json.loads(str(stored['state']))
+                series = {
+                    column: stored[column]
+                    for columns in self.SERIES.values() for column in columns
+                }
+            return (times, series, state) if len(times) else None
+        except Exception as e:
+            self.log_error(f"Indicatori salvati non leggibili per {symbol}/{data_type}", e)
+            return None
+
+    def _save(self, symbol: str, data_type: str, times: np.ndarray,
+              series: Dict[str, np.ndarray], state: Dict[str, Any]) -> None:
+        """Salva serie e stato accanto al file prezzi (con la versione dei fattori di rettifica)"""
+        path = self.file_manager.get_indicator_file(symbol, data_type)
+        state = {**state, 'factors': self.file_manager.get_factors_version(symbol, data_type)}
+        with open(path, 'wb') as f:
+            np.savez(f, time=times, state=np.array(json.dumps(state)), **series)
+
+    @staticmethod
+    def _to_frame(key_column: str, times: np.ndarray,
+                  series: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """DataFrame con colonna timestamp e serie"""
+        return pd.DataFrame({key_column: pd.to_datetime(times), **series})
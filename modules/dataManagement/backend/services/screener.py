@@ -0,0 +1,228 @@
+"""
+Screener dell'universo in cache con un piccolo linguaggio di filtro
+Principio SOLID: Single Responsibility - valuta i filtri sullo snapshot
+"""
+import ast
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import SCREENER_MAX_EXPRESSION
+from .snapshot import SnapshotService
+
+
+# Operatori ammessi nelle espressioni: tutto il resto viene rifiutato
+COMPARISONS = {
+    ast.Gt: np.greater, ast.GtE: np.greater_equal,
+    ast.Lt: np.less, ast.LtE: np.less_equal,
+    ast.Eq: np.equal, ast.NotEq: np.not_equal
+}
+ARITHMETIC = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+FUNCTIONS = {'abs': (1, np.abs), 'min': (2, np.minimum), 'max': (2, np.maximum)}
+MAX_NODES = 200
+
+
+@lru_cache(maxsize=256)
+def parse_filter(expression: str) -> Tuple[ast.Expression, Tuple[str, ...]]:
+    """
+    Analizza un filtro come 'close > sma_50 and volume > 2 * avg_volume_20'
+    Ammessi: campi dello snapshot, numeri, + - * /, confronti (anche a
+    catena), and / or / not, parentesi e le funzioni abs, min, max.
+    L'espressione non viene mai eseguita: l'albero sintattico è validato nodo
+    per nodo e poi valutato sulle colonne
+
+    Returns:
+        (albero validato, campi usati nell'ordine di apparizione)
+    """
+    if len(expression) > SCREENER_MAX_EXPRESSION:
+        raise ValueError(f"Filtro troppo lungo: massimo {SCREENER_MAX_EXPRESSION} caratteri")
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Filtro non valido: {e.msg} (colonna {e.offset})")
+
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_NODES:
+        raise ValueError(f"Filtro troppo complesso: massimo {MAX_NODES} nodi")
+
+    fields = []
+    for node in nodes:
+        if isinstance(node, ast.Name):
+            if node.id in FUNCTIONS and _is_callee(node, nodes):
+                continue
+            if node.id not in SnapshotService.FIELDS:
+                raise ValueError(
+                    f"Campo sconosciuto: {node.id}. Usa uno tra {', '.join(SnapshotService.FIELDS)}"
+                )
+            if node.id not in fields:
+                fields.append(node.id)
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise ValueError(f"Funzione non ammessa. Usa una tra {', '.join(FUNCTIONS)}")
+            arity = FUNCTIONS[node.func.id][0]
+            if node.keywords or len(node.args) != arity:
+                raise ValueError(f"{node.func.id} richiede {arity} argomenti")
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"Valore non numerico nel filtro: {node.value!r}")
+            if isinstance(node.value, int) and abs(node.value) > 2 ** 53:
+                raise ValueError(f"Numero troppo grande nel filtro: {node.value}")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in ARITHMETIC:
+                raise ValueError("Operatore non ammesso: usa + - * /")
+        elif isinstance(node, ast.Compare):
+            if any(type(op) not in COMPARISONS for op in node.ops):
+                raise ValueError("Confronto non ammesso: usa > >= < <= == !=")
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, (ast.Not, ast.USub, ast.UAdd)):
+                raise ValueError("Operatore unario non ammesso: usa not o -")
+        elif not isinstance(node, (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.Load,
+                                   ast.Not, ast.USub, ast.UAdd, *COMPARISONS, *ARITHMETIC)):
+            raise ValueError(f"Sintassi non ammessa nel filtro: {type(node).__name__}")
+    return tree, tuple(fields)
+
+
+def _is_callee(name: ast.Name, nodes: List[ast.AST]) -> bool:
+    """Il nome è la funzione chiamata (non un campo)?"""
+    return any(isinstance(node, ast.Call) and node.func is name for node in nodes)
+
+
+class ScreenerService(BaseService):
+    """
+    Filtra i simboli in cache sull'ultima barra e sugli indicatori
+    Il filtro viene valutato in blocco sulle colonne NumPy dello snapshot
+    (una posizione per simbolo): nessuno storico viene letto
+    """
+
+    DEFAULT_FIELDS = ('close', 'change_pct', 'volume')
+    DEFAULT_LIMIT = 100
+    DECIMALS = 4
+
+    def __init__(self, snapshot: Optional[SnapshotService] = None):
+        super().__init__()
+        self.snapshot = snapshot or SnapshotService()
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida campi di output e ordinamento"""
+        for field in data.get('fields', []):
+            if field not in SnapshotService.FIELDS:
+                raise ValueError(
+                    f"Campo sconosciuto: {field}. Usa uno tra {', '.join(SnapshotService.FIELDS)}"
+                )
+        sort = data.get('sort')
+        if sort and sort.lstrip('-') not in SnapshotService.FIELDS + ('symbol',):
+            raise ValueError(f"Campo di ordinamento sconosciuto: {sort.lstrip('-')}")
+        return True
+
+    def screen(self, expression: Optional[str] = None, data_type: str = 'dailyAdjusted',
+               fields: Optional[List[str]] = None, sort: Optional[str] = None,
+               limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Simboli che soddisfano il filtro (tutti se il filtro è vuoto)
+
+        Args:
+            expression: filtro, es. 'close > sma_50 and volume_ratio > 2'
+            fields: colonne di output oltre a symbol e date (default: close,
+                change_pct, volume e i campi usati da filtro e ordinamento)
+            sort: campo di ordinamento, '-campo' per decrescente (NaN in coda)
+            limit: massimo righe restituite (default DEFAULT_LIMIT)
+
+        Returns:
+            {'filter', 'data_type', 'universe', 'matched', 'count', 'columns', 'rows'}
+        """
+        expression = (expression or '').strip()
+        fields = list(fields or [])
+        self.validate_input({'fields': fields, 'sort': sort})
+        tree, used = parse_filter(expression) if expression else (None, ())
+
+        table = self.snapshot.table(data_type)
+        universe = len(table['symbol'])
+        if tree is None:
+            mask = np.ones(universe, dtype=bool)
+        else:
+            mask = self._evaluate(tree.body, table)
+            if mask.dtype != bool:
+                raise ValueError("Il filtro deve essere una condizione (es. close > sma_50)")
+        selected = np.flatnonzero(mask)
+
+        if sort:
+            key = table[sort.lstrip('-')][selected]
+            # I NaN finiscono in coda in entrambe le direzioni
+            order = np.argsort(key, kind='stable')
+            if sort.startswith('-'):
+                order = order[::-1] if key.dtype == object else np.argsort(-key, kind='stable')
+            selected = selected[order]
+        rows_limit = self.DEFAULT_LIMIT if limit is None else limit
+
+        columns = list(dict.fromkeys(['symbol', 'date', *(
+            fields or [*self.DEFAULT_FIELDS, *used, *([sort.lstrip('-')] if sort else [])]
+        )]))
+        page = selected[:rows_limit]
+        values = [self._column(table[column][page]) for column in columns]
+
+        return {
+            'filter': expression,
+            'data_type': data_type,
+            'universe': universe,
+            'matched': int(len(selected)),
+            'count': int(len(page)),
+            'columns': columns,
+            'rows': [list(row) for row in zip(*values)]
+        }
+
+    def _evaluate(self, node: ast.AST, table: Dict[str, np.ndarray]) -> Any:
+        """Valuta un nodo validato da parse_filter sulle colonne (array per simbolo)"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if isinstance(node, ast.Constant):
+                return np.float64(node.value)
+            if isinstance(node, ast.Name):
+                return table[node.id]
+            if isinstance(node, ast.BoolOp):
+                operands = [self._condition(value, table) for value in node.values]
+                reduce = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+                return reduce.reduce(operands)
+            if isinstance(node, ast.UnaryOp):
+                if isinstance(node.op, ast.Not):
+                    return ~self._condition(node.operand, table)
+                value = self._number(node.operand, table)
+                return -value if isinstance(node.op, ast.USub) else value
+            if isinstance(node, ast.Compare):
+                # a < b < c  ->  (a < b) and (b < c); i NaN non soddisfano nessun confronto
+                left = self._number(node.left, table)
+                result = None
+                for op, comparator in zip(node.ops, node.comparators):
+                    right = self._number(comparator, table)
+                    step = COMPARISONS[type(op)](left, right)
+                    result = step if result is None else result & step
+                    left = right
+                return np.broadcast_to(result, table['symbol'].shape)
+            if isinstance(node, ast.BinOp):
+                return ARITHMETIC[type(node.op)](self._number(node.left, table),
+                                                 self._number(node.right, table))
+            if isinstance(node, ast.Call):
+                function = FUNCTIONS[node.func.id][1]
+                return function(*(self._number(arg, table) for arg in node.args))
+        raise ValueError(f"Sintassi non ammessa nel filtro: {type(node).__name__}")
+
+    def _condition(self, node: ast.AST, table: Dict[str, np.ndarray]) -> np.ndarray:
+        """Operando logico: deve essere una condizione"""
+        value = self._evaluate(node, table)
+        if getattr(value, 'dtype', None) != bool:
+            raise ValueError("and / or / not richiedono condizioni (es. rsi_14 < 30)")
+        return value
+
+    def _number(self, node: ast.AST, table: Dict[str, np.ndarray]) -> Any:
+        """Operando numerico: una condizione non può essere usata come numero"""
+        value = self._evaluate(node, table)
+        if getattr(value, 'dtype', None) == bool:
+            raise ValueError("Le condizioni non possono essere usate come numeri")
+        return value
+
+    def _column(self, values: np.ndarray) -> List[Any]:
+        """Valori JSON-compatibili di una colonna (NaN -> null)"""
+        if values.dtype == object:
+            return values.tolist()
+        rounded = np.round(values, self.DECIMALS)
+        return [None if np.isnan(value) else value for value in rounded.tolist()]
@@ -0,0 +1,303 @@
+"""
+Tabella "ultima barra" per simbolo: prezzi e indicatori dell'ultima data in cache
+Principio SOLID: Single Responsibility - mantiene lo snapshot, non filtra
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import BATCH_MAX_WORKERS, SCREENER_RECONCILE_SECONDS
+from .file_manager import FileManagerService
+from .indicators import IndicatorService
+
+
+class SnapshotService(BaseService):
+    """
+    Una riga per simbolo con l'ultima barra e gli indicatori a quella data
+    - ogni scrittura in cache ricalcola la riga dal frame appena salvato
+      (listener del FileManagerService) e la salva accanto al file prezzi
+    - in memoria le righe diventano colonne NumPy: uno screen su tutto
+      l'universo non legge nessuno storico
+    - al primo uso e poi ogni SCREENER_RECONCILE_SECONDS le versioni dei file
+      vengono confrontate con quelle delle righe (scritture di altri processi)
+    Le EMA / medie di Wilder sono calcolate sulle ultime TAIL_ROWS righe: con
+    250 righe di riscaldamento la differenza dal calcolo sull'intero storico
+    è sotto 1e-8 in termini relativi
+    """
+
+    DATA_TYPES = ('daily', 'dailyAdjusted')
+    TAIL_ROWS = 253
+    VOLUME_PERIOD = 20
+    LONG_SMA = 200
+    YEAR_ROWS = 252
+    RETURN_PERIODS = (5, 20, 252)
+    STATE_VERSION = 1
+
+    # Campi numerici filtrabili (oltre a 'symbol' e 'date')
+    FIELDS = (
+        'open', 'high', 'low', 'close', 'volume', 'prev_close', 'change', 'change_pct',
+        *IndicatorService.SERIES['sma'], f'sma_{LONG_SMA}',
+        *IndicatorService.SERIES['ema'], *IndicatorService.SERIES['rsi'],
+        *IndicatorService.SERIES['macd'], 'bb_upper', 'bb_lower',
+        *IndicatorService.SERIES['atr'],
+        f'avg_volume_{VOLUME_PERIOD}', 'volume_ratio', 'high_52w', 'low_52w',
+        *(f'return_{period}d' for period in RETURN_PERIODS)
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+        self.indicators = IndicatorService()
+        self._lock = threading.Lock()
+        self._token = uuid.uuid4().hex[:8]
+        # Per tipo dati: righe e versioni per simbolo, colonne materializzate
+        self._rows: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, Dict[str, str]] = {}
+        self._tables: Dict[str, Dict[str, np.ndarray]] = {}
+        self._changes: Dict[str, Tuple[int, float]] = {}
+        self._reconciled: Dict[str, float] = {}
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida il tipo dati (solo barre giornaliere)"""
+        if data.get('data_type') not in self.DATA_TYPES:
+            raise ValueError(
+                f"Tipo dati non supportato: {data.get('data_type')}. "
+                f"Usa uno tra {', '.join(self.DATA_TYPES)}"
+            )
+        return True
+
+    def on_write(self, symbol: str, data_type: Optional[str],
+                 frame: Optional[pd.DataFrame]) -> None:
+        """Listener di scrittura: aggiorna (o rimuove) la riga del simbolo"""
+        data_types = [data_type] if data_type else list(self.DATA_TYPES)
+        for current in data_types:
+            if current not in self.DATA_TYPES:
+                continue
+            if frame is None:
+                self._store(current, symbol, None, None)
+                continue
+
+            row = self.compute(frame.tail(self.TAIL_ROWS))
+            version = self.file_manager.get_data_version(symbol, current)
+            if row is not None and version is not None:
+                self._persist(symbol, current, row, version[0])
+            self._store(current, symbol, row, version[0] if version else None)
+
+    def table(self, data_type: str) -> Dict[str, np.ndarray]:
+        """
+        Colonne dello snapshot: 'symbol' e 'date' (array di stringhe) e un array
+        float64 per campo, una posizione per simbolo (NaN se non disponibile)
+        """
+        self.validate_input({'data_type': data_type})
+        self._ensure_current(data_type)
+
+        with self._lock:
+            table = self._tables.get(data_type)
+            if table is None:
+                rows = self._rows[data_type]
+                symbols = sorted(rows)
+                table = {
+                    'symbol': np.array(symbols, dtype=object),
+                    'date': np.array([rows[symbol]['date'] for symbol in symbols], dtype=object)
+                }
+                values = np.array(
+                    [[rows[symbol][field] for field in self.FIELDS] for symbol in symbols],
+                    dtype=np.float64
+                ).reshape(len(symbols), len(self.FIELDS))
+                for position, field in enumerate(self.FIELDS):
+                    table[field] = values[:, position]
+                self._tables[data_type] = table
+            return table
+
+    def get_version(self, data_type: str) -> Tuple[str, float]:
+        """Versione della tabella (cambia a ogni riga aggiornata) per ETag / Last-Modified"""
+        self._ensure_current(data_type)
+        changes, updated = self._changes.get(data_type, (0, 0.0))
+        return f"{self._token}-{data_type}-{changes}", updated
+
+    def compute(self, prices: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """Riga dello snapshot dalle ultime righe di prezzo (ordinate per data)"""
+        if prices is None or prices.empty:
+            return None
+
+        series, _ = self.indicators.compute(prices)
+        prefix = 'adj_' if 'adj_close' in prices.columns else ''
+        close = prices[f'{prefix}close'].ffill().to_numpy(dtype=np.float64)
+        volume = prices['volume'].to_numpy(dtype=np.float64) \
+            if 'volume' in prices.columns else np.full(len(close), np.nan)
+        last = prices.iloc[-1]
+
+        def price(field):
+            column = f'{prefix}{field}'
+            return np.float64(last[column]) if column in prices.columns else close[-1]
+
+        def ago(rows):
+            return close[-1 - rows] if len(close) > rows else np.float64(np.nan)
+
+        row = {
+            'open': price('open'),
+            'high': price('high'),
+            'low': price('low'),
+            'close': close[-1],
+            'volume': volume[-1],
+            'prev_close': ago(1)
+        }
+        for field in self.FIELDS:
+            if field in series:
+                row[field] = series[field][-1]
+        row[f'sma_{self.LONG_SMA}'] = IndicatorService.rolling_mean(
+            close[-self.LONG_SMA:], self.LONG_SMA
+        )[-1]
+
+        # Media del volume delle sedute precedenti (esclusa l'ultima)
+        previous = volume[-1 - self.VOLUME_PERIOD:-1]
+        average = previous.mean() if len(previous) == self.VOLUME_PERIOD else np.float64(np.nan)
+        year = close[-self.YEAR_ROWS:]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row['change'] = row['close'] - row['prev_close']
+            row['change_pct'] = row['change'] / row['prev_close'] * 100
+            row[f'avg_volume_{self.VOLUME_PERIOD}'] = average
+            row['volume_ratio'] = row['volume'] / average
+            row['high_52w'] = year.max()
+            row['low_52w'] = year.min()
+            for period in self.RETURN_PERIODS:
+                row[f'return_{period}d'] = (row['close'] / ago(period) - 1) * 100
+
+        # NaN / inf -> None: la riga viene salvata in JSON
+        snapshot = {'date': pd.Timestamp(last['date']).strftime('%Y-%m-%d')}
+        for field in self.FIELDS:
+            value = float(row[field])
+            snapshot[field] = value if np.isfinite(value) else None
+        return snapshot
+
+    def _ensure_current(self, data_type: str) -> None:
+        """Carica la tabella al primo uso e la riallinea ai file ogni SCREENER_RECONCILE_SECONDS"""
+        now = time.monotonic()
+        last = self._reconciled.get(data_type)
+        if last is not None and now - last < SCREENER_RECONCILE_SECONDS:
+            return
+        self._reconciled[data_type] = now
+        self.reconcile(data_type)
+
+    def reconcile(self, data_type: str) -> Dict[str, int]:
+        """
+        Allinea le righe ai file in cache: rilegge solo i simboli il cui file
+        ha una versione diversa da quella della riga (prima dallo snapshot
+        salvato, altrimenti dalla coda del file prezzi)
+
+        Returns:
+            {'symbols': simboli in tabella, 'updated': righe ricalcolate o caricate,
+             'removed': simboli non più in cache}
+        """
+        base_path = self.file_manager.base_path
+        symbols = [path.name for path in base_path.iterdir() if path.is_dir()] \
+            if base_path.exists() else []
+        known = dict(self._versions.get(data_type, {}))
+
+        def refresh(symbol):
+            version = self.file_manager.get_data_version(symbol, data_type)
+            if version is None:
+                return symbol, None, None, symbol in known
+            if known.get(symbol) == version[0]:
+                return symbol, None, version[0], False
+            return symbol, self._load_row(symbol, data_type, version[0]), version[0], True
+
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_MAX_WORKERS, len(symbols) or 1))) as pool:
+            results = list(pool.map(refresh, symbols))
+
+        listed = set(symbols)
+        updated = removed = 0
+        with self._lock:
+            self._rows.setdefault(data_type, {})
+            self._versions.setdefault(data_type, {})
+        for symbol, row, version, changed in results:
+            if not changed:
+                continue
+            self._store(data_type, symbol, row, version)
+            updated += row is not None
+            removed += row is None
+        for symbol in [symbol for symbol in known if symbol not in listed]:
+            self._store(data_type, symbol, None, None)
+            removed += 1
+
+        if updated or removed:
+            self.log_info(f"Snapshot {data_type}: {updated} righe aggiornate, {removed} rimosse")
+        return {'symbols': len(self._rows[data_type]), 'updated': updated, 'removed': removed}
+
+    def _load_row(self, symbol: str, data_type: str, version: str) -> Optional[Dict[str, Any]]:
+        """Riga salvata se allineata al file, altrimenti ricalcolata dalla coda del file"""
+        path = self.file_manager.get_snapshot_file(symbol, data_type)
+        try:
+            with open(path, 'r') as f:
+                stored = json.load(f)
+            if stored.get('version') == version and stored.get('state') == self.STATE_VERSION:
+                return stored['row']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        try:
+            row = self.compute(self.file_manager.read_tail(symbol, data_type, self.TAIL_ROWS))
+        except Exception as e:
+            self.log_error(f"Errore snapshot {symbol}/{data_type}", e)
+            return None
+        if row is not None:
+            self._persist(symbol, data_type, row, version)
+        return row
+
+    def _persist(self, symbol: str, data_type: str, row: Dict[str, Any], version: str) -> None:
+        """Salva la riga accanto al file prezzi (scrittura atomica)"""
+        path = self.file_manager.get_snapshot_file(symbol, data_type)
+        temporary = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(temporary, 'w') as f:
+            json.dump({'state': self.STATE_VERSION, 'version': version, 'row': row}, f)
+        os.replace(temporary, path)
+
+    def _store(self, data_type: str, symbol: str, row: Optional[Dict[str, Any]],
+               version: Optional[str]) -> None:
+        """Aggiorna la riga in memoria (se la tabella è caricata) e le colonne"""
+        with self._lock:
+            if data_type not in self._rows:
+                return
+            if row is None:
+                if self._rows[data_type].pop(symbol, None) is None:
+                    return
+                self._versions[data_type].pop(symbol, None)
+                self._tables.pop(data_type, None)
+            else:
+                values = {
+                    field: np.nan if row.get(field) is None else row[field]
+                    for field in ('date',) + self.FIELDS
+                }
+                self._rows[data_type][symbol] = values
+                self._versions[data_type][symbol] = version
+                self._update_table(data_type, symbol, values)
+            changes, _ = self._changes.get(data_type, (0, 0.0))
+            self._changes[data_type] = (changes + 1, time.time())
+
+    def _update_table(self, data_type: str, symbol: str, values: Dict[str, Any]) -> None:
+        """
+        Aggiorna le colonne materializzate di un simbolo già presente con una
+        copia (gli screen in corso continuano sulle colonne precedenti);
+        un simbolo nuovo invalida le colonne, ricostruite al prossimo screen
+        """
+        table = self._tables.get(data_type)
+        if table is None:
+            return
+        position = int(np.searchsorted(table['symbol'], symbol))
+        if position == len(table['symbol']) or table['symbol'][position] != symbol:
+            self._tables.pop(data_type, None)
+            return
+
+        updated = {key: column.copy() for key, column in table.items()}
+        for field, value in values.items():
+            updated[field][position] = value
+        self._tables[data_type] = updated
@@ -0,0 +1,173 @@
+"""
+Barre settimanali, mensili e trimestrali derivate dalla cache giornaliera
+Principio SOLID: Single Responsibility - aggrega le barre giornaliere, non le scarica
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from .downsampling import DownsamplingService
+from .file_manager import FileManagerService
+
+
+# Intervallo richiesto -> (prefisso del tipo dati, periodo pandas)
+TIMEFRAMES = {
+    '1wk': ('weekly', 'W-SUN'),
+    '1mo': ('monthly', 'M'),
+    '3mo': ('quarterly', 'Q-DEC')
+}
+SOURCE_TYPES = ('daily', 'dailyAdjusted')
+
+
+class TimeframeService(BaseService):
+    """
+    Materializza le barre di periodo come tipi dati propri della cache
+    (weekly, weeklyAdjusted, monthly, ...), calcolate dal file giornaliero:
+    - settimane lunedì-domenica, mesi e trimestri di calendario; ogni barra è
+      datata al primo giorno del periodo (come Yahoo Finance)
+    - open primo, high massimo, low minimo, close ultimo, volume somma
+    - a ogni scrittura giornaliera vengono ricalcolati solo i periodi dall'ultima
+      barra salvata in poi (l'ultima può essere parziale); se lo storico
+      giornaliero è stato riscritto la serie viene ricalcolata per intero
+    Nessuna chiamata di rete: i dati giornalieri devono essere già in cache
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+        self.aggregator = DownsamplingService()
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida intervallo e tipo dati giornaliero di partenza"""
+        if data.get('interval') not in TIMEFRAMES:
+            raise ValueError(
+                f"Intervallo non supportato: {data.get('interval')}. "
+                f"Usa uno tra {', '.join(TIMEFRAMES)}"
+            )
+        if data.get('source_type') not in SOURCE_TYPES:
+            raise ValueError(f"Tipo dati di origine non supportato: {data.get('source_type')}")
+        return True
+
+    @staticmethod
+    def get_data_type(interval: str, source_type: str) -> str:
+        """Tipo dati derivato: 'weekly' da 'daily', 'weeklyAdjusted' da 'dailyAdjusted'"""
+        return TIMEFRAMES[interval][0] + source_type[len('daily'):]
+
+    def resample(self, df: pd.DataFrame, interval: str) -> pd.DataFrame:
+        """
+        Barre di periodo da barre giornaliere ordinate per data
+        I confini dei periodi sono i cambi di periodo tra righe consecutive:
+        un'unica passata di reduceat per colonna
+        """
+        if df.empty:
+            return df.copy()
+
+        periods = pd.PeriodIndex(pd.to_datetime(df['date']), freq=TIMEFRAMES[interval][1])
+        codes = periods.asi8
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+        bars = self.aggregator.aggregate(df.reset_index(drop=True), starts)
+        bars['date'] = periods[starts].start_time
+        return bars
+
+    def refresh(self, symbol: str, source_type: str, interval: str,
+                frame: Optional[pd.DataFrame] = None) -> str:
+        """
+        Allinea le barre derivate al file giornaliero (se già aggiornate non fa nulla)
+
+        Args:
+            frame: Storico giornaliero appena salvato (None: letto dalla cache)
+
+        Returns:
+            Tipo dati derivato
+        """
+        self.validate_input({'interval': interval, 'source_type': source_type})
+        data_type = self.get_data_type(interval, source_type)
+
+        version = self.file_manager.get_data_version(symbol, source_type)
+        if version is None:
+            raise ValueError(f"Nessun dato giornaliero in cache per {symbol}")
+        metadata = self.file_manager.load_metadata(symbol, data_type) or {}
+        if metadata.get('source_version') == version[0] \
+                and self.file_manager.get_data_version(symbol, data_type) is not None:
+            return data_type
+
+        if frame is None:
+            frame = self.file_manager.load_data(symbol, source_type)
+        if frame is None or frame.empty:
+            raise ValueError(f"Nessun dato giornaliero in cache per {symbol}")
+
+        # Fattori di rettifica cambiati (es. nuovo dividendo): tutto lo storico
+        # adjusted è cambiato anche se le ultime barre coincidono
+        factors = self.file_manager.get_factors_version(symbol, source_type)
+        existing = self.file_manager.load_data(symbol, data_type) \
+            if self.file_manager.get_data_version(symbol, data_type) \
+            and metadata.get('factors_version') == factors else None
+        bars = self._incremental(frame, existing, interval)
+        if bars is None:
+            bars = self.resample(frame, interval)
+            self.log_info(f"Barre {data_type} ricalcolate per {symbol}: {len(bars)}")
+
+        self.file_manager.save_data(symbol, data_type, bars, metadata={
+            'source': source_type,
+            'interval': interval,
+            'source_version': version[0],
+            'factors_version': factors
+        })
+        return data_type
+
+    def on_write(self, symbol: str, data_type: Optional[str],
+                 frame: Optional[pd.DataFrame]) -> None:
+        """
+        Listener di scrittura: aggiorna i tipi derivati già materializzati del
+        simbolo; se i dati giornalieri vengono cancellati li cancella
+        """
+        for source_type in ([data_type] if data_type else list(SOURCE_TYPES)):
+            if source_type not in SOURCE_TYPES:
+                continue
+            for interval in TIMEFRAMES:
+                derived = self.get_data_type(interval, source_type)
+                if self.file_manager.get_data_version(symbol, derived) is None:
+                    continue
+                if frame is None:
+                    self.file_manager.clear_data(symbol, derived)
+                else:
+                    self.refresh(symbol, source_type, interval, frame)
+
+    def _incremental(self, frame: pd.DataFrame, existing: Optional[pd.DataFrame],
+                     interval: str) -> Optional[pd.DataFrame]:
+        """
+        Ricalcola solo gli ultimi periodi: la penultima barra salvata (completa)
+        deve coincidere con quella ricalcolata, altrimenti lo storico è cambiato
+
+        Returns:
+            Serie completa aggiornata o None se serve il ricalcolo completo
+        """
+        if existing is None or len(existing) < 2:
+            return None
+
+        first = pd.Period(pd.to_datetime(frame['date']).iloc[0], freq=TIMEFRAMES[interval][1])
+        if existing['date'].iloc[0] != first.start_time:
+            return None
+
+        previous = existing['date'].iloc[-2]
+        recent = self.resample(frame[pd.to_datetime(frame['date']) >= previous], interval)
+        if recent.empty or recent['date'].iloc[0] != previous:
+            return None
+
+        stored = existing.iloc[-2]
+        check = recent.iloc[0]
+        for column in recent.columns.drop('date'):
+            if column not in existing.columns:
+                return None
+            if pd.api.types.is_numeric_dtype(recent[column]):
+                same = np.isclose(float(stored[column]), float(check[column]),
+                                  rtol=1e-9, equal_nan=True)
+            else:
+                same = stored[column] == check[column]
+            if not same:
+                return None
+        # Le barre fino alla penultima restano quelle salvate
+        return pd.concat([existing.iloc[:-1], recent.iloc[1:]], ignore_index=True)
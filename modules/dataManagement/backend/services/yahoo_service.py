@@ -10,19 +10,29 @@ import time
 
 from core.backend.base.base_service import BaseService
 from core.backend.config.settings import YAHOO_API_TIMEOUT, YAHOO_MAX_RETRIES
+from core.backend.utils.columnar import frame_to_columnar, panel_to_columnar, records_to_columnar
+from core.backend.utils.pagination import decode_cursor, encode_cursor
 from ..services.file_manager import FileManagerService
 from ..services.adjusted_data import AdjustedDataService
+from ..services.downsampling import DownsamplingService
+from ..services.timeframes import TIMEFRAMES, TimeframeService
 
 
 class YahooFinanceService(BaseService):
     """Servizio per recuperare dati da Yahoo Finance con cache e download incrementale"""
     
+    # Layout 'panel' di /stock/multiple: campi presenti in ogni file prezzi
+    PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+    PANEL_JOINS = ('outer', 'inner')
+    
     def __init__(self):
         super().__init__()
         self.timeout = YAHOO_API_TIMEOUT
         self.max_retries = YAHOO_MAX_RETRIES
         self.file_manager = FileManagerService()
         self.adjusted_service = AdjustedDataService()
+        self.downsampler = DownsamplingService()
+        self.timeframes = TimeframeService()
     
     def validate_input(self, data: Dict[str, Any]) -> bool:
         """Valida i parametri di input"""
@@ -66,7 +76,9 @@ class YahooFinanceService(BaseService):
     
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
                       interval: str = '1d', use_cache: bool = True,
-                      adjusted: bool = True) -> Dict[str, Any]:
+                      adjusted: bool = True, output_format: str = 'records',
+                      delta_timestamps: bool = False, max_points: Optional[int] = None,
+                      downsample_method: str = 'minmax') -> Dict[str, Any]:
         """
         Recupera i dati storici di un titolo con supporto cache e download incrementale
         
@@ -74,9 +86,13 @@ class YahooFinanceService(BaseService):
             symbol: Simbolo del titolo
             start_date: Data inizio
             end_date: Data fine
-            interval: Intervallo dati (1d, 1m, etc)
+            interval: Intervallo dati (1d, 1m; 1wk, 1mo, 3mo derivati dalla cache giornaliera)
             use_cache: Se True, usa dati salvati e scarica solo i mancanti
             adjusted: Se True, scarica e calcola prezzi adjusted
+            output_format: 'records' (lista di dizionari) o 'columnar' (un array per campo)
+            delta_timestamps: Solo per 'columnar', timestamp interi codificati a delta
+            max_points: Se indicato, serie ridotta ad al massimo max_points punti
+            downsample_method: 'minmax' (barre OHLC per bucket) o 'lttb'
         """
         try:
             symbol = str(symbol).strip().upper()
@@ -84,7 +100,7 @@ class YahooFinanceService(BaseService):
             end_date = str(end_date).strip()
             
             # Determina il tipo di dati
-            data_type = self._get_data_type(interval, adjusted)
+            data_type = self.get_data_type(interval, adjusted)
             
             self.log_info(f"=== RECUPERO DATI {data_type} ===")
             self.log_info(f"Simbolo: {symbol}, Periodo: {start_date} -> {end_date}")
@@ -96,6 +112,19 @@ class YahooFinanceService(BaseService):
                 'end_date': end_date
             })
             
+            if interval != '1m' and (use_cache or interval in TIMEFRAMES):
+                # Giornaliero (barre grezze + fattori di rettifica) e barre di periodo
+                # derivate: la cache viene aggiornata e la risposta letta da essa
+                status = self.ensure_cached(symbol, start_date, end_date,
+                                            interval=interval, adjusted=adjusted)
+                if not status['success']:
+                    return status
+                return self._prepare_response_from_cache(
+                    self.file_manager.load_data(symbol, data_type), symbol,
+                    start_date, end_date, output_format, delta_timestamps,
+                    max_points, downsample_method
+                )
+            
             # Se use_cache, prova a usare dati esistenti
             if use_cache:
                 cached_data, missing_start, missing_end = self._check_cached_data(
@@ -106,7 +135,9 @@ class YahooFinanceService(BaseService):
                     # Tutti i dati sono già presenti
                     self.log_info("Tutti i dati richiesti sono già in cache")
                     return self._prepare_response_from_cache(
-                        cached_data, symbol, start_date, end_date
+                        cached_data, symbol, start_date, end_date,
+                        output_format, delta_timestamps,
+                        max_points, downsample_method
                     )
                 
                 if missing_start and missing_end:
@@ -133,12 +164,27 @@ class YahooFinanceService(BaseService):
                         # Ricarica tutti i dati
                         all_data = self.file_manager.load_data(symbol, data_type)
                         return self._prepare_response_from_cache(
-                            all_data, symbol, start_date, end_date
+                            all_data, symbol, start_date, end_date,
+                            output_format, delta_timestamps,
+                            max_points, downsample_method
                         )
             
             # Download completo
             result = self._download_from_yahoo(symbol, start_date, end_date, interval)
             
+            if result['success'] and interval != '1m':
+                # Giornaliero senza cache: adjusted calcolati dai fattori del download
+                bars, events = self.adjusted_service.split_factors(result['data']['records'])
+                downloaded = pd.DataFrame(bars)
+                downloaded['date'] = pd.to_datetime(downloaded['date'])
+                if adjusted:
+                    downloaded = self.adjusted_service.apply_factors(downloaded, events)
+                return self._prepare_response_from_cache(
+                    downloaded, symbol, start_date, end_date,
+                    output_format, delta_timestamps,
+                    max_points, downsample_method
+                )
+            
             if result['success']:
                 # Processa dati adjusted se richiesto
                 if adjusted:
@@ -158,6 +204,21 @@ class YahooFinanceService(BaseService):
                             'adjusted': adjusted
                         }
                     )
+                
+                if max_points:
+                    # Il downsampling lavora sulle colonne: riparte dal DataFrame
+                    downloaded = pd.DataFrame(result['data']['records'])
+                    downloaded['date'] = pd.to_datetime(downloaded['date'])
+                    return self._prepare_response_from_cache(
+                        downloaded, symbol, start_date, end_date,
+                        output_format, delta_timestamps,
+                        max_points, downsample_method
+                    )
+                
+                if output_format == 'columnar':
+                    result['data'] = self._to_columnar_data(
+                        result['data'], delta_timestamps
+                    )
             
             return result
             
@@ -170,32 +231,114 @@ class YahooFinanceService(BaseService):
                 'context': f"get_stock_data({symbol})"
             }
     
-    def get_full_history(self, symbol: str, adjusted: bool = True) -> Dict[str, Any]:
+    def get_full_history(self, symbol: str, adjusted: bool = True,
+                         max_points: Optional[int] = None,
+                         downsample_method: str = 'minmax') -> Dict[str, Any]:
         """Scarica lo storico completo disponibile per un simbolo"""
         try:
             symbol = str(symbol).strip().upper()
             self.log_info(f"Download storico completo per {symbol}")
             
-            # Yahoo Finance di solito ha dati dal 1970 circa
-            start_date = "1900-01-01"  # Yahoo ignorerà date troppo vecchie
-            end_date = datetime.now().strftime('%Y-%m-%d')
+            start_date, end_date = self.get_full_history_range()
             
-            return self.get_stock_data(
+            # Lo storico completo supera i limiti di periodo di get_stock_data:
+            # aggiorna la cache e rispondi leggendo da essa
+            status = self.ensure_cached(
                 symbol, start_date, end_date,
-                interval='1d', use_cache=True, adjusted=adjusted
+                adjusted=adjusted, full_history=True
+            )
+            if not status['success']:
+                return status
+            
+            cached_df = self.file_manager.load_data(symbol, status['data']['data_type'])
+            if cached_df is None or cached_df.empty:
+                raise ValueError(f"Nessun dato trovato per {symbol}")
+            
+            return self._prepare_response_from_cache(
+                cached_df, symbol, start_date, end_date,
+                max_points=max_points, downsample_method=downsample_method
             )
             
         except Exception as e:
             return self.handle_error(e, f"get_full_history({symbol})")
     
-    def _get_data_type(self, interval: str, adjusted: bool) -> str:
+    def get_stock_page(self, symbol: str, start_date: str, end_date: str,
+                       limit: int, cursor: Optional[str] = None,
+                       interval: str = '1d', adjusted: bool = True,
+                       output_format: str = 'records', delta_timestamps: bool = False,
+                       full_history: bool = False) -> Dict[str, Any]:
+        """
+        Restituisce una pagina di al massimo limit record a partire dal cursore
+        La pagina viene letta dal file con un seek sull'indice dei timestamp:
+        il costo dipende da limit, non dalla posizione nello storico
+        
+        Args:
+            limit: Numero massimo di record della pagina
+            cursor: Cursore opaco restituito dalla pagina precedente (None: prima pagina)
+            full_history: Se True non applica i limiti sul periodo
+        
+        Returns:
+            Risposta come get_stock_data con 'has_more' e 'next_cursor'
+        """
+        try:
+            symbol = str(symbol).strip().upper()
+            start_date = str(start_date).strip()
+            end_date = str(end_date).strip()
+            data_type = self.get_data_type(interval, adjusted)
+            after = decode_cursor(cursor, symbol, data_type)
+            
+            if after is None:
+                # Solo la prima pagina aggiorna la cache: le successive leggono lo stesso file
+                status = self.ensure_cached(
+                    symbol, start_date, end_date, interval=interval,
+                    adjusted=adjusted, full_history=full_history
+                )
+                if not status['success']:
+                    return status
+            elif not full_history:
+                self.validate_input({
+                    'symbol': symbol,
+                    'start_date': start_date,
+                    'end_date': end_date
+                })
+            
+            page, has_more = self.file_manager.read_page(
+                symbol, data_type, start_date, end_date, after=after, limit=limit
+            )
+            if page is None:
+                raise ValueError(f"Nessun dato trovato per {symbol}")
+            
+            result = self._prepare_response_from_cache(
+                page, symbol, start_date, end_date, output_format, delta_timestamps
+            )
+            result['data'].update({
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': encode_cursor(
+                    symbol, data_type, page['date'].iloc[-1].value
+                ) if has_more else None
+            })
+            return result
+            
+        except Exception as e:
+            return self.handle_error(e, f"get_stock_page({symbol})")
+    
+    def get_full_history_range(self) -> Tuple[str, str]:
+        """Periodo usato per lo storico completo"""
+        # Yahoo Finance di solito ha dati dal 1970 circa
+        start_date = "1900-01-01"  # Yahoo ignorerà date troppo vecchie
+        end_date = datetime.now().strftime('%Y-%m-%d')
+        return start_date, end_date
+    
+    def get_data_type(self, interval: str, adjusted: bool) -> str:
         """Determina il tipo di dati basato su intervallo e adjusted"""
         if interval == '1m':
             return 'minute'
-        elif adjusted:
-            return 'dailyAdjusted'
-        else:
-            return 'daily'
+        daily_type = 'dailyAdjusted' if adjusted else 'daily'
+        if interval in TIMEFRAMES:
+            # Barre di periodo derivate dalla cache giornaliera
+            return self.timeframes.get_data_type(interval, daily_type)
+        return daily_type
     
     def _check_cached_data(self, symbol: str, data_type: str, 
                           start_date: str, end_date: str) -> Tuple[Optional[pd.DataFrame], 
@@ -226,28 +369,193 @@ class YahooFinanceService(BaseService):
             self.log_info(f"Cache disponibile: {cache_start.strftime('%Y-%m-%d')} -> "
                          f"{cache_end.strftime('%Y-%m-%d')}")
             
-            # Caso 1: Tutti i dati richiesti sono in cache
-            if cache_start <= req_start and cache_end >= req_end:
-                return cached_df, None, None
+            missing_start, missing_end = self._find_missing_period(
+                cache_start, cache_end, start_date, end_date
+            )
+            return cached_df, missing_start, missing_end
             
-            # Caso 2: Necessario download prima dell'inizio cache
-            if req_start < cache_start:
-                missing_start = start_date
-                missing_end = (cache_start - timedelta(days=1)).strftime('%Y-%m-%d')
-                return cached_df, missing_start, missing_end
+        except Exception as e:
+            self.log_error("Errore controllo cache", e)
+            return None, start_date, end_date
+    
+    def _find_missing_period(self, cache_start: pd.Timestamp, cache_end: pd.Timestamp,
+                             start_date: str, end_date: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Determina il periodo da scaricare rispetto all'intervallo in cache
+        
+        Returns:
+            (missing_start_date, missing_end_date), (None, None) se già coperto
+        """
+        req_start = pd.to_datetime(start_date)
+        req_end = pd.to_datetime(end_date)
+        
+        # Caso 1: Tutti i dati richiesti sono in cache
+        if cache_start <= req_start and cache_end >= req_end:
+            return None, None
+        
+        # Caso 2: Necessario download prima dell'inizio cache
+        if req_start < cache_start:
+            missing_end = (cache_start - timedelta(days=1)).strftime('%Y-%m-%d')
+            return start_date, missing_end
+        
+        # Caso 3: Necessario download dopo la fine cache
+        missing_start = (cache_end + timedelta(days=1)).strftime('%Y-%m-%d')
+        return missing_start, end_date
+    
+    def ensure_cached(self, symbol: str, start_date: str, end_date: str,
+                      interval: str = '1d', adjusted: bool = True,
+                      full_history: bool = False) -> Dict[str, Any]:
+        """
+        Garantisce che il periodo richiesto sia in cache senza costruire la risposta
+        Usato da chi legge poi direttamente dal file (es. risposte in streaming)
+        
+        Args:
+            full_history: Se True non applica i limiti sul periodo e controlla
+                solo la coda della cache (lo storico iniziale non può crescere)
+        
+        Returns:
+            {'success': True, 'data': {'symbol', 'data_type'}} o errore
+        """
+        try:
+            if interval in TIMEFRAMES:
+                # Aggiorna la cache giornaliera, poi ricava le barre localmente
+                status = self.ensure_cached(symbol, start_date, end_date, adjusted=adjusted,
+                                            full_history=full_history)
+                if not status['success']:
+                    return status
+                status['data']['data_type'] = self.timeframes.refresh(
+                    status['data']['symbol'], status['data']['data_type'], interval
+                )
+                return status
             
-            # Caso 3: Necessario download dopo la fine cache
-            if req_end > cache_end:
-                missing_start = (cache_end + timedelta(days=1)).strftime('%Y-%m-%d')
-                missing_end = end_date
-                return cached_df, missing_start, missing_end
+            symbol = str(symbol).strip().upper()
+            start_date = str(start_date).strip()
+            end_date = str(end_date).strip()
+            data_type = self.get_data_type(interval, adjusted)
             
-            # Altri casi: scarica tutto
-            return None, start_date, end_date
+            if full_history:
+                if not symbol:
+                    raise ValueError("Simbolo richiesto")
+            else:
+                self.validate_input({
+                    'symbol': symbol,
+                    'start_date': start_date,
+                    'end_date': end_date
+                })
+            
+            # Giornaliero e adjusted condividono le barre grezze del tipo 'daily';
+            # senza fattori di rettifica la cache è nel vecchio formato (una copia
+            # completa per tipo) e viene letta così com'è finché è sufficiente
+            storage_type = 'minute' if interval == '1m' else 'daily'
+            legacy = storage_type == 'daily' and not self.file_manager.is_derived(symbol, 'dailyAdjusted')
+            date_range = self.file_manager.get_date_range(
+                symbol, data_type if legacy else storage_type
+            )
+            
+            if date_range is None:
+                missing_start, missing_end = start_date, end_date
+            elif full_history:
+                cache_end = date_range[1]
+                missing_start, missing_end = (
+                    (cache_end + timedelta(days=1)).strftime('%Y-%m-%d'), end_date
+                ) if cache_end < pd.to_datetime(end_date) else (None, None)
+            else:
+                missing_start, missing_end = self._find_missing_period(
+                    date_range[0], date_range[1], start_date, end_date
+                )
+            
+            replace = date_range is None
+            if missing_start is not None and legacy:
+                # Migrazione: il periodo delle vecchie copie viene riscaricato per
+                # intero come barre grezze + fattori
+                missing_start, missing_end = start_date, end_date
+                for legacy_type in ('daily', 'dailyAdjusted'):
+                    legacy_range = self.file_manager.get_date_range(symbol, legacy_type)
+                    if legacy_range is not None:
+                        missing_start = min(missing_start, legacy_range[0].strftime('%Y-%m-%d'))
+                        missing_end = max(missing_end, legacy_range[1].strftime('%Y-%m-%d'))
+                replace = True
+            elif missing_start is not None and storage_type == 'daily' and date_range is not None:
+                if pd.to_datetime(missing_start) > date_range[1]:
+                    # Una seduta in comune con la cache: un evento di rettifica
+                    # sulla prima seduta nuova viene rilevato
+                    missing_start = date_range[1].strftime('%Y-%m-%d')
+                elif pd.to_datetime(missing_end) < date_range[0]:
+                    # Idem prima dell'inizio cache (la data di fine è esclusa da Yahoo)
+                    missing_end = (date_range[0] + timedelta(days=1)).strftime('%Y-%m-%d')
+            
+            if missing_start is not None:
+                self.log_info(f"Aggiornamento cache {symbol}/{storage_type}: "
+                              f"{missing_start} -> {missing_end}")
+                new_data = self._download_from_yahoo(
+                    symbol, missing_start, missing_end, interval
+                )
+                
+                if new_data['success'] and storage_type == 'daily':
+                    self._store_daily(symbol, new_data['data']['records'], replace=replace)
+                elif new_data['success']:
+                    records = new_data['data']['records']
+                    if adjusted:
+                        records = self.adjusted_service.calculate_adjusted_prices(
+                            records, has_adjusted=True
+                        )
+                    
+                    if date_range is None:
+                        self.file_manager.save_data(
+                            symbol, data_type, records,
+                            metadata={
+                                'source': 'yahoo_finance',
+                                'interval': interval,
+                                'adjusted': adjusted
+                            }
+                        )
+                    else:
+                        self.file_manager.append_data(symbol, data_type, records)
+                        
+                elif date_range is None:
+                    # Nessun dato in cache e download fallito
+                    return new_data
+                else:
+                    self.log_info(f"Download incrementale non riuscito, uso la cache: "
+                                  f"{new_data.get('error')}")
+            
+            return {
+                'success': True,
+                'data': {
+                    'symbol': symbol,
+                    'data_type': data_type
+                }
+            }
             
         except Exception as e:
-            self.log_error("Errore controllo cache", e)
-            return None, start_date, end_date
+            return self.handle_error(e, f"ensure_cached({symbol})")
+    
+    def _store_daily(self, symbol: str, records: List[Dict], replace: bool) -> None:
+        """
+        Salva un download giornaliero: barre grezze nel tipo 'daily' e, a parte,
+        gli eventi di rettifica da cui 'dailyAdjusted' viene calcolato in lettura
+        
+        I fattori vengono salvati prima delle barre: la scrittura delle barre
+        notifica una sola volta i listener di 'dailyAdjusted' con lo storico
+        rettificato definitivo
+        
+        Args:
+            replace: True per un nuovo storico, False per unire al file esistente
+                (sostituisce solo gli eventi nel periodo scaricato)
+        """
+        bars, events = self.adjusted_service.split_factors(records)
+        if replace:
+            self.file_manager.save_factors(symbol, events, notify=False)
+            self.file_manager.save_data(symbol, 'daily', bars, metadata={
+                'source': 'yahoo_finance',
+                'interval': '1d',
+                'adjusted': False
+            })
+        else:
+            self.file_manager.save_factors(
+                symbol, events, span=(records[0]['date'], records[-1]['date']), notify=False
+            )
+            self.file_manager.append_data(symbol, 'daily', bars)
     
     def _download_from_yahoo(self, symbol: str, start_date: str, 
                            end_date: str, interval: str = '1d') -> Dict[str, Any]:
@@ -255,6 +563,9 @@ class YahooFinanceService(BaseService):
         try:
             self.log_info(f"Download Yahoo: {symbol} {start_date} -> {end_date}")
             
+            # Giornaliero: barre non rettificate più Adj Close (fattori di rettifica)
+            auto_adjust = interval == '1m'
+            
             last_error = None
             for attempt in range(self.max_retries):
                 try:
@@ -264,6 +575,7 @@ class YahooFinanceService(BaseService):
                         start=start_date,
                         end=end_date,
                         interval=interval,
+                        auto_adjust=auto_adjust,
                         timeout=self.timeout
                     )
                     
@@ -281,6 +593,7 @@ class YahooFinanceService(BaseService):
                                 start=start_date,
                                 end=end_date,
                                 interval=interval,
+                                auto_adjust=auto_adjust,
                                 timeout=self.timeout
                             )
                             if not alt_data.empty:
@@ -307,13 +620,49 @@ class YahooFinanceService(BaseService):
             }
     
     def _prepare_response_from_cache(self, df: pd.DataFrame, symbol: str,
-                                   start_date: str, end_date: str) -> Dict[str, Any]:
+                                   start_date: str, end_date: str,
+                                   output_format: str = 'records',
+                                   delta_timestamps: bool = False,
+                                   max_points: Optional[int] = None,
+                                   downsample_method: str = 'minmax') -> Dict[str, Any]:
         """Prepara risposta da dati cached"""
         try:
             # Filtra per periodo richiesto
             mask = (df['date'] >= start_date) & (df['date'] <= end_date)
             filtered_df = df[mask].copy()
             
+            # Riduzione dei punti prima della serializzazione
+            downsampling = {}
+            if max_points:
+                downsampling = {'downsampling': {
+                    'method': downsample_method,
+                    'max_points': max_points,
+                    'original_count': len(filtered_df)
+                }}
+                filtered_df = self.downsampler.downsample(
+                    filtered_df, max_points, downsample_method
+                )
+            
+            if output_format == 'columnar':
+                # Costruisce gli array direttamente dalle colonne, senza record
+                return {
+                    'success': True,
+                    'data': {
+                        'symbol': symbol,
+                        'format': 'columnar',
+                        'count': len(filtered_df),
+                        'first_date': (filtered_df['date'].iloc[0].strftime('%Y-%m-%d')
+                                       if not filtered_df.empty else None),
+                        'last_date': (filtered_df['date'].iloc[-1].strftime('%Y-%m-%d')
+                                      if not filtered_df.empty else None),
+                        'from_cache': True,
+                        **downsampling,
+                        **frame_to_columnar(
+                            filtered_df, delta_timestamps=delta_timestamps
+                        )
+                    }
+                }
+            
             # Converti in formato risposta
             records = []
             for _, row in filtered_df.iterrows():
@@ -346,7 +695,8 @@ class YahooFinanceService(BaseService):
                     'count': len(records),
                     'first_date': records[0]['date'] if records else None,
                     'last_date': records[-1]['date'] if records else None,
-                    'from_cache': True
+                    'from_cache': True,
+                    **downsampling
                 }
             }
             
@@ -354,6 +704,16 @@ class YahooFinanceService(BaseService):
             self.log_error("Errore preparazione risposta da cache", e)
             raise
     
+    def _to_columnar_data(self, data: Dict[str, Any],
+                          delta_timestamps: bool = False) -> Dict[str, Any]:
+        """Converte i dati di una risposta da record a formato colonnare"""
+        columnar = {key: value for key, value in data.items() if key != 'records'}
+        columnar['format'] = 'columnar'
+        columnar.update(
+            records_to_columnar(data['records'], delta_timestamps=delta_timestamps)
+        )
+        return columnar
+    
     def _prepare_data_response(self, data: pd.DataFrame, symbol: str) -> Dict[str, Any]:
         """Prepara la risposta con i dati del DataFrame"""
         data_reset = data.reset_index()
@@ -369,9 +729,11 @@ class YahooFinanceService(BaseService):
                 'volume': int(row['Volume'])
             }
             
-            # Aggiungi Adj Close se presente
+            # Aggiungi Adj Close se presente (e il fattore di rettifica non arrotondato)
             if 'Adj Close' in row:
                 record['adj_close'] = round(float(row['Adj Close']), 2)
+                record['adj_factor'] = float(row['Adj Close']) / float(row['Close']) \
+                    if float(row['Close']) else 1.0
             
             records.append(record)
         
@@ -410,7 +772,9 @@ class YahooFinanceService(BaseService):
         return list(dict.fromkeys(alternatives))[:3]
     
     def get_multiple_stocks(self, symbols: List[str], start_date: str, 
-                          end_date: str, adjusted: bool = True) -> Dict[str, Any]:
+                          end_date: str, adjusted: bool = True,
+                          output_format: str = 'records',
+                          delta_timestamps: bool = False) -> Dict[str, Any]:
         """Recupera dati per multipli titoli"""
         try:
             results = {}
@@ -419,7 +783,9 @@ class YahooFinanceService(BaseService):
             for symbol in symbols:
                 result = self.get_stock_data(
                     symbol, start_date, end_date, 
-                    use_cache=True, adjusted=adjusted
+                    use_cache=True, adjusted=adjusted,
+                    output_format=output_format,
+                    delta_timestamps=delta_timestamps
                 )
                 
                 if result['success']:
@@ -438,7 +804,113 @@ class YahooFinanceService(BaseService):
             
         except Exception as e:
             return self.handle_error(e, "get_multiple_stocks")
-    
+
+    def get_multiple_panel(self, symbols: List[str], start_date: str, end_date: str,
+                           adjusted: bool = True, fields: Optional[List[str]] = None,
+                           join: str = 'outer', fill: Optional[str] = None,
+                           fill_limit: Optional[int] = None,
+                           delta_timestamps: bool = False) -> Dict[str, Any]:
+        """
+        Dati di più titoli allineati su un asse di date condiviso
+        La cache viene aggiornata per ogni simbolo, poi i file vengono letti in
+        parallelo e allineati in matrici data x simbolo (una per campo)
+
+        Args:
+            fields: Campi del pannello (default: close)
+            join: 'outer' (unione delle date, null dove manca un simbolo) o
+                'inner' (solo le date presenti per tutti i simboli)
+            fill: 'ffill' per riportare l'ultimo prezzo sulle date mancanti
+                (volume 0); le date prima della prima barra restano null
+            fill_limit: Massimo di date consecutive riempite
+
+        Returns:
+            {'success': True, 'data': {'layout': 'panel', 'timestamps', 'symbols',
+             'fields', 'values': {campo: matrice data x simbolo}, ...}, 'errors'}
+        """
+        try:
+            fields = list(fields or ['close'])
+            unknown = [field for field in fields if field not in self.PANEL_FIELDS]
+            if unknown:
+                raise ValueError(
+                    f"Campi non supportati: {', '.join(unknown)}. "
+                    f"Usa uno tra {', '.join(self.PANEL_FIELDS)}"
+                )
+            if join not in self.PANEL_JOINS:
+                raise ValueError(f"Join non supportato: {join}. Usa uno tra {', '.join(self.PANEL_JOINS)}")
+            if fill not in (None, 'ffill'):
+                raise ValueError(f"Riempimento non supportato: {fill}. Usa 'ffill'")
+            if fill_limit is not None and fill_limit < 1:
+                raise ValueError("fill_limit deve essere un intero positivo")
+
+            symbols = list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols))
+            data_type = self.get_data_type('1d', adjusted)
+
+            available, errors = [], []
+            for symbol in symbols:
+                status = self.ensure_cached(symbol, start_date, end_date, adjusted=adjusted)
+                if status['success']:
+                    available.append(symbol)
+                else:
+                    errors.append({
+                        'symbol': symbol,
+                        'error': status.get('error', 'Errore sconosciuto')
+                    })
+
+            panels, missing = self.file_manager.load_panel(
+                available, data_type, start_date, end_date, fields=tuple(fields)
+            )
+            errors.extend({'symbol': symbol, 'error': 'Nessun dato in cache per il periodo'}
+                          for symbol in missing)
+            panels = self._align_panel(panels, join, fill, fill_limit)
+
+            data = panel_to_columnar(panels, delta_timestamps=delta_timestamps)
+            data.update({
+                'layout': 'panel',
+                'data_type': data_type,
+                'fields': fields,
+                'join': join,
+                'fill': fill,
+                'count': len(data['timestamps'])
+            })
+            return {
+                'success': True,
+                'data': data,
+                'errors': errors if errors else None
+            }
+
+        except Exception as e:
+            return self.handle_error(e, "get_multiple_panel")
+
+    def _align_panel(self, panels: Dict[str, pd.DataFrame], join: str,
+                     fill: Optional[str], fill_limit: Optional[int]) -> Dict[str, pd.DataFrame]:
+        """
+        Applica join e riempimento a matrici già allineate sull'unione delle date
+        Una data è presente per un simbolo se almeno un campo ha un valore
+        """
+        present = None
+        for panel in panels.values():
+            valid = panel.notna().to_numpy()
+            present = valid if present is None else present | valid
+        if present is None:
+            return panels
+
+        if join == 'inner':
+            rows = present.all(axis=1)
+            panels = {field: panel[rows] for field, panel in panels.items()}
+            present = present[rows]
+
+        if fill == 'ffill':
+            aligned = {}
+            for field, panel in panels.items():
+                if field == 'volume':
+                    # Nessuno scambio nelle date riempite
+                    filled = panel.ffill(limit=fill_limit).notna()
+                    aligned[field] = panel.where(~filled | present, 0.0)
+                else:
+                    aligned[field] = panel.ffill(limit=fill_limit)
+            panels = aligned
+        return panels
+
     def get_stock_info(self, symbol: str) -> Dict[str, Any]:
         """Recupera informazioni dettagliate su un titolo"""
         try:
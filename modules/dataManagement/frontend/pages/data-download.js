@@ -242,8 +242,9 @@ class DataDownloadManager {
         try {
             console.log('Caricamento dati per:', formData);
             
-            // Carica dati principali
-            const response = await this.makeApiCall('POST', '/stock/data', formData);
+            // Carica dati principali (GET: il browser rivalida con ETag)
+            const query = new URLSearchParams(formData).toString();
+            const response = await this.makeApiCall('GET', `/stock/data?${query}`);
             
             console.log('Risposta API:', response);
             
@@ -0,0 +1,90 @@
+"""
+Test per il kernel dei prezzi adjusted
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.adjusted_data import AdjustedDataService
+
+
+class TestAdjustedData:
+    """Test suite per AdjustedDataService.adjust_arrays e calculate_adjusted_prices"""
+
+    @pytest.fixture
+    def service(self):
+        """Fixture per creare istanza del servizio"""
+        return AdjustedDataService()
+
+    @pytest.fixture
+    def records(self):
+        """Record con split, close a zero, valori mancanti e OHLC incoerente"""
+        return [
+            {'date': '2024-01-02', 'open': 100.0, 'high': 110.0, 'low': 95.0,
+             'close': 105.0, 'volume': 1000, 'adj_close': 52.5},
+            {'date': '2024-01-03', 'open': 106.0, 'high': 104.0, 'low': 101.0,
+             'close': 102.0, 'volume': 1100, 'adj_close': 51.0},
+            {'date': '2024-01-04', 'open': 1.0, 'high': 1.0, 'low': 1.0,
+             'close': 0.0, 'volume': 0, 'adj_close': 0.0},
+            {'date': '2024-01-05', 'open': 50.0, 'high': 55.0, 'low': 49.0,
+             'close': 54.0, 'volume': 900, 'adj_close': None},
+        ]
+
+    def test_kernel_matches_pandas_reference(self, service):
+        """Test kernel uguale al calcolo riga per riga con pandas"""
+        rng = np.random.default_rng(48)
+        n = 500
+        close = 100 + rng.normal(0, 5, n)
+        df = pd.DataFrame({
+            'open': close + rng.normal(0, 2, n), 'high': close + rng.normal(0, 2, n),
+            'low': close + rng.normal(0, 2, n), 'close': close,
+            'adj_close': close * rng.uniform(0.5, 1.0, n)
+        })
+        df.loc[3, 'high'] = np.nan
+        original = df.copy()
+
+        result = service.adjust_arrays(df['open'].to_numpy(), df['high'].to_numpy(),
+                                       df['low'].to_numpy(), df['close'].to_numpy(),
+                                       adj_close=df['adj_close'].to_numpy())
+
+        factor = df['adj_close'] / df['close']
+        expected = pd.DataFrame({field: df[field] * factor for field in ('open', 'high', 'low')})
+        expected['close'] = df['adj_close']
+        high = expected.max(axis=1)
+        low = expected[['open', 'low', 'close']].assign(high=high).min(axis=1)
+
+        np.testing.assert_allclose(result['adj_open'], expected['open'])
+        np.testing.assert_allclose(result['adj_high'], high)
+        np.testing.assert_allclose(result['adj_low'], low)
+        assert (result['adj_high'] >= result['adj_low']).all()
+        pd.testing.assert_frame_equal(df, original)
+
+    def test_records_wrapper(self, service, records):
+        """Test wrapper a record: fattore, coerenza OHLC e casi limite"""
+        result = service.calculate_adjusted_prices(records)
+
+        assert len(result) == 4
+        assert list(result[0]) == ['date', 'open', 'high', 'low', 'close', 'volume',
+                                   'adj_close', 'adj_open', 'adj_high', 'adj_low']
+        assert result[0]['adj_open'] == pytest.approx(50.0)
+        assert result[0]['adj_high'] == pytest.approx(55.0)
+        assert result[0]['adj_low'] == pytest.approx(47.5)
+        # Open sopra l'high: l'high adjusted viene corretto
+        assert result[1]['adj_high'] == pytest.approx(53.0)
+        # Close a zero: fattore 1
+        assert result[2]['adj_open'] == 1.0 and result[2]['adj_low'] == 0.0
+        # Adj Close mancante: fattore 1, adj_close resta NaN
+        assert result[3]['adj_open'] == 50.0 and np.isnan(result[3]['adj_close'])
+        assert records[0].keys() == {'date', 'open', 'high', 'low', 'close', 'volume', 'adj_close'}
+
+    def test_without_adjusted_close(self, service, records):
+        """Test senza Adj Close: copiato da Close, prezzi invariati"""
+        result = service.calculate_adjusted_prices(records, has_adjusted=False)
+
+        assert [record['adj_close'] for record in result] == [105.0, 102.0, 0.0, 54.0]
+        assert result[3]['adj_open'] == 50.0 and result[3]['adj_high'] == 55.0
+        assert service.calculate_adjusted_prices([]) == []
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,137 @@
+"""
+Test per l'audit di qualità dei dati in cache
+"""
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.audit import DataAuditService
+
+
+class TestDataAudit:
+    """Test suite per DataAuditService"""
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch):
+        """Servizio su cache temporanea"""
+        monkeypatch.chdir(tmp_path)
+        return DataAuditService()
+
+    @pytest.fixture
+    def clean(self, service):
+        """Un anno di sedute di borsa 2024 con OHLCV coerenti"""
+        sessions = service.sessions()
+        days = sessions[(sessions >= pd.Timestamp('2024-01-01').value // 86_400_000_000_000)
+                        & (sessions <= pd.Timestamp('2024-12-31').value // 86_400_000_000_000)]
+        dates = pd.to_datetime(days, unit='D')
+        close = 100 + np.cumsum(np.random.default_rng(50).normal(0, 1, len(dates)))
+        return pd.DataFrame({
+            'date': dates, 'open': close, 'high': close + 1, 'low': close - 1,
+            'close': close, 'volume': 1_000
+        })
+
+    def test_calendar(self, service, clean):
+        """Test festività NYSE escluse (Venerdì Santo, Juneteenth) e dati puliti senza problemi"""
+        dates = set(clean['date'].dt.strftime('%Y-%m-%d'))
+        assert len(clean) == 252
+        assert not {'2024-03-29', '2024-06-19', '2024-07-04', '2024-12-25'} & dates
+        assert service.audit_frame(clean, 'daily')['counts'] == {}
+
+    def test_historical_calendar(self, service):
+        """Test MLK chiuso solo dal 1998, chiusure straordinarie pre-2001, nulla prima del 1971"""
+        dates = pd.to_datetime(['1969-12-30', '1985-09-26', '1985-09-30', '1990-01-12',
+                                '1990-01-15', '1994-04-26', '1994-04-28', '1998-01-19'])
+        df = pd.DataFrame({'date': dates, 'open': 10.0, 'high': 10.0, 'low': 10.0,
+                           'close': 10.0, 'volume': 100})
+
+        result = service.audit_frame(df, 'daily')
+        off = [issue['date'][:10] for issue in result['issues']
+               if issue['check'] == 'off_calendar']
+        assert off == ['1998-01-19']
+        # Nessun buco sulle chiusure (1985, 1990, 1994): restano solo i salti tra anni
+        previous = {issue['detail']['previous'] for issue in result['issues']
+                    if issue['check'] == 'calendar_gap'}
+        assert previous == {'1985-09-30', '1990-01-15'}
+
+    def test_checks_detect_defects(self, service, clean):
+        """Test ogni controllo sulla riga difettosa, elenco troncato a max_issues"""
+        df = clean.copy()
+        df.loc[5, 'high'] = df.loc[5, 'low'] - 1
+        df.loc[10, 'close'] = -1.0
+        df.loc[11, 'volume'] = -5
+        df.loc[12, 'open'] = np.nan
+        df.loc[100:, ['open', 'high', 'low', 'close']] /= 2
+        df.loc[202, 'date'] = pd.Timestamp('2024-10-19')  # sabato al posto di lunedì 21
+        df = df.drop(index=[150, 151])
+        df = pd.concat([df, df.iloc[[20]]], ignore_index=True)
+
+        result = service.audit_frame(df, 'daily', max_issues=1)
+        counts = result['counts']
+        assert counts['duplicate_timestamp'] == 1 and counts['unsorted_timestamp'] == 1
+        assert counts['missing_value'] == 1 and counts['negative_volume'] == 1
+        assert counts['non_positive_price'] == 1
+        assert counts['ohlc_inconsistent'] == 2  # high sotto il low; close negativo sotto il low
+        assert counts['off_calendar'] == 1
+        assert counts['calendar_gap'] == 2  # due sedute tolte; il lunedì spostato al sabato
+
+        by_check = {issue['check']: issue for issue in result['issues']}
+        assert len(result['issues']) == len(counts)
+        assert by_check['calendar_gap']['detail']['missing_sessions'] == 2
+        jump = by_check['split_like_jump']['detail']
+        assert jump['split'] == '2:1' and jump['ratio'] == pytest.approx(0.5, rel=0.05)
+        assert by_check['missing_value']['detail'] == {'fields': ['open']}
+
+        # Minuti: nessun controllo di calendario
+        assert 'off_calendar' not in service.audit_frame(df, 'minute')['counts']
+
+    def test_split_label(self, service):
+        """Test rapporti di split riconosciuti (diretti e inversi)"""
+        assert service.split_label(0.5) == '2:1'
+        assert service.split_label(10.2) == '1:10'
+        assert service.split_label(0.667) == '3:2'
+        assert service.split_label(0.45) is None
+
+    def test_run_over_cache(self, service, clean, tmp_path):
+        """Test audit di tutta la cache: processo singolo e pool danno lo stesso report"""
+        broken = clean.copy()
+        broken.loc[3, 'low'] = broken.loc[3, 'high'] + 1
+        service.file_manager.save_data('AAA', 'daily', clean)
+        service.file_manager.save_data('BBB', 'dailyAdjusted', broken.assign(adj_close=broken['close']))
+        (service.file_manager.base_path / 'CCC' / 'daily').mkdir(parents=True)
+
+        assert service.list_files() == [('AAA', 'daily'), ('BBB', 'dailyAdjusted')]
+        single = service.run(max_workers=1, output_dir=str(tmp_path / 'audit'))
+        pooled = service.run(max_workers=2, output_dir=None)
+
+        summary = single['summary']
+        assert summary['files'] == 2 and summary['files_with_issues'] == 1
+        assert summary['by_check']['ohlc_inconsistent'] == 1
+        assert pooled['summary']['by_check'] == summary['by_check']
+        assert pooled['issues'] == single['issues']
+        assert single['issues'][0]['symbol'] == 'BBB'
+
+        with open(summary['paths']['issues']) as f:
+            assert [json.loads(line) for line in f] == single['issues']
+        with open(summary['paths']['summary']) as f:
+            assert json.load(f)['files'][0]['counts'] == {'ohlc_inconsistent': 1}
+
+    def test_background_run(self, service, clean):
+        """Test audit su richiesta in background e job periodico disattivato con intervallo 0"""
+        service.file_manager.save_data('AAA', 'daily', clean)
+        assert service.start_schedule(0) is False
+
+        assert service.trigger(max_workers=1, output_dir=None) is True
+        deadline = time.time() + 30
+        while service.status()['running'] and time.time() < deadline:
+            time.sleep(0.05)
+
+        status = service.status()
+        assert status['last_error'] is None and status['last_finished']
+        assert status['summary']['files'] == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
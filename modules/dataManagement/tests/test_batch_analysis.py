@@ -0,0 +1,96 @@
+"""
+Test per l'analisi batch su matrice data x simbolo
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.data_processor import DataProcessor
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+
+
+class TestBatchAnalysis:
+    """Test suite per load_panel e DataProcessor.analyze_panel"""
+
+    @pytest.fixture
+    def processor(self):
+        """Istanza del servizio"""
+        return DataProcessor()
+
+    @pytest.fixture
+    def frames(self):
+        """Tre simboli con storici di lunghezza e inizio diversi"""
+        rng = np.random.default_rng(7)
+        frames = {}
+        for symbol, start, days in (('AAA', '2024-01-01', 120), ('BBB', '2024-02-15', 60),
+                                    ('CCC', '2024-03-01', 10)):
+            frames[symbol] = pd.DataFrame({
+                'date': pd.bdate_range(start, periods=days),
+                'close': 50 + np.cumsum(rng.normal(0, 1, days)),
+                'volume': rng.integers(1_000, 5_000, days)
+            })
+        return frames
+
+    @pytest.fixture
+    def file_manager(self, tmp_path, monkeypatch, frames):
+        """Cache su directory temporanea con i tre simboli salvati"""
+        monkeypatch.chdir(tmp_path)
+        manager = FileManagerService()
+        for symbol, df in frames.items():
+            manager.save_data(symbol, 'dailyAdjusted', df)
+        return manager
+
+    def test_matches_single_analysis(self, processor, frames):
+        """Test ogni riga uguale all'analisi del singolo simbolo"""
+        close = pd.concat({s: df.set_index('date')['close'] for s, df in frames.items()}, axis=1)
+        volume = pd.concat({s: df.set_index('date')['volume'] for s, df in frames.items()}, axis=1)
+
+        table = processor.analyze_panel(close, volume)
+        assert table['count'] == 3
+
+        for row in table['rows']:
+            row = dict(zip(table['columns'], row))
+            single = processor.analyze_frame(row['symbol'], frames[row['symbol']])
+
+            assert row['start'] == single['period']['start']
+            assert row['end'] == single['period']['end']
+            assert row['days'] == single['period']['days']
+            assert row['std'] == pytest.approx(single['price_stats']['std'])
+            assert row['current'] == pytest.approx(single['price_stats']['current'])
+            assert row['volume_total'] == single['volume_stats']['total']
+            assert row['volume_avg'] == single['volume_stats']['daily_avg']
+            assert row['return_total'] == pytest.approx(single['returns']['total'])
+            assert row['worst_day'] == pytest.approx(single['returns']['worst_day'])
+            assert row['volatility_annualized'] == pytest.approx(
+                single['volatility']['annualized']
+            )
+            assert row['trend_short_term'] == single['trends']['short_term']
+            assert row['trend_medium_term'] == single['trends']['medium_term']
+
+    def test_load_panel_aligns_and_reports_missing(self, file_manager):
+        """Test allineamento per data e simboli assenti dalla cache"""
+        panels, missing = file_manager.load_panel(
+            ['AAA', 'BBB', 'ZZZ'], 'dailyAdjusted', '2024-02-01', None,
+            fields=('close', 'volume')
+        )
+
+        assert missing == ['ZZZ']
+        assert list(panels['close'].columns) == ['AAA', 'BBB']
+        assert panels['close'].index.is_monotonic_increasing
+        assert panels['close'].index[0] == pd.Timestamp('2024-02-01')
+        assert panels['close']['BBB'].first_valid_index() == pd.Timestamp('2024-02-15')
+
+    def test_no_cached_symbols(self, file_manager, processor):
+        """Test nessun simbolo in cache: tabella vuota e tutti i simboli in missing"""
+        panels, missing = file_manager.load_panel(
+            ['ZZZQ', 'YYYQ'], 'dailyAdjusted', fields=('close', 'volume')
+        )
+        table = processor.analyze_panel(panels['close'], panels['volume'])
+
+        assert missing == ['ZZZQ', 'YYYQ']
+        assert table['rows'] == [] and table['count'] == 0
+        assert table['columns'][0] == 'symbol'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
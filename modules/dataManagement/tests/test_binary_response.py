@@ -0,0 +1,60 @@
+"""
+Test per i formati di risposta binari (Arrow / MessagePack)
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from werkzeug.datastructures import MIMEAccept
+
+from core.backend.utils.binary import (
+    frame_to_arrow, frame_to_msgpack, negotiate_binary_format
+)
+
+
+class TestBinaryResponse:
+    """Test suite per la negoziazione e serializzazione binaria"""
+
+    @pytest.fixture
+    def cached_df(self):
+        """DataFrame come caricato dalla cache"""
+        return pd.DataFrame({
+            'date': pd.to_datetime(['2024-01-02', '2024-01-03']),
+            'close': [103.123456, 104.5],
+            'volume': [1000, 2000]
+        })
+
+    def test_negotiation(self):
+        """Test scelta del formato dall'header Accept"""
+        assert negotiate_binary_format(MIMEAccept([('*/*', 1)])) is None
+        assert negotiate_binary_format(
+            MIMEAccept([('application/msgpack', 1)])
+        ) == 'msgpack'
+        assert negotiate_binary_format(MIMEAccept([
+            ('application/msgpack', 0.5),
+            ('application/vnd.apache.arrow.stream', 0.9)
+        ])) == 'arrow'
+
+    def test_msgpack_columns(self, cached_df):
+        """Test colonne MessagePack come byte grezzi a piena precisione"""
+        msgpack = pytest.importorskip('msgpack')
+        payload = msgpack.unpackb(frame_to_msgpack(cached_df, {'symbol': 'AAPL'}))
+
+        assert payload['symbol'] == 'AAPL'
+        assert payload['count'] == 2
+        columns = payload['columns']
+        close = np.frombuffer(columns['close']['data'], dtype=columns['close']['dtype'])
+        dates = np.frombuffer(columns['date']['data'], dtype=columns['date']['dtype'])
+        assert close.tolist() == [103.123456, 104.5]
+        assert str(dates[0]) == '2024-01-02T00:00:00.000'
+
+    def test_arrow_stream(self, cached_df):
+        """Test round-trip Arrow IPC stream"""
+        pa = pytest.importorskip('pyarrow')
+        table = pa.ipc.open_stream(frame_to_arrow(cached_df, {'symbol': 'AAPL'})).read_all()
+
+        assert table.schema.metadata[b'symbol'] == b'AAPL'
+        assert table.to_pandas().equals(cached_df)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,90 @@
+"""
+Test per le risposte in formato colonnare
+"""
+import pytest
+import pandas as pd
+
+from modules.dataManagement.backend.services.yahoo_service import YahooFinanceService
+from core.backend.utils.columnar import parse_output_format, records_to_columnar
+
+
+class TestColumnarResponse:
+    """Test suite per format=columnar"""
+
+    @pytest.fixture
+    def service(self):
+        """Fixture per creare istanza del servizio"""
+        return YahooFinanceService()
+
+    @pytest.fixture
+    def cached_df(self):
+        """DataFrame come caricato dalla cache"""
+        return pd.DataFrame({
+            'date': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-04']),
+            'open': [100.004, 101.0, 102.0],
+            'high': [105.0, 106.0, 107.0],
+            'low': [99.0, 100.0, 101.0],
+            'close': [103.0, 104.0, 105.0],
+            'volume': [1000, 2000, 3000],
+            'adj_close': [51.5, 52.0, 52.5]
+        })
+
+    def test_parse_output_format(self):
+        """Test validazione parametro format"""
+        assert parse_output_format(None) == 'records'
+        assert parse_output_format(' Columnar ') == 'columnar'
+
+        with pytest.raises(ValueError):
+            parse_output_format('xml')
+
+    def test_columnar_from_cache(self, service, cached_df):
+        """Test costruzione colonnare direttamente dalla cache"""
+        result = service._prepare_response_from_cache(
+            cached_df, 'AAPL', '2024-01-03', '2024-01-04', output_format='columnar'
+        )
+
+        data = result['data']
+        assert result['success'] is True
+        assert 'records' not in data
+        assert data['format'] == 'columnar'
+        assert data['count'] == 2
+        assert data['first_date'] == '2024-01-03'
+        assert data['timestamps'] == ['2024-01-03', '2024-01-04']
+        assert data['columns']['close'] == [104.0, 105.0]
+        assert data['columns']['volume'] == [2000, 3000]
+        assert data['columns']['adj_close'] == [52.0, 52.5]
+
+    def test_columnar_matches_records(self, service, cached_df):
+        """Test coerenza tra formato records e colonnare"""
+        records = service._prepare_response_from_cache(
+            cached_df, 'AAPL', '2024-01-01', '2024-01-31'
+        )['data']['records']
+        columnar = service._prepare_response_from_cache(
+            cached_df, 'AAPL', '2024-01-01', '2024-01-31', output_format='columnar'
+        )['data']
+
+        for i, record in enumerate(records):
+            assert columnar['timestamps'][i] == record['date']
+            for field, values in columnar['columns'].items():
+                assert values[i] == record[field]
+
+    def test_delta_timestamps(self, service, cached_df):
+        """Test codifica a delta dei timestamp"""
+        data = service._prepare_response_from_cache(
+            cached_df, 'AAPL', '2024-01-01', '2024-01-31',
+            output_format='columnar', delta_timestamps=True
+        )['data']
+
+        assert data['timestamp_encoding'] == 'delta'
+        assert data['timestamps'][0] == 1704153600  # 2024-01-02 00:00:00
+        assert data['timestamps'][1:] == [86400, 86400]
+
+    def test_records_to_columnar_empty(self):
+        """Test conversione di una lista vuota"""
+        payload = records_to_columnar([])
+        assert payload['timestamps'] == []
+        assert payload['columns'] == {}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
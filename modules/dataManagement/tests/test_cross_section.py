@@ -0,0 +1,157 @@
+"""
+Test per l'indice date-major (cross-section di tutti i simboli)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services import cross_section as cross_section_module
+from modules.dataManagement.backend.services.cross_section import RECORD, CrossSectionService
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+
+
+class TestCrossSection:
+    """Test suite per CrossSectionService"""
+
+    @pytest.fixture
+    def frames(self):
+        """Tre simboli con storici diversi a cavallo di più mesi"""
+        rng = np.random.default_rng(45)
+        frames = {}
+        for symbol, start, days in (('AAA', '2024-01-02', 80), ('BBB', '2024-01-15', 60),
+                                    ('CCC', '2024-02-01', 50)):
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+            frames[symbol] = pd.DataFrame({
+                'date': pd.bdate_range(start, periods=days),
+                'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                'volume': rng.integers(1_000, 2_000, days)
+            })
+        return frames
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch, frames):
+        """Cache su directory temporanea con i simboli già salvati (prima dell'indice)"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(cross_section_module, 'CROSS_SECTION_COMPACT_BYTES', 1 << 20)
+        manager = FileManagerService()
+        for symbol, df in frames.items():
+            manager.save_data(symbol, 'dailyAdjusted', df)
+        return manager
+
+    @pytest.fixture
+    def service(self, manager):
+        """Indice registrato come listener di scrittura"""
+        service = CrossSectionService()
+        FileManagerService.add_write_listener(service.on_write)
+        yield service
+        FileManagerService.remove_write_listener(service.on_write)
+
+    @staticmethod
+    def expected(frames, start, end):
+        """Riferimento pandas: righe (date, symbol) con la variazione sul close precedente"""
+        parts = []
+        for symbol, df in frames.items():
+            part = df[['date', 'close', 'volume']].copy()
+            part['symbol'] = symbol
+            part['change_pct'] = part['close'].pct_change() * 100
+            parts.append(part)
+        rows = pd.concat(parts)
+        rows = rows[(rows['date'] >= start) & (rows['date'] <= end)]
+        return rows.sort_values(['date', 'symbol']).reset_index(drop=True)
+
+    def assert_matches(self, service, frames, start, end):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        result = service.query('dailyAdjusted', start, end)
+        expected = self.expected(frames, start, end)
+        assert list(result['symbol']) == list(expected['symbol'])
+        assert (result['date'].to_numpy() == expected['date'].to_numpy()).all()
+        for field in CrossSectionService.FIELDS:
+            np.testing.assert_allclose(result[field], expected[field].astype(float), rtol=1e-12)
+
+    def test_query_matches_pandas(self, service, frames):
+        """Test prima query: l'indice copre i dati salvati prima della sua creazione"""
+        self.assert_matches(service, frames, '2024-02-01', '2024-02-01')
+        self.assert_matches(service, frames, '2024-01-10', '2024-04-30')
+
+        single = service.query('dailyAdjusted', pd.Timestamp('2024-01-05'),
+                               pd.Timestamp('2024-01-05'))
+        assert list(single['symbol']) == ['AAA']
+        assert np.isnan(service.query('dailyAdjusted', pd.Timestamp('2024-01-02'),
+                                      pd.Timestamp('2024-01-02'))['change_pct'][0])
+
+        filtered = service.query('dailyAdjusted', pd.Timestamp('2024-02-01'),
+                                 pd.Timestamp('2024-02-29'), symbols=['CCC'])
+        assert set(filtered['symbol']) == {'CCC'}
+
+    def test_append_is_incremental(self, service, manager, frames, tmp_path):
+        """Test un'append accoda al log solo le righe nuove"""
+        service.query('dailyAdjusted', pd.Timestamp('2024-01-02'), pd.Timestamp('2024-01-02'))
+
+        df = frames['AAA']
+        extra = df.tail(2).copy()
+        extra['date'] = pd.bdate_range(df['date'].iloc[-1] + pd.Timedelta(days=1), periods=2)
+        extra['close'] = [101.0, 103.0]
+        frames['AAA'] = pd.concat([df, extra], ignore_index=True)
+        manager.save_data('AAA', 'dailyAdjusted', frames['AAA'])
+
+        month = extra['date'].iloc[0].strftime('%Y-%m')
+        log = tmp_path / 'resources/data/cross_section/dailyAdjusted' / f'{month}.log'
+        logged = np.frombuffer(log.read_bytes(), dtype=RECORD)
+        assert len(logged) == 2
+        assert (logged['op'] == 0).all()
+        self.assert_matches(service, frames, '2024-01-02', '2024-05-31')
+
+    def test_rewrite_and_clear_apply_tombstones(self, service, manager, frames):
+        """Test storico riscritto o cancellato: le righe vecchie spariscono dall'indice"""
+        service.query('dailyAdjusted', pd.Timestamp('2024-01-02'), pd.Timestamp('2024-01-02'))
+
+        # Storico riscritto e accorciato: niente righe residue nei mesi non più coperti
+        frames['BBB'] = frames['BBB'].iloc[10:30].assign(close=lambda df: df['close'] * 2)
+        manager.save_data('BBB', 'dailyAdjusted', frames['BBB'].reset_index(drop=True))
+        self.assert_matches(service, frames, '2024-01-02', '2024-05-31')
+
+        manager.clear_data('CCC')
+        del frames['CCC']
+        self.assert_matches(service, frames, '2024-01-02', '2024-05-31')
+
+    def test_compaction_preserves_results(self, service, manager, frames):
+        """Test la fusione del log nel file base non cambia le query"""
+        service.query('dailyAdjusted', pd.Timestamp('2024-01-02'), pd.Timestamp('2024-01-02'))
+
+        df = frames['CCC']
+        extra = df.tail(1).copy()
+        extra['date'] = df['date'].iloc[-1] + pd.offsets.BDay()
+        frames['CCC'] = pd.concat([df, extra], ignore_index=True)
+        manager.save_data('CCC', 'dailyAdjusted', frames['CCC'])
+
+        store = service._store_path('dailyAdjusted')
+        month = extra['date'].iloc[0].strftime('%Y-%m')
+        assert (store / f'{month}.log').exists()
+        self.assert_matches(service, frames, '2024-01-02', '2024-05-31')
+
+        assert service.compact('dailyAdjusted', month) > 0
+        assert not (store / f'{month}.log').exists()
+        self.assert_matches(service, frames, '2024-01-02', '2024-05-31')
+
+    def test_rebuild_and_validation(self, service, frames):
+        """Test ricostruzione completa e validazione dell'intervallo"""
+        stats = service.rebuild('dailyAdjusted')
+        assert stats['symbols'] == 3
+        self.assert_matches(service, frames, '2024-01-02', '2024-05-31')
+
+        with pytest.raises(ValueError):
+            service.validate_input({'data_type': 'dailyAdjusted', 'fields': [],
+                                    'start': pd.Timestamp('2024-02-01'),
+                                    'end': pd.Timestamp('2024-01-01')})
+        with pytest.raises(ValueError):
+            service.validate_input({'data_type': 'weekly', 'fields': [],
+                                    'start': pd.Timestamp('2024-01-01'),
+                                    'end': pd.Timestamp('2024-01-01')})
+        with pytest.raises(ValueError):
+            service.validate_input({'data_type': 'dailyAdjusted', 'fields': [],
+                                    'start': pd.Timestamp('2020-01-01'),
+                                    'end': pd.Timestamp('2024-01-01')})
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
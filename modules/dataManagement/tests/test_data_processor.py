@@ -0,0 +1,71 @@
+"""
+Test per il kernel NumPy dell'analisi di base
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.data_processor import DataProcessor
+
+
+class TestDataProcessor:
+    """Test suite per DataProcessor.analyze_arrays"""
+
+    @pytest.fixture
+    def processor(self):
+        """Istanza del servizio"""
+        return DataProcessor()
+
+    @pytest.fixture
+    def frame(self):
+        """Serie giornaliera sintetica di 120 giorni"""
+        rng = np.random.default_rng(1)
+        return pd.DataFrame({
+            'date': pd.bdate_range('2024-01-01', periods=120),
+            'close': 100 + np.cumsum(rng.normal(0, 1, 120)),
+            'volume': rng.integers(1_000, 5_000, 120)
+        })
+
+    def test_matches_pandas(self, processor, frame):
+        """Test risultati uguali al calcolo pandas di riferimento"""
+        result = processor.analyze_frame('TEST', frame)
+        close = frame['close']
+        returns = close.pct_change()
+
+        assert result['period'] == {'start': '2024-01-01', 'end': '2024-06-14', 'days': 120}
+        assert result['price_stats']['std'] == pytest.approx(close.std())
+        assert result['price_stats']['mean'] == pytest.approx(close.mean())
+        assert result['volume_stats']['total'] == int(frame['volume'].sum())
+        assert result['returns']['daily_avg'] == pytest.approx(returns.mean() * 100)
+        assert result['returns']['worst_day'] == pytest.approx(returns.min() * 100)
+        assert result['volatility']['annualized'] == pytest.approx(
+            returns.std() * np.sqrt(252) * 100
+        )
+
+        sma_50 = close.rolling(50).mean().iloc[-1]
+        expected = 'Rialzista' if close.iloc[-1] > sma_50 else 'Ribassista'
+        assert result['trends']['medium_term'] == expected
+
+    def test_records_and_short_series(self, processor):
+        """Test input a record e trend N/A con meno di 20 giorni"""
+        records = [{'date': '2024-01-0%d' % day, 'close': 10.0 + day, 'volume': 100}
+                   for day in range(1, 6)]
+        result = processor.basic_analysis({
+            'symbol': 'TEST', 'records': records,
+            'first_date': '2024-01-01', 'last_date': '2024-01-05'
+        })
+
+        assert result['returns']['total'] == pytest.approx(40 / 11 * 10)
+        assert result['trends'] == {'short_term': 'N/A', 'medium_term': 'N/A'}
+
+    def test_missing_values_ignored(self, processor):
+        """Test valori NaN ignorati nelle statistiche"""
+        close = np.array([10.0, np.nan, 12.0, 11.0])
+        result = processor.analyze_arrays('TEST', 'a', 'b', close, np.ones(4))
+
+        assert result['price_stats']['max'] == 12.0
+        assert result['returns']['best_day'] == pytest.approx(-100 / 12)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,79 @@
+"""
+Test per il downsampling delle serie prezzo
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+from modules.dataManagement.backend.services.downsampling import DownsamplingService
+
+
+class TestDownsamplingService:
+    """Test suite per DownsamplingService"""
+
+    @pytest.fixture
+    def service(self):
+        """Fixture per creare istanza del servizio"""
+        return DownsamplingService()
+
+    @pytest.fixture
+    def prices(self):
+        """Serie giornaliera di 1000 barre"""
+        rng = np.random.default_rng(0)
+        close = 100 + np.cumsum(rng.normal(size=1000))
+        return pd.DataFrame({
+            'date': pd.bdate_range('2020-01-01', periods=1000),
+            'open': close - 0.5,
+            'high': close + 1.0,
+            'low': close - 1.0,
+            'close': close,
+            'volume': rng.integers(100, 1000, 1000)
+        })
+
+    def test_minmax_preserves_extremes(self, service, prices):
+        """Test barre OHLC per bucket: estremi e volume totale conservati"""
+        result = service.downsample(prices, 100, 'minmax')
+
+        assert len(result) == 100
+        assert list(result.columns) == list(prices.columns)
+        assert result['high'].max() == prices['high'].max()
+        assert result['low'].min() == prices['low'].min()
+        assert result['volume'].sum() == prices['volume'].sum()
+        assert result['open'].iloc[0] == prices['open'].iloc[0]
+        assert result['close'].iloc[-1] == prices['close'].iloc[-1]
+
+    def test_lttb_selects_original_rows(self, service, prices):
+        """Test LTTB: righe originali, estremi inclusi, ordine conservato"""
+        result = service.downsample(prices, 50, 'lttb')
+
+        assert len(result) == 50
+        assert result['date'].is_monotonic_increasing
+        assert result['date'].iloc[0] == prices['date'].iloc[0]
+        assert result['date'].iloc[-1] == prices['date'].iloc[-1]
+        assert result['close'].isin(prices['close']).all()
+
+    def test_lttb_keeps_spike(self):
+        """Test che un picco isolato venga sempre selezionato"""
+        y = np.zeros(1000)
+        y[537] = 10.0
+        indices = DownsamplingService.lttb_indices(np.arange(1000.0), y, 20)
+        assert 537 in indices
+
+    def test_small_series_unchanged(self, service, prices):
+        """Test serie già entro il limite"""
+        small = prices.head(10)
+        assert service.downsample(small, 100) is small
+
+    def test_parse_params(self, service):
+        """Test validazione parametri della richiesta"""
+        assert service.parse_params({}) == (None, 'minmax')
+        assert service.parse_params({'max_points': '500', 'downsample': 'LTTB'}) == (500, 'lttb')
+
+        with pytest.raises(ValueError):
+            service.parse_params({'max_points': 2})
+        with pytest.raises(ValueError):
+            service.parse_params({'max_points': 100, 'downsample': 'avg'})
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
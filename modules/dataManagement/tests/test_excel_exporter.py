@@ -0,0 +1,69 @@
+"""
+Test per l'export Excel in streaming
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from modules.dataManagement.backend.services.excel_exporter import ExcelExportService
+
+
+class TestExcelExportService:
+    """Test suite per ExcelExportService"""
+
+    @pytest.fixture
+    def service(self):
+        """Fixture per creare istanza del servizio"""
+        return ExcelExportService()
+
+    @staticmethod
+    def batches(n_batches, size):
+        """Batch di prezzi come letti dalla cache"""
+        for i in range(n_batches):
+            yield pd.DataFrame({
+                'date': [f'2024-01-{i + 1:02d}'] * size,
+                'close': np.arange(size, dtype=float),
+                'volume': np.arange(size, dtype=np.int64)
+            })
+
+    def test_batches_written_in_order(self, service):
+        """Test scrittura di più batch nello stesso foglio"""
+        output = service.build_workbook([('Price Data', self.batches(3, 4))])
+        sheet = load_workbook(output)['Price Data']
+
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[0] == ('date', 'close', 'volume')
+        assert len(rows) == 13
+        assert rows[-1] == ('2024-01-03', 3.0, 3)
+
+    def test_sheet_rollover(self, service, monkeypatch):
+        """Test continuazione su un nuovo foglio oltre il limite righe"""
+        monkeypatch.setattr(ExcelExportService, 'MAX_SHEET_ROWS', 5)
+        output = service.build_workbook([('Data', self.batches(2, 5))])
+        workbook = load_workbook(output)
+
+        assert workbook.sheetnames == ['Data', 'Data (2)', 'Data (3)']
+        assert workbook['Data (3)'].max_row == 3  # header + 2 righe
+
+    def test_nan_and_sheet_names(self, service):
+        """Test NaN come celle vuote e nomi foglio sanitizzati/univoci"""
+        frame = pd.DataFrame({'close': [1.0, np.nan]})
+        output = service.build_workbook([
+            ('A/B', [frame]),
+            ('a/b', [frame]),
+            ('Empty', [])
+        ])
+        workbook = load_workbook(output)
+
+        assert workbook.sheetnames == ['A_B', 'a_b (2)', 'Empty']
+        assert workbook['A_B']['A3'].value is None
+
+    def test_empty_sheets_rejected(self, service):
+        """Test validazione lista fogli vuota"""
+        with pytest.raises(ValueError):
+            service.build_workbook([])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
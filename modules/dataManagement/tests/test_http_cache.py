@@ -0,0 +1,74 @@
+"""
+Test per cache HTTP condizionale e compressione delle risposte
+"""
+import gzip
+
+import pytest
+from flask import Flask, jsonify
+
+from core.backend.middleware.compression import init_compression
+from core.backend.middleware.http_cache import conditional
+
+
+class TestHttpCache:
+    """Test suite per ETag/304 e compressione"""
+
+    @pytest.fixture
+    def state(self):
+        """Versione corrente dei dati e conteggio letture"""
+        return {'version': ('v1', 1700000000.0), 'reads': 0}
+
+    @pytest.fixture
+    def client(self, state):
+        """App minima con un endpoint condizionale"""
+        app = Flask(__name__)
+        init_compression(app, min_size=100)
+
+        @app.route('/data', methods=['GET', 'POST'])
+        @conditional(lambda params: state['version'])
+        def data():
+            state['reads'] += 1
+            return jsonify({'success': True, 'data': {'records': [{'close': 1.5}] * 50}})
+
+        return app.test_client()
+
+    def test_not_modified(self, client, state):
+        """Test 304 con If-None-Match senza eseguire la view"""
+        first = client.get('/data?symbol=AAPL')
+        etag = first.headers['ETag']
+
+        assert first.status_code == 200
+        assert 'must-revalidate' in first.headers['Cache-Control']
+        assert first.headers['Last-Modified']
+
+        second = client.get('/data?symbol=AAPL', headers={'If-None-Match': etag})
+        assert second.status_code == 304
+        assert second.headers['ETag'] == etag
+        assert state['reads'] == 1
+
+    def test_etag_changes(self, client, state):
+        """Test ETag diverso per parametri o versione dei dati diversi"""
+        etag = client.get('/data?symbol=AAPL').headers['ETag']
+
+        assert client.get('/data?symbol=MSFT', headers={'If-None-Match': etag}).status_code == 200
+
+        state['version'] = ('v2', 1700000100.0)
+        assert client.get('/data?symbol=AAPL', headers={'If-None-Match': etag}).status_code == 200
+
+    def test_post_not_conditional(self, client):
+        """Test che le richieste POST non ricevano header di cache"""
+        response = client.post('/data', json={'symbol': 'AAPL'})
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+
+    def test_gzip_compression(self, client):
+        """Test compressione gzip sopra soglia"""
+        response = client.get('/data', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert b'"close"' in gzip.decompress(response.data)
+        assert 'Content-Encoding' not in client.get('/data').headers
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
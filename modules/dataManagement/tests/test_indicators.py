@@ -0,0 +1,93 @@
+"""
+Test per il motore degli indicatori tecnici
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.indicators import IndicatorService
+
+
+class TestIndicatorService:
+    """Test suite per IndicatorService"""
+
+    @pytest.fixture
+    def service(self, tmp_path):
+        """Servizio con cache su directory temporanea"""
+        service = IndicatorService()
+        service.file_manager.base_path = tmp_path
+        return service
+
+    @pytest.fixture
+    def prices(self):
+        """500 barre giornaliere sintetiche"""
+        rng = np.random.default_rng(3)
+        close = 50 + np.abs(np.cumsum(rng.normal(0, 1, 500)))
+        return pd.DataFrame({
+            'date': pd.bdate_range('2020-01-01', periods=500),
+            'open': close,
+            'high': close + rng.random(500),
+            'low': close - rng.random(500),
+            'close': close,
+            'volume': rng.integers(100, 1_000, 500)
+        })
+
+    def test_matches_pandas(self, service, prices):
+        """Test serie uguali alle implementazioni pandas di riferimento"""
+        series, _ = service.compute(prices)
+        close = prices['close']
+
+        np.testing.assert_allclose(series['sma_20'], close.rolling(20).mean(), rtol=1e-10)
+        np.testing.assert_allclose(series['ema_26'], close.ewm(span=26, adjust=False).mean(),
+                                   rtol=1e-10)
+
+        change = close.diff()
+        gain = change.clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        loss = (-change).clip(lower=0).ewm(alpha=1 / 14, adjust=False).mean()
+        rsi = 100 - 100 / (1 + gain / loss)
+        rsi[:14] = np.nan
+        np.testing.assert_allclose(series['rsi_14'], rsi, rtol=1e-10)
+
+        upper = close.rolling(20).mean() + 2 * close.rolling(20).std(ddof=0)
+        np.testing.assert_allclose(series['bb_upper'], upper, rtol=1e-10)
+
+    def test_incremental_update(self, service, prices):
+        """Test calcolo della sola coda dopo un append identico al ricalcolo completo"""
+        records = prices.to_dict('records')
+        manager = service.file_manager
+        manager.save_data('TEST', 'daily', records[:300])
+        service.update('TEST', 'daily')
+
+        manager.append_data('TEST', 'daily', records[300:])
+        incremental = service.update('TEST', 'daily')
+
+        manager.get_indicator_file('TEST', 'daily').unlink()
+        full = service.update('TEST', 'daily')
+
+        assert len(incremental) == 500
+        for column in full.columns[1:]:
+            np.testing.assert_allclose(incremental[column], full[column], rtol=1e-9)
+
+    def test_rewritten_prices_recomputed(self, service, prices):
+        """Test ricalcolo completo se il file prezzi non prosegue le serie salvate"""
+        records = prices.to_dict('records')
+        service.file_manager.save_data('TEST', 'daily', records)
+        service.update('TEST', 'daily')
+
+        changed = prices.assign(close=prices['close'] * 2).to_dict('records')
+        service.file_manager.save_data('TEST', 'daily', changed)
+        series = service.get_indicators('TEST', 'daily', indicators=['sma'])
+
+        np.testing.assert_allclose(series['sma_20'], (prices['close'] * 2).rolling(20).mean(),
+                                   rtol=1e-10)
+
+    def test_parse_indicators(self, service):
+        """Test parametro indicators"""
+        assert service.parse_indicators(None) == list(IndicatorService.INDICATORS)
+        assert service.parse_indicators('RSI, macd') == ['rsi', 'macd']
+        with pytest.raises(ValueError):
+            service.parse_indicators(['stochastic'])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
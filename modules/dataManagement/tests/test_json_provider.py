@@ -0,0 +1,66 @@
+"""
+Test per il JSON provider basato su orjson
+"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from flask import Flask, jsonify
+
+from core.backend.utils.json_provider import OrjsonProvider, init_json_provider
+
+pytest.importorskip('orjson')
+
+
+class TestJsonProvider:
+    """Test suite per OrjsonProvider"""
+
+    @pytest.fixture
+    def app(self):
+        """App Flask con provider orjson"""
+        app = Flask(__name__)
+        assert init_json_provider(app, 'orjson') == 'orjson'
+        return app
+
+    def test_numpy_and_datetime(self, app):
+        """Test serializzazione nativa di array NumPy, Timestamp e NaN"""
+        with app.app_context():
+            body = jsonify({
+                'close': np.array([1.5, np.nan]),
+                'volume': np.int64(10),
+                'date': pd.Timestamp('2024-01-02 09:30'),
+                'missing': pd.NaT
+            }).get_data()
+
+        assert json.loads(body) == {
+            'close': [1.5, None],
+            'volume': 10,
+            'date': '2024-01-02T09:30:00',
+            'missing': None
+        }
+
+    def test_matches_default_output(self, app):
+        """Test output compatto e con chiavi ordinate come il provider standard"""
+        payload = {'success': True, 'data': {'b': [1, 2.5], 'a': 'x'}}
+        with app.app_context():
+            fast = jsonify(payload).get_data()
+
+        default = Flask(__name__)
+        with default.app_context():
+            assert fast == jsonify(payload).get_data()
+
+    def test_fallback_to_json(self, app):
+        """Test ripiego su json per valori non supportati da orjson"""
+        provider = OrjsonProvider(app)
+        assert json.loads(provider.dumps({'big': 2 ** 70})) == {'big': 2 ** 70}
+        assert provider.loads(b'{"a": 1}') == {'a': 1}
+
+    def test_unknown_provider(self, app):
+        """Test errore per provider non configurato"""
+        with pytest.raises(ValueError):
+            init_json_provider(app, 'ujson')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
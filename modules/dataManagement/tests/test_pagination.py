@@ -0,0 +1,92 @@
+"""
+Test per la paginazione a cursore con indice sparso sui timestamp
+"""
+import pytest
+import pandas as pd
+
+from core.backend.utils.pagination import decode_cursor, encode_cursor, parse_limit
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+
+
+class TestPagination:
+    """Test suite per indice sparso, read_page e cursori"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        """FileManager su directory temporanea con 1000 barre giornaliere"""
+        manager = FileManagerService()
+        manager.base_path = tmp_path
+        dates = pd.bdate_range('2020-01-01', periods=1000)
+        records = [
+            {'date': date, 'open': float(i), 'high': i + 1.0, 'low': i - 1.0,
+             'close': float(i), 'volume': i}
+            for i, date in enumerate(dates)
+        ]
+        manager.save_data('TEST', 'daily', records)
+        return manager
+
+    def test_index_built_on_save(self, manager):
+        """Test indice creato al salvataggio con una voce ogni stride righe"""
+        manager.build_index('TEST', 'daily', stride=64)
+        index = manager.load_index('TEST', 'daily')
+
+        assert len(index['keys']) == 16
+        assert int(index['stride']) == 64
+        assert manager.get_index_file('TEST', 'daily').exists()
+
+    def test_pages_match_full_load(self, manager):
+        """Test concatenazione delle pagine identica al caricamento completo"""
+        manager.build_index('TEST', 'daily', stride=64)
+        full = manager.load_data('TEST', 'daily')
+        full = full[(full['date'] >= '2020-03-01') & (full['date'] <= '2022-06-30')]
+
+        pages, after, has_more = [], None, True
+        while has_more:
+            page, has_more = manager.read_page(
+                'TEST', 'daily', '2020-03-01', '2022-06-30', after=after, limit=70
+            )
+            assert len(page) <= 70
+            pages.append(page)
+            after = page['date'].iloc[-1].value
+
+        combined = pd.concat(pages, ignore_index=True)
+        assert combined['date'].tolist() == full['date'].tolist()
+        assert combined['close'].tolist() == full['close'].tolist()
+
+    def test_stale_index_rebuilt(self, manager):
+        """Test indice ricostruito se il file cambia dopo la sua creazione"""
+        manager.append_data('TEST', 'daily', [{
+            'date': '2030-01-01', 'open': 1.0, 'high': 1.0, 'low': 1.0,
+            'close': 1.0, 'volume': 1
+        }])
+        # Simula un indice vecchio: file dati modificato senza ricostruirlo
+        with open(manager.get_data_file('TEST', 'daily'), 'a') as f:
+            f.write('2030-01-02,2.0,2.0,2.0,2.0,2\n')
+
+        page, has_more = manager.read_page('TEST', 'daily', '2030-01-01', limit=5)
+        assert page['close'].tolist() == [1.0, 2.0]
+        assert has_more is False
+
+    def test_cursor_roundtrip(self):
+        """Test cursore opaco legato a simbolo e tipo dati"""
+        cursor = encode_cursor('AAPL', 'daily', 123)
+        assert decode_cursor(cursor, 'AAPL', 'daily') == 123
+        assert decode_cursor(None, 'AAPL', 'daily') is None
+
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, 'MSFT', 'daily')
+        with pytest.raises(ValueError):
+            decode_cursor('non-un-cursore', 'AAPL', 'daily')
+
+    def test_parse_limit(self):
+        """Test validazione del parametro limit"""
+        assert parse_limit(None) is None
+        assert parse_limit('50') == 50
+        with pytest.raises(ValueError):
+            parse_limit(0)
+        with pytest.raises(ValueError):
+            parse_limit('abc')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,102 @@
+"""
+Test per il layout 'panel' di /stock/multiple (date condivise, matrici data x simbolo)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.dataManagement.backend.services.yahoo_service import YahooFinanceService
+
+
+class TestPanelLayout:
+    """Test suite per YahooFinanceService.get_multiple_panel"""
+
+    @pytest.fixture
+    def frames(self):
+        """AAA completo, BBB quotato dopo e con una seduta mancante"""
+        dates = pd.bdate_range('2024-01-02', periods=10)
+        aaa = pd.DataFrame({
+            'date': dates, 'open': 10.0, 'high': 11.0, 'low': 9.0,
+            'close': np.arange(10, 20, dtype=float), 'volume': 100
+        })
+        bbb_dates = dates[3:].delete(3)
+        bbb = pd.DataFrame({
+            'date': bbb_dates, 'open': 50.0, 'high': 51.0, 'low': 49.0,
+            'close': np.arange(50, 50 + len(bbb_dates), dtype=float), 'volume': 200
+        })
+        return {'AAA': aaa, 'BBB': bbb}
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch, frames):
+        """Servizio su cache temporanea, senza download"""
+        monkeypatch.chdir(tmp_path)
+        service = YahooFinanceService()
+        for symbol, df in frames.items():
+            service.file_manager.save_data(symbol, 'dailyAdjusted', df)
+        monkeypatch.setattr(service, 'ensure_cached', lambda symbol, *args, **kwargs: {
+            'success': symbol != 'ZZZ', 'error': 'Simbolo non trovato',
+            'data': {'symbol': symbol, 'data_type': 'dailyAdjusted'}
+        })
+        return service
+
+    def test_outer_join_matches_records(self, service, frames):
+        """Test unione delle date: ogni cella uguale al record del simbolo (null se assente)"""
+        result = service.get_multiple_panel(['AAA', 'bbb'], '2024-01-01', '2024-01-31',
+                                            fields=['close', 'volume'])
+        data = result['data']
+
+        assert result['success'] is True and result['errors'] is None
+        assert data['layout'] == 'panel'
+        assert data['symbols'] == ['AAA', 'BBB']
+        assert data['timestamps'] == frames['AAA']['date'].dt.strftime('%Y-%m-%d').tolist()
+        for column, symbol in enumerate(data['symbols']):
+            by_date = frames[symbol].set_index(frames[symbol]['date'].dt.strftime('%Y-%m-%d'))
+            for row, date in enumerate(data['timestamps']):
+                expected = by_date['close'].get(date)
+                assert data['values']['close'][row][column] == expected
+        assert data['values']['close'][0] == [10.0, None]
+
+    def test_inner_join_and_ffill(self, service):
+        """Test solo date comuni e riempimento in avanti (volume 0 nelle date riempite)"""
+        inner = service.get_multiple_panel(['AAA', 'BBB'], '2024-01-01', '2024-01-31',
+                                           join='inner')['data']
+        assert inner['count'] == 6
+        assert all(None not in row for row in inner['values']['close'])
+
+        filled = service.get_multiple_panel(['AAA', 'BBB'], '2024-01-01', '2024-01-31',
+                                            fields=['close', 'volume'], fill='ffill')['data']
+        close, volume = filled['values']['close'], filled['values']['volume']
+        # Prima della prima barra nessun riempimento; seduta mancante di BBB riempita
+        assert close[2][1] is None
+        assert close[6] == [16.0, 52.0] and volume[6] == [100.0, 0.0]
+        assert close[7] == [17.0, 53.0] and volume[7] == [100.0, 200.0]
+
+    def test_missing_symbols_and_validation(self, service):
+        """Test simboli senza dati riportati in errors, parametri non validi rifiutati"""
+        result = service.get_multiple_panel(['AAA', 'ZZZ', 'CCC'], '2024-01-01', '2024-01-31')
+        assert result['data']['symbols'] == ['AAA']
+        assert [error['symbol'] for error in result['errors']] == ['ZZZ', 'CCC']
+
+        for kwargs in ({'fields': ['adj_close']}, {'join': 'left'}, {'fill': 'bfill'},
+                       {'fill': 'ffill', 'fill_limit': 0}):
+            result = service.get_multiple_panel(['AAA'], '2024-01-01', '2024-01-31', **kwargs)
+            assert result['success'] is False
+
+    def test_date_range_without_full_read(self, tmp_path, monkeypatch, frames):
+        """Test prima / ultima data lette da indice e coda del file"""
+        monkeypatch.chdir(tmp_path)
+        manager = FileManagerService()
+        manager.save_data('BBB', 'dailyAdjusted', frames['BBB'])
+
+        def fail(*args, **kwargs):
+            raise AssertionError("lettura completa non attesa")
+        monkeypatch.setattr(manager, 'load_data', fail)
+
+        first, last = manager.get_date_range('BBB', 'dailyAdjusted')
+        assert first == frames['BBB']['date'].iloc[0]
+        assert last == frames['BBB']['date'].iloc[-1]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,251 @@
+"""
+Test per lo storage a barre grezze + fattori di rettifica (dailyAdjusted calcolato in lettura)
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.adjusted_data import AdjustedDataService
+from modules.dataManagement.backend.services.cross_section import CrossSectionService
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.dataManagement.backend.services.indicators import IndicatorService
+from modules.dataManagement.backend.services.timeframes import TimeframeService
+from modules.dataManagement.backend.services.yahoo_service import YahooFinanceService
+
+
+class TestRawBarStore:
+    """Test suite per FileManagerService.save_factors / letture derivate e download giornaliero"""
+
+    @pytest.fixture
+    def history(self):
+        """60 sedute grezze con due dividendi (moltiplicatori 0.98 e 0.99)"""
+        rng = np.random.default_rng(49)
+        dates = pd.bdate_range('2024-01-02', periods=60)
+        close = np.round(100 + np.cumsum(rng.normal(0, 1, len(dates))), 2)
+        df = pd.DataFrame({
+            'date': dates, 'open': np.round(close + rng.normal(0, 0.5, len(dates)), 2),
+            'high': close + 1.0, 'low': close - 1.0, 'close': close,
+            'volume': rng.integers(1_000, 5_000, len(dates))
+        })
+        return df, {dates[20]: 0.98, dates[45]: 0.99}
+
+    @staticmethod
+    def yahoo_records(df, dividends, start, end):
+        """Download simulato: righe in [start, end), fattori rispetto all'ultima seduta nota"""
+        known = {date: m for date, m in dividends.items() if date < pd.Timestamp(end)}
+        factor = np.ones(len(df))
+        for date, multiplier in known.items():
+            factor[(df['date'] < date).to_numpy()] *= multiplier
+        mask = ((df['date'] >= pd.Timestamp(start)) & (df['date'] < pd.Timestamp(end))).to_numpy()
+        records = df[mask].assign(adj_factor=factor[mask], adj_close=df['close'][mask] * factor[mask])
+        records['date'] = records['date'].dt.strftime('%Y-%m-%d')
+        return records.to_dict('records')
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch, history):
+        """Servizio su cache temporanea con download simulato"""
+        monkeypatch.chdir(tmp_path)
+        service = YahooFinanceService()
+        service.downloads = []
+
+        def download(symbol, start_date, end_date, interval='1d'):
+            service.downloads.append((start_date, end_date))
+            records = self.yahoo_records(*service.history, start_date, end_date)
+            return {'success': True, 'data': {'symbol': symbol, 'records': records}}
+        monkeypatch.setattr(service, '_download_from_yahoo', download)
+        service.history = history
+        return service
+
+    def test_factor_events_roundtrip(self):
+        """Test compressione negli eventi e ricostruzione del fattore di ogni seduta"""
+        adjuster = AdjustedDataService()
+        dates = pd.bdate_range('2024-01-02', periods=8)
+        factors = np.array([0.5, 0.5 * (1 + 1e-8), 0.5, 0.8, 0.8, np.nan, 0.8, 1.0])
+
+        events = adjuster.factor_events(dates, factors)
+        assert list(events['date']) == [dates[3], dates[7]]
+        np.testing.assert_allclose(events['multiplier'], [0.625, 0.8])
+
+        rebuilt = adjuster.factor_series(dates, events)
+        np.testing.assert_allclose(rebuilt, [0.5, 0.5, 0.5, 0.8, 0.8, 0.8, 0.8, 1.0])
+        assert (adjuster.factor_series(dates, events.iloc[:0]) == 1.0).all()
+
+    def test_single_raw_copy_matches_legacy_adjusted(self, service, history):
+        """Test una sola copia delle barre; letture adjusted uguali al vecchio calcolo a record"""
+        df, dividends = history
+        records = self.yahoo_records(df, dividends, '2024-01-01', '2024-12-31')
+        status = service.ensure_cached('AAA', '2024-01-01', '2024-12-31')
+        assert status['success'] and status['data']['data_type'] == 'dailyAdjusted'
+
+        manager = service.file_manager
+        assert not (manager.get_data_path('AAA', 'dailyAdjusted') / 'AAA_dailyAdjusted.csv').exists()
+        assert len(manager.load_factors('AAA')) == 2
+        listed = {entry['type']: entry for entry in manager.list_available_symbols()[0]['data_types']}
+        assert listed['dailyAdjusted']['record_count'] == 60
+        assert listed['dailyAdjusted']['last_update'] is not None
+        assert listed['dailyAdjusted']['last_update'] == listed['daily']['last_update']
+
+        expected = pd.DataFrame(service.adjusted_service.calculate_adjusted_prices(records))
+        derived = manager.load_data('AAA', 'dailyAdjusted')
+        for column in ('adj_close', 'adj_open', 'adj_high', 'adj_low'):
+            np.testing.assert_allclose(derived[column], expected[column], rtol=1e-12)
+        np.testing.assert_allclose(derived['close'], expected['adj_close'], rtol=1e-12)
+        assert list(manager.load_data('AAA', 'daily').columns) == \
+            ['date', 'open', 'high', 'low', 'close', 'volume']
+
+        # Stesse colonne adjusted da selezione, batch, pagina e coda
+        subset = manager.load_data('AAA', 'dailyAdjusted', columns=['date', 'adj_close'])
+        assert list(subset.columns) == ['date', 'adj_close']
+        batches = pd.concat(manager.iter_batches('AAA', 'dailyAdjusted', batch_size=7))
+        page, _ = manager.read_page('AAA', 'dailyAdjusted', after=None, limit=None)
+        tail = manager.read_tail('AAA', 'dailyAdjusted', 5)
+        np.testing.assert_allclose(batches['adj_close'], derived['adj_close'])
+        np.testing.assert_allclose(page['adj_low'], derived['adj_low'])
+        np.testing.assert_allclose(tail['adj_close'], derived['adj_close'].tail(5))
+
+    def test_adjusted_close_keeps_auto_adjust_semantics(self, service, history):
+        """Test close di dailyAdjusted rettificato come con auto_adjust: rendimento col dividendo"""
+        df, dividends = history
+        service.ensure_cached('AAA', '2024-01-01', '2024-12-31')
+        manager = service.file_manager
+        expected = pd.DataFrame(self.yahoo_records(df, dividends, '2024-01-01', '2024-12-31'))
+        factor = expected['adj_factor'].to_numpy()
+
+        derived = manager.load_data('AAA', 'dailyAdjusted')
+        np.testing.assert_allclose(derived['close'], expected['adj_close'], rtol=1e-12)
+        for field in ('open', 'high', 'low'):
+            np.testing.assert_allclose(derived[field], df[field] * factor, rtol=1e-12)
+        np.testing.assert_allclose(derived['adj_close'], derived['close'])
+
+        # Rendimento nel giorno di stacco: variazione di prezzo più il dividendo
+        day = df.index[df['date'] == list(dividends)[0]][0]
+        raw_return = df['close'][day] / df['close'][day - 1] - 1
+        adjusted_return = derived['close'][day] / derived['close'][day - 1] - 1
+        assert adjusted_return == pytest.approx((1 + raw_return) / 0.98 - 1, rel=1e-12)
+        assert manager.load_data('AAA', 'daily')['close'][day] == df['close'][day]
+
+        # Stessi close rettificati dalle letture per colonna (backtest, rischio, batch)
+        subset = manager.load_data('AAA', 'dailyAdjusted', columns=['date', 'close'])
+        assert list(subset.columns) == ['date', 'close']
+        np.testing.assert_allclose(subset['close'], derived['close'])
+        panels, _ = manager.load_panel(['AAA'], 'dailyAdjusted', fields=('close', 'volume'))
+        np.testing.assert_allclose(panels['close']['AAA'], derived['close'])
+
+    def test_dividend_is_one_row_update(self, service, history):
+        """Test download incrementale con una seduta in comune: un dividendo aggiunge un solo evento"""
+        df, dividends = history
+        dates = df['date']
+        manager = service.file_manager
+        last_cached = dates[44].strftime('%Y-%m-%d')
+
+        service.ensure_cached('AAA', '2024-01-01', dates[45].strftime('%Y-%m-%d'))
+        assert len(manager.load_factors('AAA')) == 1
+        version = manager.get_data_version('AAA', 'dailyAdjusted')
+
+        end = dates[59].strftime('%Y-%m-%d')
+        service.ensure_cached('AAA', '2024-01-02', end)
+        assert service.downloads[-1] == (last_cached, end)
+
+        events = manager.load_factors('AAA')
+        assert list(events['date']) == [dates[20], dates[45]]
+        assert manager.get_data_version('AAA', 'dailyAdjusted') != version
+
+        derived = manager.load_data('AAA', 'dailyAdjusted')
+        expected = self.yahoo_records(df, dividends, '2024-01-01', end)
+        np.testing.assert_allclose(derived['adj_close'], [r['adj_close'] for r in expected])
+
+    def test_refresh_without_events(self, service, history):
+        """Test simbolo senza dividendi: file fattori vuoto, aggiornamenti successivi riusciti"""
+        df, _ = history
+        service.history = (df, {})
+        manager = service.file_manager
+        dates = df['date'].dt.strftime('%Y-%m-%d')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', FutureWarning)
+            assert service.ensure_cached('AAA', '2024-01-02', dates[30])['success']
+            assert service.ensure_cached('AAA', '2024-01-02', dates[45])['success']
+            assert service.ensure_cached('AAA', '2024-01-02', dates[59])['success']
+
+        events = manager.load_factors('AAA')
+        assert events.empty and events['multiplier'].dtype == np.float64
+        derived = manager.load_data('AAA', 'dailyAdjusted')
+        assert len(derived) == 59
+        np.testing.assert_allclose(derived['close'], df['close'][:59])
+
+    def test_new_dividend_rewrites_derived_indexes(self, service, history):
+        """Test nuovo dividendo: cross-section, barre settimanali e indicatori adjusted ricalcolati"""
+        df, _ = history
+        manager = service.file_manager
+        cross_section, timeframes = CrossSectionService(), TimeframeService()
+        indicators = IndicatorService()
+        notified = []
+        listener = lambda symbol, data_type, frame: notified.append(data_type)
+        listeners = (cross_section.on_write, timeframes.on_write, listener)
+        for callback in listeners:
+            FileManagerService.add_write_listener(callback)
+        try:
+            dates = df['date']
+            service.ensure_cached('AAA', '2024-01-02', dates[45].strftime('%Y-%m-%d'))
+            timeframes.refresh('AAA', 'dailyAdjusted', '1wk')
+            day = dates[2]
+            cross_section.query('dailyAdjusted', day, day)
+            indicators.update('AAA', 'dailyAdjusted')
+
+            def check():
+                derived = manager.load_data('AAA', 'dailyAdjusted')
+                row = cross_section.query('dailyAdjusted', day, day)
+                assert row['close'].iloc[0] == pytest.approx(derived['close'][2], rel=1e-12)
+                weekly = manager.load_data('AAA', 'weeklyAdjusted')
+                np.testing.assert_allclose(weekly['close'],
+                                           timeframes.resample(derived, '1wk')['close'])
+                np.testing.assert_allclose(indicators.update('AAA', 'dailyAdjusted')['ema_12'],
+                                           indicators.compute(derived)[0]['ema_12'])
+
+            # Dividendo sull'ultima seduta scaricata: una sola notifica, fattori già salvati
+            notified.clear()
+            service.ensure_cached('AAA', '2024-01-02', dates[59].strftime('%Y-%m-%d'))
+            assert notified.count('dailyAdjusted') == 1
+            check()
+
+            # Fattori cambiati senza nuove barre (ultima riga invariata): stato non più valido
+            events = pd.concat([manager.load_factors('AAA'), pd.DataFrame(
+                {'date': [dates[58]], 'multiplier': [0.95]})], ignore_index=True)
+            manager.save_factors('AAA', events)
+            check()
+        finally:
+            for callback in listeners:
+                FileManagerService.remove_write_listener(callback)
+
+    def test_explicit_copy_clear_and_migration(self, service, history):
+        """Test copia adjusted esplicita, cancellazione propagata e migrazione di una vecchia copia"""
+        df, _ = history
+        manager = service.file_manager
+        notified = []
+        listener = lambda symbol, data_type, frame: notified.append((data_type, frame is None))
+        FileManagerService.add_write_listener(listener)
+        try:
+            service.ensure_cached('AAA', '2024-01-01', '2024-12-31')
+            manager.clear_data('AAA', 'daily')
+            assert ('dailyAdjusted', True) in notified and ('daily', True) in notified
+            assert manager.get_data_version('AAA', 'dailyAdjusted') is None
+
+            # Vecchia copia completa: letta finché basta, migrata al primo download
+            manager.save_data('AAA', 'dailyAdjusted', df.head(30).assign(adj_close=df['close'].head(30)))
+            assert not manager.is_derived('AAA', 'dailyAdjusted')
+            assert service.ensure_cached('AAA', '2024-01-10', '2024-01-20')['success']
+            assert service.downloads == [('2024-01-01', '2024-12-31')]
+
+            service.ensure_cached('AAA', '2024-01-10', '2024-12-31')
+            assert service.downloads[-1] == ('2024-01-02', '2024-12-31')
+            assert manager.is_derived('AAA', 'dailyAdjusted')
+            assert not (manager.get_data_path('AAA', 'dailyAdjusted') / 'AAA_dailyAdjusted.csv').exists()
+            assert len(manager.load_data('AAA', 'dailyAdjusted')) == 60
+        finally:
+            FileManagerService.remove_write_listener(listener)
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,82 @@
+"""
+Test per la decodifica dei body delle richieste (gzip, MessagePack, Arrow)
+"""
+import gzip
+import json
+
+import pandas as pd
+import pytest
+from flask import Flask, jsonify
+
+from core.backend.middleware.request_decoding import (
+    data_reference, decompress_body, request_payload
+)
+from core.backend.utils.binary import binary_format_available, frame_to_msgpack
+
+
+class TestRequestDecoding:
+    """Test suite per request_payload e decompress_body"""
+
+    @pytest.fixture
+    def client(self):
+        """App con un endpoint che descrive il body decodificato"""
+        app = Flask(__name__)
+
+        @app.route('/echo', methods=['POST'])
+        def echo():
+            payload = request_payload()
+            records = payload.pop('records', None)
+            return jsonify({
+                'params': payload,
+                'frame': isinstance(records, pd.DataFrame),
+                'count': len(records) if records is not None else 0
+            })
+
+        return app.test_client()
+
+    def test_gzip_json(self, client):
+        """Test body JSON compresso con Content-Encoding gzip"""
+        body = gzip.compress(json.dumps({'records': [{'a': 1}], 'timeframe': '5m'}).encode())
+        response = client.post('/echo', data=body, content_type='application/json',
+                               headers={'Content-Encoding': 'gzip'})
+
+        assert response.json == {'params': {'timeframe': '5m'}, 'frame': False, 'count': 1}
+
+    def test_msgpack_columns(self, client):
+        """Test colonne MessagePack decodificate in DataFrame"""
+        if not binary_format_available('msgpack'):
+            pytest.skip("msgpack non installato")
+
+        df = pd.DataFrame({'close': [1.0, 2.0, 3.0], 'volume': [1, 2, 3]})
+        response = client.post('/echo?timeframe=1h', data=frame_to_msgpack(df),
+                               content_type='application/msgpack')
+
+        assert response.json == {'params': {'timeframe': '1h'}, 'frame': True, 'count': 3}
+
+    def test_decompressed_size_limit(self):
+        """Test limite sulla dimensione decompressa (413)"""
+        body = gzip.compress(b'0' * 10_000)
+        assert decompress_body(body, 'gzip', max_size=10_000) == b'0' * 10_000
+
+        with pytest.raises(Exception) as error:
+            decompress_body(body, 'gzip', max_size=1_000)
+        assert error.value.code == 413
+
+    def test_invalid_body(self, client):
+        """Test body corrotto (400) e Content-Type non supportato (415)"""
+        response = client.post('/echo', data=b'non gzip', content_type='application/json',
+                               headers={'Content-Encoding': 'gzip'})
+        assert response.status_code == 400
+        assert client.post('/echo', data=b'x', content_type='text/plain').status_code == 415
+
+    def test_data_reference(self):
+        """Test riferimento {symbol, start, end} al posto dei record"""
+        assert data_reference({'symbol': 'aapl', 'start': '2024-01-01', 'end': '2024-02-01'}) \
+            == ('AAPL', '2024-01-01', '2024-02-01')
+        assert data_reference({'symbol': 'AAPL', 'start_date': '2024-01-01'}) \
+            == ('AAPL', '2024-01-01', None)
+        assert data_reference({'symbol': 'AAPL', 'records': []}) is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
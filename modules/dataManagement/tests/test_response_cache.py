@@ -0,0 +1,64 @@
+"""
+Test per la cache delle risposte serializzate
+"""
+import pytest
+
+from core.backend.utils.response_cache import ResponseCache
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+
+
+class TestResponseCache:
+    """Test suite per ResponseCache"""
+
+    @pytest.fixture
+    def cache(self):
+        """Cache con budget ridotto"""
+        return ResponseCache(max_bytes=10)
+
+    def test_key_normalization(self):
+        """Test chiavi indipendenti da ordine parametri e maiuscole del simbolo"""
+        a = ResponseCache.make_key('data', {'symbol': 'aapl', 'start_date': '2024-01-01'}, 'v1')
+        b = ResponseCache.make_key('data', {'start_date': '2024-01-01', 'symbol': 'AAPL',
+                                            'use_cache': True}, 'v1')
+        assert a == b
+        assert a != ResponseCache.make_key('data', {'symbol': 'AAPL', 'start_date': '2024-01-01'}, 'v2')
+
+    def test_lru_byte_budget(self, cache):
+        """Test eviction della voce meno recente oltre il budget di byte"""
+        cache.put('a', b'1234', 'application/json')
+        cache.put('b', b'1234', 'application/json')
+        cache.get('a')
+        cache.put('c', b'1234', 'application/json')
+
+        assert cache.get('b') is None
+        assert cache.get('a') == (b'1234', 'application/json')
+        assert cache.stats()['size_bytes'] == 8
+        assert cache.put('big', b'x' * 11, 'application/json') is False
+
+    def test_invalidate_symbol(self, cache):
+        """Test invalidazione di tutte le risposte di un simbolo"""
+        cache.put('a', b'1', 'application/json', symbols=['aapl'])
+        cache.put('b', b'2', 'application/json', symbols=['AAPL', 'MSFT'])
+        cache.put('c', b'3', 'application/json', symbols=['MSFT'])
+
+        assert cache.invalidate('AAPL', 'dailyAdjusted', None) == 2
+        assert cache.get('a') is None and cache.get('b') is None
+        assert cache.get('c') is not None
+
+    def test_write_listener(self, cache, tmp_path):
+        """Test invalidazione automatica alle scritture di FileManagerService"""
+        manager = FileManagerService()
+        manager.base_path = tmp_path
+        cache.put('a', b'1', 'application/json', symbols=['TEST'])
+
+        FileManagerService.add_write_listener(cache.invalidate)
+        try:
+            manager.save_data('TEST', 'daily', [{'date': '2024-01-02', 'close': 1.0}])
+        finally:
+            FileManagerService.remove_write_listener(cache.invalidate)
+
+        assert cache.get('a') is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
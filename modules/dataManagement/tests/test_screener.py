@@ -0,0 +1,143 @@
+"""
+Test per lo snapshot ultima barra e lo screener
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services import snapshot as snapshot_module
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.dataManagement.backend.services.indicators import IndicatorService
+from modules.dataManagement.backend.services.screener import ScreenerService, parse_filter
+from modules.dataManagement.backend.services.snapshot import SnapshotService
+
+
+class TestScreener:
+    """Test suite per SnapshotService e ScreenerService"""
+
+    @pytest.fixture
+    def frames(self):
+        """Quattro simboli; l'ultimo con storico breve (indicatori lunghi assenti)"""
+        rng = np.random.default_rng(21)
+        frames = {}
+        for symbol, days in (('AAA', 400), ('BBB', 400), ('CCC', 400), ('DDD', 30)):
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+            frames[symbol] = pd.DataFrame({
+                'date': pd.bdate_range('2023-01-02', periods=days),
+                'open': close, 'high': close * 1.01, 'low': close * 0.99, 'close': close,
+                'volume': rng.integers(1_000, 2_000, days)
+            })
+        # AAA: ultima seduta con volume triplo
+        frames['AAA'].loc[399, 'volume'] = 6_000
+        return frames
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch, frames):
+        """Cache su directory temporanea con i simboli salvati"""
+        monkeypatch.chdir(tmp_path)
+        manager = FileManagerService()
+        for symbol, df in frames.items():
+            manager.save_data(symbol, 'dailyAdjusted', df)
+        return manager
+
+    @pytest.fixture
+    def snapshot(self, manager, monkeypatch):
+        """Snapshot registrato come listener di scrittura"""
+        monkeypatch.setattr(snapshot_module, 'SCREENER_RECONCILE_SECONDS', 3600)
+        service = SnapshotService()
+        FileManagerService.add_write_listener(service.on_write)
+        yield service
+        FileManagerService.remove_write_listener(service.on_write)
+
+    def test_snapshot_matches_full_history(self, snapshot, frames):
+        """Test riga dello snapshot uguale agli indicatori sull'intero storico"""
+        table = snapshot.table('dailyAdjusted')
+        assert list(table['symbol']) == ['AAA', 'BBB', 'CCC', 'DDD']
+
+        df = frames['BBB']
+        series, _ = IndicatorService().compute(df)
+        close, volume = df['close'], df['volume'].astype(float)
+        row = {field: table[field][1] for field in SnapshotService.FIELDS}
+
+        assert table['date'][1] == df['date'].iloc[-1].strftime('%Y-%m-%d')
+        for field in ('sma_50', 'ema_26', 'rsi_14', 'macd_signal', 'atr_14'):
+            assert row[field] == pytest.approx(series[field][-1], rel=1e-8)
+        assert row['sma_200'] == pytest.approx(close.tail(200).mean())
+        assert row['avg_volume_20'] == pytest.approx(volume.iloc[-21:-1].mean())
+        assert row['high_52w'] == pytest.approx(close.tail(252).max())
+        assert row['return_252d'] == pytest.approx((close.iloc[-1] / close.iloc[-253] - 1) * 100)
+
+        # Storico breve: i campi non calcolabili sono NaN
+        assert np.isnan(table['sma_50'][3])
+        assert table['rsi_14'][3] == pytest.approx(IndicatorService().compute(frames['DDD'])[0]['rsi_14'][-1])
+
+    def test_screen_filter_sort_limit(self, snapshot):
+        """Test filtro, ordinamento e campi di output"""
+        screener = ScreenerService(snapshot)
+        result = screener.screen('volume > 2 * avg_volume_20', 'dailyAdjusted')
+        assert result['universe'] == 4
+        assert [row[0] for row in result['rows']] == ['AAA']
+        assert result['columns'] == ['symbol', 'date', 'close', 'change_pct', 'volume',
+                                     'avg_volume_20']
+
+        # I NaN non soddisfano i confronti e finiscono in coda nell'ordinamento
+        result = screener.screen('sma_50 > 0 or rsi_14 >= 0', 'dailyAdjusted',
+                                 sort='-sma_50', limit=3, fields=['sma_50'])
+        table = snapshot.table('dailyAdjusted')
+        expected = list(table['symbol'][np.argsort(-table['sma_50'][:3])])
+        assert result['matched'] == 4
+        assert [row[0] for row in result['rows']] == expected
+        assert result['columns'] == ['symbol', 'date', 'sma_50']
+
+        assert screener.screen('not (close > 0)', 'dailyAdjusted')['matched'] == 0
+        assert screener.screen(None, 'dailyAdjusted')['matched'] == 4
+
+    def test_snapshot_follows_cache_writes(self, snapshot, manager, frames):
+        """Test scrittura e cancellazione aggiornano lo snapshot senza rileggere i file"""
+        screener = ScreenerService(snapshot)
+        before = snapshot.get_version('dailyAdjusted')
+        assert screener.screen('close > 1000000', 'dailyAdjusted')['matched'] == 0
+
+        manager.append_data('CCC', 'dailyAdjusted', [{
+            'date': '2025-01-02', 'open': 2e6, 'high': 2e6, 'low': 2e6, 'close': 2e6,
+            'volume': 1_000
+        }])
+        result = screener.screen('close > 1000000', 'dailyAdjusted')
+        assert [row[:2] for row in result['rows']] == [['CCC', '2025-01-02']]
+        assert snapshot.get_version('dailyAdjusted') != before
+
+        manager.clear_data('CCC', 'dailyAdjusted')
+        assert screener.screen(None, 'dailyAdjusted')['universe'] == 3
+
+    def test_reconcile_picks_up_external_writes(self, manager, frames, monkeypatch):
+        """Test scritture di un altro processo (senza listener) rilevate al riallineamento"""
+        monkeypatch.setattr(snapshot_module, 'SCREENER_RECONCILE_SECONDS', 0)
+        service = SnapshotService()
+        assert service.table('dailyAdjusted')['close'][0] == pytest.approx(frames['AAA']['close'].iloc[-1])
+
+        df = frames['AAA'].copy()
+        df.loc[399, 'close'] = 1.0
+        manager.save_data('AAA', 'dailyAdjusted', df)
+        assert service.table('dailyAdjusted')['close'][0] == 1.0
+        assert manager.get_snapshot_file('AAA', 'dailyAdjusted').exists()
+
+    @pytest.mark.parametrize('expression', [
+        'close.__class__', '__import__("os").system("ls")', 'close[0] > 1',
+        'close ** 2 > 1', 'foo > 1', 'close > "a"', 'lambda: 1', 'abs(close, 1) > 0',
+        'close >', 'close if close else 1', 'True'
+    ])
+    def test_rejects_unsafe_expressions(self, expression):
+        """Test espressioni fuori dalla grammatica rifiutate con ValueError"""
+        with pytest.raises(ValueError):
+            parse_filter(expression)
+
+    def test_rejects_non_conditions(self, snapshot):
+        """Test filtri che non producono una condizione"""
+        screener = ScreenerService(snapshot)
+        for expression in ('close + 1', 'rsi_14 < 30 or 5', '(close > 1) * 2'):
+            with pytest.raises(ValueError):
+                screener.screen(expression, 'dailyAdjusted')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,128 @@
+"""
+Test per le barre settimanali / mensili / trimestrali derivate dalla cache giornaliera
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.dataManagement.backend.services.timeframes import TimeframeService
+from modules.dataManagement.backend.services.yahoo_service import YahooFinanceService
+
+
+class TestTimeframes:
+    """Test suite per TimeframeService"""
+
+    @pytest.fixture
+    def daily(self):
+        """Un anno di sedute con OHLCV casuali (festivi esclusi a caso)"""
+        rng = np.random.default_rng(47)
+        dates = pd.bdate_range('2023-01-02', '2023-12-29')
+        dates = dates[rng.random(len(dates)) > 0.05]
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+        open_ = close * (1 + rng.normal(0, 0.005, len(dates)))
+        return pd.DataFrame({
+            'date': dates, 'open': open_,
+            'high': np.maximum(open_, close) * 1.01, 'low': np.minimum(open_, close) * 0.99,
+            'close': close, 'volume': rng.integers(1_000, 5_000, len(dates))
+        })
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch, daily):
+        """Cache temporanea con il giornaliero e il listener registrato"""
+        monkeypatch.chdir(tmp_path)
+        FileManagerService().save_data('AAA', 'dailyAdjusted', daily)
+        service = TimeframeService()
+        FileManagerService.add_write_listener(service.on_write)
+        yield service
+        FileManagerService.remove_write_listener(service.on_write)
+
+    @staticmethod
+    def reference(daily, rule):
+        """Riferimento pandas: resample con etichetta all'inizio del periodo"""
+        bars = daily.set_index('date').resample(rule).agg({
+            'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+        })
+        bars = bars[daily.set_index('date')['close'].resample(rule).count() > 0]
+        bars.index = bars.index.to_period().start_time
+        return bars.reset_index()
+
+    @pytest.mark.parametrize('interval, rule', [('1wk', 'W-SUN'), ('1mo', 'M'), ('3mo', 'Q')])
+    def test_resample_matches_pandas(self, service, daily, interval, rule):
+        """Test OHLCV e confini di calendario uguali al resample di pandas"""
+        bars = service.resample(daily, interval)
+        expected = self.reference(daily, rule)
+
+        assert list(bars['date']) == list(expected['date'])
+        for column in ('open', 'high', 'low', 'close'):
+            np.testing.assert_allclose(bars[column], expected[column])
+        assert (bars['volume'].to_numpy() == expected['volume'].to_numpy()).all()
+        if interval == '1wk':
+            assert (bars['date'].dt.dayofweek == 0).all()
+
+    def test_refresh_materializes_and_skips_when_current(self, service, daily, monkeypatch):
+        """Test tipo dati proprio in cache; nessun ricalcolo se il giornaliero non cambia"""
+        data_type = service.refresh('AAA', 'dailyAdjusted', '1mo')
+        assert data_type == 'monthlyAdjusted'
+        stored = service.file_manager.load_data('AAA', data_type)
+        assert len(stored) == 12
+
+        # Tipo di periodo elencato in cache e accettato come tipo dati
+        listed = {entry['type']: entry for entry in
+                  service.file_manager.list_available_symbols()[0]['data_types']}
+        assert listed['monthlyAdjusted']['record_count'] == 12
+        assert service.file_manager.validate_input({'symbol': 'AAA', 'data_type': data_type})
+
+        monkeypatch.setattr(service, 'resample', lambda *args: pytest.fail("ricalcolo inatteso"))
+        assert service.refresh('AAA', 'dailyAdjusted', '1mo') == data_type
+
+    def test_append_refreshes_incrementally(self, service, daily, monkeypatch):
+        """Test un'append giornaliera ricalcola solo gli ultimi periodi"""
+        service.refresh('AAA', 'dailyAdjusted', '1wk')
+
+        calls = []
+        resample = service.resample
+        monkeypatch.setattr(service, 'resample',
+                            lambda df, interval: calls.append(len(df)) or resample(df, interval))
+        extra = pd.DataFrame({
+            'date': pd.to_datetime(['2024-01-02', '2024-01-03']), 'open': 120.0,
+            'high': 125.0, 'low': 118.0, 'close': [121.0, 122.0], 'volume': 1_000
+        })
+        extended = pd.concat([daily, extra], ignore_index=True)
+        service.file_manager.save_data('AAA', 'dailyAdjusted', extended)
+
+        assert calls and max(calls) <= 12
+        stored = service.file_manager.load_data('AAA', 'weeklyAdjusted')
+        expected = self.reference(extended, 'W-SUN')
+        assert list(stored['date']) == list(expected['date'])
+        np.testing.assert_allclose(stored['close'], expected['close'])
+        assert stored['high'].iloc[-1] == 125.0 and stored['volume'].iloc[-1] == 2_000
+
+    def test_rewrite_and_clear(self, service, daily):
+        """Test storico riscritto (es. nuovi adjusted): ricalcolo completo; cancellazione propagata"""
+        service.refresh('AAA', 'dailyAdjusted', '1wk')
+
+        halved = daily.assign(**{c: daily[c] / 2 for c in ('open', 'high', 'low', 'close')})
+        service.file_manager.save_data('AAA', 'dailyAdjusted', halved)
+        stored = service.file_manager.load_data('AAA', 'weeklyAdjusted')
+        np.testing.assert_allclose(stored['close'], self.reference(halved, 'W-SUN')['close'])
+
+        service.file_manager.clear_data('AAA', 'dailyAdjusted')
+        assert service.file_manager.get_data_version('AAA', 'weeklyAdjusted') is None
+
+    def test_yahoo_service_never_downloads_derived(self, service, monkeypatch):
+        """Test interval '1wk' servito dalla cache giornaliera, senza download settimanali"""
+        yahoo = YahooFinanceService()
+        monkeypatch.setattr(yahoo, '_download_from_yahoo',
+                            lambda *args, **kwargs: pytest.fail("download inatteso"))
+
+        assert yahoo.get_data_type('1wk', True) == 'weeklyAdjusted'
+        assert yahoo.get_data_type('3mo', False) == 'quarterly'
+        result = yahoo.get_stock_data('AAA', '2023-03-01', '2023-03-31', interval='1wk')
+        assert result['success'] is True
+        assert [record['date'] for record in result['data']['records']] == \
+            ['2023-03-06', '2023-03-13', '2023-03-20', '2023-03-27']
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -2,11 +2,27 @@
 API Routes per il modulo Minute Data
 """
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import HTTPException
 import pandas as pd
 from datetime import datetime, timedelta
 
 from ..services.minute_data_service import MinuteDataService
 from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.dataManagement.backend.services.excel_exporter import ExcelExportService
+from modules.dataManagement.backend.services.downsampling import DownsamplingService
+from core.backend.middleware.http_cache import (
+    conditional, request_params, with_freshness
+)
+from core.backend.middleware.request_decoding import data_reference, request_payload
+from core.backend.utils.binary import (
+    binary_format_available, binary_response, negotiate_binary_format
+)
+from core.backend.utils.columnar import parse_output_format
+from core.backend.utils.pagination import parse_limit
+from core.backend.utils.response_cache import cached_json_response, response_cache
+from core.backend.utils.streaming import (
+    csv_response, format_batch, parse_compression, parse_stream_mode, stream_response
+)
 
 # Crea blueprint per il modulo
 minuteData_bp = Blueprint('minuteData', __name__)
@@ -14,26 +30,96 @@ minuteData_bp = Blueprint('minuteData', __name__)
 # Inizializza servizi
 minute_service = MinuteDataService()
 file_manager = FileManagerService()
+excel_exporter = ExcelExportService()
+downsampler = DownsamplingService()
 
+# Le risposte in cache vengono invalidate a ogni scrittura dei dati del simbolo
+FileManagerService.add_write_listener(response_cache.invalidate)
 
-@minuteData_bp.route('/data/1m', methods=['POST'])
+
+def _minute_data_version(params):
+    """Versione della cache minuto per ETag/Last-Modified (None: non cacheabile)"""
+    if not params.get('symbol'):
+        return None
+    
+    symbol = str(params['symbol']).strip().upper()
+    # Periodo aperto: durante la giornata arrivano nuove barre, ETag a bucket di 5 minuti
+    return with_freshness(
+        file_manager.get_data_version(symbol, 'minute'), params.get('end_date'),
+        bucket_seconds=300
+    )
+
+
+@minuteData_bp.route('/data/1m', methods=['GET', 'POST'])
+@conditional(_minute_data_version)
 def get_minute_data():
     """Endpoint per recuperare dati a 1 minuto"""
     try:
-        data = request.get_json()
+        data = request_params()
         
         # Parametri
         use_cache = data.get('use_cache', True)
+        output_format = parse_output_format(data.get('format'))
+        stream_mode = parse_stream_mode(data.get('stream'))
+        max_points, downsample_method = downsampler.parse_params(data)
         
-        # Recupera dati
-        result = minute_service.get_minute_data(
-            symbol=data['symbol'],
-            start_date=data['start_date'],
-            end_date=data['end_date'],
-            use_cache=use_cache
-        )
+        binary_format = negotiate_binary_format(request.accept_mimetypes)
+        if binary_format:
+            return _binary_minute_data(
+                data['symbol'], data['start_date'], data['end_date'], binary_format,
+                max_points=max_points, downsample_method=downsample_method
+            )
         
-        return jsonify(result)
+        if stream_mode:
+            # Aggiorna la cache e leggi dal file a batch
+            status = minute_service.ensure_cached(
+                data['symbol'], data['start_date'], data['end_date']
+            )
+            if not status['success']:
+                return jsonify(status)
+            
+            symbol = status['data']['symbol']
+            batches = (
+                format_batch(batch)
+                for batch in file_manager.iter_batches(
+                    symbol, 'minute', data['start_date'], data['end_date']
+                )
+            )
+            return stream_response(batches, stream_mode, envelope={
+                'symbol': symbol,
+                'interval': '1m',
+                'from_cache': True
+            })
+        
+        limit = parse_limit(data.get('limit'))
+        if limit:
+            # Pagina a cursore: seek sull'indice dei timestamp della cache
+            return cached_json_response(
+                'minute_data_page', data, _minute_data_version,
+                lambda: minute_service.get_minute_page(
+                    data['symbol'], data['start_date'], data['end_date'], limit,
+                    cursor=data.get('cursor'),
+                    output_format=output_format,
+                    delta_timestamps=bool(data.get('delta_timestamps', False))
+                ),
+                symbols=[data['symbol']], error_status=400
+            )
+        
+        # Recupera dati (byte serializzati in cache finché i dati non cambiano)
+        return cached_json_response(
+            'minute_data', data, _minute_data_version,
+            lambda: minute_service.get_minute_data(
+                symbol=data['symbol'],
+                start_date=data['start_date'],
+                end_date=data['end_date'],
+                use_cache=use_cache,
+                output_format=output_format,
+                delta_timestamps=bool(data.get('delta_timestamps', False)),
+                max_points=max_points,
+                downsample_method=downsample_method
+            ),
+            symbols=[data['symbol']]
+        )
         
     except ValueError as e:
         return jsonify({
@@ -47,20 +133,63 @@ def get_minute_data():
             'details': str(e)
         }), 500
 
+def _binary_minute_data(symbol, start_date, end_date, binary_format,
+                        max_points=None, downsample_method='minmax'):
+    """
+    Risposta binaria (Arrow / MessagePack) dei dati minuto letti dalla cache
+    Colonne: datetime (timestamp) e OHLCV; il simbolo viaggia nei metadata
+    """
+    if not binary_format_available(binary_format):
+        return jsonify({
+            'success': False,
+            'error': f"Formato {binary_format} non disponibile sul server"
+        }), 406
+    
+    status = minute_service.ensure_cached(symbol, start_date, end_date)
+    if not status['success']:
+        return jsonify(status)
+    
+    symbol = status['data']['symbol']
+    df = file_manager.load_range(
+        symbol, 'minute', start_date, end_date,
+        columns=['datetime', 'open', 'high', 'low', 'close', 'volume']
+    )
+    df = df.drop(columns=['date'])
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    if max_points:
+        df = downsampler.downsample(df, max_points, downsample_method, time_column='datetime')
+    
+    return binary_response(df, binary_format, metadata={
+        'symbol': symbol,
+        'interval': '1m'
+    })
+
 
 @minuteData_bp.route('/data/aggregate', methods=['POST'])
 def aggregate_minute_data():
-    """Endpoint per aggregare dati minuto in timeframe maggiori"""
+    """
+    Endpoint per aggregare dati minuto in timeframe maggiori
+    Record inline (JSON, MessagePack o Arrow, anche gzip) oppure riferimento
+    {symbol, start, end} ai dati in cache
+    """
     try:
-        data = request.get_json()
+        data = request_payload()
         
         # Validazione
-        if 'records' not in data or 'timeframe' not in data:
+        if 'timeframe' not in data:
+            raise ValueError("Records e timeframe richiesti")
+        
+        reference = data_reference(data)
+        if reference is not None:
+            records = _reference_minute_frame(*reference)
+        elif data.get('records') is not None:
+            records = data['records']
+        else:
             raise ValueError("Records e timeframe richiesti")
         
         # Aggrega
         aggregated = minute_service.aggregate_to_timeframe(
-            data['records'],
+            records,
             data['timeframe']
         )
         
@@ -70,10 +199,15 @@ def aggregate_minute_data():
                 'records': aggregated,
                 'count': len(aggregated),
                 'timeframe': data['timeframe'],
-                'original_count': len(data['records'])
+                'original_count': len(records)
             }
         })
         
+    except HTTPException as e:
+        return jsonify({
+            'success': False,
+            'error': e.description
+        }), e.code
     except ValueError as e:
         return jsonify({
             'success': False,
@@ -86,6 +220,22 @@ def aggregate_minute_data():
         }), 500
 
 
+def _reference_minute_frame(symbol, start_date, end_date):
+    """Dati minuto in cache per un riferimento {symbol, start, end}"""
+    if start_date and end_date:
+        status = minute_service.ensure_cached(symbol, start_date, end_date)
+        if not status['success']:
+            raise ValueError(status['error'])
+    
+    df = file_manager.load_range(
+        symbol, 'minute', start_date, end_date,
+        columns=['datetime', 'open', 'high', 'low', 'close', 'volume']
+    )
+    if df is None:
+        raise ValueError(f"Nessun dato minuto in cache per {symbol}")
+    return df
+
+
 @minuteData_bp.route('/data/market-hours', methods=['POST'])
 def get_market_hours_data():
     """Endpoint per dati solo durante ore di mercato"""
@@ -166,83 +316,31 @@ def download_minute_data():
         data = request.get_json()
         
         # Validazione
-        required = ['symbol', 'start_date', 'end_date', 'format']
+        required = ['start_date', 'end_date', 'format']
         for field in required:
             if field not in data:
                 raise ValueError(f"Campo richiesto: {field}")
         
+        symbols = data.get('symbols') or ([data['symbol']] if data.get('symbol') else [])
+        if not isinstance(symbols, list) or not symbols:
+            raise ValueError("Campo richiesto: symbol")
+        
         format_type = data['format'].lower()
         timeframe = data.get('timeframe', '1m')
+        compression = parse_compression(data.get('compression'))
         
-        # Recupera dati
-        result = minute_service.get_minute_data(
-            symbol=data['symbol'],
-            start_date=data['start_date'],
-            end_date=data['end_date'],
-            use_cache=True
-        )
-        
-        if not result['success']:
-            return jsonify(result), 400
-        
-        records = result['data']['records']
-        
-        # Se richiesto timeframe diverso, aggrega
-        if timeframe != '1m':
-            records = minute_service.aggregate_to_timeframe(records, timeframe)
-        
-        # Prepara download
-        from flask import make_response
-        import io
-        
-        df = pd.DataFrame(records)
+        if timeframe != '1m' and timeframe not in minute_service.TIMEFRAME_FREQUENCIES:
+            raise ValueError(f"Timeframe non supportato: {timeframe}")
         
         if format_type == 'csv':
-            output = io.StringIO()
-            df.to_csv(output, index=False)
-            csv_data = output.getvalue()
-            
-            response = make_response(csv_data)
-            response.headers['Content-Type'] = 'text/csv'
-            response.headers['Content-Disposition'] = (
-                f'attachment; filename="{data["symbol"]}_'
-                f'{timeframe}_minute_data.csv"'
+            return _export_minute_csv(
+                symbols, data['start_date'], data['end_date'], timeframe, compression
             )
-            
-            return response
-            
+        
         elif format_type == 'excel':
-            output = io.BytesIO()
-            
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Dati principali
-                df.to_excel(writer, sheet_name=f'{timeframe} Data', index=False)
-                
-                # Info
-                info_data = {
-                    'Metric': ['Symbol', 'Timeframe', 'Records', 'Period'],
-                    'Value': [
-                        data['symbol'],
-                        timeframe,
-                        len(records),
-                        f"{data['start_date']} to {data['end_date']}"
-                    ]
-                }
-                info_df = pd.DataFrame(info_data)
-                info_df.to_excel(writer, sheet_name='Info', index=False)
-            
-            excel_data = output.getvalue()
-            
-            response = make_response(excel_data)
-            response.headers['Content-Type'] = (
-                'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            return _export_minute_excel(
+                symbols, data['start_date'], data['end_date'], timeframe
             )
-            response.headers['Content-Disposition'] = (
-                f'attachment; filename="{data["symbol"]}_'
-                f'{timeframe}_minute_data.xlsx"'
-            )
-            
-            return response
         
         else:
             raise ValueError(f"Formato non supportato: {format_type}")
@@ -254,6 +352,109 @@ def download_minute_data():
         }), 500
 
 
+def _cache_minute_symbols(symbols, start_date, end_date):
+    """Aggiorna la cache minuto per ogni simbolo di un export: (pronti, errori)"""
+    ready = []
+    errors = []
+    for symbol in symbols:
+        status = minute_service.ensure_cached(symbol, start_date, end_date)
+        if status['success']:
+            ready.append(status['data']['symbol'])
+        else:
+            errors.append(symbol)
+    return ready, errors
+
+
+def _minute_batches(symbol, start_date, end_date, timeframe):
+    """Batch formattati dei dati minuto di un simbolo, aggregati se richiesto"""
+    symbol_batches = file_manager.iter_batches(symbol, 'minute', start_date, end_date)
+    if timeframe != '1m':
+        symbol_batches = minute_service.iter_aggregated_batches(symbol_batches, timeframe)
+    for batch in symbol_batches:
+        batch = format_batch(batch)
+        batch['symbol'] = symbol
+        yield batch
+
+
+def _minute_export_name(symbols, ready, timeframe, extension):
+    """Nome file degli export minuto"""
+    name = ready[0] if len(symbols) == 1 else f"{len(symbols)}_symbols"
+    return f"{name}_{timeframe}_minute_data.{extension}"
+
+
+def _export_minute_csv(symbols, start_date, end_date, timeframe, compression):
+    """
+    Export CSV dati minuto in streaming letto dalla cache a batch
+    Supporta più simboli nello stesso file e aggregazione per timeframe
+    """
+    ready, errors = _cache_minute_symbols(symbols, start_date, end_date)
+    if not ready:
+        return jsonify({
+            'success': False,
+            'error': 'Nessun dato minuto disponibile',
+            'errors': errors
+        }), 400
+    
+    def batches():
+        for symbol in ready:
+            yield from _minute_batches(symbol, start_date, end_date, timeframe)
+    
+    response = csv_response(
+        batches(), _minute_export_name(symbols, ready, timeframe, 'csv'), compression
+    )
+    if errors:
+        response.headers['X-Skipped-Symbols'] = ','.join(errors)
+    return response
+
+
+def _export_minute_excel(symbols, start_date, end_date, timeframe):
+    """
+    Export Excel dati minuto con worksheet write-only letto dalla cache a batch
+    Un foglio dati per simbolo (oltre il limite righe continua su fogli successivi)
+    """
+    ready, errors = _cache_minute_symbols(symbols, start_date, end_date)
+    if not ready:
+        return jsonify({
+            'success': False,
+            'error': 'Nessun dato minuto disponibile',
+            'errors': errors
+        }), 400
+    
+    counts = {}
+    
+    def counted_batches(symbol):
+        counts[symbol] = 0
+        for batch in _minute_batches(symbol, start_date, end_date, timeframe):
+            counts[symbol] += len(batch)
+            yield batch
+    
+    def info_batches():
+        # Valutato dopo i fogli dati, quando i conteggi sono completi
+        yield pd.DataFrame({
+            'Metric': ['Symbol', 'Timeframe', 'Records', 'Period'],
+            'Value': [
+                ', '.join(ready),
+                timeframe,
+                sum(counts.values()),
+                f"{start_date} to {end_date}"
+            ]
+        })
+    
+    sheets = [
+        (f'{timeframe} Data' if len(ready) == 1 else f'{symbol} {timeframe}',
+         counted_batches(symbol))
+        for symbol in ready
+    ]
+    sheets.append(('Info', info_batches()))
+    
+    response = excel_exporter.send_workbook(
+        sheets, _minute_export_name(symbols, ready, timeframe, 'xlsx')
+    )
+    if errors:
+        response.headers['X-Skipped-Symbols'] = ','.join(errors)
+    return response
+
+
 @minuteData_bp.route('/stats/<symbol>', methods=['GET'])
 def get_minute_stats(symbol):
     """Statistiche sui dati minuto cached"""
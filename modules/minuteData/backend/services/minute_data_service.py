@@ -4,23 +4,38 @@ Principio SOLID: Single Responsibility - gestisce solo dati intraday
 """
 import yfinance as yf
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
 import pandas as pd
 import time
 
 from core.backend.base.base_service import BaseService
 from core.backend.config.settings import YAHOO_API_TIMEOUT, YAHOO_MAX_RETRIES
+from core.backend.utils.columnar import (
+    MINUTE_TIME_FORMAT, frame_to_columnar, records_to_columnar
+)
+from core.backend.utils.pagination import decode_cursor, encode_cursor
 from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.dataManagement.backend.services.downsampling import DownsamplingService
 
 
 class MinuteDataService(BaseService):
     """Servizio specializzato per dati a 1 minuto"""
     
+    # Mappa timeframe a frequenza pandas
+    TIMEFRAME_FREQUENCIES = {
+        '5m': '5T',
+        '15m': '15T',
+        '30m': '30T',
+        '1h': '1H',
+        '4h': '4H'
+    }
+    
     def __init__(self):
         super().__init__()
         self.timeout = YAHOO_API_TIMEOUT
         self.max_retries = YAHOO_MAX_RETRIES
         self.file_manager = FileManagerService()
+        self.downsampler = DownsamplingService()
         self.max_days_per_request = 7  # Yahoo limita i dati minuto a 7 giorni
     
     def validate_input(self, data: Dict[str, Any]) -> bool:
@@ -57,9 +72,16 @@ class MinuteDataService(BaseService):
         return True
     
     def get_minute_data(self, symbol: str, start_date: str, end_date: str,
-                       use_cache: bool = True) -> Dict[str, Any]:
+                       use_cache: bool = True, output_format: str = 'records',
+                       delta_timestamps: bool = False, max_points: Optional[int] = None,
+                       downsample_method: str = 'minmax') -> Dict[str, Any]:
         """
         Recupera dati a 1 minuto con supporto cache
+        
+        output_format: 'records' (lista di dizionari) o 'columnar' (un array per campo)
+        delta_timestamps: Solo per 'columnar', timestamp interi codificati a delta
+        max_points: Se indicato, serie ridotta ad al massimo max_points punti
+            ('minmax': barre OHLC per bucket, 'lttb': barre originali più significative)
         """
         try:
             symbol = str(symbol).strip().upper()
@@ -83,7 +105,9 @@ class MinuteDataService(BaseService):
                 if cached_data is not None and not missing_periods:
                     self.log_info("Tutti i dati minuto richiesti sono in cache")
                     return self._prepare_response_from_cache(
-                        cached_data, symbol, start_date, end_date
+                        cached_data, symbol, start_date, end_date,
+                        output_format, delta_timestamps,
+                        max_points, downsample_method
                     )
                 
                 # Download incrementale per periodi mancanti
@@ -93,7 +117,7 @@ class MinuteDataService(BaseService):
                     for period_start, period_end in missing_periods:
                         self.log_info(f"Download periodo mancante: {period_start} -> {period_end}")
                         new_data = self._download_minute_data(
-                            symbol, period_start, period_end
+                            symbol, period_start, period_end, save=False
                         )
                         
                         if new_data['success']:
@@ -106,20 +130,89 @@ class MinuteDataService(BaseService):
                         # Ricarica tutti i dati
                         all_data = self.file_manager.load_data(symbol, data_type)
                         return self._prepare_response_from_cache(
-                            all_data, symbol, start_date, end_date
+                            all_data, symbol, start_date, end_date,
+                            output_format, delta_timestamps,
+                            max_points, downsample_method
                         )
             
             # Download completo
-            return self._download_minute_data(symbol, start_date, end_date)
+            result = self._download_minute_data(symbol, start_date, end_date)
+            
+            if result['success'] and max_points:
+                # Il downsampling lavora sulle colonne: riparte dal DataFrame
+                downloaded = pd.DataFrame(result['data']['records'])
+                downloaded['date'] = pd.to_datetime(downloaded['date'])
+                return self._prepare_response_from_cache(
+                    downloaded, symbol, start_date, end_date,
+                    output_format, delta_timestamps,
+                    max_points, downsample_method
+                )
+            
+            if result['success'] and output_format == 'columnar':
+                data = result['data']
+                records = data.pop('records')
+                data['format'] = 'columnar'
+                data.update(records_to_columnar(
+                    records, time_column='datetime',
+                    time_format=MINUTE_TIME_FORMAT,
+                    delta_timestamps=delta_timestamps
+                ))
+            
+            return result
             
         except Exception as e:
             return self.handle_error(e, f"get_minute_data({symbol})")
     
+    def get_minute_page(self, symbol: str, start_date: str, end_date: str,
+                        limit: int, cursor: Optional[str] = None,
+                        output_format: str = 'records',
+                        delta_timestamps: bool = False) -> Dict[str, Any]:
+        """
+        Pagina di al massimo limit barre a 1 minuto a partire dal cursore
+        Letta con un seek sull'indice dei timestamp, senza caricare lo storico
+        """
+        try:
+            symbol = str(symbol).strip().upper()
+            after = decode_cursor(cursor, symbol, 'minute')
+            
+            if after is None:
+                status = self.ensure_cached(symbol, start_date, end_date)
+                if not status['success']:
+                    return status
+            else:
+                self.validate_input({
+                    'symbol': symbol,
+                    'start_date': start_date,
+                    'end_date': end_date
+                })
+            
+            page, has_more = self.file_manager.read_page(
+                symbol, 'minute', start_date, end_date, after=after, limit=limit
+            )
+            if page is None:
+                raise ValueError(f"Nessun dato minuto trovato per {symbol}")
+            
+            result = self._prepare_response_from_cache(
+                page, symbol, start_date, end_date, output_format, delta_timestamps
+            )
+            result['data'].update({
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': encode_cursor(
+                    symbol, 'minute', pd.Timestamp(page['datetime'].iloc[-1]).value
+                ) if has_more else None
+            })
+            return result
+            
+        except Exception as e:
+            return self.handle_error(e, f"get_minute_page({symbol})")
+    
     def _download_minute_data(self, symbol: str, start_date: str, 
-                            end_date: str) -> Dict[str, Any]:
+                            end_date: str, save: bool = True) -> Dict[str, Any]:
         """
         Download dati minuto da Yahoo Finance
         Gestisce il limite di 7 giorni per richiesta
+        Con save=False non sovrascrive la cache (download incrementale + append)
         """
         try:
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
@@ -175,14 +268,15 @@ class MinuteDataService(BaseService):
                 raise ValueError(f"Nessun dato minuto trovato per {symbol}")
             
             # Salva in cache
-            self.file_manager.save_data(
-                symbol, 'minute', all_records,
-                metadata={
-                    'source': 'yahoo_finance',
-                    'interval': '1m',
-                    'download_date': datetime.now().isoformat()
-                }
-            )
+            if save:
+                self.file_manager.save_data(
+                    symbol, 'minute', all_records,
+                    metadata={
+                        'source': 'yahoo_finance',
+                        'interval': '1m',
+                        'download_date': datetime.now().isoformat()
+                    }
+                )
             
             return {
                 'success': True,
@@ -238,31 +332,85 @@ class MinuteDataService(BaseService):
             if 'datetime' in cached_df.columns:
                 cached_df['datetime'] = pd.to_datetime(cached_df['datetime'])
             
-            # Identifica periodi mancanti
-            req_start = pd.to_datetime(start_date)
-            req_end = pd.to_datetime(end_date)
+            missing_periods = self._find_missing_periods(
+                cached_df['date'], start_date, end_date
+            )
             
-            # Trova date con dati in cache
-            cached_dates = set(cached_df['date'].unique())
+            return cached_df, missing_periods
             
-            # Genera tutte le date richieste (escludendo weekend)
-            date_range = pd.date_range(start=req_start, end=req_end, freq='B')
-            required_dates = set(date_range.strftime('%Y-%m-%d'))
+        except Exception as e:
+            self.log_error("Errore controllo cache minuti", e)
+            return None, [(start_date, end_date)]
+    
+    def _find_missing_periods(self, cached_dates: pd.Series, start_date: str,
+                              end_date: str) -> List[Tuple[str, str]]:
+        """Identifica i periodi richiesti senza dati in cache"""
+        req_start = pd.to_datetime(start_date)
+        req_end = pd.to_datetime(end_date)
+        
+        # Trova date con dati in cache (load_data converte 'date' in datetime)
+        available_dates = set(pd.to_datetime(cached_dates).dt.strftime('%Y-%m-%d').unique())
+        
+        # Genera tutte le date richieste (escludendo weekend)
+        date_range = pd.date_range(start=req_start, end=req_end, freq='B')
+        required_dates = set(date_range.strftime('%Y-%m-%d'))
+        
+        # Trova date mancanti
+        missing_dates = required_dates - available_dates
+        
+        if not missing_dates:
+            return []
+        
+        # Raggruppa date mancanti in periodi continui
+        return self._group_missing_dates(sorted(missing_dates))
+    
+    def ensure_cached(self, symbol: str, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Garantisce che il periodo richiesto sia in cache senza costruire la risposta
+        Usato da chi legge poi direttamente dal file (es. risposte in streaming)
+        """
+        try:
+            symbol = str(symbol).strip().upper()
             
-            # Trova date mancanti
-            missing_dates = required_dates - cached_dates
+            self.validate_input({
+                'symbol': symbol,
+                'start_date': start_date,
+                'end_date': end_date
+            })
             
-            if not missing_dates:
-                return cached_df, []
+            cached = self.file_manager.load_data(symbol, 'minute', columns=['date'])
             
-            # Raggruppa date mancanti in periodi continui
-            missing_periods = self._group_missing_dates(sorted(missing_dates))
+            if cached is None or cached.empty:
+                result = self._download_minute_data(symbol, start_date, end_date)
+                if not result['success']:
+                    return result
+            else:
+                missing_periods = self._find_missing_periods(
+                    cached['date'], start_date, end_date
+                )
+                
+                new_records = []
+                for period_start, period_end in missing_periods:
+                    self.log_info(f"Download periodo mancante: {period_start} -> {period_end}")
+                    new_data = self._download_minute_data(
+                        symbol, period_start, period_end, save=False
+                    )
+                    if new_data['success']:
+                        new_records.extend(new_data['data']['records'])
+                
+                if new_records:
+                    self.file_manager.append_data(symbol, 'minute', new_records)
             
-            return cached_df, missing_periods
+            return {
+                'success': True,
+                'data': {
+                    'symbol': symbol,
+                    'data_type': 'minute'
+                }
+            }
             
         except Exception as e:
-            self.log_error("Errore controllo cache minuti", e)
-            return None, [(start_date, end_date)]
+            return self.handle_error(e, f"ensure_cached({symbol})")
     
     def _group_missing_dates(self, missing_dates: List[str]) -> List[Tuple[str, str]]:
         """Raggruppa date mancanti in periodi continui"""
@@ -288,7 +436,11 @@ class MinuteDataService(BaseService):
         return periods
     
     def _prepare_response_from_cache(self, df: pd.DataFrame, symbol: str,
-                                   start_date: str, end_date: str) -> Dict[str, Any]:
+                                   start_date: str, end_date: str,
+                                   output_format: str = 'records',
+                                   delta_timestamps: bool = False,
+                                   max_points: Optional[int] = None,
+                                   downsample_method: str = 'minmax') -> Dict[str, Any]:
         """Prepara risposta da dati cached per minuti"""
         try:
             # Filtra per periodo richiesto
@@ -299,6 +451,45 @@ class MinuteDataService(BaseService):
             if 'datetime' in filtered_df.columns:
                 filtered_df.sort_values('datetime', inplace=True)
             
+            # Riduzione dei punti prima della serializzazione
+            downsampling = {}
+            if max_points:
+                downsampling = {'downsampling': {
+                    'method': downsample_method,
+                    'max_points': max_points,
+                    'original_count': len(filtered_df)
+                }}
+                filtered_df = self.downsampler.downsample(
+                    filtered_df, max_points, downsample_method, time_column='datetime'
+                )
+            
+            if output_format == 'columnar':
+                # Costruisce gli array direttamente dalle colonne, senza record
+                columnar = frame_to_columnar(
+                    filtered_df, time_column='datetime',
+                    time_format=MINUTE_TIME_FORMAT,
+                    delta_timestamps=delta_timestamps
+                )
+                bounds = [
+                    pd.Timestamp(value).strftime(MINUTE_TIME_FORMAT)
+                    for value in filtered_df['datetime'].iloc[[0, -1]]
+                ] if not filtered_df.empty else [None, None]
+                
+                return {
+                    'success': True,
+                    'data': {
+                        'symbol': symbol,
+                        'format': 'columnar',
+                        'count': len(filtered_df),
+                        'first_date': bounds[0],
+                        'last_date': bounds[-1],
+                        'interval': '1m',
+                        'from_cache': True,
+                        **downsampling,
+                        **columnar
+                    }
+                }
+            
             # Converti in records
             records = filtered_df.to_dict('records')
             
@@ -311,7 +502,8 @@ class MinuteDataService(BaseService):
                     'first_date': records[0]['datetime'] if records else None,
                     'last_date': records[-1]['datetime'] if records else None,
                     'interval': '1m',
-                    'from_cache': True
+                    'from_cache': True,
+                    **downsampling
                 }
             }
             
@@ -319,68 +511,97 @@ class MinuteDataService(BaseService):
             self.log_error("Errore preparazione risposta cache minuti", e)
             raise
     
-    def aggregate_to_timeframe(self, minute_data: List[Dict], 
+    def aggregate_to_timeframe(self, minute_data: Union[List[Dict], pd.DataFrame],
                              timeframe: str = '5m') -> List[Dict]:
         """
         Aggrega dati minuto in timeframe maggiori (5m, 15m, 30m, 1h)
+        Accetta record o direttamente un DataFrame colonnare (body binari, cache)
         """
         try:
-            if not minute_data:
+            if len(minute_data) == 0:
                 return []
             
-            # Converti in DataFrame
-            df = pd.DataFrame(minute_data)
-            df['datetime'] = pd.to_datetime(df['datetime'])
-            df.set_index('datetime', inplace=True)
-            
-            # Mappa timeframe a frequenza pandas
-            freq_map = {
-                '5m': '5T',
-                '15m': '15T',
-                '30m': '30T',
-                '1h': '1H',
-                '4h': '4H'
-            }
-            
-            if timeframe not in freq_map:
-                raise ValueError(f"Timeframe non supportato: {timeframe}")
-            
-            # Aggrega OHLCV
-            agg_rules = {
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum'
-            }
-            
-            # Resample
-            resampled = df.resample(freq_map[timeframe]).agg(agg_rules)
-            
-            # Rimuovi righe con NaN
-            resampled.dropna(inplace=True)
+            frame = minute_data if isinstance(minute_data, pd.DataFrame) \
+                else pd.DataFrame(minute_data)
+            aggregated = self.aggregate_frame(frame, timeframe)
             
             # Converti back in records
-            records = []
-            for idx, row in resampled.reset_index().iterrows():
-                records.append({
-                    'datetime': idx.strftime('%Y-%m-%d %H:%M:%S'),
-                    'date': idx.strftime('%Y-%m-%d'),
-                    'time': idx.strftime('%H:%M:%S'),
-                    'open': round(row['open'], 2),
-                    'high': round(row['high'], 2),
-                    'low': round(row['low'], 2),
-                    'close': round(row['close'], 2),
-                    'volume': int(row['volume']),
-                    'timeframe': timeframe
-                })
-            
-            return records
+            return aggregated.to_dict('records')
             
         except Exception as e:
             self.log_error(f"Errore aggregazione a {timeframe}", e)
             raise
     
+    def aggregate_frame(self, df: pd.DataFrame, timeframe: str = '5m') -> pd.DataFrame:
+        """
+        Aggrega un DataFrame di dati minuto (colonna datetime) nel timeframe richiesto
+        Restituisce le colonne dei record aggregati (datetime, date, time, OHLCV, timeframe)
+        """
+        if timeframe not in self.TIMEFRAME_FREQUENCIES:
+            raise ValueError(f"Timeframe non supportato: {timeframe}")
+        
+        frame = df[['datetime', 'open', 'high', 'low', 'close', 'volume']].copy()
+        frame['datetime'] = pd.to_datetime(frame['datetime'])
+        frame.set_index('datetime', inplace=True)
+        
+        # Aggrega OHLCV
+        agg_rules = {
+            'open': 'first',
+            'high': 'max',
+            'low': 'min',
+            'close': 'last',
+            'volume': 'sum'
+        }
+        
+        # Resample
+        resampled = frame.resample(self.TIMEFRAME_FREQUENCIES[timeframe]).agg(agg_rules)
+        
+        # Rimuovi righe con NaN
+        resampled.dropna(inplace=True)
+        
+        index = resampled.index
+        return pd.DataFrame({
+            'datetime': index.strftime('%Y-%m-%d %H:%M:%S'),
+            'date': index.strftime('%Y-%m-%d'),
+            'time': index.strftime('%H:%M:%S'),
+            'open': resampled['open'].round(2).to_numpy(),
+            'high': resampled['high'].round(2).to_numpy(),
+            'low': resampled['low'].round(2).to_numpy(),
+            'close': resampled['close'].round(2).to_numpy(),
+            'volume': resampled['volume'].astype('int64').to_numpy(),
+            'timeframe': timeframe
+        })
+    
+    def iter_aggregated_batches(self, batches: Iterable[pd.DataFrame],
+                                timeframe: str) -> Iterator[pd.DataFrame]:
+        """
+        Aggrega in streaming batch di dati minuto letti dalla cache
+        Le barre non attraversano mai la mezzanotte: l'ultimo giorno di ogni batch
+        viene trattenuto e unito al batch successivo, così nessuna barra è spezzata
+        """
+        if timeframe not in self.TIMEFRAME_FREQUENCIES:
+            raise ValueError(f"Timeframe non supportato: {timeframe}")
+        return self._aggregate_batches(batches, timeframe)
+    
+    def _aggregate_batches(self, batches: Iterable[pd.DataFrame],
+                           timeframe: str) -> Iterator[pd.DataFrame]:
+        """Generatore interno di iter_aggregated_batches"""
+        carry = None
+        
+        for batch in batches:
+            if carry is not None:
+                batch = pd.concat([carry, batch])
+            
+            is_last_day = batch['date'] == batch['date'].iloc[-1]
+            carry = batch[is_last_day]
+            complete = batch[~is_last_day]
+            
+            if not complete.empty:
+                yield self.aggregate_frame(complete, timeframe)
+        
+        if carry is not None and not carry.empty:
+            yield self.aggregate_frame(carry, timeframe)
+    
     def get_market_hours_data(self, symbol: str, date: str) -> Dict[str, Any]:
         """
         Recupera solo dati durante ore di mercato (9:30-16:00 ET)
@@ -237,14 +237,18 @@ class MinuteDataManager {
             symbol: document.getElementById('symbol').value.toUpperCase(),
             start_date: document.getElementById('start-date').value,
             end_date: document.getElementById('end-date').value,
-            use_cache: document.getElementById('use-cache').checked
+            use_cache: document.getElementById('use-cache').checked,
+            format: 'columnar'
         };
         
         try {
-            const response = await window.apiClient.post('/minuteData/data/1m', params);
+            const response = await window.apiClient.get('/minuteData/data/1m', params);
             
             if (response.success && response.data && response.data.data) {
                 this.currentData = response.data.data;
+                if (this.currentData.format === 'columnar') {
+                    this.currentData.records = ApiClient.columnarToRecords(this.currentData, 'datetime');
+                }
                 this.aggregatedData = { '1m': this.currentData.records };
                 
                 // Applica filtro ore di mercato se richiesto
@@ -0,0 +1 @@
+"""Portfolio Analytics Module"""
\ No newline at end of file
@@ -0,0 +1 @@
+"""Backend del modulo Portfolio Analytics"""
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+API Routes per il modulo Portfolio Analytics
+"""
+import hashlib
+
+from flask import Blueprint, jsonify
+
+from ..services.correlation_service import CorrelationService
+from ..services.risk_service import RiskService
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from core.backend.middleware.http_cache import conditional, request_params
+from core.backend.utils.response_cache import cached_json_response, response_cache
+
+# Crea blueprint per il modulo
+portfolioAnalytics_bp = Blueprint('portfolioAnalytics', __name__)
+
+# Inizializza servizi
+correlation_service = CorrelationService()
+risk_service = RiskService()
+file_manager = FileManagerService()
+
+# Le risposte in cache vengono invalidate a ogni scrittura dei dati del simbolo
+FileManagerService.add_write_listener(response_cache.invalidate)
+
+
+def _universe_params(params):
+    """Simboli e tipo dati di una richiesta su un insieme di titoli"""
+    symbols = params.get('symbols')
+    if not isinstance(symbols, list) or not symbols:
+        raise ValueError("Campo richiesto mancante: symbols")
+    symbols = list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols))
+    data_type = 'dailyAdjusted' if params.get('adjusted', True) else 'daily'
+    return symbols, data_type
+
+
+def _universe_version(params):
+    """Versione combinata dei file in cache dei simboli richiesti"""
+    symbols, data_type = _universe_params(params)
+    versions = [file_manager.get_data_version(symbol, data_type) for symbol in symbols]
+    digest = hashlib.sha1('|'.join(
+        version[0] if version else '-' for version in versions
+    ).encode('ascii')).hexdigest()
+    return digest, max((version[1] for version in versions if version), default=0.0)
+
+
+def _optional_number(params, key, cast):
+    """Parametro numerico opzionale (None se assente)"""
+    if params.get(key) in (None, ''):
+        return None
+    try:
+        return cast(params[key])
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} non valido: {params[key]}")
+
+
+def _confidence_levels(params):
+    """Livelli di confidenza: lista o stringa separata da virgole (GET)"""
+    levels = params.get('confidence')
+    if levels in (None, ''):
+        return None
+    if isinstance(levels, str):
+        levels = [level for level in levels.split(',') if level.strip()]
+    if not isinstance(levels, list):
+        levels = [levels]
+    try:
+        return [float(level) for level in levels]
+    except (TypeError, ValueError):
+        raise ValueError(f"confidence non valido: {params['confidence']}")
+
+
+@portfolioAnalytics_bp.route('/correlation', methods=['GET', 'POST'])
+@conditional(_universe_version)
+def get_correlation_matrix():
+    """
+    Endpoint per le matrici di correlazione / covarianza dei rendimenti giornalieri
+    Legge solo la cache; 'method' full (default), rolling (window) o ewm (halflife).
+    Le somme di full ed ewm sono salvate: una nuova data costa O(N²)
+    """
+    try:
+        data = dict(request_params())
+        symbols, data_type = _universe_params(data)
+        window = _optional_number(data, 'window', int)
+        halflife = _optional_number(data, 'halflife', float)
+        
+        def compute():
+            matrix = correlation_service.get_matrix(
+                symbols,
+                start_date=data.get('start_date'),
+                end_date=data.get('end_date'),
+                data_type=data_type,
+                method=str(data.get('method', 'full')).strip().lower(),
+                kind=str(data.get('kind', 'correlation')).strip().lower(),
+                window=window,
+                halflife=halflife
+            )
+            return {
+                'success': True,
+                'data': matrix
+            }
+        
+        return cached_json_response(
+            'portfolio_correlation', data, _universe_version, compute,
+            symbols=symbols, error_status=400
+        )
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
+
+
+
+@portfolioAnalytics_bp.route('/risk', methods=['GET', 'POST'])
+@conditional(_universe_version)
+def get_risk_metrics():
+    """
+    Endpoint per le metriche di rischio di un simbolo o di un portafoglio pesato
+    Drawdown, Sharpe / Sortino (anche mobili), VaR / CVaR storici e Monte Carlo
+    ('model' bootstrap o gbm, 'none' per saltare la simulazione). La
+    simulazione usa un seme fisso di default: la risposta è riproducibile
+    e può essere servita dalla cache finché i dati non cambiano
+    """
+    try:
+        data = dict(request_params())
+        symbols, data_type = _universe_params(data)
+        confidence = _confidence_levels(data)
+        horizon = _optional_number(data, 'horizon', int)
+        window = _optional_number(data, 'window', int)
+        risk_free = _optional_number(data, 'risk_free', float)
+        paths = _optional_number(data, 'paths', int)
+        seed = _optional_number(data, 'seed', int)
+        workers = _optional_number(data, 'workers', int)
+        
+        def compute():
+            metrics = risk_service.get_risk(
+                symbols,
+                weights=data.get('weights'),
+                start_date=data.get('start_date'),
+                end_date=data.get('end_date'),
+                data_type=data_type,
+                confidence=confidence,
+                horizon=1 if horizon is None else horizon,
+                window=window,
+                risk_free=risk_free or 0.0,
+                model=str(data.get('model', 'bootstrap')).strip().lower(),
+                paths=paths,
+                seed=seed,
+                workers=1 if workers is None else workers
+            )
+            return {
+                'success': True,
+                'data': metrics
+            }
+        
+        return cached_json_response(
+            'portfolio_risk', data, _universe_version, compute,
+            symbols=symbols, error_status=400
+        )
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': 'Errore interno del server'
+        }), 500
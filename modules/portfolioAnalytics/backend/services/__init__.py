@@ -0,0 +1,6 @@
+# modules/portfolioAnalytics/backend/services/__init__.py
+"""Servizi del modulo"""
+from .correlation_service import CorrelationService
+from .risk_service import RiskService
+
+__all__ = ['CorrelationService', 'RiskService']
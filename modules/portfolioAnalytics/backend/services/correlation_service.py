@@ -0,0 +1,415 @@
+"""
+Servizio per matrici di correlazione e covarianza dei rendimenti
+Principio SOLID: Single Responsibility - statistiche di portafoglio sui dati in cache
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import BATCH_MAX_SYMBOLS, BATCH_MAX_WORKERS
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+
+
+class CorrelationService(BaseService):
+    """
+    Correlazione e covarianza N x N dei rendimenti giornalieri allineati per data
+    - 'full': tutto il periodo; le somme correnti sono salvate su disco e un
+      nuovo giorno aggiorna le matrici in O(N²) senza rileggere lo storico
+    - 'ewm': pesi esponenziali (halflife in giorni), somme decadute e aggiornate
+      allo stesso modo
+    - 'rolling': ultime 'window' date del pannello, calcolate dalla coda
+    Ogni coppia usa solo le date in cui entrambi i simboli hanno un rendimento
+    (come DataFrame.corr/cov di pandas)
+    """
+
+    METHODS = ('full', 'rolling', 'ewm')
+    KINDS = ('correlation', 'covariance', 'both')
+    DEFAULT_WINDOW = 60
+    DEFAULT_HALFLIFE = 30.0
+    MIN_PERIODS = 2
+    DATA_TYPES = ('daily', 'dailyAdjusted')
+    PRICE_FIELD = 'close'
+    # 2: close di dailyAdjusted rettificato in lettura (stati sui close grezzi scartati)
+    STATE_VERSION = 2
+
+    # Somme pesate per coppia (i, j) sulle date in cui entrambi hanno un rendimento:
+    # numero di osservazioni, Σw, Σw², Σw·x_i, Σw·x_i², Σw·x_i·x_j
+    SUMS = ('count', 'sw', 'sww', 'sx', 'sxx', 'sxy')
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+        self.state_path = Path("resources/data/portfolio/correlation")
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida simboli, tipo dati, metodo, tipo di matrice e parametri della finestra"""
+        symbols = data.get('symbols')
+        if not isinstance(symbols, list) or len(symbols) < 2:
+            raise ValueError("Servono almeno 2 simboli")
+        if len(symbols) > BATCH_MAX_SYMBOLS:
+            raise ValueError(f"Massimo {BATCH_MAX_SYMBOLS} simboli per richiesta")
+
+        if data.get('data_type', 'dailyAdjusted') not in self.DATA_TYPES:
+            raise ValueError(f"Tipo dati non supportato: {data.get('data_type')}")
+        if data.get('method', 'full') not in self.METHODS:
+            raise ValueError(
+                f"Metodo non supportato: {data.get('method')}. "
+                f"Usa uno tra {', '.join(self.METHODS)}"
+            )
+        if data.get('kind', 'correlation') not in self.KINDS:
+            raise ValueError(
+                f"Tipo matrice non supportato: {data.get('kind')}. "
+                f"Usa uno tra {', '.join(self.KINDS)}"
+            )
+
+        window = data.get('window', self.DEFAULT_WINDOW)
+        if not isinstance(window, int) or isinstance(window, bool) or window < self.MIN_PERIODS:
+            raise ValueError(f"window deve essere un intero >= {self.MIN_PERIODS}")
+
+        halflife = data.get('halflife', self.DEFAULT_HALFLIFE)
+        if not isinstance(halflife, (int, float)) or isinstance(halflife, bool) \
+                or not np.isfinite(halflife) or halflife <= 0:
+            raise ValueError("halflife deve essere un numero positivo")
+        return True
+
+    def get_matrix(self, symbols: List[str], start_date: Optional[str] = None,
+                   end_date: Optional[str] = None, data_type: str = 'dailyAdjusted',
+                   method: str = 'full', kind: str = 'correlation',
+                   window: Optional[int] = None, halflife: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Matrici richieste sui rendimenti dei simboli presenti in cache
+
+        Returns:
+            {'symbols', 'missing', 'start', 'end', 'observations', 'incremental',
+             'new_rows', 'correlation' e/o 'covariance' (liste N x N, null se
+             la coppia ha meno di MIN_PERIODS osservazioni comuni)}
+        """
+        symbols = list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols))
+        window = self.DEFAULT_WINDOW if window is None else window
+        halflife = self.DEFAULT_HALFLIFE if halflife is None else halflife
+        self.validate_input({
+            'symbols': symbols, 'data_type': data_type, 'method': method, 'kind': kind,
+            'window': window, 'halflife': halflife
+        })
+
+        if method == 'rolling':
+            sums, state = self._rolling_sums(symbols, data_type, start_date, end_date, window)
+            incremental, new_rows = False, state['rows']
+        else:
+            decay = 1.0 if method == 'full' else float(np.exp(-np.log(2.0) / halflife))
+            sums, state, incremental, new_rows = self.update(
+                symbols, data_type, start_date, end_date, method, decay
+            )
+
+        result = {
+            'symbols': state['symbols'],
+            'missing': state['missing'],
+            'data_type': data_type,
+            'method': method,
+            'start': state['start'],
+            'end': state['end'],
+            'observations': state['rows'],
+            'incremental': incremental,
+            'new_rows': new_rows
+        }
+        if method == 'rolling':
+            result['window'] = window
+        elif method == 'ewm':
+            result['halflife'] = halflife
+
+        correlation, covariance = self.matrices(sums)
+        if kind in ('correlation', 'both'):
+            result['correlation'] = self._to_list(correlation)
+        if kind in ('covariance', 'both'):
+            result['covariance'] = self._to_list(covariance)
+        return result
+
+    def update(self, symbols: List[str], data_type: str, start_date: Optional[str],
+               end_date: Optional[str], method: str,
+               decay: float) -> Tuple[Dict[str, np.ndarray], Dict[str, Any], bool, int]:
+        """
+        Allinea le somme salvate ai file prezzi e le restituisce
+        Se i file sono solo cresciuti si accumulano le nuove date partendo dallo
+        stato salvato (O(N²) per data); altrimenti ricalcolo completo
+
+        Returns:
+            (somme, stato, aggiornamento incrementale, date elaborate)
+        """
+        key = self._state_key(symbols, data_type, start_date, method, decay)
+        stored = self._load(key)
+
+        if stored is not None:
+            sums, state = stored
+            tail = self._tail_panel(state, data_type, end_date)
+            if tail is not None:
+                close, versions = tail
+                if len(close):
+                    self.log_info(f"Correlazione {key[:12]}: aggiornamento di {len(close)} date")
+                    self._advance(sums, state, close, decay)
+                if len(close) or versions != state['versions']:
+                    state['versions'] = versions
+                    self._save(key, sums, state)
+                return sums, state, True, len(close)
+
+        # Versioni lette prima dei dati: una scrittura concorrente verrà riletta
+        versions = {symbol: self._file_version(symbol, data_type) for symbol in symbols}
+        panels, missing = self.file_manager.load_panel(
+            symbols, data_type, start_date, end_date, fields=(self.PRICE_FIELD,)
+        )
+        close = panels[self.PRICE_FIELD]
+        if close.empty:
+            raise ValueError("Nessun dato trovato in cache per i simboli richiesti")
+
+        self.log_info(f"Correlazione {key[:12]}: calcolo completo "
+                      f"({len(close)} date x {close.shape[1]} simboli)")
+        n = close.shape[1]
+        sums = {name: np.zeros((n, n)) for name in self.SUMS}
+        state = {
+            'version': self.STATE_VERSION,
+            'symbols': [str(symbol) for symbol in close.columns],
+            'missing': missing,
+            'start': None,
+            'rows': 0,
+            'last_close': [None] * n,
+            'last_time': [None] * n,
+            # Con end_date le righe successive non sono incluse: file da rileggere
+            'versions': [None if end_date else versions[symbol] for symbol in close.columns]
+        }
+        self._advance(sums, state, close, decay)
+        self._save(key, sums, state)
+        return sums, state, False, len(close)
+
+    def accumulate(self, sums: Dict[str, np.ndarray], returns: np.ndarray,
+                   decay: float = 1.0) -> None:
+        """
+        Aggiunge alle somme le righe di rendimenti (date x simboli, NaN = assente)
+        Con decay < 1 le somme precedenti e le righe più vecchie pesano
+        decay^età: il risultato coincide con un calcolo unico sulle stesse righe
+        """
+        rows = len(returns)
+        if not rows:
+            return
+
+        valid = np.isfinite(returns)
+        mask = valid.astype(np.float64)
+        x = np.where(valid, returns, 0.0)
+        weights = decay ** np.arange(rows - 1, -1, -1, dtype=np.float64)
+        carry = decay ** rows
+
+        wx = x * weights[:, None]
+        wmask = mask * weights[:, None]
+        sums['count'] += mask.T @ mask
+        for name, value, scale in (
+            ('sw', wmask.T @ mask, carry),
+            ('sww', (wmask * weights[:, None]).T @ mask, carry ** 2),
+            ('sx', wx.T @ mask, carry),
+            ('sxx', (wx * x).T @ mask, carry),
+            ('sxy', wx.T @ x, carry)
+        ):
+            if scale != 1.0:
+                sums[name] *= scale
+            sums[name] += value
+
+    def matrices(self, sums: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Correlazione e covarianza (non distorta) dalle somme per coppia"""
+        sw = sums['sw']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_x = sums['sx'] / sw
+            mean_y = mean_x.T
+            cov_biased = sums['sxy'] / sw - mean_x * mean_y
+            var_x = np.maximum(sums['sxx'] / sw - mean_x ** 2, 0.0)
+            var_y = var_x.T
+            covariance = cov_biased * (sw ** 2 / (sw ** 2 - sums['sww']))
+            correlation = np.clip(cov_biased / np.sqrt(var_x * var_y), -1.0, 1.0)
+
+        insufficient = sums['count'] < self.MIN_PERIODS
+        covariance[insufficient | ~np.isfinite(covariance)] = np.nan
+        correlation[insufficient | ~np.isfinite(correlation)] = np.nan
+        return correlation, covariance
+
+    def _rolling_sums(self, symbols: List[str], data_type: str, start_date: Optional[str],
+                      end_date: Optional[str], window: int) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Somme delle ultime window date del pannello (nessuno stato salvato)"""
+        panels, missing = self.file_manager.load_panel(
+            symbols, data_type, start_date, end_date, fields=(self.PRICE_FIELD,)
+        )
+        close = panels[self.PRICE_FIELD]
+        if close.empty:
+            raise ValueError("Nessun dato trovato in cache per i simboli richiesti")
+
+        n = close.shape[1]
+        returns, _ = self._returns(close.to_numpy(dtype=np.float64), np.full(n, np.nan))
+        sums = {name: np.zeros((n, n)) for name in self.SUMS}
+        self.accumulate(sums, returns[-window:])
+
+        dates = close.index[-window:]
+        return sums, {
+            'symbols': [str(symbol) for symbol in close.columns],
+            'missing': missing,
+            'start': dates[0].strftime('%Y-%m-%d'),
+            'end': dates[-1].strftime('%Y-%m-%d'),
+            'rows': len(dates)
+        }
+
+    def _advance(self, sums: Dict[str, np.ndarray], state: Dict[str, Any],
+                 close: pd.DataFrame, decay: float) -> None:
+        """Accumula le date di close (date x simboli dello stato) e aggiorna lo stato"""
+        previous = np.array(
+            [np.nan if value is None else value for value in state['last_close']],
+            dtype=np.float64
+        )
+        values = close.to_numpy(dtype=np.float64)
+        returns, last_close = self._returns(values, previous)
+        self.accumulate(sums, returns, decay)
+
+        times = close.index.to_numpy().astype('datetime64[ns]').astype(np.int64)
+        for j, column in enumerate(values.T):
+            valid = np.flatnonzero(np.isfinite(column))
+            if len(valid):
+                state['last_time'][j] = int(times[valid[-1]])
+                state['last_close'][j] = float(last_close[j])
+
+        if state['start'] is None:
+            state['start'] = close.index[0].strftime('%Y-%m-%d')
+        state['end'] = close.index[-1].strftime('%Y-%m-%d')
+        state['cursor'] = int(times[-1])
+        state['rows'] += len(close)
+
+    @staticmethod
+    def _returns(close: np.ndarray, previous: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rendimenti rispetto all'ultimo close valido di ogni simbolo
+        previous: ultimo close prima della prima riga (NaN se assente)
+
+        Returns:
+            (rendimenti date x simboli, ultimo close valido per simbolo)
+        """
+        filled = pd.DataFrame(np.vstack([previous, close])).ffill().to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = close / filled[:-1] - 1.0
+        returns[~np.isfinite(returns)] = np.nan
+        return returns, filled[-1]
+
+    def _tail_panel(self, state: Dict[str, Any], data_type: str,
+                    end_date: Optional[str]) -> Optional[Tuple[pd.DataFrame, List[Optional[str]]]]:
+        """
+        Nuove date (close date x simboli) successive allo stato salvato
+        Si rileggono solo le code dei file cambiati dall'ultimo aggiornamento.
+        None se lo stato non è più valido: file riscritti, simboli prima assenti
+        ora in cache, periodo richiesto che termina prima dello stato
+
+        Returns:
+            (nuove date, versioni dei file incluse nello stato)
+        """
+        if state.get('version') != self.STATE_VERSION:
+            return None
+        end = pd.to_datetime(end_date) if end_date else None
+        if end is not None and end.value < state['cursor']:
+            return None
+        if any(self._file_version(symbol, data_type) is not None for symbol in state['missing']):
+            return None
+
+        versions = [self._file_version(symbol, data_type) for symbol in state['symbols']]
+        changed = [
+            j for j, version in enumerate(versions)
+            if version is None or version != state['versions'][j]
+        ]
+
+        def read(j):
+            return self._symbol_tail(state, j, data_type, end)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(BATCH_MAX_WORKERS, len(changed) or 1))) as pool:
+            tails = list(pool.map(read, changed))
+
+        columns = []
+        for j, tail in zip(changed, tails):
+            if tail is None:
+                return None
+            new_rows, complete = tail
+            if not complete:
+                versions[j] = None
+            if len(new_rows):
+                columns.append(new_rows)
+
+        if not columns:
+            return pd.DataFrame(columns=state['symbols'], index=pd.DatetimeIndex([]), dtype=np.float64), versions
+        close = pd.concat(columns, axis=1).sort_index()
+        return close.reindex(columns=state['symbols']), versions
+
+    def _symbol_tail(self, state: Dict[str, Any], j: int, data_type: str,
+                     end: Optional[pd.Timestamp]) -> Optional[Tuple[pd.Series, bool]]:
+        """
+        Close successivi allo stato per il simbolo j (None se il file non lo prosegue)
+
+        Returns:
+            (nuovi close fino a end, nessuna riga esclusa da end)
+        """
+        symbol, last_time = state['symbols'][j], state['last_time'][j]
+        if last_time is None:
+            return None
+        tail, _ = self.file_manager.read_page(symbol, data_type, after=last_time - 1, limit=None)
+        if tail is None or tail.empty or tail['date'].iloc[0].value != last_time:
+            return None
+        if not np.isclose(tail[self.PRICE_FIELD].iloc[0], state['last_close'][j],
+                          rtol=1e-12, atol=0.0):
+            return None
+
+        new_rows = tail.iloc[1:]
+        if len(new_rows) and new_rows['date'].iloc[0].value <= state['cursor']:
+            return None
+
+        complete = True
+        if end is not None:
+            included = new_rows['date'] <= end
+            complete = bool(included.all())
+            new_rows = new_rows[included]
+        return new_rows.set_index('date')[self.PRICE_FIELD].rename(symbol), complete
+
+    def _file_version(self, symbol: str, data_type: str) -> Optional[str]:
+        """Versione del file prezzi (None se assente)"""
+        version = self.file_manager.get_data_version(symbol, data_type)
+        return version[0] if version else None
+
+    def _state_key(self, symbols: List[str], data_type: str,
+                   start_date: Optional[str], method: str, decay: float) -> str:
+        """Chiave dello stato: universo, tipo dati, inizio periodo e pesi"""
+        payload = json.dumps([self.STATE_VERSION, symbols, data_type, start_date, method, decay])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _load(self, key: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+        """Somme e stato salvati (None se assenti o illeggibili)"""
+        path = self.state_path / f"{key}.npz"
+        if not path.exists():
+            return None
+        try:
+            with np.load(path) as stored:
+                state = json.loads(str(stored['state']))
+                sums = {name: stored[name] for name in self.SUMS}
+            return sums, state
+        except Exception as e:
+            self.log_error(f"Stato correlazione non leggibile: {path}", e)
+            return None
+
+    def _save(self, key: str, sums: Dict[str, np.ndarray], state: Dict[str, Any]) -> None:
+        """Salva somme e stato (scrittura atomica: le richieste concorrenti leggono file completi)"""
+        self.state_path.mkdir(parents=True, exist_ok=True)
+        path = self.state_path / f"{key}.npz"
+        temp_path = path.with_name(f"{key}.{os.getpid()}.tmp")
+        with open(temp_path, 'wb') as f:
+            np.savez(f, state=np.array(json.dumps(state)), **sums)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _to_list(matrix: np.ndarray) -> List[List[Optional[float]]]:
+        """Matrice JSON-compatibile (NaN -> None)"""
+        return [
+            [float(value) if np.isfinite(value) else None for value in row]
+            for row in matrix
+        ]
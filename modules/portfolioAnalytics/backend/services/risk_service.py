@@ -0,0 +1,412 @@
+"""
+Servizio per le metriche di rischio di simboli e portafogli pesati
+Principio SOLID: Single Responsibility - rischio storico e simulato sui dati in cache
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.backend.base.base_service import BaseService
+from core.backend.config.settings import (
+    BATCH_MAX_SYMBOLS, MONTE_CARLO_CHUNK_ELEMENTS, MONTE_CARLO_MAX_PATHS,
+    MONTE_CARLO_MAX_WORKERS, MONTE_CARLO_START_METHOD
+)
+from core.backend.utils.columnar import frame_to_columnar
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+
+
+# Input della simulazione nel processo worker: impostati una volta dall'initializer
+_simulation: Dict[str, Any] = {}
+
+
+def simulate_chunk(model: str, inputs: Dict[str, np.ndarray], paths: int, horizon: int,
+                   seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simula un blocco di path buy-and-hold del portafoglio (valore iniziale 1)
+    - bootstrap: ogni giorno del path è una data storica estratta con
+      reinserimento (riga intera: la correlazione tra simboli è preservata)
+    - gbm: log-rendimenti normali multivariati con media e covarianza storiche
+
+    Returns:
+        (rendimento a fine orizzonte, massimo drawdown lungo il path) per path
+    """
+    rng = np.random.default_rng(seed)
+    if model == 'bootstrap':
+        history = inputs['log_returns']
+        steps = history[rng.integers(0, len(history), size=(paths, horizon))]
+    else:
+        steps = rng.standard_normal((paths, horizon, len(inputs['drift'])))
+        steps = steps @ inputs['scale'].T
+        steps += inputs['drift']
+
+    # paths x orizzonte x simboli -> valore del portafoglio paths x orizzonte
+    np.cumsum(steps, axis=1, out=steps)
+    np.exp(steps, out=steps)
+    value = steps @ inputs['weights']
+
+    peak = np.maximum(np.maximum.accumulate(value, axis=1), 1.0)
+    drawdown = (value / peak - 1.0).min(axis=1)
+    return value[:, -1] - 1.0, drawdown
+
+
+def _init_simulation(model: str, inputs: Dict[str, np.ndarray]) -> None:
+    """Riceve gli input della simulazione una volta per worker, non per blocco"""
+    _simulation['model'] = model
+    _simulation['inputs'] = inputs
+
+
+def _simulate_worker_chunk(paths: int, horizon: int,
+                           seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Blocco simulato nel worker con gli input ricevuti dall'initializer"""
+    return simulate_chunk(_simulation['model'], _simulation['inputs'], paths, horizon, seed)
+
+
+class RiskService(BaseService):
+    """
+    Metriche di rischio dei rendimenti giornalieri di un simbolo o di un
+    portafoglio pesato (ribilanciato giornalmente sulle date comuni)
+    - drawdown massimo, date di picco / minimo / recupero e durate
+    - Sharpe e Sortino annualizzati, complessivi e su finestra mobile
+    - VaR / CVaR storici su rendimenti composti sull'orizzonte
+    - VaR / CVaR Monte Carlo (bootstrap o GBM) su matrici path x orizzonte,
+      simulate a blocchi per limitare la memoria e opzionalmente su più processi
+    Perdite e rendimenti sono in percentuale
+    """
+
+    MODELS = ('bootstrap', 'gbm', 'none')
+    DATA_TYPES = ('daily', 'dailyAdjusted')
+    PRICE_FIELD = 'close'
+    TRADING_DAYS = 252
+    DEFAULT_CONFIDENCE = (0.95, 0.99)
+    DEFAULT_WINDOW = 63
+    DEFAULT_PATHS = 10000
+    DEFAULT_SEED = 0
+    MAX_HORIZON = 1260
+
+    def __init__(self):
+        super().__init__()
+        self.file_manager = FileManagerService()
+
+    def validate_input(self, data: Dict[str, Any]) -> bool:
+        """Valida simboli, modello, livelli di confidenza, orizzonte, path e finestra"""
+        symbols = data.get('symbols')
+        if not isinstance(symbols, list) or not symbols:
+            raise ValueError("Serve almeno un simbolo")
+        if len(symbols) > BATCH_MAX_SYMBOLS:
+            raise ValueError(f"Massimo {BATCH_MAX_SYMBOLS} simboli per richiesta")
+
+        if data.get('data_type', 'dailyAdjusted') not in self.DATA_TYPES:
+            raise ValueError(f"Tipo dati non supportato: {data.get('data_type')}")
+        if data.get('model', 'bootstrap') not in self.MODELS:
+            raise ValueError(
+                f"Modello non supportato: {data.get('model')}. "
+                f"Usa uno tra {', '.join(self.MODELS)}"
+            )
+
+        confidence = data.get('confidence', self.DEFAULT_CONFIDENCE)
+        if not confidence or any(not 0 < level < 1 for level in confidence):
+            raise ValueError("confidence deve contenere livelli tra 0 e 1 (es. 0.95)")
+
+        for key, low, high in (('horizon', 1, self.MAX_HORIZON),
+                               ('paths', 1, MONTE_CARLO_MAX_PATHS),
+                               ('window', 2, None),
+                               ('workers', 1, None)):
+            value = data.get(key, low)
+            if not isinstance(value, int) or isinstance(value, bool) or value < low \
+                    or (high is not None and value > high):
+                limit = f" e <= {high}" if high is not None else ""
+                raise ValueError(f"{key} deve essere un intero >= {low}{limit}")
+        return True
+
+    def get_risk(self, symbols: List[str], weights: Optional[Any] = None,
+                 start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 data_type: str = 'dailyAdjusted', confidence: Sequence[float] = None,
+                 horizon: int = 1, window: Optional[int] = None, risk_free: float = 0.0,
+                 model: str = 'bootstrap', paths: Optional[int] = None,
+                 seed: Optional[int] = None, workers: int = 1) -> Dict[str, Any]:
+        """
+        Metriche di rischio del portafoglio sui dati in cache
+
+        Args:
+            weights: {simbolo: peso} o lista allineata ai simboli (default pesi
+                uguali); normalizzati a somma 1
+            confidence: livelli di VaR / CVaR (default 0.95 e 0.99)
+            horizon: orizzonte in giorni di borsa di VaR e simulazioni
+            window: finestra di Sharpe / Sortino mobili
+            risk_free: tasso privo di rischio annuo (es. 0.03)
+            model: 'bootstrap', 'gbm' o 'none' (nessuna simulazione)
+            seed: seme della simulazione (stesso seme, stesso risultato
+                indipendentemente dal numero di worker)
+            workers: processi per la simulazione (1 = nel processo corrente)
+
+        Returns:
+            {'symbols', 'missing', 'weights', 'start', 'end', 'observations',
+             'performance', 'drawdown', 'historical', 'monte_carlo', 'rolling'}
+        """
+        symbols = list(dict.fromkeys(str(symbol).strip().upper() for symbol in symbols))
+        confidence = [float(level) for level in (confidence or self.DEFAULT_CONFIDENCE)]
+        window = self.DEFAULT_WINDOW if window is None else window
+        paths = self.DEFAULT_PATHS if paths is None else paths
+        self.validate_input({
+            'symbols': symbols, 'data_type': data_type, 'model': model,
+            'confidence': confidence, 'horizon': horizon, 'paths': paths,
+            'window': window, 'workers': workers
+        })
+        weights = self._weights(symbols, weights)
+
+        panels, missing = self.file_manager.load_panel(
+            symbols, data_type, start_date, end_date, fields=(self.PRICE_FIELD,)
+        )
+        if missing and len(missing) == len(symbols):
+            raise ValueError("Nessun dato trovato in cache per i simboli richiesti")
+        if missing and weights is not None:
+            raise ValueError(f"Simboli con peso ma senza dati in cache: {', '.join(missing)}")
+
+        close = panels[self.PRICE_FIELD]
+        symbols = [str(symbol) for symbol in close.columns]
+        weights = np.full(len(symbols), 1.0 / len(symbols)) if weights is None \
+            else np.array([weights[symbol] for symbol in symbols])
+
+        returns, dates = self.aligned_returns(close)
+        if len(returns) < max(window, horizon + 1):
+            raise ValueError(
+                f"Storico comune insufficiente: {len(returns)} rendimenti "
+                f"(servono almeno {max(window, horizon + 1)})"
+            )
+        portfolio = returns @ weights
+        excess = portfolio - risk_free / self.TRADING_DAYS
+
+        equity = np.concatenate([[1.0], np.cumprod(1.0 + portfolio)])
+        result = {
+            'symbols': symbols,
+            'missing': missing,
+            'weights': dict(zip(symbols, weights.tolist())),
+            'data_type': data_type,
+            'start': dates[0].strftime('%Y-%m-%d'),
+            'end': dates[-1].strftime('%Y-%m-%d'),
+            'observations': int(len(portfolio)),
+            'performance': self.performance(portfolio, excess, dates),
+            'drawdown': self.drawdown(equity, dates),
+            'historical': {
+                'horizon': horizon,
+                'levels': self.historical_var(portfolio, confidence, horizon)
+            },
+            'rolling': self.rolling_ratios(excess, dates[1:], window)
+        }
+        if model != 'none':
+            result['monte_carlo'] = self.monte_carlo(
+                np.log1p(returns), weights, model, confidence, horizon, paths,
+                self.DEFAULT_SEED if seed is None else int(seed), workers
+            )
+        return result
+
+    def aligned_returns(self, close: pd.DataFrame) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+        """
+        Rendimenti giornalieri delle sole date in cui tutti i simboli ne hanno uno
+        (rispetto all'ultimo close valido di ciascuno)
+
+        Returns:
+            (rendimenti date x simboli, date: la prima è la base del primo rendimento)
+        """
+        values = close.to_numpy(dtype=np.float64)
+        filled = close.ffill().to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = values[1:] / filled[:-1] - 1.0
+        valid = np.isfinite(returns).all(axis=1)
+
+        rows = np.flatnonzero(valid)
+        if not len(rows):
+            return np.empty((0, values.shape[1])), pd.DatetimeIndex([])
+        dates = close.index[np.concatenate([[rows[0]], rows + 1])]
+        return returns[valid], dates
+
+    def performance(self, portfolio: np.ndarray, excess: np.ndarray,
+                    dates: pd.DatetimeIndex) -> Dict[str, Any]:
+        """Rendimento, volatilità, Sharpe e Sortino annualizzati sul periodo"""
+        total = float(np.prod(1.0 + portfolio) - 1.0)
+        years = max((dates[-1] - dates[0]).days / 365.25, 1e-9)
+        volatility = float(np.std(excess, ddof=1))
+        downside = float(np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2)))
+        annualize = np.sqrt(self.TRADING_DAYS)
+
+        return {
+            'total_return': total * 100,
+            'cagr': ((1.0 + total) ** (1.0 / years) - 1.0) * 100 if total > -1 else -100.0,
+            'volatility_annualized': float(np.std(portfolio, ddof=1) * annualize * 100),
+            'sharpe': float(np.mean(excess) / volatility * annualize) if volatility > 0 else None,
+            'sortino': float(np.mean(excess) / downside * annualize) if downside > 0 else None
+        }
+
+    @staticmethod
+    def drawdown(equity: np.ndarray, dates: pd.DatetimeIndex) -> Dict[str, Any]:
+        """
+        Drawdown massimo con date di picco, minimo e recupero; durate in giorni
+        di borsa dal picco al recupero (o all'ultima data se non recuperato)
+        """
+        peak = np.maximum.accumulate(equity)
+        drawdown = equity / peak - 1.0
+
+        trough = int(np.argmin(drawdown))
+        start = int(np.argmax(equity[:trough + 1]))
+        recovered = np.flatnonzero(equity[trough:] >= equity[start])
+        recovery = trough + int(recovered[0]) if len(recovered) else None
+
+        # Periodi sott'acqua: sequenze di drawdown < 0 tra un picco e il recupero
+        underwater = np.concatenate([[False], drawdown < 0, [False]])
+        edges = np.flatnonzero(np.diff(underwater.astype(np.int8)))
+        starts, ends = edges[::2], edges[1::2]
+        durations = ends - starts + (ends < len(equity))
+
+        def day(index):
+            return dates[index].strftime('%Y-%m-%d') if index is not None else None
+
+        return {
+            'max_drawdown': float(drawdown[trough] * 100),
+            'peak': day(start),
+            'trough': day(trough),
+            'recovery': day(recovery),
+            'duration_days': (recovery if recovery is not None else len(equity) - 1) - start,
+            'longest_duration_days': int(durations.max()) if len(durations) else 0,
+            'current_drawdown': float(drawdown[-1] * 100)
+        }
+
+    @staticmethod
+    def historical_var(portfolio: np.ndarray, confidence: Sequence[float],
+                       horizon: int) -> List[Dict[str, float]]:
+        """VaR e CVaR storici sui rendimenti composti a 'horizon' giorni (finestre sovrapposte)"""
+        growth = np.concatenate([[0.0], np.cumsum(np.log1p(portfolio))])
+        returns = np.expm1(growth[horizon:] - growth[:-horizon])
+        return RiskService._tail_levels(returns, confidence)
+
+    def rolling_ratios(self, excess: np.ndarray, dates: pd.DatetimeIndex,
+                       window: int) -> Dict[str, Any]:
+        """Sharpe e Sortino annualizzati su finestra mobile (somme cumulative, O(n))"""
+        def rolling_sum(values):
+            total = np.concatenate([[0.0], np.cumsum(values)])
+            return total[window:] - total[:-window]
+
+        mean = rolling_sum(excess) / window
+        variance = (rolling_sum(excess ** 2) - window * mean ** 2) / (window - 1)
+        downside = np.sqrt(rolling_sum(np.minimum(excess, 0.0) ** 2) / window)
+        annualize = np.sqrt(self.TRADING_DAYS)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = mean / np.sqrt(np.maximum(variance, 0.0)) * annualize
+            sortino = mean / downside * annualize
+        frame = pd.DataFrame({
+            'date': dates[window - 1:],
+            'sharpe': np.where(np.isfinite(sharpe), sharpe, np.nan),
+            'sortino': np.where(np.isfinite(sortino), sortino, np.nan)
+        })
+        return {'window': window,
+                **frame_to_columnar(frame, fields=['sharpe', 'sortino'], decimals=4)}
+
+    def monte_carlo(self, log_returns: np.ndarray, weights: np.ndarray, model: str,
+                    confidence: Sequence[float], horizon: int, paths: int, seed: int,
+                    workers: int = 1) -> Dict[str, Any]:
+        """
+        VaR / CVaR simulati del portafoglio buy-and-hold a fine orizzonte
+        I path sono divisi in blocchi di al più MONTE_CARLO_CHUNK_ELEMENTS valori
+        (path x orizzonte x simboli); ogni blocco ha il proprio seme derivato,
+        quindi il risultato non dipende da come i blocchi vengono distribuiti
+        """
+        started = time.perf_counter()
+        inputs = {'weights': weights}
+        if model == 'bootstrap':
+            inputs['log_returns'] = log_returns
+        else:
+            inputs['drift'] = log_returns.mean(axis=0)
+            inputs['scale'] = self._covariance_root(log_returns)
+
+        per_chunk = max(1, MONTE_CARLO_CHUNK_ELEMENTS // (horizon * len(weights)))
+        sizes = [min(per_chunk, paths - offset) for offset in range(0, paths, per_chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        workers = max(1, min(workers, MONTE_CARLO_MAX_WORKERS, len(sizes)))
+
+        if workers == 1:
+            chunks = [simulate_chunk(model, inputs, size, horizon, chunk_seed)
+                      for size, chunk_seed in zip(sizes, seeds)]
+        else:
+            context = multiprocessing.get_context(MONTE_CARLO_START_METHOD)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_simulation,
+                                     initargs=(model, inputs)) as executor:
+                chunks = list(executor.map(
+                    _simulate_worker_chunk, sizes, [horizon] * len(sizes), seeds
+                ))
+
+        terminal = np.concatenate([chunk[0] for chunk in chunks])
+        drawdown = np.concatenate([chunk[1] for chunk in chunks])
+        self.log_info(
+            f"Monte Carlo {model}: {paths} path x {horizon} giorni, "
+            f"{len(sizes)} blocchi su {workers} processi"
+        )
+        return {
+            'model': model,
+            'paths': paths,
+            'horizon': horizon,
+            'seed': seed,
+            'chunks': len(sizes),
+            'workers': workers,
+            'levels': self._tail_levels(terminal, confidence),
+            'expected_return': float(terminal.mean() * 100),
+            'probability_of_loss': float((terminal < 0).mean() * 100),
+            'max_drawdown': {
+                'mean': float(drawdown.mean() * 100),
+                'median': float(np.median(drawdown) * 100),
+                'worst_5pct': float(np.quantile(drawdown, 0.05) * 100)
+            },
+            'elapsed_seconds': round(time.perf_counter() - started, 3)
+        }
+
+    @staticmethod
+    def _tail_levels(returns: np.ndarray, confidence: Sequence[float]) -> List[Dict[str, float]]:
+        """VaR (perdita al quantile 1 - confidenza) e CVaR (perdita media oltre il VaR)"""
+        levels = []
+        for level in confidence:
+            quantile = float(np.quantile(returns, 1.0 - level))
+            levels.append({
+                'confidence': level,
+                'var': -quantile * 100,
+                'cvar': -float(returns[returns <= quantile].mean()) * 100
+            })
+        return levels
+
+    @staticmethod
+    def _covariance_root(log_returns: np.ndarray) -> np.ndarray:
+        """
+        Matrice S con S·Sᵀ = covarianza dei log-rendimenti
+        Decomposizione spettrale: valida anche con covarianza singolare
+        (più simboli che date, simboli collineari), dove Cholesky fallisce
+        """
+        covariance = np.atleast_2d(np.cov(log_returns, rowvar=False))
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        return eigenvectors * np.sqrt(np.clip(eigenvalues, 0.0, None))
+
+    @staticmethod
+    def _weights(symbols: List[str], weights: Optional[Any]) -> Optional[Dict[str, float]]:
+        """Pesi normalizzati a somma 1 per simbolo (None = pesi uguali)"""
+        if weights is None:
+            return None
+        if isinstance(weights, list):
+            if len(weights) != len(symbols):
+                raise ValueError("weights deve avere un valore per ogni simbolo")
+            weights = dict(zip(symbols, weights))
+        if not isinstance(weights, dict):
+            raise ValueError("weights deve essere un oggetto {simbolo: peso} o una lista")
+
+        weights = {str(symbol).strip().upper(): value for symbol, value in weights.items()}
+        unknown = [symbol for symbol in weights if symbol not in symbols]
+        if unknown:
+            raise ValueError(f"Pesi per simboli non richiesti: {', '.join(unknown)}")
+        try:
+            values = np.array([float(weights.get(symbol, 0.0)) for symbol in symbols])
+        except (TypeError, ValueError):
+            raise ValueError("I pesi devono essere numerici")
+        if not np.isfinite(values).all() or values.sum() <= 0:
+            raise ValueError("I pesi devono essere finiti con somma positiva")
+        return dict(zip(symbols, (values / values.sum()).tolist()))
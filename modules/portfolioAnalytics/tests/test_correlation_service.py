@@ -0,0 +1,136 @@
+"""
+Test per il servizio di correlazione / covarianza dei rendimenti
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.portfolioAnalytics.backend.services.correlation_service import CorrelationService
+
+
+class TestCorrelationService:
+    """Test suite per CorrelationService"""
+
+    @pytest.fixture
+    def frames(self):
+        """Tre simboli con inizio diverso e date mancanti"""
+        rng = np.random.default_rng(3)
+        frames = {}
+        for symbol, start, days in (('AAA', '2020-01-01', 400), ('BBB', '2020-03-02', 350),
+                                    ('CCC', '2020-01-01', 400)):
+            close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+            frames[symbol] = pd.DataFrame({
+                'date': pd.bdate_range(start, periods=days),
+                'open': close, 'high': close, 'low': close, 'close': close,
+                'volume': 1000
+            })
+        frames['CCC'] = frames['CCC'].drop(index=rng.choice(400, 20, replace=False))
+        return frames
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch):
+        """Servizio con cache e stato su directory temporanea"""
+        monkeypatch.chdir(tmp_path)
+        return CorrelationService()
+
+    @staticmethod
+    def save(frames, until):
+        """Salva in cache i dati fino alla data indicata"""
+        manager = FileManagerService()
+        for symbol, df in frames.items():
+            manager.save_data(symbol, 'dailyAdjusted', df[df['date'] <= until])
+
+    @staticmethod
+    def reference_returns(frames, until):
+        """Rendimenti attesi: rispetto all'ultimo close valido di ogni simbolo"""
+        close = pd.concat(
+            {symbol: df[df['date'] <= until].set_index('date')['close']
+             for symbol, df in frames.items()}, axis=1
+        ).sort_index()
+        return (close / close.ffill().shift(1) - 1).where(close.notna())
+
+    def test_full_matches_pandas(self, service, frames):
+        """Test correlazione e covarianza pairwise uguali a pandas"""
+        self.save(frames, '2021-12-31')
+        result = service.get_matrix(['AAA', 'BBB', 'CCC', 'ZZZ'], kind='both')
+        returns = self.reference_returns(frames, '2021-12-31')
+
+        assert result['missing'] == ['ZZZ']
+        assert not result['incremental']
+        np.testing.assert_allclose(np.array(result['correlation'], dtype=float),
+                                   returns.corr().to_numpy(), atol=1e-12)
+        np.testing.assert_allclose(np.array(result['covariance'], dtype=float),
+                                   returns.cov().to_numpy(), atol=1e-15)
+
+    def test_incremental_update_matches_recompute(self, service, frames):
+        """Test aggiornamento con le sole nuove date uguale al ricalcolo completo"""
+        self.save(frames, '2021-01-29')
+        service.get_matrix(['AAA', 'BBB', 'CCC'], method='ewm', halflife=10)
+
+        self.save(frames, '2021-03-31')
+        result = service.get_matrix(['AAA', 'BBB', 'CCC'], method='ewm', halflife=10,
+                                    kind='covariance')
+        assert result['incremental']
+        assert result['new_rows'] == len(pd.bdate_range('2021-02-01', '2021-03-31'))
+
+        returns = self.reference_returns(frames, '2021-03-31')[['AAA', 'BBB']]
+        expected = returns.ewm(halflife=10).cov().iloc[-2:].to_numpy()
+        np.testing.assert_allclose(np.array(result['covariance'], dtype=float)[:2, :2],
+                                   expected, rtol=1e-10)
+
+        fresh = CorrelationService()
+        fresh.state_path = service.state_path / 'fresh'
+        recomputed = fresh.get_matrix(['AAA', 'BBB', 'CCC'], method='ewm', halflife=10,
+                                      kind='covariance')
+        assert not recomputed['incremental']
+        np.testing.assert_allclose(np.array(result['covariance'], dtype=float),
+                                   np.array(recomputed['covariance'], dtype=float),
+                                   rtol=1e-10)
+
+    def test_rewritten_history_forces_recompute(self, service, frames):
+        """Test dati riscritti (nuovo ultimo close): ricalcolo completo"""
+        self.save(frames, '2021-06-30')
+        service.get_matrix(['AAA', 'BBB'])
+
+        frames['AAA'].loc[:, 'close'] *= 1.5
+        self.save(frames, '2021-06-30')
+        assert not service.get_matrix(['AAA', 'BBB'])['incremental']
+
+    def test_new_dividend_forces_recompute(self, service, frames):
+        """Test barre grezze + fattori: un nuovo dividendo cambia i close passati, ricalcolo"""
+        manager = FileManagerService()
+        for symbol in ('AAA', 'BBB'):
+            manager.save_data(symbol, 'daily', frames[symbol][frames[symbol]['date'] <= '2021-03-31'])
+            manager.save_factors(symbol, pd.DataFrame({'date': [], 'multiplier': []}))
+        service.get_matrix(['AAA', 'BBB'])
+
+        dividend = pd.Timestamp('2021-04-01')
+        for symbol in ('AAA', 'BBB'):
+            manager.append_data(symbol, 'daily', frames[symbol][frames[symbol]['date'] == dividend])
+        manager.save_factors('AAA', pd.DataFrame({'date': [dividend], 'multiplier': [0.97]}))
+        result = service.get_matrix(['AAA', 'BBB'], kind='covariance')
+        assert not result['incremental']
+
+        adjusted = {symbol: frames[symbol].copy() for symbol in ('AAA', 'BBB')}
+        adjusted['AAA'].loc[adjusted['AAA']['date'] < dividend, 'close'] *= 0.97
+        returns = self.reference_returns(adjusted, '2021-04-01')
+        np.testing.assert_allclose(np.array(result['covariance'], dtype=float),
+                                   returns.cov().to_numpy(), atol=1e-15)
+
+    def test_rolling_and_validation(self, service, frames):
+        """Test finestra mobile e parametri non validi"""
+        self.save(frames, '2021-06-30')
+        result = service.get_matrix(['AAA', 'CCC'], method='rolling', window=30)
+        returns = self.reference_returns(frames, '2021-06-30')[['AAA', 'CCC']]
+        np.testing.assert_allclose(np.array(result['correlation'], dtype=float),
+                                   returns.tail(30).corr().to_numpy(), atol=1e-12)
+
+        with pytest.raises(ValueError):
+            service.get_matrix(['AAA'])
+        with pytest.raises(ValueError):
+            service.get_matrix(['AAA', 'BBB'], method='spearman')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,120 @@
+"""
+Test per il servizio delle metriche di rischio
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.dataManagement.backend.services.file_manager import FileManagerService
+from modules.portfolioAnalytics.backend.services import risk_service
+from modules.portfolioAnalytics.backend.services.risk_service import RiskService
+
+
+class TestRiskService:
+    """Test suite per RiskService"""
+
+    @pytest.fixture
+    def close(self):
+        """Due simboli correlati, il secondo con una data mancante"""
+        rng = np.random.default_rng(8)
+        shocks = rng.multivariate_normal([0.0004, 0.0002], [[1e-4, 6e-5], [6e-5, 2e-4]], 800)
+        close = pd.DataFrame(100 * np.exp(np.cumsum(shocks, axis=0)), columns=['AAA', 'BBB'],
+                             index=pd.bdate_range('2020-01-01', periods=800))
+        close.iloc[500, 1] = np.nan
+        return close
+
+    @pytest.fixture
+    def service(self, tmp_path, monkeypatch, close):
+        """Servizio con cache su directory temporanea"""
+        monkeypatch.chdir(tmp_path)
+        manager = FileManagerService()
+        for symbol in close.columns:
+            series = close[symbol].dropna()
+            manager.save_data(symbol, 'dailyAdjusted', pd.DataFrame({
+                'date': series.index, 'open': series.values, 'high': series.values,
+                'low': series.values, 'close': series.values, 'volume': 1000
+            }))
+        return RiskService()
+
+    def test_historical_metrics_match_pandas(self, service, close):
+        """Test drawdown, Sharpe mobile e VaR storico uguali al calcolo pandas"""
+        result = service.get_risk(['AAA', 'BBB'], weights={'AAA': 3, 'BBB': 1},
+                                  horizon=5, window=20, model='none')
+        assert result['weights'] == {'AAA': 0.75, 'BBB': 0.25}
+        assert 'monte_carlo' not in result
+
+        returns = (close / close.ffill().shift(1) - 1).dropna()
+        portfolio = returns @ np.array([0.75, 0.25])
+        assert result['observations'] == len(portfolio) == 798
+
+        equity = (1 + portfolio).cumprod()
+        drawdown = equity / np.maximum(equity.cummax(), 1.0) - 1
+        assert result['drawdown']['max_drawdown'] == pytest.approx(drawdown.min() * 100)
+        assert result['drawdown']['trough'] == drawdown.idxmin().strftime('%Y-%m-%d')
+
+        rolling = portfolio.rolling(20)
+        sharpe = (rolling.mean() / rolling.std() * np.sqrt(252)).dropna()
+        assert result['rolling']['timestamps'][0] == sharpe.index[0].strftime('%Y-%m-%d')
+        assert result['rolling']['columns']['sharpe'] == pytest.approx(
+            sharpe.round(4).tolist(), abs=1e-4)
+
+        five_day = (1 + portfolio).rolling(5).apply(np.prod, raw=True).dropna() - 1
+        level = result['historical']['levels'][0]
+        assert level['confidence'] == 0.95
+        assert level['var'] == pytest.approx(-five_day.quantile(0.05) * 100)
+        assert level['cvar'] >= level['var']
+
+    def test_drawdown_durations(self, service):
+        """Test date e durate del drawdown su una equity nota"""
+        equity = np.array([1.0, 1.1, 0.9, 1.0, 1.2, 1.1, 1.15])
+        dates = pd.bdate_range('2024-01-01', periods=len(equity))
+        result = service.drawdown(equity, dates)
+
+        assert result['peak'] == '2024-01-02'
+        assert result['trough'] == '2024-01-03'
+        assert result['recovery'] == '2024-01-05'
+        assert result['duration_days'] == 3
+        assert result['longest_duration_days'] == 3
+        assert result['current_drawdown'] == pytest.approx((1.15 / 1.2 - 1) * 100)
+
+    def test_gbm_matches_analytic_var(self, service, monkeypatch):
+        """Test VaR GBM di un simbolo vicino alla formula lognormale (più blocchi)"""
+        monkeypatch.setattr(risk_service, 'MONTE_CARLO_CHUNK_ELEMENTS', 500000)
+        rng = np.random.default_rng(1)
+        log_returns = rng.normal(0.0005, 0.02, (2000, 1))
+        result = service.monte_carlo(log_returns, np.array([1.0]), 'gbm', [0.99],
+                                     horizon=10, paths=200000, seed=7)
+
+        mu, sigma = log_returns.mean(), log_returns.std(ddof=1)
+        expected = -np.expm1(10 * mu + NormalDist().inv_cdf(0.01) * sigma * np.sqrt(10)) * 100
+        assert result['levels'][0]['var'] == pytest.approx(expected, rel=0.02)
+        assert result['chunks'] > 1
+
+    def test_process_pool_is_deterministic(self, service, monkeypatch):
+        """Test stesso seme: stesso risultato in processo e su più worker"""
+        monkeypatch.setattr(risk_service, 'MONTE_CARLO_MAX_WORKERS', 2)
+        monkeypatch.setattr(risk_service, 'MONTE_CARLO_CHUNK_ELEMENTS', 100000)
+        kwargs = dict(horizon=10, paths=20000, seed=3, window=20)
+        serial = service.get_risk(['AAA', 'BBB'], workers=1, **kwargs)['monte_carlo']
+        parallel = service.get_risk(['AAA', 'BBB'], workers=2, **kwargs)['monte_carlo']
+
+        assert parallel['workers'] == 2
+        assert parallel['levels'] == serial['levels']
+        assert parallel['max_drawdown'] == serial['max_drawdown']
+
+    def test_validation(self, service):
+        """Test errori di input"""
+        with pytest.raises(ValueError):
+            service.get_risk(['AAA'], model='historical')
+        with pytest.raises(ValueError):
+            service.get_risk(['AAA'], confidence=[95])
+        with pytest.raises(ValueError):
+            service.get_risk(['AAA', 'ZZZ'], weights={'AAA': 1, 'ZZZ': 1})
+        with pytest.raises(ValueError):
+            service.get_risk(['AAA'], weights={'BBB': 1})
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -21,6 +21,8 @@ from core.backend.config.settings import (
     LOG_LEVEL,
     LOG_FORMAT
 )
+from core.backend.middleware.compression import init_compression
+from core.backend.utils.json_provider import init_json_provider
 from orchestrator.module_loader import ModuleLoader
 
 
@@ -56,6 +58,12 @@ class FinancialApp:
         self.app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
         self.app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
         
+        # Serializzazione JSON con orjson (array NumPy e datetime nativi)
+        init_json_provider(self.app)
+        
+        # Compressione gzip/brotli delle risposte sopra soglia
+        init_compression(self.app)
+        
         # Routes base
         self.setup_base_routes()
     